@@ -0,0 +1,276 @@
+"""
+Create or update many Genie spaces from a manifest.
+
+Each manifest entry is validated with validate_config in a process pool;
+invalid entries are reported and skipped. Valid entries are then sent
+concurrently over pooled keep-alive connections with a shared rate limit and
+retries. Runs are idempotent: an entry whose title and parent_path match an
+existing space PATCHes that space (or leaves it alone if its config,
+description and warehouse_id are unchanged) instead of creating a duplicate,
+so a failed run can simply be re-run. Results (action, space_id, URL, timing)
+are written to a JSON or CSV report.
+
+Manifest (JSON):
+    {
+      "defaults": {"warehouse_id": "abc123", "parent_path": "/Workspace/Shared/genie"},
+      "spaces": [
+        {"title": "Sales — EMEA", "description": "...", "serialized_space": {...}},
+        {"title": "Sales — APJ", "serialized_space_path": "spaces/apj.json"}
+      ]
+    }
+Each entry needs title, warehouse_id, parent_path (from the entry or
+"defaults"), and either serialized_space (a dict) or serialized_space_path
+(relative to the manifest). A bare list of entries is accepted too.
+
+Usage:
+    python scripts/bulk_create_spaces.py manifest.json --report report.json
+    python scripts/bulk_create_spaces.py manifest.json --dry-run
+Authentication uses databricks-sdk's default WorkspaceClient configuration
+(DATABRICKS_HOST/DATABRICKS_TOKEN, ~/.databrickscfg, or notebook context).
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from genie_api_client import GenieApiClient, list_spaces
+from validate_config import validate_config
+
+SPACES_PATH = "/api/2.0/genie/spaces"
+REPORT_COLUMNS = ("title", "parent_path", "action", "space_id", "url", "seconds", "error")
+
+
+# =====================================================================
+# MANIFEST
+# =====================================================================
+
+def load_manifest(path: str) -> list[dict]:
+    """
+    Manifest entries with defaults applied and serialized_space loaded.
+
+    Entries that can't be loaded keep an "error" instead of a config, so they
+    are reported alongside the rest.
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"spaces": manifest}
+    defaults = manifest.get("defaults", {})
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    entries = []
+    for index, raw in enumerate(manifest.get("spaces", [])):
+        entry = {**defaults, **raw, "index": index, "error": None}
+        missing = [field for field in ("title", "warehouse_id", "parent_path") if not entry.get(field)]
+        try:
+            if missing:
+                raise ValueError(f"missing {', '.join(missing)}")
+            if "serialized_space_path" in entry:
+                with open(os.path.join(base_dir, entry["serialized_space_path"]), encoding="utf-8") as f:
+                    entry["serialized_space"] = json.load(f)
+            elif isinstance(entry.get("serialized_space"), str):
+                entry["serialized_space"] = json.loads(entry["serialized_space"])
+            if not isinstance(entry.get("serialized_space"), dict):
+                raise ValueError("needs a serialized_space object or serialized_space_path")
+        except (OSError, ValueError) as e:
+            entry["error"] = f"Invalid manifest entry — {e}"
+        entries.append(entry)
+
+    seen = {}
+    for entry in entries:
+        key = (entry.get("title"), normalize_path(entry["parent_path"]) if entry.get("parent_path") else None)
+        if entry["error"] is None and key in seen:
+            entry["error"] = f"Duplicate of manifest entry {seen[key]} (same title and parent_path)"
+        seen.setdefault(key, entry["index"])
+    return entries
+
+
+def validation_errors(config: dict) -> list[str]:
+    return [f"[{i['path']}] {i['message']}" for i in validate_config(config) if i["level"] == "error"]
+
+
+def validate_entries(entries: list, workers: int = None):
+    """Validate loaded entries in a process pool, recording the first errors on each invalid entry."""
+    todo = [e for e in entries if e["error"] is None]
+    if not todo:
+        return
+    workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+    configs = [e["serialized_space"] for e in todo]
+    if workers == 1:
+        results = list(map(validation_errors, configs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(validation_errors, configs))
+    for entry, errors in zip(todo, results):
+        if errors:
+            entry["error"] = f"{len(errors)} validation error(s): " + "; ".join(errors[:3])
+
+
+# =====================================================================
+# CREATE OR UPDATE
+# =====================================================================
+
+def existing_spaces(api: GenieApiClient, titles: set, max_concurrency: int = 8) -> dict:
+    """
+    {(title, parent_path): space_id} for existing spaces whose title is in `titles`.
+
+    parent_path is read from the list response, or from the space itself when
+    the list omits it; a space whose parent_path still can't be determined is
+    left out, so it is never mistaken for the space of another folder.
+    """
+    candidates = [s for s in list_spaces(api) if s.get("title") in titles]
+
+    def with_parent_path(space):
+        if space.get("parent_path"):
+            return space
+        return {**space, **api.get(f"{SPACES_PATH}/{space['space_id']}")}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(candidates) or 1))) as pool:
+        detailed = list(pool.map(with_parent_path, candidates))
+    return {(s.get("title"), normalize_path(s["parent_path"])): s["space_id"] for s in detailed if s.get("parent_path")}
+
+
+def normalize_path(path: str) -> str:
+    return path.rstrip("/") or "/"
+
+
+def match_existing(existing: dict, title: str, parent_path: str):
+    """Space ID with this title in this folder, else None."""
+    return existing.get((title, normalize_path(parent_path)))
+
+
+def apply_entry(api: GenieApiClient, entry: dict, existing: dict, host: str, dry_run: bool = False) -> dict:
+    """Create or PATCH one valid entry's space; returns its report row."""
+    start = time.perf_counter()
+    row = {"title": entry["title"], "parent_path": entry["parent_path"], "action": None,
+           "space_id": match_existing(existing, entry["title"], entry["parent_path"]),
+           "url": None, "seconds": None, "error": None}
+    serialized = json.dumps(entry["serialized_space"], sort_keys=True)
+    try:
+        if row["space_id"] is None:
+            row["action"] = "would create" if dry_run else "created"
+            if not dry_run:
+                response = api.post(SPACES_PATH, {
+                    "serialized_space": serialized,
+                    "warehouse_id": entry["warehouse_id"],
+                    "parent_path": entry["parent_path"],
+                    "title": entry["title"],
+                    **({"description": entry["description"]} if entry.get("description") else {}),
+                })
+                row["space_id"] = response.get("space_id")
+        else:
+            current = api.get(f"{SPACES_PATH}/{row['space_id']}", {"include_serialized_space": "true"})
+            current_config = json.loads(current.get("serialized_space") or "{}")
+            # A missing or null description is the same as an empty one
+            description = entry.get("description") or ""
+            unchanged = (
+                current_config == entry["serialized_space"]
+                and (current.get("description") or "") == description
+                and current.get("warehouse_id") == entry["warehouse_id"]
+            )
+            if unchanged:
+                row["action"] = "unchanged"
+            else:
+                row["action"] = "would update" if dry_run else "updated"
+                if not dry_run:
+                    api.patch(f"{SPACES_PATH}/{row['space_id']}", {
+                        "serialized_space": serialized,
+                        "warehouse_id": entry["warehouse_id"],
+                        "title": entry["title"],
+                        "description": description,
+                    })
+    except Exception as e:
+        row["action"] = "failed"
+        row["error"] = str(e)
+    if row["space_id"]:
+        row["url"] = f"{host.rstrip('/')}/genie/rooms/{row['space_id']}"
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def bulk_create_spaces(api: GenieApiClient, entries: list, host: str, max_concurrency: int = 8,
+                       dry_run: bool = False) -> list[dict]:
+    """Create or update every valid entry concurrently; one report row per entry, in manifest order."""
+    valid = [e for e in entries if e["error"] is None]
+    existing = existing_spaces(api, {e["title"] for e in valid}, max_concurrency) if valid else {}
+    rows = {}
+    if valid:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(valid)))) as pool:
+            for entry, row in zip(valid, pool.map(lambda e: apply_entry(api, e, existing, host, dry_run), valid)):
+                rows[entry["index"]] = row
+    for entry in entries:
+        if entry["error"] is not None:
+            rows[entry["index"]] = {"title": entry.get("title"), "parent_path": entry.get("parent_path"),
+                                    "action": "invalid", "space_id": None, "url": None, "seconds": None,
+                                    "error": entry["error"]}
+    return [rows[entry["index"]] for entry in entries]
+
+
+# =====================================================================
+# REPORT
+# =====================================================================
+
+def write_report(rows: list, path: str):
+    """Write report rows as CSV for a .csv path, JSON otherwise."""
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Create or update Genie spaces from a manifest.")
+    parser.add_argument("manifest", help="manifest JSON file")
+    parser.add_argument("--report", default="genie_bulk_report.json", help="report file, .json or .csv")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="requests in flight at once (default: 8)")
+    parser.add_argument("--max-requests-per-second", type=float, default=5.0,
+                        help="rate limit across all requests (default: 5)")
+    parser.add_argument("--max-retries", type=int, default=5, help="retries on 429/5xx (default: 5)")
+    parser.add_argument("--workers", type=int, default=None, help="validation processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="validate and match existing spaces without writing")
+    args = parser.parse_args(argv)
+
+    from databricks.sdk import WorkspaceClient
+
+    w = WorkspaceClient()
+    entries = load_manifest(args.manifest)
+    validate_entries(entries, args.workers)
+
+    api = GenieApiClient(w.config.host, w.config.authenticate, max_retries=args.max_retries,
+                         max_requests_per_second=args.max_requests_per_second)
+    start = time.perf_counter()
+    try:
+        rows = bulk_create_spaces(api, entries, w.config.host, args.max_concurrency, args.dry_run)
+    finally:
+        api.close()
+    seconds = time.perf_counter() - start
+
+    for row in rows:
+        mark = "✗" if row["error"] else "✓"
+        print(f"{mark} {row['action']:<12} {row['title']}" + (f" — {row['url']}" if row["url"] else ""))
+        if row["error"]:
+            print(f"    {row['error'][:300]}")
+    write_report(rows, args.report)
+
+    counts = {}
+    for row in rows:
+        counts[row["action"]] = counts.get(row["action"], 0) + 1
+    print(
+        f"{len(rows)} space(s) in {seconds:.1f}s ({api.retries} retried request(s)): "
+        + ", ".join(f"{count} {action}" for action, count in sorted(counts.items()))
+        + f". Report: {args.report}",
+        file=sys.stderr,
+    )
+    return 1 if any(row["error"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
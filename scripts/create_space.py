@@ -9,7 +9,6 @@ gathering requirements from the user.
 """
 
 import json
-import secrets
 
 from databricks.sdk import WorkspaceClient
 
@@ -17,7 +16,7 @@ w = WorkspaceClient()
 
 # --- CONFIGURE THESE VALUES ---
 
-# Tables to include (sorted alphabetically by identifier)
+# Tables to include (any order — the builder sorts them)
 # "description" overrides the Unity Catalog description for this space only
 # "column_configs" sets per-column metadata (prompt matching):
 #   - enable_format_assistance: provides representative values
@@ -26,11 +25,13 @@ w = WorkspaceClient()
 # IMPORTANT: Prompt matching is NOT auto-enabled when creating via API.
 # You must explicitly set enable_format_assistance and enable_entity_matching
 # to True for every string/category column users will filter on.
-tables = sorted([
+# Each entity-matched column is re-read on every prompt matching refresh; for
+# fleets, scripts/plan_matching_refresh.py estimates that cost.
+tables = [
     {
         "identifier": "catalog.schema.orders",
         "description": ["Daily sales transactions with line-item details"],
-        "column_configs": sorted([
+        "column_configs": [
             {
                 "column_name": "region",
                 "description": ["Sales region code: AMER, EMEA, APJ, LATAM"],
@@ -47,26 +48,26 @@ tables = sorted([
                 "column_name": "etl_timestamp",
                 "exclude": True,  # Hide irrelevant columns from Genie
             },
-        ], key=lambda x: x["column_name"]),
+        ],
     },
     {
         "identifier": "catalog.schema.products",
         "description": ["Product catalog with categories and pricing"],
-        "column_configs": sorted([
+        "column_configs": [
             {
                 "column_name": "category",
                 "enable_entity_matching": True,
                 "enable_format_assistance": True,
             },
-        ], key=lambda x: x["column_name"]),
+        ],
     },
-], key=lambda x: x["identifier"])
+]
 
 # Metric views — pre-defined metrics, dimensions, and aggregations
 # Remove this list if not using metric views
-metric_views = sorted([
+metric_views = [
     {"identifier": "catalog.schema.revenue_metrics", "description": ["Revenue metrics by product and region"]},
-], key=lambda x: x["identifier"])
+]
 
 # Sample questions for business users (one question per entry)
 sample_questions_text = [
@@ -167,89 +168,66 @@ sql_functions = [
 ]
 
 # Space metadata
-warehouse_id = "your_serverless_warehouse_id"
+# Defaults to the top-ranked warehouse from discover_resources.py Part 1 when run in the same notebook
+warehouse_id = globals().get("recommended_warehouse_id") or "your_serverless_warehouse_id"
 parent_path = "/Users/your.email@company.com"
 title = "Sales Analytics"
 description = "Analyze sales performance and customer trends"
 
 # --- BUILD CONFIGURATION ---
-
-# Generate unique 32-character hex IDs (sorted alphabetically)
-question_ids = sorted([secrets.token_hex(16) for _ in sample_questions_text])
-example_sql_ids = sorted([secrets.token_hex(16) for _ in example_sqls])
-instruction_id = secrets.token_hex(16)
-
-# Add IDs to sql_snippets
-for item in sql_snippet_measures + sql_snippet_filters + sql_snippet_expressions:
-    item["id"] = secrets.token_hex(16)
-
-config = {
-    "version": 2,
-    "config": {
-        "sample_questions": sorted(
-            [
-                {"id": question_ids[i], "question": [sample_questions_text[i]]}
-                for i in range(len(sample_questions_text))
-            ],
-            key=lambda x: x["id"],
-        )
-    },
-    "data_sources": {
-        "tables": tables,
-        "metric_views": metric_views,  # Remove if not using metric views
-    },
-    "instructions": {
-        "text_instructions": [
-            {
-                "id": instruction_id,
-                "content": text_instruction_lines,
-            }
-        ],
-        "example_question_sqls": sorted(
-            [
-                {
-                    "id": example_sql_ids[i],
-                    "question": example_sqls[i]["question"],
-                    "sql": example_sqls[i]["sql"],
-                    **({"usage_guidance": example_sqls[i]["usage_guidance"]} if "usage_guidance" in example_sqls[i] else {}),
-                    **({"parameters": example_sqls[i]["parameters"]} if "parameters" in example_sqls[i] else {}),
-                }
-                for i in range(len(example_sqls))
-            ],
-            key=lambda x: x["id"],
-        ),
-        "sql_snippets": {
-            "measures": sorted(sql_snippet_measures, key=lambda x: x["id"]),
-            "filters": sorted(sql_snippet_filters, key=lambda x: x["id"]),
-            "expressions": sorted(sql_snippet_expressions, key=lambda x: x["id"]),
-        },
-        "join_specs": sorted(
-            [{"id": secrets.token_hex(16), **js} for js in join_specs],
-            key=lambda x: x["id"],
-        ),
-        "sql_functions": sorted(
-            [{"id": secrets.token_hex(16), **sf} for sf in sql_functions],
-            key=lambda x: x["id"],
-        ),
-    },
-}
+# GenieSpaceBuilder (genie_space_builder.py, next to this script) generates IDs,
+# keeps every collection in the order the API requires, and raises ValueError
+# on input the API would reject. In a notebook outside scripts/, add that folder
+# to sys.path first. With GENIE_TRACE=1, the build and API call are timed (tracing.py).
+
+from genie_space_builder import GenieSpaceBuilder
+from tracing import finish_tracing, span
+
+builder = GenieSpaceBuilder()
+for question in sample_questions_text:
+    builder.add_sample_question(question)
+for table in tables:
+    builder.add_table(**table)
+for mv in metric_views:  # Remove if not using metric views
+    builder.add_metric_view(**mv)
+builder.add_text_instruction(text_instruction_lines)
+for example in example_sqls:
+    builder.add_example_sql(**example)
+for measure in sql_snippet_measures:
+    builder.add_measure(**measure)
+for snippet_filter in sql_snippet_filters:
+    builder.add_filter(**snippet_filter)
+for expression in sql_snippet_expressions:
+    builder.add_expression(**expression)
+for js in join_specs:
+    builder.add_join(**js)
+for sf in sql_functions:
+    builder.add_sql_function(**sf)
+
+with span("create_space.build"):
+    config = builder.build()
 
 # --- CREATE THE SPACE ---
-
-response = w.api_client.do(
-    "POST",
-    "/api/2.0/genie/spaces",
-    body={
-        "serialized_space": json.dumps(config),
-        "warehouse_id": warehouse_id,
-        "parent_path": parent_path,
-        "title": title,
-        "description": description,
-    },
-)
+# Run scripts/validate_config.py and scripts/dry_run_sqls.py on `config` first —
+# they catch API rejections and failing or slow example SQL before the space exists.
+
+with span("http POST", path="/api/2.0/genie/spaces"):
+    response = w.api_client.do(
+        "POST",
+        "/api/2.0/genie/spaces",
+        body={
+            "serialized_space": json.dumps(config),
+            "warehouse_id": warehouse_id,
+            "parent_path": parent_path,
+            "title": title,
+            "description": description,
+        },
+    )
 
 space_id = response.get("space_id")
 host = w.config.host.rstrip("/")
 print(f"Successfully created Genie space!")
 print(f"  Space ID: {space_id}")
 print(f"  URL: {host}/genie/rooms/{space_id}")
+
+finish_tracing()
@@ -1,52 +1,192 @@
 """
 Discover and validate resources for Genie space creation.
 
-Part 1: List pro and serverless SQL warehouses and workspace URL.
+Part 1: List pro and serverless SQL warehouses and workspace URL, ranked by
+        state, size, scaling headroom, and queue depth, with a recommended
+        warehouse_id for create_space.py.
 Part 2: Audit Unity Catalog table metadata for Genie-readiness —
         checks table comments, column descriptions, column counts,
         foreign keys, and generates a quality score with recommendations.
+        Bulk mode reads metadata for all tables from information_schema in a
+        few queries and falls back to per-table DESCRIBE in a thread pool.
+        Results are cached on disk and reused until the table changes.
+        Optionally generates batched comment DDL (one ALTER TABLE per table)
+        for every missing table/column comment, runs it in a thread pool, and
+        re-scores the tables it changed.
+Part 3: Profile categorical and date columns (top values, null counts,
+        approximate distinct counts, date ranges) in one scan per table.
+Part 4: Classify the profiled string columns for entity matching (enable,
+        needs a view, or exclude) from their HyperLogLog distinct counts and
+        top-k coverage, and print sorted column_configs for create_space.py.
 
 Usage: Run this script in a Databricks notebook cell.
        Set `tables_to_review` to the tables you plan to include in your Genie space.
+       Set GENIE_TRACE=1 (or call tracing.enable_tracing()) to time each part,
+       table, and query, with a summary at the end (see tracing.py).
 """
 
-from databricks.sdk import WorkspaceClient
-from pyspark.sql import SparkSession
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-w = WorkspaceClient()
-spark = SparkSession.builder.getOrCreate()
+# table_metadata.py and tracing.py live next to this script; in a notebook
+# outside scripts/, add that folder to sys.path first
+from table_metadata import TableMetadata
+from tracing import finish_tracing, start_span, traced
+
+# The SparkSession the audit and profiling queries run on. Created with the
+# workspace client when this file runs as a script or notebook cell; code
+# importing the functions assigns its own.
+spark = None
 
 # =====================================================================
 # PART 1: DISCOVER SQL WAREHOUSES
 # =====================================================================
 
-print("=" * 70)
-print("PART 1: SQL WAREHOUSES")
-print("=" * 70)
-print(f"\nWorkspace URL: {w.config.host}\n")
+# Warehouse ranking weights (points). State dominates: a running warehouse answers
+# immediately, a stopped classic warehouse needs minutes to start.
+STATE_POINTS = {"RUNNING": 40, "STARTING": 25, "STOPPED": 10, "STOPPING": 5}
+SERVERLESS_POINTS = 15  # fast cold starts and elastic scaling
+SIZE_POINTS = 15  # scaled by position in WAREHOUSE_SIZES
+SCALING_POINTS = 10  # scaled by max_num_clusters, up to 10 clusters
+QUEUE_PENALTY_PER_QUERY = 5  # per queued query per running cluster, capped at 30
 
-warehouses = list(w.warehouses.list())
-# Genie spaces require a pro or serverless SQL warehouse
-eligible_warehouses = [
-    wh for wh in warehouses
-    if wh.enable_serverless_compute or (hasattr(wh, "warehouse_type") and str(wh.warehouse_type) == "PRO")
-]
+WAREHOUSE_SIZES = ["2X-Small", "X-Small", "Small", "Medium", "Large", "X-Large", "2X-Large", "3X-Large", "4X-Large"]
+
+
+def enum_name(value) -> str:
+    """SDK enums print as 'State.RUNNING'; return just 'RUNNING' (plain strings pass through)."""
+    return str(getattr(value, "value", value) or "")
+
+
+def is_eligible_warehouse(wh) -> bool:
+    """Genie spaces require a pro or serverless SQL warehouse."""
+    return bool(wh.enable_serverless_compute) or enum_name(getattr(wh, "warehouse_type", None)) == "PRO"
+
+
+@traced("discover.queue_depths")
+def fetch_queue_depths(client, warehouse_ids: list, max_workers: int = 8) -> dict:
+    """
+    Number of queued queries per warehouse from the query history API, or None
+    where it can't be read (missing permission, older SDK).
+    """
+    try:
+        from databricks.sdk.service.sql import QueryFilter, QueryStatus
+    except ImportError:
+        return dict.fromkeys(warehouse_ids)
+
+    def queued(warehouse_id):
+        try:
+            response = client.query_history.list(
+                filter_by=QueryFilter(warehouse_ids=[warehouse_id], statuses=[QueryStatus.QUEUED]),
+                max_results=100,
+            )
+        except Exception:
+            return None
+        # Newer SDKs return a ListQueriesResponse, older ones an iterator of queries
+        return len(list(getattr(response, "res", response) or []))
+
+    if not warehouse_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(warehouse_ids)))) as pool:
+        return dict(zip(warehouse_ids, pool.map(queued, warehouse_ids)))
+
+
+def score_warehouse(wh, queued=None) -> dict:
+    """Score one eligible warehouse for Genie latency, with the reasons behind the score."""
+    state = enum_name(wh.state)
+    serverless = bool(wh.enable_serverless_compute)
+    size = wh.cluster_size or ""
+    max_clusters = wh.max_num_clusters or 1
+    running_clusters = max(1, getattr(wh, "num_clusters", None) or 1)
+
+    score = STATE_POINTS.get(state, 0)
+    reasons = [f"{state or 'UNKNOWN'} (+{STATE_POINTS.get(state, 0)})"]
+    if serverless:
+        score += SERVERLESS_POINTS
+        reasons.append(f"serverless (+{SERVERLESS_POINTS})")
+    if size in WAREHOUSE_SIZES:
+        size_points = round(SIZE_POINTS * WAREHOUSE_SIZES.index(size) / (len(WAREHOUSE_SIZES) - 1), 1)
+        score += size_points
+        reasons.append(f"{size} (+{size_points})")
+    scaling_points = round(SCALING_POINTS * min(max_clusters, 10) / 10, 1)
+    score += scaling_points
+    reasons.append(f"up to {max_clusters} cluster(s) (+{scaling_points})")
+    if queued:
+        penalty = min(30, round(QUEUE_PENALTY_PER_QUERY * queued / running_clusters, 1))
+        score -= penalty
+        reasons.append(f"{queued} queued quer{'y' if queued == 1 else 'ies'} (-{penalty})")
+
+    return {
+        "warehouse_id": wh.id,
+        "name": wh.name,
+        "type": "Serverless" if serverless else "Pro",
+        "state": state,
+        "size": size or "N/A",
+        "max_clusters": max_clusters,
+        "queued": queued,
+        "score": round(score, 1),
+        "reasons": reasons,
+    }
+
+
+def rank_warehouses(warehouses: list, queue_depths: dict = None) -> list[dict]:
+    """Score eligible, non-deleted warehouses, best first (ties broken by name)."""
+    queue_depths = queue_depths or {}
+    ranked = [
+        score_warehouse(wh, queue_depths.get(wh.id))
+        for wh in warehouses
+        if is_eligible_warehouse(wh) and enum_name(wh.state) not in ("DELETED", "DELETING")
+    ]
+    return sorted(ranked, key=lambda r: (-r["score"], r["name"] or ""))
+
+
+def recommend_warehouse(client) -> tuple:
+    """(recommended warehouse_id or None, full ranking) for the workspace of `client`."""
+    eligible = [wh for wh in client.warehouses.list() if is_eligible_warehouse(wh)]
+    ranking = rank_warehouses(eligible, fetch_queue_depths(client, [wh.id for wh in eligible]))
+    return (ranking[0]["warehouse_id"] if ranking else None), ranking
+
+
+# --- RUN WAREHOUSE DISCOVERY ---
+
+if __name__ == "__main__":
+    from databricks.sdk import WorkspaceClient
+    from pyspark.sql import SparkSession
+
+    w = WorkspaceClient()
+    spark = SparkSession.builder.getOrCreate()
+
+    part_span = start_span("discover.part1")
+    print("=" * 70)
+    print("PART 1: SQL WAREHOUSES")
+    print("=" * 70)
+    print(f"\nWorkspace URL: {w.config.host}\n")
 
-if eligible_warehouses:
-    print(f"Found {len(eligible_warehouses)} eligible SQL warehouse(s) (pro or serverless):\n")
-    for wh in eligible_warehouses:
-        wh_type = "Serverless" if wh.enable_serverless_compute else "Pro"
-        print(f"  Name: {wh.name}")
-        print(f"  ID:   {wh.id}")
-        print(f"  Type: {wh_type}")
-        print(f"  State: {wh.state}")
-        print(f"  Size: {wh.cluster_size or 'N/A'}")
-        print(f"  {'─' * 50}")
-    print("Tip: Serverless warehouses are recommended for optimal Genie performance.")
-else:
-    print("No eligible SQL warehouses found (pro or serverless required).")
-    print("Note: Genie spaces require a pro or serverless SQL warehouse.")
-    print("You may need to create one in the SQL Warehouses UI.")
+    recommended_warehouse_id, warehouse_ranking = recommend_warehouse(w)
+
+    if warehouse_ranking:
+        print(f"Found {len(warehouse_ranking)} eligible SQL warehouse(s) (pro or serverless), best first:\n")
+        for rank, wh in enumerate(warehouse_ranking, 1):
+            print(f"  #{rank} Name: {wh['name']}")
+            print(f"  ID:   {wh['warehouse_id']}")
+            print(f"  Type: {wh['type']}")
+            print(f"  State: {wh['state']}")
+            print(f"  Size: {wh['size']} (max {wh['max_clusters']} cluster(s))")
+            print(f"  Queued queries: {wh['queued'] if wh['queued'] is not None else 'unknown'}")
+            print(f"  Score: {wh['score']} — {', '.join(wh['reasons'])}")
+            print(f"  {'─' * 50}")
+        print(f"Recommended warehouse_id: {recommended_warehouse_id}")
+        print("  (create_space.py uses recommended_warehouse_id when run in the same notebook)")
+        print("Tip: Serverless warehouses are recommended for optimal Genie performance.")
+    else:
+        print("No eligible SQL warehouses found (pro or serverless required).")
+        print("Note: Genie spaces require a pro or serverless SQL warehouse.")
+        print("You may need to create one in the SQL Warehouses UI.")
+    part_span.set(warehouses=len(warehouse_ranking))
+    part_span.end()
 
 
 # =====================================================================
@@ -60,12 +200,36 @@ tables_to_review = [
     "catalog.schema.table2",
 ]
 
+# How to collect metadata:
+#   "bulk"       — information_schema queries per catalog, per-table fallback in a thread pool
+#   "parallel"   — DESCRIBE TABLE EXTENDED per table in a thread pool
+#   "sequential" — DESCRIBE TABLE EXTENDED one table at a time
+audit_mode = "bulk"
 
-def review_table(table_identifier: str) -> dict:
-    """Review a single table's metadata quality for Genie readiness."""
-    result = {
+# Max concurrent per-table queries in "bulk" fallbacks and "parallel" mode
+audit_max_workers = 8
+
+# On-disk cache of audit and profile results, reused while a table is unchanged.
+# Audits are stamped with information_schema last_altered (columns, comments,
+# constraints); profiles with the Delta table version (data writes).
+# Set to None to disable caching.
+audit_cache_path = ".genie_audit_cache.json"
+
+# Cache size cap in MB — least recently used entries are dropped beyond it
+audit_cache_max_mb = 50
+
+# Save the audited tables' real columns as a JSON fixture, so validate_config.py
+# (table_columns) and validate_batch.py (--table-metadata) can check column
+# names offline, e.g. in CI. Set to None to skip.
+table_metadata_path = None
+
+
+def new_review_result(table_identifier: str) -> dict:
+    """Empty review result for a table, before any metadata is collected."""
+    return {
         "table": table_identifier,
         "exists": False,
+        "table_type": None,
         "table_comment": None,
         "total_columns": 0,
         "columns_with_description": 0,
@@ -76,6 +240,32 @@ def review_table(table_identifier: str) -> dict:
         "recommendations": [],
     }
 
+
+FOREIGN_KEY_PATTERN = re.compile(r"FOREIGN\s+KEY\s*\(([^)]*)\)\s*REFERENCES\s+([^(\s]+)", re.IGNORECASE)
+
+
+def parse_foreign_key(constraint_name: str, definition: str):
+    """
+    Foreign key from a constraint definition such as
+    FOREIGN KEY (`customer_id`) REFERENCES `main`.`sales`.`customers` (`id`),
+    shaped like fetch_catalog_metadata's; None for other constraints.
+    """
+    match = FOREIGN_KEY_PATTERN.search(definition or "")
+    if match is None:
+        return None
+    return {
+        "constraint_name": constraint_name,
+        "constraint_type": "FOREIGN_KEY",
+        "columns": [c.strip().strip("`") for c in match.group(1).split(",") if c.strip()],
+        "referenced_table": ".".join(p.strip("`") for p in match.group(2).split(".")),
+    }
+
+
+@traced("discover.review_table", attribute="table")
+def review_table(table_identifier: str) -> dict:
+    """Review a single table's metadata quality for Genie readiness."""
+    result = new_review_result(table_identifier)
+
     # Check table exists and get metadata
     try:
         table_info = spark.sql(f"DESCRIBE TABLE EXTENDED {table_identifier}").collect()
@@ -85,8 +275,9 @@ def review_table(table_identifier: str) -> dict:
 
     result["exists"] = True
 
-    # Parse column info and table properties
+    # Parse column info, table properties, and the "# Constraints" section
     in_detail_section = False
+    section = None
     columns = []
     for row in table_info:
         col_name = row["col_name"].strip() if row["col_name"] else ""
@@ -98,6 +289,7 @@ def review_table(table_identifier: str) -> dict:
             continue
         if col_name.startswith("#"):
             in_detail_section = True
+            section = col_name.lstrip("#").strip().lower()
             continue
 
         if not in_detail_section:
@@ -106,29 +298,30 @@ def review_table(table_identifier: str) -> dict:
                 "type": data_type,
                 "description": comment if comment else None,
             })
+        elif section == "constraints":
+            foreign_key = parse_foreign_key(col_name, data_type)
+            if foreign_key:
+                result["foreign_keys"].append(foreign_key)
         else:
             if col_name.lower() == "comment":
                 result["table_comment"] = data_type if data_type else None
+            elif col_name.lower() == "type":
+                result["table_type"] = data_type.upper() or None
 
-    result["total_columns"] = len(columns)
     result["columns"] = columns
+    return score_review(result)
+
+
+def score_review(result: dict) -> dict:
+    """Fill column counts, quality score, and recommendations from collected metadata."""
+    table_identifier = result["table"]
+    columns = result["columns"]
+    result["total_columns"] = len(columns)
     result["columns_with_description"] = sum(1 for c in columns if c["description"])
     result["columns_missing_description"] = [
         c["name"] for c in columns if not c["description"]
     ]
 
-    # Check foreign key constraints
-    try:
-        constraints = spark.sql(
-            f"SHOW CONSTRAINTS ON {table_identifier}"
-        ).collect()
-        for constraint in constraints:
-            constraint_dict = constraint.asDict()
-            if constraint_dict.get("constraint_type", "").upper() == "FOREIGN_KEY":
-                result["foreign_keys"].append(constraint_dict)
-    except Exception:
-        pass
-
     # Calculate quality score (0-100)
     score = 0
     total_weight = 0
@@ -156,7 +349,8 @@ def review_table(table_identifier: str) -> dict:
                     )
             else:
                 result["recommendations"].append(
-                    f"{len(missing)} columns missing descriptions: {', '.join(missing[:5])}... and {len(missing) - 5} more"
+                    f"{len(missing)} columns missing descriptions: {', '.join(missing[:5])}... and {len(missing) - 5} more "
+                    f"(set generate_comment_ddl = True for one batched statement)"
                 )
 
     # Column count (10 points)
@@ -182,92 +376,570 @@ def review_table(table_identifier: str) -> dict:
     return result
 
 
+def split_table_identifier(table_identifier: str):
+    """Split catalog.schema.table (optionally backtick-quoted) into lowercase parts, or None."""
+    parts = tuple(p.strip().strip("`").lower() for p in table_identifier.split("."))
+    return parts if len(parts) == 3 and all(parts) else None
+
+
+def information_schema_filter(schema_tables: set, alias: str = "") -> str:
+    """WHERE condition matching (schema, table) pairs in an information_schema view."""
+    names = ", ".join(
+        "'" + f"{schema}.{table}".replace("'", "\\'") + "'" for schema, table in sorted(schema_tables)
+    )
+    return f"lower(concat_ws('.', {alias}table_schema, {alias}table_name)) IN ({names})"
+
+
+@traced("discover.catalog_metadata", attribute="catalog")
+def fetch_catalog_metadata(catalog: str, schema_tables: set) -> dict:
+    """
+    Read table comments, columns, and foreign keys for many tables in one catalog
+    with three information_schema queries.
+
+    Returns {(schema, table): {"table_comment", "table_type", "columns", "foreign_keys"}}
+    for the tables found. Column and foreign key entries match review_table's;
+    foreign keys are {"constraint_name", "constraint_type", "columns", "referenced_table"}.
+    """
+    info_schema = f"`{catalog}`.information_schema"
+
+    metadata = {}
+    for row in spark.sql(
+        f"SELECT table_schema, table_name, table_type, comment FROM {info_schema}.tables "
+        f"WHERE {information_schema_filter(schema_tables)}"
+    ).collect():
+        metadata[(row["table_schema"].lower(), row["table_name"].lower())] = {
+            "table_comment": (row["comment"] or "").strip() or None,
+            "table_type": (row["table_type"] or "").upper() or None,
+            "columns": [],
+            "foreign_keys": [],
+        }
+
+    for row in spark.sql(
+        f"SELECT table_schema, table_name, column_name, full_data_type, comment "
+        f"FROM {info_schema}.columns WHERE {information_schema_filter(schema_tables)} "
+        f"ORDER BY table_schema, table_name, ordinal_position"
+    ).collect():
+        entry = metadata.get((row["table_schema"].lower(), row["table_name"].lower()))
+        if entry is not None:
+            entry["columns"].append({
+                "name": row["column_name"].strip(),
+                "type": (row["full_data_type"] or "").strip(),
+                "description": (row["comment"] or "").strip() or None,
+            })
+
+    foreign_keys = {}
+    for row in spark.sql(
+        f"SELECT tc.table_schema, tc.table_name, tc.constraint_name, kcu.column_name, "
+        f"  pk.table_catalog AS referenced_catalog, pk.table_schema AS referenced_schema, "
+        f"  pk.table_name AS referenced_table "
+        f"FROM {info_schema}.table_constraints tc "
+        f"JOIN {info_schema}.key_column_usage kcu "
+        f"  ON kcu.constraint_schema = tc.constraint_schema AND kcu.constraint_name = tc.constraint_name "
+        f"LEFT JOIN {info_schema}.referential_constraints rc "
+        f"  ON rc.constraint_schema = tc.constraint_schema AND rc.constraint_name = tc.constraint_name "
+        f"LEFT JOIN {info_schema}.table_constraints pk "
+        f"  ON pk.constraint_catalog = rc.unique_constraint_catalog "
+        f"  AND pk.constraint_schema = rc.unique_constraint_schema "
+        f"  AND pk.constraint_name = rc.unique_constraint_name "
+        f"WHERE tc.constraint_type = 'FOREIGN KEY' AND {information_schema_filter(schema_tables, 'tc.')} "
+        f"ORDER BY tc.table_schema, tc.table_name, tc.constraint_name, kcu.ordinal_position"
+    ).collect():
+        key = (row["table_schema"].lower(), row["table_name"].lower())
+        entry = metadata.get(key)
+        if entry is None:
+            continue
+        fk = foreign_keys.get((key, row["constraint_name"]))
+        if fk is None:
+            fk = {
+                "constraint_name": row["constraint_name"],
+                "constraint_type": "FOREIGN_KEY",
+                "columns": [],
+                "referenced_table": (
+                    f"{row['referenced_catalog']}.{row['referenced_schema']}.{row['referenced_table']}"
+                    if row["referenced_table"] else None
+                ),
+            }
+            foreign_keys[(key, row["constraint_name"])] = fk
+            entry["foreign_keys"].append(fk)
+        fk["columns"].append(row["column_name"])
+
+    return metadata
+
+
+def review_tables_parallel(table_identifiers: list, max_workers: int = 8) -> list[dict]:
+    """Run review_table for each table in a bounded thread pool, preserving input order."""
+    if not table_identifiers:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(table_identifiers)))) as pool:
+        return list(pool.map(review_table, table_identifiers))
+
+
+def review_tables(table_identifiers: list, mode: str = "bulk", max_workers: int = 8, cache=None) -> list[dict]:
+    """
+    Review many tables, returning one review_table-style result per identifier in input order.
+
+    mode "bulk" reads each catalog's metadata from information_schema and reviews
+    tables it can't resolve there (malformed names, missing tables, catalogs
+    without information_schema access) with review_table in a thread pool, so
+    inaccessible tables get the same error recommendations as a per-table run.
+    """
+    if mode not in ("bulk", "parallel", "sequential"):
+        raise ValueError(f"Unknown audit mode '{mode}'. Use 'bulk', 'parallel', or 'sequential'.")
+    if cache is not None:
+        return review_tables_cached(table_identifiers, cache, mode, max_workers)
+    if mode == "sequential":
+        return [review_table(t) for t in table_identifiers]
+    if mode == "parallel":
+        return review_tables_parallel(table_identifiers, max_workers)
+
+    results = {}
+    fallback = []
+    by_catalog = {}
+    for table_identifier in table_identifiers:
+        parts = split_table_identifier(table_identifier)
+        if parts is None:
+            fallback.append(table_identifier)
+        else:
+            by_catalog.setdefault(parts[0], {})[table_identifier] = parts[1:]
+
+    for catalog, identifiers in by_catalog.items():
+        try:
+            metadata = fetch_catalog_metadata(catalog, set(identifiers.values()))
+        except Exception:
+            fallback.extend(identifiers)
+            continue
+        for table_identifier, key in identifiers.items():
+            if key not in metadata:
+                fallback.append(table_identifier)
+                continue
+            result = new_review_result(table_identifier)
+            result["exists"] = True
+            result.update(metadata[key])
+            results[table_identifier] = score_review(result)
+
+    for table_identifier, result in zip(fallback, review_tables_parallel(fallback, max_workers)):
+        results[table_identifier] = result
+    return [results[t] for t in table_identifiers]
+
+
+# --- METADATA CACHE ---
+
+class AuditCache:
+    """
+    JSON file of review and profile results, each stamped with the version of
+    the table it was computed from.
+
+    get() returns a result only while its stamp matches the table's current
+    version and drops entries whose table has changed since; save() writes the
+    file back, dropping least recently used entries beyond max_bytes.
+    """
+
+    FORMAT = 3
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evicted = 0
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("format") == self.FORMAT:
+                self.entries = data["entries"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    def get(self, key: str, table_version):
+        """Cached value for key if it was stored at table_version, else None."""
+        entry = self.entries.get(key)
+        if entry is not None and table_version is not None:
+            if entry["table_version"] == table_version:
+                entry["last_used"] = time.time()
+                self.hits += 1
+                return entry["value"]
+            del self.entries[key]
+            self.stale += 1
+        self.misses += 1
+        return None
+
+    def put(self, key: str, table_version, value: dict):
+        """Store value under key; results for tables without a known version aren't cached."""
+        if table_version is None:
+            return
+        self.entries[key] = {
+            "table_version": table_version,
+            "last_used": time.time(),
+            "value": json.loads(json.dumps(value, default=str)),
+        }
+
+    def discard(self, key: str):
+        """Forget key, e.g. after changing the table outside the stamp's view."""
+        self.entries.pop(key, None)
+
+    def save(self):
+        """Write the cache file, evicting least recently used entries over the size cap."""
+        sizes = {key: len(json.dumps(entry)) for key, entry in self.entries.items()}
+        total = sum(sizes.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= sizes[key]
+            del self.entries[key]
+            self.evicted += 1
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"format": self.FORMAT, "entries": self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+    def summary(self) -> str:
+        return f"{self.hits} hit(s), {self.misses} miss(es), {self.stale} stale, {self.evicted} evicted"
+
+
+@traced("discover.metadata_versions")
+def fetch_metadata_versions(table_identifiers: list) -> dict:
+    """
+    information_schema last_altered per table, one query per catalog, as the
+    cache stamp for audit results. Unresolved tables map to None.
+    """
+    versions = dict.fromkeys(table_identifiers)
+    by_catalog = {}
+    for table_identifier in table_identifiers:
+        parts = split_table_identifier(table_identifier)
+        if parts is not None:
+            by_catalog.setdefault(parts[0], {}).setdefault(parts[1:], []).append(table_identifier)
+
+    for catalog, identifiers in by_catalog.items():
+        try:
+            rows = spark.sql(
+                f"SELECT table_schema, table_name, last_altered FROM `{catalog}`.information_schema.tables "
+                f"WHERE {information_schema_filter(set(identifiers))}"
+            ).collect()
+        except Exception:
+            continue
+        for row in rows:
+            if row["last_altered"] is None:
+                continue
+            for table_identifier in identifiers.get((row["table_schema"].lower(), row["table_name"].lower()), []):
+                versions[table_identifier] = f"altered:{row['last_altered']}"
+    return versions
+
+
+@traced("discover.data_version", attribute="table")
+def fetch_data_version(table_identifier: str):
+    """Latest Delta commit version as the cache stamp for profiles, or None (views, non-Delta, no access)."""
+    try:
+        rows = spark.sql(f"DESCRIBE HISTORY {table_identifier} LIMIT 1").collect()
+    except Exception:
+        return None
+    return f"delta:{rows[0]['version']}" if rows else None
+
+
+def fetch_data_versions(table_identifiers: list, max_workers: int = 8) -> dict:
+    """fetch_data_version for each table in a bounded thread pool."""
+    if not table_identifiers:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(table_identifiers)))) as pool:
+        return dict(zip(table_identifiers, pool.map(fetch_data_version, table_identifiers)))
+
+
+def review_tables_cached(table_identifiers: list, cache: AuditCache, mode: str = "bulk", max_workers: int = 8) -> list[dict]:
+    """
+    review_tables backed by an AuditCache: tables whose last_altered (or Delta
+    version, where information_schema can't resolve them) matches the cached
+    stamp are served from the cache, the rest are reviewed and stored.
+    """
+    unique = list(dict.fromkeys(table_identifiers))
+    versions = fetch_metadata_versions(unique)
+    versions.update(fetch_data_versions([t for t in unique if versions[t] is None], max_workers))
+
+    results = {}
+    for table_identifier in unique:
+        cached = cache.get(f"review:{table_identifier}", versions[table_identifier])
+        if cached is not None:
+            results[table_identifier] = cached
+
+    misses = [t for t in unique if t not in results]
+    for table_identifier, result in zip(misses, review_tables(misses, mode, max_workers)):
+        results[table_identifier] = result
+        if result["exists"]:
+            cache.put(f"review:{table_identifier}", versions[table_identifier], result)
+    return [results[t] for t in table_identifiers]
+
+
 # --- RUN TABLE REVIEW ---
 
-print(f"\n\n{'=' * 70}")
-print("PART 2: TABLE METADATA REVIEW")
-print("Auditing Genie-readiness for table descriptions and column metadata")
-print("=" * 70)
-
-all_results = []
-for table in tables_to_review:
-    review = review_table(table)
-    all_results.append(review)
-
-    print(f"\n{'─' * 70}")
-    print(f"TABLE: {review['table']}")
-    print(f"{'─' * 70}")
-
-    if not review["exists"]:
-        print(f"  ✗ Table not accessible")
-        for rec in review["recommendations"]:
-            print(f"    {rec}")
-        continue
-
-    # Table comment
-    if review["table_comment"]:
-        print(f"  ✓ Table comment: {review['table_comment'][:100]}{'...' if len(review['table_comment']) > 100 else ''}")
-    else:
-        print(f"  ✗ Table comment: MISSING")
+if __name__ == "__main__":
+    part_span = start_span("discover.part2", tables=len(tables_to_review), mode=audit_mode)
+    print(f"\n\n{'=' * 70}")
+    print("PART 2: TABLE METADATA REVIEW")
+    print("Auditing Genie-readiness for table descriptions and column metadata")
+    print("=" * 70)
 
-    # Column summary
-    total = review["total_columns"]
-    described = review["columns_with_description"]
-    print(f"  {'✓' if described == total else '✗'} Columns: {described}/{total} have descriptions")
+    audit_cache = AuditCache(audit_cache_path, int(audit_cache_max_mb * 1024 * 1024)) if audit_cache_path else None
 
-    # Foreign keys
-    if review["foreign_keys"]:
-        print(f"  ✓ Foreign keys: {len(review['foreign_keys'])} defined")
-    else:
-        print(f"  ○ Foreign keys: None (can define in Genie knowledge store)")
-
-    # Quality score
-    score = review["quality_score"]
-    grade = "Excellent" if score >= 90 else "Good" if score >= 70 else "Fair" if score >= 50 else "Needs work"
-    print(f"\n  Quality Score: {score}/100 ({grade})")
-
-    # Recommendations
-    if review["recommendations"]:
-        print(f"\n  Recommendations:")
-        for rec in review["recommendations"]:
-            print(f"    → {rec}")
-
-    # Column detail table
-    if review["columns"]:
-        print(f"\n  {'Column':<30} {'Type':<15} {'Description'}")
-        print(f"  {'─' * 30} {'─' * 15} {'─' * 40}")
-        for col in review["columns"]:
-            desc = col["description"] or "—"
-            if len(desc) > 40:
-                desc = desc[:37] + "..."
-            print(f"  {col['name']:<30} {col['type']:<15} {desc}")
-
-# --- SUMMARY ---
-
-print(f"\n{'=' * 70}")
-print("SUMMARY")
-print(f"{'=' * 70}")
-accessible = [r for r in all_results if r["exists"]]
-if accessible:
-    total_cols = sum(r["total_columns"] for r in accessible)
-    described_cols = sum(r["columns_with_description"] for r in accessible)
-    avg_score = sum(r["quality_score"] for r in accessible) / len(accessible)
-
-    print(f"  Tables reviewed: {len(accessible)}/{len(tables_to_review)}")
-    print(f"  Total columns: {total_cols}")
-    print(f"  Columns with descriptions: {described_cols}/{total_cols} ({round(described_cols / total_cols * 100, 1) if total_cols > 0 else 0}%)")
-    print(f"  Average quality score: {round(avg_score, 1)}/100")
-
-    if avg_score >= 80:
-        print(f"\n  Tables are well-annotated and ready for a Genie space.")
-    elif avg_score >= 50:
-        print(f"\n  Tables are usable but would benefit from better annotations.")
-        print(f"  Adding column descriptions will significantly improve Genie accuracy.")
+    audit_start = time.perf_counter()
+    all_results = review_tables(tables_to_review, mode=audit_mode, max_workers=audit_max_workers, cache=audit_cache)
+    audit_seconds = time.perf_counter() - audit_start
+    if audit_cache:
+        audit_cache.save()
+
+    for review in all_results:
+        print(f"\n{'─' * 70}")
+        print(f"TABLE: {review['table']}")
+        print(f"{'─' * 70}")
+
+        if not review["exists"]:
+            print(f"  ✗ Table not accessible")
+            for rec in review["recommendations"]:
+                print(f"    {rec}")
+            continue
+
+        # Table comment
+        if review["table_comment"]:
+            print(f"  ✓ Table comment: {review['table_comment'][:100]}{'...' if len(review['table_comment']) > 100 else ''}")
+        else:
+            print(f"  ✗ Table comment: MISSING")
+
+        # Column summary
+        total = review["total_columns"]
+        described = review["columns_with_description"]
+        print(f"  {'✓' if described == total else '✗'} Columns: {described}/{total} have descriptions")
+
+        # Foreign keys
+        if review["foreign_keys"]:
+            print(f"  ✓ Foreign keys: {len(review['foreign_keys'])} defined")
+        else:
+            print(f"  ○ Foreign keys: None (can define in Genie knowledge store)")
+
+        # Quality score
+        score = review["quality_score"]
+        grade = "Excellent" if score >= 90 else "Good" if score >= 70 else "Fair" if score >= 50 else "Needs work"
+        print(f"\n  Quality Score: {score}/100 ({grade})")
+
+        # Recommendations
+        if review["recommendations"]:
+            print(f"\n  Recommendations:")
+            for rec in review["recommendations"]:
+                print(f"    → {rec}")
+
+        # Column detail table
+        if review["columns"]:
+            print(f"\n  {'Column':<30} {'Type':<15} {'Description'}")
+            print(f"  {'─' * 30} {'─' * 15} {'─' * 40}")
+            for col in review["columns"]:
+                desc = col["description"] or "—"
+                if len(desc) > 40:
+                    desc = desc[:37] + "..."
+                print(f"  {col['name']:<30} {col['type']:<15} {desc}")
+
+    # --- SUMMARY ---
+
+    print(f"\n{'=' * 70}")
+    print("SUMMARY")
+    print(f"{'=' * 70}")
+    accessible = [r for r in all_results if r["exists"]]
+    if accessible:
+        total_cols = sum(r["total_columns"] for r in accessible)
+        described_cols = sum(r["columns_with_description"] for r in accessible)
+        avg_score = sum(r["quality_score"] for r in accessible) / len(accessible)
+
+        print(f"  Tables reviewed: {len(accessible)}/{len(tables_to_review)}")
+        print(f"  Total columns: {total_cols}")
+        print(f"  Columns with descriptions: {described_cols}/{total_cols} ({round(described_cols / total_cols * 100, 1) if total_cols > 0 else 0}%)")
+        print(f"  Average quality score: {round(avg_score, 1)}/100")
+        print(f"  Audit time: {audit_seconds:.1f}s ({audit_mode} mode)")
+        if audit_cache:
+            print(f"  Metadata cache: {audit_cache.summary()}")
+
+        if avg_score >= 80:
+            print(f"\n  Tables are well-annotated and ready for a Genie space.")
+        elif avg_score >= 50:
+            print(f"\n  Tables are usable but would benefit from better annotations.")
+            print(f"  Adding column descriptions will significantly improve Genie accuracy.")
+        else:
+            print(f"\n  Tables need more annotation before use in a Genie space.")
+            print(f"  Strongly recommend adding table comments and column descriptions first.")
     else:
-        print(f"\n  Tables need more annotation before use in a Genie space.")
-        print(f"  Strongly recommend adding table comments and column descriptions first.")
-else:
-    print(f"  No tables were accessible. Check permissions and table identifiers.")
+        print(f"  No tables were accessible. Check permissions and table identifiers.")
+
+
+# --- COMMENT REMEDIATION ---
+
+# Set to True to generate DDL for every missing table comment and column description
+generate_comment_ddl = False
+
+# Descriptions to write, e.g.
+#   {"catalog.schema.orders": {"table": "One row per order line.", "columns": {"amount": "Net amount in USD."}}}
+# Anything missing here gets a '<description>' placeholder; placeholder statements
+# are printed for you to fill in and never run. Leave empty to print a template.
+comment_descriptions = {}
+
+# Print the statements without running them; set to False to apply them
+comment_ddl_dry_run = True
+
+# Max statements in flight at once
+comment_ddl_max_workers = 8
+
+DESCRIPTION_PLACEHOLDER = "<description>"
+
+
+def sql_string(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def quote_identifier(name: str) -> str:
+    return f"`{name.replace('`', '``')}`"
+
+
+def is_view(review: dict) -> bool:
+    """Views (including metric and materialized views) can't take ALTER TABLE ... ALTER COLUMN."""
+    return "VIEW" in (review.get("table_type") or "")
+
+
+def column_comment_statements(table: str, comments: dict) -> list[str]:
+    return [f"COMMENT ON COLUMN {table}.{quote_identifier(col)} IS {sql_string(text)}" for col, text in comments.items()]
+
+
+def comment_statements(review: dict, descriptions: dict = None) -> list[dict]:
+    """
+    DDL adding the missing comments of one reviewed table.
+
+    The table comment is one COMMENT ON TABLE; all missing column comments
+    with a description become one ALTER TABLE ... ALTER COLUMN statement
+    (views get one COMMENT ON COLUMN per column instead). Columns without a
+    description go into a separate placeholder statement. Each entry is
+    {"table", "sql", "columns", "ready", "fallback"}: only ready statements
+    are run, and fallback holds per-column statements to use if a runtime
+    rejects the batched ALTER.
+    """
+    table = review["table"]
+    descriptions = descriptions or {}
+    statements = []
+    if not review["table_comment"]:
+        text = descriptions.get("table")
+        statements.append({
+            "table": table, "sql": f"COMMENT ON TABLE {table} IS {sql_string(text or DESCRIPTION_PLACEHOLDER)}",
+            "columns": [], "ready": bool(text), "fallback": [],
+        })
+
+    column_descriptions = descriptions.get("columns", {})
+    missing = review["columns_missing_description"]
+    described = {col: column_descriptions[col] for col in missing if column_descriptions.get(col)}
+    placeholders = {col: DESCRIPTION_PLACEHOLDER for col in missing if col not in described}
+    for comments, ready in ((described, True), (placeholders, False)):
+        if not comments:
+            continue
+        per_column = column_comment_statements(table, comments)
+        if is_view(review):
+            statements.extend({"table": table, "sql": sql, "columns": [col], "ready": ready, "fallback": []}
+                              for col, sql in zip(comments, per_column))
+            continue
+        alters = ", ".join(f"{quote_identifier(col)} COMMENT {sql_string(text)}" for col, text in comments.items())
+        statements.append({
+            "table": table, "sql": f"ALTER TABLE {table} ALTER COLUMN {alters}",
+            "columns": list(comments), "ready": ready, "fallback": per_column,
+        })
+    return statements
+
+
+def collect_comment_ddl(results: list, descriptions: dict = None) -> list[dict]:
+    """comment_statements for every accessible reviewed table, in audit order."""
+    descriptions = descriptions or {}
+    return [stmt for r in results if r["exists"] for stmt in comment_statements(r, descriptions.get(r["table"]))]
+
+
+def run_comment_statement(statement: dict) -> dict:
+    """Run one statement, falling back to per-column statements if the batched form fails."""
+    outcome = {**statement, "error": None}
+    try:
+        spark.sql(statement["sql"])
+    except Exception as e:
+        if not statement["fallback"]:
+            outcome["error"] = str(e)
+            return outcome
+        try:
+            for sql in statement["fallback"]:
+                spark.sql(sql)
+        except Exception as fallback_error:
+            outcome["error"] = str(fallback_error)
+    return outcome
+
+
+def run_comment_ddl(statements: list, max_workers: int = 8) -> list[dict]:
+    """Run the ready statements in a bounded thread pool, preserving order."""
+    ready = [s for s in statements if s["ready"]]
+    if not ready:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ready)))) as pool:
+        return list(pool.map(run_comment_statement, ready))
+
+
+def description_template(statements: list) -> dict:
+    """comment_descriptions skeleton covering every placeholder statement."""
+    template = {}
+    for stmt in statements:
+        if stmt["ready"]:
+            continue
+        entry = template.setdefault(stmt["table"], {})
+        if stmt["columns"]:
+            entry.setdefault("columns", {}).update(dict.fromkeys(stmt["columns"], ""))
+        else:
+            entry["table"] = ""
+    return template
+
+
+if __name__ == "__main__":
+    if generate_comment_ddl and accessible:
+        print(f"\n{'=' * 70}")
+        print("COMMENT REMEDIATION")
+        print(f"{'=' * 70}")
+        comment_ddl = collect_comment_ddl(all_results, comment_descriptions)
+        ready_ddl = [s for s in comment_ddl if s["ready"]]
+        if not comment_ddl:
+            print("  ✓ No missing table or column comments")
+        for stmt in comment_ddl:
+            print(f"  {'✓' if stmt['ready'] else '○'} {stmt['sql']};")
+        if len(ready_ddl) < len(comment_ddl):
+            print(f"\n  ○ {len(comment_ddl) - len(ready_ddl)} statement(s) have placeholders and won't run. "
+                  f"Fill in comment_descriptions:")
+            print("  " + json.dumps(description_template(comment_ddl), indent=2).replace("\n", "\n  "))
+
+        if ready_ddl and comment_ddl_dry_run:
+            print(f"\n  Dry run — set comment_ddl_dry_run = False to run {len(ready_ddl)} statement(s)")
+        elif ready_ddl:
+            ddl_start = time.perf_counter()
+            outcomes = run_comment_ddl(comment_ddl, comment_ddl_max_workers)
+            failed = [o for o in outcomes if o["error"]]
+            for outcome in failed:
+                print(f"  ✗ {outcome['table']}: {outcome['error'][:200]}")
+            touched = list(dict.fromkeys(o["table"] for o in outcomes if not o["error"]))
+            print(f"\n  Ran {len(outcomes) - len(failed)}/{len(outcomes)} statement(s) on {len(touched)} table(s) "
+                  f"in {time.perf_counter() - ddl_start:.1f}s")
+
+            # Re-score only the tables whose comments changed. information_schema
+            # last_altered can lag behind the DDL, so drop their cached reviews
+            # rather than trust the stamp.
+            before = {r["table"]: r["quality_score"] for r in all_results}
+            if audit_cache:
+                for table in touched:
+                    audit_cache.discard(f"review:{table}")
+            rescored = dict(zip(touched, review_tables(touched, mode=audit_mode, max_workers=audit_max_workers,
+                                                       cache=audit_cache)))
+            if audit_cache:
+                audit_cache.save()
+            all_results = [rescored.get(r["table"], r) for r in all_results]
+            accessible = [r for r in all_results if r["exists"]]
+            for table, review in rescored.items():
+                print(f"  → {table}: {before[table]} → {review['quality_score']}/100")
+
+    if table_metadata_path and accessible:
+        TableMetadata.from_audit_results(all_results).save_fixture(table_metadata_path)
+        print(f"\n  ✓ Columns of {len(accessible)} table(s) saved to {table_metadata_path} for offline validation")
+
+    part_span.end()
 
 
 # =====================================================================
@@ -285,52 +957,359 @@ enable_profiling = False
 # Max distinct values to show per column (for string/category columns)
 max_distinct_values = 20
 
+# Profile a TABLESAMPLE of each table instead of a full scan (e.g. 1.0 = 1%).
+# None scans every row. Sampled counts and date ranges are approximate.
+profile_sample_percent = None
+
 # Column types to profile for distinct values
 CATEGORICAL_TYPES = {"string", "varchar", "char", "boolean"}
 DATE_TYPES = {"date", "timestamp", "timestamp_ntz"}
 
-if enable_profiling and accessible:
+# Entity matching limits (see references/schema.md → Prompt matching overview)
+ENTITY_MATCHING_MAX_DISTINCT = 1_024
+ENTITY_MATCHING_MAX_VALUE_LENGTH = 127
+
+# Entity matching is limited to this many columns per space
+ENTITY_MATCHING_MAX_COLUMNS = 120
+
+# needs_view when the top ENTITY_MATCHING_MAX_DISTINCT values cover at least
+# this fraction of non-NULL rows
+ENTITY_MATCHING_MIN_COVERAGE = 0.8
+
+# Relative standard deviation of the HyperLogLog distinct counts of string
+# columns — tight enough to tell 1,000 from 1,100 distinct values
+DISTINCT_COUNT_RSD = 0.01
+
+# String columns get entity matching statistics on top of their profile
+STRING_TYPES = CATEGORICAL_TYPES - {"boolean"}
+
+
+def base_type(col_type: str) -> str:
+    """Normalize a column type for profiling, e.g. 'varchar(10)' → 'varchar'."""
+    return col_type.lower().split("<")[0].split("(")[0].strip()
+
+
+def top_k_size(col_type: str, max_values: int) -> int:
+    """Values to keep per column: enough to show max_values and, for strings, measure top-k coverage."""
+    return max(max_values + 1, ENTITY_MATCHING_MAX_DISTINCT) if col_type in STRING_TYPES else max_values + 1
+
+
+def profile_select_list(columns: list, max_values: int, use_approx_top_k: bool) -> list:
+    """Aggregate expressions for every profiled column, aliased by column position."""
+    exprs = ["COUNT(*) AS row_count"]
+    for i, col in enumerate(columns):
+        name = f"`{col['name'].replace('`', '``')}`"
+        col_type = base_type(col["type"])
+        if col_type not in CATEGORICAL_TYPES and col_type not in DATE_TYPES:
+            continue
+        exprs.append(f"SUM(CASE WHEN {name} IS NULL THEN 1 ELSE 0 END) AS c{i}_nulls")
+        if col_type in STRING_TYPES:
+            exprs.append(f"approx_count_distinct({name}, {DISTINCT_COUNT_RSD}) AS c{i}_distinct")
+            exprs.append(
+                f"COUNT(CASE WHEN length({name}) > {ENTITY_MATCHING_MAX_VALUE_LENGTH} THEN 1 END) AS c{i}_long_values"
+            )
+        else:
+            exprs.append(f"approx_count_distinct({name}) AS c{i}_distinct")
+        if col_type in CATEGORICAL_TYPES:
+            as_string = f"CAST({name} AS STRING)"
+            if use_approx_top_k:
+                # Bounded-memory frequency sketch: most common values first. Spark
+                # computes identical aggregates once, so the values shown and the
+                # rows covered by the top values (summed in the query, so one
+                # number comes back) read the same sketch.
+                sketch = f"approx_top_k({as_string}, {top_k_size(col_type, max_values)})"
+                exprs.append(f"slice({sketch}, 1, {max_values + 1}) AS c{i}_top")
+                if col_type in STRING_TYPES:
+                    exprs.append(f"aggregate({sketch}, 0L, (acc, v) -> acc + v.`count`) AS c{i}_top_rows")
+            exprs.append(f"MAX(length({as_string})) AS c{i}_max_length")
+        else:
+            exprs.append(f"MIN({name}) AS c{i}_min")
+            exprs.append(f"MAX({name}) AS c{i}_max")
+    return exprs
+
+
+def top_values_query(source: str, columns: list, limit: int) -> str:
+    """
+    Most frequent values of every categorical column, at most `limit` per
+    column, in one scan of `source`: the columns are unpivoted with stack()
+    and counted with GROUP BY, so memory is bounded by the shuffle rather than
+    by one in-memory set per column. Returns rows of (col, value, frequency),
+    col being the column's position. Used where approx_top_k isn't available.
+    """
+    pairs = [
+        f"{i}, CAST(`{col['name'].replace('`', '``')}` AS STRING)"
+        for i, col in enumerate(columns)
+        if base_type(col["type"]) in CATEGORICAL_TYPES
+    ]
+    return (
+        f"SELECT col, value, frequency FROM ("
+        f"SELECT col, value, frequency, "
+        f"row_number() OVER (PARTITION BY col ORDER BY frequency DESC, value) AS frequency_rank "
+        f"FROM (SELECT col, value, COUNT(*) AS frequency "
+        f"FROM (SELECT stack({len(pairs)}, {', '.join(pairs)}) AS (col, value) FROM {source}) AS unpivoted "
+        f"WHERE value IS NOT NULL GROUP BY col, value) AS counted"
+        f") AS ranked WHERE frequency_rank <= {limit}"
+    )
+
+
+@traced("discover.profile_table", attribute="table")
+def profile_table(table_id: str, columns: list, max_values: int = 20, sample_percent=None) -> dict:
+    """
+    Profile categorical and date columns of one table in a single aggregation pass.
+
+    Categorical columns get null counts, approximate distinct counts, the
+    top `max_values` values and the longest value length; date columns get null
+    counts, approximate distinct counts and their min/max. String columns also
+    get the entity matching statistics — non-NULL rows, values over the length
+    limit, the share of rows the top ENTITY_MATCHING_MAX_DISTINCT values cover —
+    and the resulting decision and reason (classify_entity_matching). Top values
+    come from the bounded approx_top_k sketch where available, else from a
+    second GROUP BY query over the same rows (top_values_query).
+    """
+    profile = {
+        "table": table_id,
+        "sample_percent": sample_percent,
+        "rows_scanned": 0,
+        "columns": {},
+        "error": None,
+    }
+    if not any(base_type(c["type"]) in CATEGORICAL_TYPES | DATE_TYPES for c in columns):
+        return profile
+
+    source = table_id + (f" TABLESAMPLE ({sample_percent} PERCENT)" if sample_percent else "")
+    row = None
+    for use_approx_top_k in (True, False):
+        query = f"SELECT {', '.join(profile_select_list(columns, max_values, use_approx_top_k))} FROM {source}"
+        try:
+            row = spark.sql(query).collect()[0]
+            break
+        except Exception as e:
+            profile["error"] = str(e)
+    if row is None:
+        return profile
+    profile["error"] = None
+    profile["rows_scanned"] = row["row_count"]
+
+    top_values = {}
+    if not use_approx_top_k and any(base_type(c["type"]) in CATEGORICAL_TYPES for c in columns):
+        try:
+            limit = max(top_k_size(base_type(c["type"]), max_values) for c in columns)
+            for top_row in spark.sql(top_values_query(source, columns, limit)).collect():
+                top_values.setdefault(top_row["col"], []).append(top_row)
+        except Exception as e:
+            profile["error"] = str(e)
+            return profile
+        for rows in top_values.values():
+            rows.sort(key=lambda r: (-r["frequency"], r["value"]))
+
+    for i, col in enumerate(columns):
+        col_type = base_type(col["type"])
+        if col_type in CATEGORICAL_TYPES:
+            if use_approx_top_k:
+                top = row[f"c{i}_top"] or []
+                values = [str(v["item"]) if isinstance(v, dict) or hasattr(v, "asDict") else str(v) for v in top]
+                top_rows = row[f"c{i}_top_rows"] if col_type in STRING_TYPES else None
+            else:
+                values = [r["value"] for r in top_values.get(i, [])]
+                top_rows = sum(r["frequency"] for r in top_values.get(i, [])[:ENTITY_MATCHING_MAX_DISTINCT])
+            stats = {
+                "type": col_type,
+                "null_count": row[f"c{i}_nulls"] or 0,
+                "approx_distinct": row[f"c{i}_distinct"] or 0,
+                "values": values[:max_values],
+                "more_values": len(values) > max_values,
+                "max_length": row[f"c{i}_max_length"] or 0,
+            }
+            if col_type in STRING_TYPES:
+                non_null = row["row_count"] - stats["null_count"]
+                stats["non_null"] = non_null
+                stats["long_values"] = row[f"c{i}_long_values"] or 0
+                stats["top_k_coverage"] = min(1.0, top_rows / non_null) if top_rows is not None and non_null else None
+                stats["decision"], stats["reason"] = classify_entity_matching(stats)
+            profile["columns"][col["name"]] = stats
+        elif col_type in DATE_TYPES:
+            profile["columns"][col["name"]] = {
+                "type": col_type,
+                "null_count": row[f"c{i}_nulls"] or 0,
+                "approx_distinct": row[f"c{i}_distinct"] or 0,
+                "min": row[f"c{i}_min"],
+                "max": row[f"c{i}_max"],
+            }
+    return profile
+
+
+def classify_entity_matching(stats: dict) -> tuple:
+    """(decision, reason) for one string column's profile statistics."""
+    non_null = stats["non_null"]
+    distinct = stats["approx_distinct"]
+    coverage = stats["top_k_coverage"]
+    if not non_null:
+        return "exclude", "all values are NULL"
+    if distinct <= ENTITY_MATCHING_MAX_DISTINCT:
+        if stats["max_length"] <= ENTITY_MATCHING_MAX_VALUE_LENGTH:
+            return "enable", f"~{distinct:,} distinct values"
+        if stats["long_values"] <= non_null * (1 - ENTITY_MATCHING_MIN_COVERAGE):
+            return "needs_view", (
+                f"~{distinct:,} distinct values, but {stats['long_values']:,} rows exceed "
+                f"{ENTITY_MATCHING_MAX_VALUE_LENGTH} characters — expose a shortened or coded column in a view"
+            )
+        return "exclude", f"values up to {stats['max_length']:,} characters — likely free text"
+    if coverage is not None and coverage >= ENTITY_MATCHING_MIN_COVERAGE:
+        return "needs_view", (
+            f"~{distinct:,} distinct values, but the top {ENTITY_MATCHING_MAX_DISTINCT:,} cover {coverage:.0%} of rows — "
+            f"map the long tail to 'Other' in a view"
+        )
+    uniqueness = distinct / non_null
+    kind = "IDs or free text" if uniqueness > 0.5 else "high cardinality"
+    return "exclude", f"~{distinct:,} distinct values ({kind})"
+
+
+if __name__ == "__main__" and enable_profiling and accessible:
+    part_span = start_span("discover.part3", tables=len(accessible), sample_percent=profile_sample_percent)
     print(f"\n\n{'=' * 70}")
     print("PART 3: COLUMN VALUE PROFILING")
-    print("Inspecting actual data values to inform SQL generation")
+    print("Inspecting actual data values to inform SQL generation (one scan per table)")
     print("=" * 70)
 
+    data_versions = fetch_data_versions([r["table"] for r in accessible], audit_max_workers) if audit_cache else {}
+    profiles_cached = 0
+
+    all_profiles = []
     for result in accessible:
         table_id = result["table"]
         print(f"\n{'─' * 70}")
         print(f"TABLE: {table_id}")
         print(f"{'─' * 70}")
 
-        for col in result["columns"]:
-            col_name = col["name"]
-            col_type = col["type"].lower().split("<")[0].split("(")[0].strip()
+        cache_key = f"profile:{table_id}:{max_distinct_values}:{profile_sample_percent}"
+        profile = audit_cache.get(cache_key, data_versions.get(table_id)) if audit_cache else None
+        if profile is not None:
+            profiles_cached += 1
+            print(f"  (cached — table unchanged since last profile)")
+        else:
+            profile = profile_table(table_id, result["columns"], max_distinct_values, profile_sample_percent)
+            if audit_cache and not profile["error"]:
+                audit_cache.put(cache_key, data_versions.get(table_id), profile)
+        all_profiles.append(profile)
+        if profile["error"]:
+            print(f"  Error — {profile['error']}")
+            continue
+        if profile_sample_percent:
+            print(f"  Sampled {profile_sample_percent}% of rows ({profile['rows_scanned']} rows scanned) — counts are approximate")
+        else:
+            print(f"  Rows scanned: {profile['rows_scanned']}")
 
+        for col_name, stats in profile["columns"].items():
+            col_type = stats["type"]
+            nulls = f" ({stats['null_count']} NULL)" if stats["null_count"] else ""
             if col_type in CATEGORICAL_TYPES:
-                try:
-                    rows = spark.sql(
-                        f"SELECT DISTINCT `{col_name}` FROM {table_id} "
-                        f"WHERE `{col_name}` IS NOT NULL "
-                        f"ORDER BY `{col_name}` LIMIT {max_distinct_values + 1}"
-                    ).collect()
-                    values = [str(r[0]) for r in rows]
-                    if len(values) > max_distinct_values:
-                        print(f"  {col_name} ({col_type}): {max_distinct_values}+ distinct values — {', '.join(values[:10])}...")
-                    elif values:
-                        print(f"  {col_name} ({col_type}): {', '.join(values)}")
-                    else:
-                        print(f"  {col_name} ({col_type}): (all NULL)")
-                except Exception as e:
-                    print(f"  {col_name} ({col_type}): Error — {e}")
-
-            elif col_type in DATE_TYPES:
-                try:
-                    row = spark.sql(
-                        f"SELECT MIN(`{col_name}`) AS min_val, MAX(`{col_name}`) AS max_val "
-                        f"FROM {table_id}"
-                    ).collect()[0]
-                    print(f"  {col_name} ({col_type}): {row['min_val']} to {row['max_val']}")
-                except Exception as e:
-                    print(f"  {col_name} ({col_type}): Error — {e}")
+                values = stats["values"]
+                if stats["more_values"]:
+                    print(f"  {col_name} ({col_type}): ~{stats['approx_distinct']} distinct{nulls} — top: {', '.join(values[:10])}...")
+                elif values:
+                    print(f"  {col_name} ({col_type}): {', '.join(values)}{nulls}")
+                else:
+                    print(f"  {col_name} ({col_type}): (all NULL)")
+            else:
+                print(f"  {col_name} ({col_type}): {stats['min']} to {stats['max']}{nulls}")
 
+    if audit_cache:
+        audit_cache.save()
+        print(f"\n  Profiles: {profiles_cached} from cache, {len(accessible) - profiles_cached} scanned")
+    part_span.end()
     print(f"\n  Tip: Use these values to write accurate filters and SQL expressions.")
     print(f"  Ask the user about domain conventions (fiscal calendar, abbreviations, etc.).")
+
+
+# =====================================================================
+# PART 4: ENTITY MATCHING CANDIDATES
+# =====================================================================
+# Decide which string columns should get format assistance and entity
+# matching, from the Part 3 profiles: HyperLogLog distinct counts
+# (approx_count_distinct) and how much of each column its most frequent
+# values cover (approx_top_k), read in the same scan as the rest of the profile.
+#
+# Each string column is classified as:
+#   enable     — fits the entity matching limits; turn on format assistance
+#                and entity matching
+#   needs_view — too many distinct values (or values too long), but a few
+#                values dominate; bucket the long tail (or shorten values) in
+#                a view and enable entity matching on the view's column
+#   exclude    — high-cardinality free text or IDs; leave prompt matching off
+# and ready-to-use column_configs are printed for create_space.py. Runs
+# whenever Part 3 does; with profile_sample_percent set, distinct counts are
+# lower bounds, so borderline columns may be misclassified.
+
+
+def apply_entity_matching_limit(profiles: list, max_columns: int = ENTITY_MATCHING_MAX_COLUMNS) -> int:
+    """
+    Keep at most `max_columns` enable decisions across the space — those with
+    the most non-NULL rows — and mark the rest exclude. Returns the number demoted.
+    """
+    enabled = [
+        (stats["non_null"], profile["table"], col_name, stats)
+        for profile in profiles
+        for col_name, stats in profile["columns"].items()
+        if stats.get("decision") == "enable"
+    ]
+    enabled.sort(key=lambda x: (-x[0], x[1], x[2]))
+    for _, _, _, stats in enabled[max_columns:]:
+        stats["decision"] = "exclude"
+        stats["reason"] += f" — over the {max_columns}-column entity matching limit for the space"
+    return max(0, len(enabled) - max_columns)
+
+
+def profile_column_configs(profile: dict) -> list:
+    """
+    column_configs entries for create_space.py for a profile's string
+    columns, sorted by column_name.
+
+    enable turns on format assistance and entity matching; needs_view keeps
+    format assistance only until the view exists; exclude turns both off.
+    """
+    configs = []
+    for col_name, stats in profile["columns"].items():
+        if "decision" not in stats:
+            continue
+        configs.append({
+            "column_name": col_name,
+            "enable_format_assistance": stats["decision"] != "exclude",
+            "enable_entity_matching": stats["decision"] == "enable",
+        })
+    return sorted(configs, key=lambda x: x["column_name"])
+
+
+if __name__ == "__main__" and enable_profiling and accessible:
+    part_span = start_span("discover.part4", tables=len(all_profiles))
+    print(f"\n\n{'=' * 70}")
+    print("PART 4: ENTITY MATCHING CANDIDATES")
+    print("Classifying the profiled string columns from their distinct counts and top-k coverage")
+    print("=" * 70)
+
+    demoted = apply_entity_matching_limit([p for p in all_profiles if not p["error"]])
+
+    decision_marks = {"enable": "✓", "needs_view": "→", "exclude": "○"}
+    for profile in all_profiles:
+        if profile["error"]:
+            continue
+        string_columns = {name: stats for name, stats in profile["columns"].items() if "decision" in stats}
+        print(f"\n{'─' * 70}")
+        print(f"TABLE: {profile['table']}")
+        print(f"{'─' * 70}")
+        if not string_columns:
+            print(f"  No string columns")
+            continue
+        for col_name, stats in sorted(string_columns.items()):
+            print(f"  {decision_marks[stats['decision']]} {col_name:<30} {stats['decision']:<11} {stats['reason']}")
+        print(f"\n  column_configs for create_space.py (prompt matching):")
+        print("  " + json.dumps(profile_column_configs(profile), indent=2).replace("\n", "\n  "))
+
+    decisions = [stats["decision"] for p in all_profiles for stats in p["columns"].values() if "decision" in stats]
+    print(f"\n  Entity matching: {decisions.count('enable')} enable, {decisions.count('needs_view')} need a view, "
+          f"{decisions.count('exclude')} exclude")
+    if demoted:
+        print(f"  ✗ {demoted} otherwise-eligible column(s) excluded to stay within {ENTITY_MATCHING_MAX_COLUMNS} columns per space")
+    part_span.end()
+
+if __name__ == "__main__":
+    finish_tracing()
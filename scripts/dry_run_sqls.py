@@ -0,0 +1,299 @@
+"""
+Dry-run every example SQL query in a Genie space config before creating or
+updating the space.
+
+For each instructions.example_question_sqls entry:
+  - binds :parameter placeholders to sample values (default_value, else a
+    value matching type_hint)
+  - captures the EXPLAIN plan and the optimizer's estimated scan size
+  - executes the query and records wall time and returned rows
+and flags queries that fail, exceed a latency budget, or scan whole tables
+with no pushed-down or partition filters. Queries run concurrently.
+
+Works with any SparkSession — a Databricks notebook, or local Spark with
+fixture tables registered under the identifiers the SQL references.
+
+Usage: Run this in a Databricks notebook cell.
+       Set `config` to your serialized_space dict (e.g. the `config` built by create_space.py).
+"""
+
+import datetime
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIGURE ---
+
+# serialized_space dict to test (defaults to `config` from create_space.py when run in the same notebook)
+config = globals().get("config")
+
+# Flag queries slower than this (seconds)
+latency_budget_seconds = 10.0
+
+# Queries executed at once
+max_concurrency = 4
+
+# Set to False to only EXPLAIN (no data is read)
+execute_queries = True
+
+# Max rows fetched per query; the query itself runs unmodified
+max_result_rows = 1_000
+
+# =====================================================================
+# PARAMETER BINDING
+# =====================================================================
+
+# :name placeholders, skipping '::' casts
+PARAM_PLACEHOLDER_PATTERN = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+SQL_STRING_PATTERN = re.compile(r"'(?:[^'\\]|\\.)*'")
+
+# Sample values for parameters without a default_value, by type_hint
+SAMPLE_LITERALS = {
+    "STRING": "''",
+    "INT": "1",
+    "INTEGER": "1",
+    "BIGINT": "1",
+    "LONG": "1",
+    "SMALLINT": "1",
+    "DOUBLE": "1.0",
+    "FLOAT": "1.0",
+    "DECIMAL": "1.0",
+    "BOOLEAN": "TRUE",
+    "DATE": "CURRENT_DATE()",
+    "TIMESTAMP": "CURRENT_TIMESTAMP()",
+}
+NUMERIC_TYPES = {"INT", "INTEGER", "BIGINT", "LONG", "SMALLINT", "DOUBLE", "FLOAT", "DECIMAL"}
+
+
+def sql_literal(value, type_hint: str = "STRING") -> str:
+    """Render a parameter value as a SQL literal of the hinted type."""
+    type_hint = (type_hint or "STRING").upper().split("(")[0]
+    if value is None:
+        return "NULL"
+    if type_hint in NUMERIC_TYPES:
+        float(value)  # raises ValueError for non-numeric defaults
+        return str(value)
+    if type_hint == "BOOLEAN":
+        return "TRUE" if str(value).lower() in ("true", "1") else "FALSE"
+    if type_hint in ("DATE", "TIMESTAMP"):
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            value = value.isoformat()
+        return f"{type_hint} '{value}'"
+    escaped = str(value).replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+def bind_parameters(sql: str, parameters: list) -> tuple:
+    """
+    Replace :name placeholders outside string literals with sample literals.
+
+    Returns (bound_sql, {name: literal}, [undeclared placeholder names]).
+    Undeclared placeholders are bound to NULL so the query still plans.
+    """
+    declared = {}
+    for param in parameters or []:
+        name = param.get("name")
+        if not name:
+            continue
+        type_hint = (param.get("type_hint") or "STRING").upper()
+        values = (param.get("default_value") or {}).get("values") or []
+        try:
+            literal = sql_literal(values[0], type_hint) if values else None
+        except ValueError:
+            literal = None
+        declared[name] = literal or SAMPLE_LITERALS.get(type_hint.split("(")[0], "''")
+
+    bindings = {}
+    undeclared = []
+
+    def substitute(match):
+        name = match.group(1)
+        if name not in declared and name not in undeclared:
+            undeclared.append(name)
+        bindings[name] = declared.get(name, "NULL")
+        return bindings[name]
+
+    parts = []
+    pos = 0
+    for string_match in SQL_STRING_PATTERN.finditer(sql):
+        parts.append(PARAM_PLACEHOLDER_PATTERN.sub(substitute, sql[pos:string_match.start()]))
+        parts.append(string_match.group(0))
+        pos = string_match.end()
+    parts.append(PARAM_PLACEHOLDER_PATTERN.sub(substitute, sql[pos:]))
+    return "".join(parts), bindings, undeclared
+
+
+# =====================================================================
+# PLAN ANALYSIS
+# =====================================================================
+
+# "(3) Scan parquet spark_catalog.default.orders" / "Scan delta main.sales.orders"
+SCAN_NODE_PATTERN = re.compile(r"^\(\d+\)\s+(?:Photon)?Scan\s+\S+\s+(\S+)", re.MULTILINE)
+SCAN_FILTER_FIELDS = ("PartitionFilters", "PushedFilters", "DataFilters", "DictionaryFilters")
+SIZE_IN_BYTES_PATTERN = re.compile(r"sizeInBytes=([\d.]+)\s*(B|KiB|MiB|GiB|TiB|PiB|EiB)")
+BYTE_UNITS = {"B": 1, "KiB": 1 << 10, "MiB": 1 << 20, "GiB": 1 << 30, "TiB": 1 << 40, "PiB": 1 << 50, "EiB": 1 << 60}
+
+
+def full_scans(formatted_plan: str) -> list:
+    """Tables read by a Scan node with no partition, pushed, or data filters in an EXPLAIN FORMATTED plan."""
+    tables = []
+    matches = list(SCAN_NODE_PATTERN.finditer(formatted_plan))
+    for i, match in enumerate(matches):
+        # Node details run until the next "(N) ..." header
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(formatted_plan)
+        details = formatted_plan[match.end():end]
+        next_node = re.search(r"^\(\d+\)", details, re.MULTILINE)
+        if next_node:
+            details = details[:next_node.start()]
+        filtered = any(
+            re.search(rf"^{field}: \[.+\]", details, re.MULTILINE) for field in SCAN_FILTER_FIELDS
+        )
+        if not filtered and match.group(1) not in tables:
+            tables.append(match.group(1))
+    return tables
+
+
+def estimated_scan_bytes(cost_plan: str):
+    """Sum of optimizer size estimates for leaf relations in an EXPLAIN COST plan, or None if unavailable."""
+    total = None
+    for line in cost_plan.splitlines():
+        if "Relation" not in line and "Scan" not in line:
+            continue
+        match = SIZE_IN_BYTES_PATTERN.search(line)
+        if match:
+            total = (total or 0) + int(float(match.group(1)) * BYTE_UNITS[match.group(2)])
+    return total
+
+
+def format_bytes(num_bytes) -> str:
+    if num_bytes is None:
+        return "unknown"
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if num_bytes < 1024 or unit == "TiB":
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+# =====================================================================
+# DRY RUN
+# =====================================================================
+
+def dry_run_query(session, example: dict, index: int, latency_budget: float = 10.0,
+                  execute: bool = True, max_rows: int = 1_000) -> dict:
+    """EXPLAIN and (optionally) execute one example SQL entry, returning timings, plan facts, and flags."""
+    sql = example.get("sql", [])
+    raw_sql = "".join(sql) if isinstance(sql, list) else str(sql)
+    bound_sql, bindings, undeclared = bind_parameters(raw_sql, example.get("parameters"))
+    result = {
+        "index": index,
+        "id": example.get("id"),
+        "question": (example.get("question") or [""])[0],
+        "sql": bound_sql,
+        "bindings": bindings,
+        "plan": None,
+        "full_scans": [],
+        "estimated_scan_bytes": None,
+        "seconds": None,
+        "rows": None,
+        "error": None,
+        "flags": [],
+    }
+    if undeclared:
+        result["flags"].append(f"undeclared parameter(s) bound to NULL: {', '.join(undeclared)}")
+
+    try:
+        result["plan"] = "\n".join(row[0] for row in session.sql(f"EXPLAIN FORMATTED {bound_sql}").collect())
+        result["full_scans"] = full_scans(result["plan"])
+        try:
+            cost_plan = "\n".join(row[0] for row in session.sql(f"EXPLAIN COST {bound_sql}").collect())
+            result["estimated_scan_bytes"] = estimated_scan_bytes(cost_plan)
+        except Exception:
+            pass
+        if execute:
+            start = time.perf_counter()
+            rows = session.sql(bound_sql).limit(max_rows).collect()
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            result["rows"] = len(rows)
+    except Exception as e:
+        result["error"] = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+        result["flags"].append("error")
+        return result
+
+    if result["full_scans"]:
+        result["flags"].append(f"full table scan: {', '.join(result['full_scans'])}")
+    if result["seconds"] is not None and result["seconds"] > latency_budget:
+        result["flags"].append(f"slow: {result['seconds']:.1f}s > {latency_budget:.1f}s budget")
+    if result["rows"] == 0:
+        result["flags"].append("returned 0 rows")
+    return result
+
+
+def dry_run_example_sqls(session, config: dict, latency_budget: float = 10.0, max_workers: int = 4,
+                         execute: bool = True, max_rows: int = 1_000) -> list[dict]:
+    """Dry-run every example SQL in a serialized_space config concurrently, in config order."""
+    examples = config.get("instructions", {}).get("example_question_sqls", [])
+    if not examples:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(examples)))) as pool:
+        return list(pool.map(
+            lambda args: dry_run_query(session, args[1], args[0], latency_budget, execute, max_rows),
+            enumerate(examples),
+        ))
+
+
+# =====================================================================
+# RUN DRY RUN
+# =====================================================================
+
+if __name__ == "__main__":
+    from pyspark.sql import SparkSession
+
+    spark = SparkSession.builder.getOrCreate()
+
+    if not config:
+        print("No config provided. Set 'config' to your serialized_space dict at the top of this script.")
+    else:
+        print("=" * 70)
+        print("EXAMPLE SQL DRY RUN")
+        print(f"Latency budget: {latency_budget_seconds}s, concurrency: {max_concurrency}"
+              f"{'' if execute_queries else ' (EXPLAIN only)'}")
+        print("=" * 70)
+
+        run_start = time.perf_counter()
+        dry_run_results = dry_run_example_sqls(
+            spark, config, latency_budget_seconds, max_concurrency, execute_queries, max_result_rows
+        )
+        run_seconds = time.perf_counter() - run_start
+
+        for r in dry_run_results:
+            print(f"\n{'─' * 70}")
+            print(f"[{r['index']}] {r['question'][:80]}")
+            if r["bindings"]:
+                print(f"  Parameters: {', '.join(f'{k}={v}' for k, v in r['bindings'].items())}")
+            if r["error"]:
+                print(f"  ✗ Error: {r['error']}")
+                continue
+            timing = f"{r['seconds']:.2f}s, {r['rows']} row(s)" if r["seconds"] is not None else "not executed"
+            print(f"  {'✗' if any(f.startswith('slow') for f in r['flags']) else '✓'} {timing}")
+            print(f"  Estimated scan: {format_bytes(r['estimated_scan_bytes'])}")
+            for flag in r["flags"]:
+                print(f"  ○ {flag}")
+
+        failed = [r for r in dry_run_results if r["error"]]
+        slow = [r for r in dry_run_results if any(f.startswith("slow") for f in r["flags"])]
+        scans = [r for r in dry_run_results if r["full_scans"]]
+        print(f"\n{'=' * 70}")
+        print("SUMMARY")
+        print(f"{'=' * 70}")
+        print(f"  {len(dry_run_results) - len(failed)}/{len(dry_run_results)} example SQL queries ran successfully"
+              f" ({run_seconds:.1f}s total)")
+        if slow:
+            print(f"  ✗ {len(slow)} over the {latency_budget_seconds}s budget: {', '.join(str(r['index']) for r in slow)}")
+        if scans:
+            print(f"  ○ {len(scans)} with full table scans: {', '.join(str(r['index']) for r in scans)}")
+            print(f"    Add filters on partition/clustering columns, or confirm the full scan is intended.")
+        if failed or slow:
+            print(f"\n  Fix the flagged queries before creating or updating the space —")
+            print(f"  Genie learns its query patterns from these examples.")
+        else:
+            print(f"\n  ✓ All example SQL queries are ready.")
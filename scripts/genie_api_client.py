@@ -0,0 +1,176 @@
+"""
+Thread-safe JSON client for the Genie spaces REST API, shared by the scripts
+that make many requests (manage_space.py fleet inventory, bulk_create_spaces.py).
+
+Concurrency comes from callers' thread pools rather than asyncio: Databricks
+notebooks already run an event loop (so asyncio.run() fails in a cell), and
+a few dozen blocking requests in flight need only the standard library — each
+thread keeps its own keep-alive connection, and the rate limiter and retries
+are shared.
+
+Usage:
+    from genie_api_client import GenieApiClient
+
+    api = GenieApiClient(w.config.host, w.config.authenticate, max_requests_per_second=10)
+    space = api.get(f"/api/2.0/genie/spaces/{space_id}", {"include_serialized_space": "true"})
+    api.close()
+"""
+
+import http.client
+import json
+import random
+import threading
+import time
+import urllib.parse
+
+# tracing.py lives next to this script; in a notebook outside scripts/, add
+# that folder to sys.path first
+from tracing import span
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Methods safe to resend after a 5xx or dropped connection. A POST that failed
+# that way may still have created its space, so it is only retried on 429.
+IDEMPOTENT_METHODS = {"GET", "PATCH", "PUT", "DELETE"}
+
+
+class RateLimiter:
+    """Token bucket shared by all threads: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GenieApiClient:
+    """
+    Minimal thread-safe JSON client for the Genie spaces API.
+
+    Each worker thread reuses one keep-alive connection. Throttled (429) and
+    transient 5xx responses are retried with exponential backoff and jitter,
+    honoring Retry-After. `headers` is called per request, so OAuth tokens
+    refreshed by the SDK are picked up. With max_requests_per_second, requests
+    from all threads share one rate limit. Each request is timed as an
+    "http <METHOD>" span when tracing is on (see tracing.py).
+    """
+
+    def __init__(self, host: str, headers, max_retries: int = 5, backoff_seconds: float = 1.0,
+                 max_backoff_seconds: float = 30.0, timeout: float = 60.0, max_requests_per_second: float = None):
+        url = urllib.parse.urlsplit(host if "://" in host else f"https://{host}")
+        self.connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.netloc = url.netloc
+        self.base_path = url.path.rstrip("/")
+        self.headers = headers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(max_requests_per_second) if max_requests_per_second else None
+        self.retries = 0
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.connection_class(self.netloc, timeout=self.timeout)
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def backoff(self, attempt: int, retry_after=None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff_seconds)
+            except ValueError:
+                pass
+        return min(self.backoff_seconds * 2 ** attempt, self.max_backoff_seconds) * random.uniform(0.5, 1.0)
+
+    def request(self, method: str, path: str, query: dict = None, body: dict = None) -> dict:
+        url = self.base_path + path + (f"?{urllib.parse.urlencode(query)}" if query else "")
+        headers = {"Accept": "application/json"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        with span(f"http {method}", path=path) as request_span:
+            for attempt in range(self.max_retries + 1):
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                conn = self.connection()
+                try:
+                    conn.request(method, url, body=payload, headers={**self.headers(), **headers})
+                    response = conn.getresponse()
+                    response_body = response.read()
+                except (http.client.HTTPException, OSError):
+                    conn.close()
+                    self.local.conn = None
+                    if attempt == self.max_retries or method not in IDEMPOTENT_METHODS:
+                        request_span.set(attempts=attempt + 1)
+                        raise
+                    with self.lock:
+                        self.retries += 1
+                    time.sleep(self.backoff(attempt))
+                    continue
+                retryable = response.status == 429 or (response.status in RETRYABLE_STATUS and method in IDEMPOTENT_METHODS)
+                if retryable and attempt < self.max_retries:
+                    with self.lock:
+                        self.retries += 1
+                    time.sleep(self.backoff(attempt, response.getheader("Retry-After")))
+                    continue
+                request_span.set(status=response.status, attempts=attempt + 1)
+                if response.status >= 400:
+                    raise RuntimeError(
+                        f"{method} {path} failed: HTTP {response.status} — {response_body[:200].decode(errors='replace')}"
+                    )
+                return json.loads(response_body or b"{}")
+
+    def get(self, path: str, query: dict = None) -> dict:
+        return self.request("GET", path, query)
+
+    def post(self, path: str, body: dict) -> dict:
+        return self.request("POST", path, body=body)
+
+    def patch(self, path: str, body: dict) -> dict:
+        return self.request("PATCH", path, body=body)
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+
+
+def list_spaces(api: GenieApiClient, page_size: int = 100) -> list[dict]:
+    """Every Genie space visible to the caller (as returned by the list endpoint), following next_page_token."""
+    spaces = []
+    page_token = None
+    while True:
+        query = {"page_size": page_size, **({"page_token": page_token} if page_token else {})}
+        page = api.get("/api/2.0/genie/spaces", query)
+        spaces.extend(page.get("spaces", []))
+        page_token = page.get("next_page_token")
+        if not page_token:
+            return spaces
+
+
+def list_space_ids(api: GenieApiClient, page_size: int = 100) -> list:
+    """IDs of every Genie space visible to the caller."""
+    return [s["space_id"] for s in list_spaces(api, page_size)]
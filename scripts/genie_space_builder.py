@@ -0,0 +1,340 @@
+"""
+Build a Genie space serialized_space config programmatically.
+
+GenieSpaceBuilder keeps every collection in the order the API requires as
+items are added (binary-search insertion on the sort key, no re-sorting),
+generates collision-free IDs, and rejects input the API would reject at the
+call that adds it, so mistakes point at the offending line instead of at a
+400 response. build() then emits the config in a single pass.
+
+Usage:
+    from genie_space_builder import GenieSpaceBuilder
+
+    builder = GenieSpaceBuilder()
+    builder.add_table("catalog.schema.orders", description="Daily sales transactions")
+    builder.add_column_config("catalog.schema.orders", "region",
+                              enable_format_assistance=True, enable_entity_matching=True)
+    builder.add_sample_question("What were total sales last month?")
+    builder.add_measure("total_revenue", "SUM(orders.quantity * orders.unit_price)",
+                        display_name="Total Revenue")
+    builder.add_example_sql("What are total sales by region?",
+                            "SELECT\\n  orders.region,\\n  SUM(orders.amount) AS total_sales\\n"
+                            "FROM catalog.schema.orders\\nGROUP BY orders.region")
+    config = builder.build()          # serialized_space dict
+    issues = builder.validate()       # full validate_config() pass, for best-practice warnings
+
+The module has no Databricks dependencies; import it from a notebook in the
+same folder, or add the scripts/ folder to sys.path.
+"""
+
+import json
+import secrets
+from bisect import bisect_left
+
+from validate_config import (
+    ID_PATTERN,
+    MAX_ARRAY_SIZE,
+    MAX_STRING_LENGTH,
+    TABLE_ID_PATTERN,
+    VALID_RT_TYPES,
+    WHERE_PREFIX_PATTERN,
+    validate_config,
+)
+
+RELATIONSHIP_TYPES = ("MANY_TO_ONE", "ONE_TO_MANY", "ONE_TO_ONE", "MANY_TO_MANY")
+
+
+def as_lines(value, split_lines: bool = False) -> list:
+    """
+    A string-array field from a string or list. With split_lines, a multi-line
+    string becomes one element per line, each ending in '\\n' but the last.
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return value.splitlines(keepends=True) if split_lines else [value]
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"Expected a string or list of strings, got {value!r}")
+    return list(value)
+
+
+class SortedCollection:
+    """Items kept sorted by a key as they are inserted, with keys unique."""
+
+    def __init__(self, name: str, key_name: str):
+        self.name = name
+        self.key_name = key_name
+        self.keys = []
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        i = bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def get(self, key):
+        i = bisect_left(self.keys, key)
+        return self.items[i] if i < len(self.keys) and self.keys[i] == key else None
+
+    def insert(self, key: str, item: dict) -> dict:
+        if len(self.items) >= MAX_ARRAY_SIZE:
+            raise ValueError(f"{self.name} is full ({MAX_ARRAY_SIZE} item limit)")
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            raise ValueError(f"Duplicate {self.key_name} '{key}' in {self.name}")
+        self.keys.insert(i, key)
+        self.items.insert(i, item)
+        return item
+
+
+class GenieSpaceBuilder:
+    """
+    Incrementally assembles a serialized_space config.
+
+    Each add_* method validates its input, inserts the item in sorted position,
+    and returns the generated ID (or the identifier for tables and metric
+    views). IDs share the API's uniqueness scopes: sample questions with
+    benchmarks, and all instruction types with each other.
+    """
+
+    def __init__(self, version: int = 2):
+        self.version = version
+        self.sample_questions = SortedCollection("config.sample_questions", "id")
+        self.tables = SortedCollection("data_sources.tables", "identifier")
+        self.column_configs = {}  # table identifier -> SortedCollection by column_name
+        self.metric_views = SortedCollection("data_sources.metric_views", "identifier")
+        self.text_instructions = SortedCollection("instructions.text_instructions", "id")
+        self.example_question_sqls = SortedCollection("instructions.example_question_sqls", "id")
+        self.sql_functions = SortedCollection("instructions.sql_functions", "id")
+        self.join_specs = SortedCollection("instructions.join_specs", "id")
+        self.sql_snippets = {
+            snippet_type: SortedCollection(f"instructions.sql_snippets.{snippet_type}", "id")
+            for snippet_type in ("filters", "expressions", "measures")
+        }
+        self.benchmarks = SortedCollection("benchmarks.questions", "id")
+        self.question_ids = set()
+        self.instruction_ids = set()
+
+    # --- Helpers ---
+
+    def new_id(self, scope: set, requested: str = None) -> str:
+        """A fresh 32-char hex ID unique within scope, or `requested` after checking it."""
+        if requested is not None:
+            if not ID_PATTERN.match(requested):
+                raise ValueError(f"ID '{requested}' is not a valid 32-character lowercase hex string")
+            if requested in scope:
+                raise ValueError(f"Duplicate ID '{requested}'")
+            scope.add(requested)
+            return requested
+        while True:
+            new = secrets.token_hex(16)
+            if new not in scope:
+                scope.add(new)
+                return new
+
+    @staticmethod
+    def check_strings(field: str, values: list) -> list:
+        for value in values:
+            if len(value) > MAX_STRING_LENGTH:
+                raise ValueError(f"{field}: string exceeds {MAX_STRING_LENGTH} character limit (length: {len(value)})")
+        return values
+
+    @staticmethod
+    def check_table_identifier(identifier: str):
+        if not isinstance(identifier, str) or not TABLE_ID_PATTERN.match(identifier):
+            raise ValueError(f"'{identifier}' must be three-level namespace: catalog.schema.table")
+
+    @staticmethod
+    def optional_fields(**fields) -> dict:
+        """String-array fields that were given, in the order passed."""
+        item = {}
+        for name, value in fields.items():
+            lines = as_lines(value)
+            if lines:
+                item[name] = GenieSpaceBuilder.check_strings(name, lines)
+        return item
+
+    # --- config / data_sources ---
+
+    def add_sample_question(self, question: str, id: str = None) -> str:
+        question = self.check_strings("question", as_lines(question))
+        if len(question) != 1:
+            raise ValueError("A sample question must be a single question string")
+        sq_id = self.new_id(self.question_ids, id)
+        self.sample_questions.insert(sq_id, {"id": sq_id, "question": question})
+        return sq_id
+
+    def add_table(self, identifier: str, description=None, column_configs: list = None) -> str:
+        self.check_table_identifier(identifier)
+        self.tables.insert(identifier, {"identifier": identifier, **self.optional_fields(description=description)})
+        self.column_configs[identifier] = SortedCollection(f"{identifier} column_configs", "column_name")
+        for cc in column_configs or []:
+            self.add_column_config(identifier, **cc)
+        return identifier
+
+    def add_column_config(self, table: str, column_name: str, description=None, synonyms=None,
+                          enable_format_assistance: bool = None, enable_entity_matching: bool = None,
+                          exclude: bool = None) -> str:
+        if table not in self.tables:
+            raise ValueError(f"Table '{table}' has not been added")
+        if enable_entity_matching and not enable_format_assistance:
+            raise ValueError(
+                f"{table}.{column_name}: enable_entity_matching requires enable_format_assistance to be True"
+            )
+        item = {"column_name": column_name, **self.optional_fields(description=description, synonyms=synonyms)}
+        for flag, value in (("enable_format_assistance", enable_format_assistance),
+                            ("enable_entity_matching", enable_entity_matching), ("exclude", exclude)):
+            if value is not None:
+                item[flag] = value
+        self.column_configs[table].insert(column_name, item)
+        return column_name
+
+    def add_metric_view(self, identifier: str, description=None) -> str:
+        self.check_table_identifier(identifier)
+        self.metric_views.insert(identifier, {"identifier": identifier, **self.optional_fields(description=description)})
+        return identifier
+
+    # --- instructions ---
+
+    def add_text_instruction(self, content, id: str = None) -> str:
+        """Add the space's text instruction; each line gets a trailing newline so the API doesn't jam them together."""
+        if len(self.text_instructions):
+            raise ValueError("Only one text instruction is allowed; add lines to the existing one instead")
+        lines = [line if line[-1:].isspace() else line + "\n" for line in as_lines(content) if line]
+        if not lines:
+            raise ValueError("Text instruction content is empty")
+        ti_id = self.new_id(self.instruction_ids, id)
+        self.text_instructions.insert(ti_id, {"id": ti_id, "content": self.check_strings("content", lines)})
+        return ti_id
+
+    def add_example_sql(self, question, sql, usage_guidance=None, parameters: list = None, id: str = None) -> str:
+        question = self.check_strings("question", as_lines(question))
+        if len(question) != 1:
+            raise ValueError("An example SQL entry must have a single question string")
+        sql = self.check_strings("sql", as_lines(sql, split_lines=True))
+        if not sql:
+            raise ValueError(f"Example SQL for '{question[0]}' is empty")
+        eq_id = self.new_id(self.instruction_ids, id)
+        item = {"id": eq_id, "question": question, "sql": sql, **self.optional_fields(usage_guidance=usage_guidance)}
+        if parameters:
+            item["parameters"] = list(parameters)
+        self.example_question_sqls.insert(eq_id, item)
+        return eq_id
+
+    def add_sql_function(self, identifier: str, description: str = None, id: str = None) -> str:
+        self.check_table_identifier(identifier)
+        sf_id = self.new_id(self.instruction_ids, id)
+        self.sql_functions.insert(sf_id, {
+            "id": sf_id, "identifier": identifier, **({"description": description} if description else {}),
+        })
+        return sf_id
+
+    def add_join(self, left: dict, right: dict, sql, instruction=None, comment=None,
+                 relationship_type: str = None, id: str = None) -> str:
+        """
+        Add a join spec. `sql` is the join condition (or the full sql array);
+        give relationship_type (e.g. "MANY_TO_ONE") unless sql already has its
+        --rt= annotation. Multi-column joins are separate join specs.
+        """
+        for side, obj in (("left", left), ("right", right)):
+            if not isinstance(obj, dict) or not obj.get("identifier"):
+                raise ValueError(f"Join spec {side} must be {{'identifier': ..., 'alias': ...}}")
+            self.check_table_identifier(obj["identifier"])
+        sql = as_lines(sql)
+        if relationship_type is not None:
+            if relationship_type not in RELATIONSHIP_TYPES:
+                raise ValueError(f"relationship_type must be one of {', '.join(RELATIONSHIP_TYPES)}")
+            sql = [s for s in sql if not s.startswith("--rt=")] + [f"--rt=FROM_RELATIONSHIP_TYPE_{relationship_type}--"]
+        annotations = [s for s in sql if s.startswith("--rt=")]
+        if len(annotations) != 1 or annotations[0] not in VALID_RT_TYPES:
+            raise ValueError("Join spec needs exactly one valid --rt=FROM_RELATIONSHIP_TYPE_...-- annotation")
+        if len(sql) != 2:
+            raise ValueError("Join spec sql must be one equality condition plus the --rt= annotation")
+        js_id = self.new_id(self.instruction_ids, id)
+        self.join_specs.insert(js_id, {
+            "id": js_id, "left": dict(left), "right": dict(right), "sql": self.check_strings("sql", sql),
+            **self.optional_fields(instruction=instruction, comment=comment),
+        })
+        return js_id
+
+    def add_snippet(self, snippet_type: str, sql, alias: str = None, display_name: str = None, synonyms=None,
+                    instruction=None, comment=None, id: str = None) -> str:
+        if snippet_type not in self.sql_snippets:
+            raise ValueError(f"snippet_type must be one of {', '.join(self.sql_snippets)}")
+        sql = self.check_strings("sql", as_lines(sql))
+        if not sql:
+            raise ValueError(f"SQL expression '{alias or display_name}' has empty sql")
+        if snippet_type == "filters" and WHERE_PREFIX_PATTERN.match(sql[0]):
+            raise ValueError(f"Filter '{display_name or alias}' must not start with WHERE — give only the condition")
+        sn_id = self.new_id(self.instruction_ids, id)
+        item = {"id": sn_id}
+        if alias:
+            item["alias"] = alias
+        if display_name:
+            item["display_name"] = display_name
+        item["sql"] = sql
+        item.update(self.optional_fields(synonyms=synonyms, instruction=instruction, comment=comment))
+        self.sql_snippets[snippet_type].insert(sn_id, item)
+        return sn_id
+
+    def add_measure(self, alias: str, sql, **fields) -> str:
+        return self.add_snippet("measures", sql, alias=alias, **fields)
+
+    def add_filter(self, display_name: str, sql, **fields) -> str:
+        return self.add_snippet("filters", sql, display_name=display_name, **fields)
+
+    def add_expression(self, alias: str, sql, **fields) -> str:
+        return self.add_snippet("expressions", sql, alias=alias, **fields)
+
+    # --- benchmarks ---
+
+    def add_benchmark(self, question: str, answer_sql, id: str = None) -> str:
+        question = self.check_strings("question", as_lines(question))
+        if len(question) != 1:
+            raise ValueError("A benchmark must have a single question string")
+        bq_id = self.new_id(self.question_ids, id)
+        self.benchmarks.insert(bq_id, {
+            "id": bq_id,
+            "question": question,
+            "answer": [{"format": "SQL", "content": self.check_strings("answer", as_lines(answer_sql, split_lines=True))}],
+        })
+        return bq_id
+
+    # --- Output ---
+
+    def build(self) -> dict:
+        """The serialized_space dict; empty sections are omitted."""
+        tables = []
+        for table in self.tables.items:
+            column_configs = self.column_configs[table["identifier"]].items
+            tables.append({**table, "column_configs": list(column_configs)} if column_configs else dict(table))
+
+        sections = (
+            ("config", {"sample_questions": self.sample_questions.items}),
+            ("data_sources", {"tables": tables, "metric_views": self.metric_views.items}),
+            ("instructions", {
+                "text_instructions": self.text_instructions.items,
+                "example_question_sqls": self.example_question_sqls.items,
+                "sql_functions": self.sql_functions.items,
+                "join_specs": self.join_specs.items,
+                "sql_snippets": {k: c.items for k, c in self.sql_snippets.items() if len(c)},
+            }),
+            ("benchmarks", {"questions": self.benchmarks.items}),
+        )
+        config = {"version": self.version}
+        for section, fields in sections:
+            present = {name: list(value) if isinstance(value, list) else value
+                       for name, value in fields.items() if value}
+            if present:
+                config[section] = present
+        return config
+
+    def to_json(self) -> str:
+        """build() serialized for the API's serialized_space field."""
+        return json.dumps(self.build())
+
+    def validate(self, similarity_mode: str = "auto") -> list[dict]:
+        """Run the full validate_config() on the built config, for checks the builder doesn't enforce."""
+        return validate_config(self.build(), similarity_mode=similarity_mode)
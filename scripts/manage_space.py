@@ -1,96 +1,157 @@
 """
 Manage an existing Databricks AI/BI Genie space.
 
-Part 1: Retrieve and summarize the current configuration.
-Part 2: Apply updates via the PATCH API.
+Part 1: Retrieve and summarize the current configuration, optionally
+        recording it in a local snapshot store (snapshot_store.py).
+Part 2: Apply updates via the PATCH API. Edits are diffed against the fetched
+        config by section and ID; unchanged configs are not sent, and only
+        changed sections are re-validated.
+Part 3: Fleet inventory — fetch every space concurrently over pooled
+        connections (retrying on 429) and tabulate the Part 1 summary counts,
+        optionally as CSV and as snapshots.
 
 Usage: Run the relevant section in a Databricks notebook cell.
+       Set GENIE_TRACE=1 (or call tracing.enable_tracing()) to time each API
+       call, with a summary at the end (see tracing.py).
 """
 
+import csv
 import json
 import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from databricks.sdk import WorkspaceClient
+# genie_api_client.py, snapshot_store.py, space_model.py and tracing.py live next
+# to this script; in a notebook outside scripts/, add that folder to sys.path first
+from genie_api_client import GenieApiClient, list_space_ids
+from snapshot_store import SnapshotStore
+from space_model import KEYED_SECTIONS, SpaceModel, changed_fields, diff_keyed, get_section, keyed_items
+from tracing import finish_tracing, span
+
+
+def summarize_config(config: dict) -> dict:
+    """Section counts and instruction budget usage of a serialized_space config."""
+    return SpaceModel.from_config(config).summary()
 
-w = WorkspaceClient()
 
 # --- PART 1: RETRIEVE AND SUMMARIZE CONFIGURATION ---
 
 space_id = "your_space_id"
 
-space_data = w.api_client.do(
-    "GET",
-    f"/api/2.0/genie/spaces/{space_id}",
-    query={"include_serialized_space": "true"},  # Required to get the serialized_space field
-)
+# Snapshot store directory (e.g. "/Volumes/main/genie/snapshots"); None skips snapshots.
+# Unchanged configs are not re-saved, and items shared across snapshots are stored once.
+snapshot_dir = None
+
+if __name__ == "__main__":
+    from databricks.sdk import WorkspaceClient
+
+    w = WorkspaceClient()
+
+    with span("http GET", path=f"/api/2.0/genie/spaces/{space_id}"):
+        space_data = w.api_client.do(
+            "GET",
+            f"/api/2.0/genie/spaces/{space_id}",
+            query={"include_serialized_space": "true"},  # Required to get the serialized_space field
+        )
 
-current_config = json.loads(space_data.get("serialized_space", "{}"))
-
-# Display summary
-tables = current_config.get("data_sources", {}).get("tables", [])
-metric_views = current_config.get("data_sources", {}).get("metric_views", [])
-questions = current_config.get("config", {}).get("sample_questions", [])
-instructions = current_config.get("instructions", {})
-text_instr = instructions.get("text_instructions", [])
-example_sqls = instructions.get("example_question_sqls", [])
-sql_functions = instructions.get("sql_functions", [])
-join_specs = instructions.get("join_specs", [])
-snippets = instructions.get("sql_snippets", {})
-snippet_measures = snippets.get("measures", [])
-snippet_filters = snippets.get("filters", [])
-snippet_expressions = snippets.get("expressions", [])
-
-print(f"Space: {space_data.get('title', 'Untitled')}")
-print(f"Description: {space_data.get('description', 'None')}")
-print(f"\n{'='*60}")
-print(f"Data Sources: {len(tables)} table(s)")
-for t in tables:
-    print(f"  - {t['identifier']}")
-if metric_views:
-    print(f"\nMetric Views: {len(metric_views)}")
-    for mv in metric_views:
-        print(f"  - {mv['identifier']}")
-print(f"\nSample Questions: {len(questions)}")
-for q in questions:
-    print(f"  - {q['question'][0]}")
-print(f"\nExample SQL Queries: {len(example_sqls)}")
-for eq in example_sqls:
-    print(f"  - {eq['question'][0]}")
-print(f"\nSQL Functions: {len(sql_functions)}")
-if join_specs:
-    print(f"\nJoin Specs: {len(join_specs)}")
-    for js in join_specs:
-        left = js.get("left", {}).get("identifier", "?")
-        right = js.get("right", {}).get("identifier", "?")
-        sql = " ".join(js.get("sql", [])) if isinstance(js.get("sql"), list) else js.get("sql", "?")
-        print(f"  - {left} JOIN {right} ON {sql}")
-total_snippets = len(snippet_measures) + len(snippet_filters) + len(snippet_expressions)
-if total_snippets:
-    print(f"\nSQL Expressions: {total_snippets} (measures: {len(snippet_measures)}, filters: {len(snippet_filters)}, dimensions: {len(snippet_expressions)})")
-    for m in snippet_measures:
-        sql = " ".join(m.get("sql", [])) if isinstance(m.get("sql"), list) else m.get("sql", "?")
-        print(f"  - [measure] {m.get('alias', '?')}: {sql}")
-    for f in snippet_filters:
-        sql = " ".join(f.get("sql", [])) if isinstance(f.get("sql"), list) else f.get("sql", "?")
-        print(f"  - [filter] {f.get('display_name', '?')}: {sql}")
-    for e in snippet_expressions:
-        sql = " ".join(e.get("sql", [])) if isinstance(e.get("sql"), list) else e.get("sql", "?")
-        print(f"  - [dimension] {e.get('alias', '?')}: {sql}")
-print(f"\nText Instructions: {len(text_instr)} block(s)")
-if text_instr:
-    for line in text_instr[0].get("content", []):
-        print(f"  - {line}")
-
-# Instruction count audit
-total_instructions = len(example_sqls) + len(sql_functions) + (1 if text_instr else 0)
-print(f"\n{'='*60}")
-print(f"Total Instruction Count: {total_instructions} / 100")
-if total_instructions > 80:
-    print("  WARNING: Approaching the 100 instruction limit!")
+    current_config = json.loads(space_data.get("serialized_space", "{}"))
+    # Untouched copy of the fetched config, to diff edits against in Part 2
+    original_config = json.loads(space_data.get("serialized_space", "{}"))
+
+    snapshot_metadata = {field: space_data.get(field) for field in ("title", "description", "warehouse_id", "parent_path")}
+    if snapshot_dir:
+        saved = SnapshotStore(snapshot_dir).save(space_id, original_config, snapshot_metadata)
+        print(f"Snapshot: {saved['snapshot_id']}"
+              + (" (unchanged since last snapshot)" if saved["unchanged"] else f" ({saved['new_objects']} new object(s))"))
+
+    # Display summary
+    space = SpaceModel.from_config(current_config)
+
+    print(f"Space: {space_data.get('title', 'Untitled')}")
+    print(f"Description: {space_data.get('description', 'None')}")
+    print(f"\n{'='*60}")
+    print(f"Data Sources: {len(space.tables)} table(s)")
+    for t in space.tables:
+        print(f"  - {t.identifier}")
+    if space.metric_views:
+        print(f"\nMetric Views: {len(space.metric_views)}")
+        for mv in space.metric_views:
+            print(f"  - {mv.identifier}")
+    print(f"\nSample Questions: {len(space.sample_questions)}")
+    for q in space.sample_questions:
+        print(f"  - {q.question}")
+    print(f"\nExample SQL Queries: {len(space.example_sqls)}")
+    for eq in space.example_sqls:
+        print(f"  - {eq.name}")
+    print(f"\nSQL Functions: {len(space.sql_functions)}")
+    if space.join_specs:
+        print(f"\nJoin Specs: {len(space.join_specs)}")
+        for js in space.join_specs:
+            left = js.raw.get("left", {}).get("identifier", "?")
+            right = js.raw.get("right", {}).get("identifier", "?")
+            print(f"  - {left} JOIN {right} ON {js.sql}")
+    snippet_labels = {"measures": ("measure", "alias"), "filters": ("filter", "display_name"), "expressions": ("dimension", "alias")}
+    total_snippets = sum(len(items) for items in space.snippets.values())
+    if total_snippets:
+        print(f"\nSQL Expressions: {total_snippets} (measures: {len(space.snippets['measures'])}, filters: {len(space.snippets['filters'])}, dimensions: {len(space.snippets['expressions'])})")
+        for snippet_type in ("measures", "filters", "expressions"):
+            label, name_field = snippet_labels[snippet_type]
+            for sn in space.snippets[snippet_type]:
+                print(f"  - [{label}] {sn.raw.get(name_field, '?')}: {sn.sql}")
+    print(f"\nText Instructions: {len(space.text_instructions)} block(s)")
+    if space.text_instructions:
+        for line in space.text_instructions[0].raw.get("content", []):
+            print(f"  - {line}")
+
+    # Instruction count audit
+    total_instructions = space.summary()["instruction_count"]
+    print(f"\n{'='*60}")
+    print(f"Total Instruction Count: {total_instructions} / 100")
+    if total_instructions > 80:
+        print("  WARNING: Approaching the 100 instruction limit!")
 
 
 # --- PART 2: APPLY UPDATES ---
-# Uncomment and modify the section below to apply changes.
+
+def diff_config(before: dict, after: dict) -> dict:
+    """
+    Change set between two serialized_space configs, keyed by section path.
+
+    ID-keyed sections map to {"added", "removed", "modified": [ids], "reordered": bool};
+    other fields map to {"before", "after"}. Unchanged sections are omitted, so
+    an empty dict means the configs are identical.
+    """
+    changes = {}
+    for path, key in KEYED_SECTIONS.items():
+        change = diff_keyed(keyed_items(get_section(before, path), key), keyed_items(get_section(after, path), key))
+        if change:
+            changes[path] = change
+    changes.update(changed_fields(before, after))
+    return changes
+
+
+def print_change_set(changes: dict):
+    if not changes:
+        print("No changes.")
+        return
+    print(f"Change set: {len(changes)} section(s)")
+    for path, change in changes.items():
+        if path in KEYED_SECTIONS:
+            counts = ", ".join(f"{len(change[k])} {k}" for k in ("added", "modified", "removed") if change[k])
+            print(f"  {path}: {counts or 'reordered'}{' (reordered)' if counts and change['reordered'] else ''}")
+            for kind, mark in (("added", "+"), ("modified", "~"), ("removed", "-")):
+                for item_id in change[kind]:
+                    print(f"    {mark} {item_id}")
+        else:
+            print(f"  {path}: {json.dumps(change['before'])} → {json.dumps(change['after'])}")
+
+
+def changed_sections(changes: dict) -> set:
+    """Sections to re-validate with validate_config(..., sections=...)."""
+    return {path for path in changes if path in KEYED_SECTIONS}
+
+
+# Modify current_config in the section below, then uncomment it to apply the changes.
 
 # # Example: Add a new example SQL query
 # example_sql_id = secrets.token_hex(16)
@@ -119,16 +180,165 @@ if total_instructions > 80:
 #         key=lambda x: x["id"]
 #     )
 #
-# # Apply the update
-# update_response = w.api_client.do(
-#     "PATCH",
-#     f"/api/2.0/genie/spaces/{space_id}",
-#     body={
-#         "serialized_space": json.dumps(current_config)
-#     },
-# )
+# # Diff against the fetched config; nothing is sent if nothing changed
+# changes = diff_config(original_config, current_config)
+# print_change_set(changes)
+#
+# if changes:
+#     # Validate only the changed sections (validate_config from scripts/validate_config.py)
+#     issues = validate_config(current_config, sections=changed_sections(changes))
+#     errors = [i for i in issues if i["level"] == "error"]
+#     for issue in issues:
+#         print(f"  {'✗' if issue['level'] == 'error' else '○'} [{issue['path']}]")
+#         print(f"    {issue['message']}")
+#
+#     if errors:
+#         print(f"\nNot applying update — fix {len(errors)} error(s) first.")
+#     else:
+#         # Apply the update (the API replaces the whole serialized_space)
+#         with span("http PATCH", path=f"/api/2.0/genie/spaces/{space_id}"):
+#             update_response = w.api_client.do(
+#                 "PATCH",
+#                 f"/api/2.0/genie/spaces/{space_id}",
+#                 body={
+#                     "serialized_space": json.dumps(current_config)
+#                 },
+#             )
 #
-# print(f"Successfully updated Genie space!")
-# host = w.config.host.rstrip("/")
-# print(f"  Space ID: {space_id}")
-# print(f"  URL: {host}/genie/rooms/{space_id}")
+#         print(f"Successfully updated Genie space!")
+#         host = w.config.host.rstrip("/")
+#         print(f"  Space ID: {space_id}")
+#         print(f"  URL: {host}/genie/rooms/{space_id}")
+# else:
+#     print("Skipping PATCH — config is unchanged.")
+
+# # Example: Roll back to an earlier snapshot (requires snapshot_dir)
+# store = SnapshotStore(snapshot_dir)
+# for snapshot in store.list_snapshots(space_id):
+#     print(f"  {snapshot['snapshot_id']}")
+# rollback_id = store.list_snapshots(space_id)[-2]["snapshot_id"]
+# print_change_set(store.diff(space_id, store.latest(space_id)["snapshot_id"], rollback_id))
+# w.api_client.do("PATCH", f"/api/2.0/genie/spaces/{space_id}", body=store.patch_body(space_id, rollback_id))
+
+
+# --- PART 3: FLEET INVENTORY ---
+
+# Set to True to summarize many spaces at once
+run_fleet_inventory = False
+
+# Space IDs to inventory; None lists every space visible to the caller
+fleet_space_ids = None
+
+# Max concurrent requests (one pooled keep-alive connection per worker)
+fleet_max_concurrency = 16
+
+# Retries per request on 429/5xx responses and connection errors
+fleet_max_retries = 5
+
+# Also write the inventory to this CSV path (e.g. "/Workspace/Users/you@company.com/genie_fleet.csv")
+fleet_csv_path = None
+
+# Also snapshot every fetched space into this store directory (see snapshot_dir in Part 1)
+fleet_snapshot_dir = None
+
+def fetch_space_summary(api: GenieApiClient, space_id: str, store: SnapshotStore = None) -> dict:
+    """One inventory row: title and summarize_config counts, or the error that prevented them."""
+    row = {"space_id": space_id, "title": None, **summarize_config({}), "error": None}
+    try:
+        data = api.get(f"/api/2.0/genie/spaces/{space_id}", {"include_serialized_space": "true"})
+        row["title"] = data.get("title")
+        config = json.loads(data.get("serialized_space") or "{}")
+        row.update(summarize_config(config))
+        if store is not None:
+            metadata = {field: data.get(field) for field in ("title", "description", "warehouse_id", "parent_path")}
+            row["snapshot"] = store.save(space_id, config, metadata)
+    except Exception as e:
+        row["error"] = str(e)
+    return row
+
+
+def fleet_inventory(api: GenieApiClient, space_ids=None, max_concurrency: int = 16,
+                    store: SnapshotStore = None) -> list[dict]:
+    """Summarize (and optionally snapshot) many spaces concurrently, preserving the order of space_ids."""
+    if space_ids is None:
+        space_ids = list_space_ids(api)
+    if not space_ids:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(space_ids)))) as pool:
+        return list(pool.map(lambda space_id: fetch_space_summary(api, space_id, store), space_ids))
+
+
+FLEET_COLUMNS = (
+    ("title", "Title", 30),
+    ("tables", "Tables", 6),
+    ("metric_views", "MVs", 4),
+    ("sample_questions", "SampleQ", 7),
+    ("example_sqls", "SQLs", 5),
+    ("sql_functions", "Funcs", 5),
+    ("join_specs", "Joins", 5),
+    ("snippet_measures", "Meas", 5),
+    ("snippet_filters", "Filt", 5),
+    ("snippet_expressions", "Dims", 5),
+    ("instruction_count", "Instr", 7),
+)
+
+
+def print_fleet_table(rows: list):
+    print(f"{'Space ID':<34} " + " ".join(f"{label:<{width}}" for _, label, width in FLEET_COLUMNS))
+    print(f"{'─' * 34} " + " ".join("─" * width for _, _, width in FLEET_COLUMNS))
+    for row in rows:
+        if row["error"]:
+            print(f"{row['space_id']:<34} ✗ {row['error'][:100]}")
+            continue
+        cells = []
+        for key, _, width in FLEET_COLUMNS:
+            value = str(row[key] if row[key] is not None else "")
+            cells.append(f"{value[:width - 1] + '…' if len(value) > width else value:<{width}}")
+        print(f"{row['space_id']:<34} " + " ".join(cells))
+
+
+def write_fleet_csv(rows: list, path: str):
+    fieldnames = ["space_id", "title", *summarize_config({}), "error"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__" and run_fleet_inventory:
+    api = GenieApiClient(w.config.host, w.config.authenticate, max_retries=fleet_max_retries)
+    fleet_start = time.perf_counter()
+    try:
+        fleet_store = SnapshotStore(fleet_snapshot_dir) if fleet_snapshot_dir else None
+        with span("manage.fleet_inventory", max_concurrency=fleet_max_concurrency):
+            fleet_rows = fleet_inventory(api, fleet_space_ids, fleet_max_concurrency, fleet_store)
+    finally:
+        api.close()
+    fleet_seconds = time.perf_counter() - fleet_start
+
+    print(f"\n{'=' * 60}")
+    print(f"Fleet Inventory: {len(fleet_rows)} space(s) in {fleet_seconds:.1f}s ({api.retries} retried request(s))")
+    print(f"{'=' * 60}")
+    print_fleet_table(fleet_rows)
+
+    failed = [r for r in fleet_rows if r["error"]]
+    near_limit = [r for r in fleet_rows if not r["error"] and r["instruction_count"] > 80]
+    if failed:
+        print(f"\n  ✗ {len(failed)} space(s) could not be read")
+    if near_limit:
+        print(f"\n  WARNING: {len(near_limit)} space(s) approaching the 100 instruction limit:")
+        for r in near_limit:
+            print(f"    - {r['title']} ({r['space_id']}): {r['instruction_count']} / 100")
+    if fleet_csv_path:
+        write_fleet_csv(fleet_rows, fleet_csv_path)
+        print(f"\n  Wrote {fleet_csv_path}")
+    if fleet_store is not None:
+        snapshots = [r["snapshot"] for r in fleet_rows if not r["error"]]
+        new_snapshots = sum(1 for s in snapshots if not s["unchanged"])
+        stats = fleet_store.stats()
+        print(f"\n  Snapshots: {new_snapshots} new, {len(snapshots) - new_snapshots} unchanged, "
+              f"{sum(s['new_objects'] for s in snapshots)} new object(s) "
+              f"({stats['objects']} objects, {stats['object_bytes'] / 1e6:.1f} MB in {fleet_snapshot_dir})")
+
+if __name__ == "__main__":
+    finish_tracing()
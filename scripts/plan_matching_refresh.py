@@ -0,0 +1,437 @@
+"""
+Estimate prompt matching refresh cost across a fleet of Genie spaces and plan
+a staggered refresh schedule.
+
+Refreshing prompt matching re-reads the distinct values of every
+entity-matched column (see references/ui_walkthroughs.md → Refresh Prompt
+Matching Data). When many spaces share large dimension tables, refreshing
+them all at once scans the same tables concurrently and saturates the
+warehouse. This script:
+  - collects the enable_entity_matching columns of each space's column_configs
+  - gets each column's distinct-value count (and table row count) — from
+    discover_resources.py Part 3 profiles, a `distinct_counts` dict, or one
+    approx_count_distinct query per table shared by the whole fleet
+  - estimates each space's refresh time from those counts
+  - plans start times longest-first under a concurrency cap, optionally
+    never refreshing two spaces that read the same table at once, with a
+    minimum stagger between starts
+  - simulates the plan with randomized actual durations to show how much
+    slack it has, entirely offline
+
+Genie has no refresh API this script can call; the schedule tells whoever
+triggers the refreshes (a job or a person following the UI steps) when to
+run each space.
+
+Usage: Run this in a Databricks notebook cell, or offline with
+       `space_configs` and `distinct_counts` filled in (or a snapshot store
+       from snapshot_store.py) to plan and simulate without a workspace.
+"""
+
+import csv
+import datetime
+import heapq
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# snapshot_store.py and space_model.py live next to this script; in a notebook
+# outside scripts/, add that folder to sys.path first
+from snapshot_store import SnapshotStore
+from space_model import SpaceModel
+
+# --- CONFIGURE ---
+
+# {space_id: serialized_space dict} to plan for. None loads the latest snapshot of
+# every space in `snapshot_dir`, or fetches every visible space from the workspace.
+space_configs = None
+
+# Snapshot store to read space configs from offline (see snapshot_store.py)
+snapshot_dir = None
+
+# {table identifier: {column name: distinct count, "__rows__": row count}}. None uses
+# discover_resources.py Part 3 profiles when run in the same notebook, and measures
+# anything still missing with one query per table.
+distinct_counts = None
+
+# Refreshes running at once across the fleet
+max_concurrent_refreshes = 4
+
+# Never refresh two spaces that read the same table at the same time
+avoid_shared_table_overlap = True
+
+# Minimum seconds between two refresh starts
+stagger_seconds = 60
+
+# Wall-clock start of the refresh window, UTC (e.g. "02:00")
+window_start = "02:00"
+
+# Simulation: actual durations vary by up to ±this fraction of the estimate
+simulation_duration_error = 0.5
+simulation_runs = 200
+simulation_seed = 7
+
+# Also write the schedule to this CSV path
+schedule_csv_path = None
+
+# Rough cost model — calibrate against the refresh times you observe
+REFRESH_SECONDS_PER_COLUMN = 5.0  # fixed overhead of one column's refresh
+REFRESH_SECONDS_PER_MILLION_ROWS = 2.0  # scanning the table for the column's values
+REFRESH_SECONDS_PER_VALUE = 0.02  # indexing each stored value
+
+# Entity matching stores at most this many values per column (references/schema.md)
+ENTITY_MATCHING_MAX_DISTINCT = 1_024
+
+ROW_COUNT_KEY = "__rows__"
+
+# =====================================================================
+# ENTITY-MATCHED COLUMNS AND DISTINCT COUNTS
+# =====================================================================
+
+def entity_matched_columns(config: dict) -> dict:
+    """{table identifier: [column names]} of the columns with enable_entity_matching in a config."""
+    columns = {}
+    for source in SpaceModel.from_config(config).tables:
+        names = [c.column_name for c in source.column_configs if c.enable_entity_matching and c.column_name]
+        if names:
+            columns[source.identifier] = names
+    return columns
+
+
+def load_snapshot_configs(store_dir: str) -> dict:
+    """{space_id: config} from the latest snapshot of every space in a snapshot store."""
+    store = SnapshotStore(store_dir)
+    space_ids = list(dict.fromkeys(s["space_id"] for s in store.list_snapshots()))
+    return {space_id: store.restore(space_id) for space_id in space_ids}
+
+
+def fetch_space_configs(space_ids=None, max_concurrency: int = 16) -> dict:
+    """{space_id: config} for every visible space (or `space_ids`), fetched concurrently."""
+    from databricks.sdk import WorkspaceClient
+
+    from genie_api_client import GenieApiClient, list_space_ids
+
+    w = WorkspaceClient()
+    api = GenieApiClient(w.config.host, w.config.authenticate)
+    try:
+        space_ids = list_space_ids(api) if space_ids is None else space_ids
+
+        def fetch(space_id):
+            data = api.get(f"/api/2.0/genie/spaces/{space_id}", {"include_serialized_space": "true"})
+            return json.loads(data.get("serialized_space") or "{}")
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(space_ids) or 1))) as pool:
+            return dict(zip(space_ids, pool.map(fetch, space_ids)))
+    finally:
+        api.close()
+
+
+def distinct_counts_from_results(profiles: list) -> dict:
+    """
+    distinct_counts from discover_resources.py Part 3 profiles (per-column
+    approx_distinct).
+    Sampled results are skipped, since their distinct counts are lower bounds.
+    """
+    counts = {}
+    for profile in profiles or []:
+        if profile.get("error") or profile.get("sample_percent"):
+            continue
+        table = counts.setdefault(profile["table"], {ROW_COUNT_KEY: profile.get("rows_scanned") or 0})
+        for col_name, stats in profile.get("columns", {}).items():
+            if stats.get("approx_distinct") is not None:
+                table[col_name] = stats["approx_distinct"]
+    return counts
+
+
+def measure_distinct_counts(columns_by_table: dict, max_workers: int = 8) -> dict:
+    """
+    Row count and approx_count_distinct of each column, one query per table
+    (each table is scanned once however many spaces use it). Tables that
+    can't be read are left out.
+    """
+    from pyspark.sql import SparkSession
+
+    spark = SparkSession.builder.getOrCreate()
+
+    def measure(item):
+        table, columns = item
+        exprs = ["COUNT(*) AS row_count"] + [
+            f"approx_count_distinct(`{c.replace('`', '``')}`) AS c{i}" for i, c in enumerate(columns)
+        ]
+        try:
+            row = spark.sql(f"SELECT {', '.join(exprs)} FROM {table}").collect()[0]
+        except Exception:
+            return table, None
+        return table, {ROW_COUNT_KEY: row["row_count"], **{c: row[f"c{i}"] for i, c in enumerate(columns)}}
+
+    items = [(table, sorted(columns)) for table, columns in columns_by_table.items() if columns]
+    if not items:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        return {table: counts for table, counts in pool.map(measure, items) if counts is not None}
+
+
+def missing_counts(columns_by_space: dict, counts: dict) -> dict:
+    """{table: {columns}} of entity-matched columns with no known distinct count."""
+    missing = {}
+    for columns_by_table in columns_by_space.values():
+        for table, columns in columns_by_table.items():
+            for column in columns:
+                if column not in counts.get(table, {}):
+                    missing.setdefault(table, set()).add(column)
+    return missing
+
+
+# =====================================================================
+# COST ESTIMATE
+# =====================================================================
+
+def estimate_column_seconds(distinct, rows=None) -> float:
+    """Estimated refresh time of one column; unknown counts cost only the fixed overhead."""
+    return (
+        REFRESH_SECONDS_PER_COLUMN
+        + (rows or 0) / 1_000_000 * REFRESH_SECONDS_PER_MILLION_ROWS
+        + min(distinct or 0, ENTITY_MATCHING_MAX_DISTINCT) * REFRESH_SECONDS_PER_VALUE
+    )
+
+
+def estimate_refresh_jobs(columns_by_space: dict, counts: dict) -> list[dict]:
+    """
+    One refresh job per space with entity-matched columns:
+    {"space_id", "tables", "columns", "rows_scanned", "seconds", "unknown", "over_limit"}.
+
+    unknown lists columns without a distinct count; over_limit lists columns
+    with more distinct values than entity matching stores (only part of their
+    values can be matched — consider a view or turning matching off).
+    """
+    jobs = []
+    for space_id, columns_by_table in columns_by_space.items():
+        job = {"space_id": space_id, "tables": sorted(columns_by_table), "columns": 0, "rows_scanned": 0,
+               "seconds": 0.0, "unknown": [], "over_limit": []}
+        for table, columns in columns_by_table.items():
+            table_counts = counts.get(table, {})
+            rows = table_counts.get(ROW_COUNT_KEY)
+            for column in columns:
+                distinct = table_counts.get(column)
+                job["columns"] += 1
+                job["rows_scanned"] += rows or 0
+                job["seconds"] += estimate_column_seconds(distinct, rows)
+                if distinct is None:
+                    job["unknown"].append(f"{table}.{column}")
+                elif distinct > ENTITY_MATCHING_MAX_DISTINCT:
+                    job["over_limit"].append(f"{table}.{column}")
+        if job["columns"]:
+            jobs.append(job)
+    return jobs
+
+
+# =====================================================================
+# SCHEDULING AND SIMULATION
+# =====================================================================
+
+def dispatch(jobs: list, durations: list, max_concurrent: int, stagger_seconds: float = 0,
+             avoid_table_overlap: bool = True, release_times: list = None) -> list[tuple]:
+    """
+    Event-driven list scheduling: at each event, start pending jobs in list
+    order while fewer than max_concurrent run, none of a job's tables is in
+    use (if avoid_table_overlap), at least stagger_seconds have passed since
+    the last start, and the job's release time (if any) has come.
+    Returns [(start, end)] per job.
+    """
+    if max_concurrent < 1:
+        raise ValueError(f"max_concurrent must be at least 1, got {max_concurrent}")
+    times = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    running = []  # heap of (end, job index)
+    busy = {}  # table -> running jobs reading it
+    now = 0.0
+    last_start = None
+    while pending:
+        while running and running[0][0] <= now:
+            _, i = heapq.heappop(running)
+            for table in jobs[i]["tables"]:
+                busy[table] -= 1
+        for i in list(pending):
+            if len(running) >= max_concurrent or (last_start is not None and now < last_start + stagger_seconds):
+                break
+            if release_times is not None and release_times[i] > now:
+                continue
+            if avoid_table_overlap and any(busy.get(t) for t in jobs[i]["tables"]):
+                continue
+            pending.remove(i)
+            times[i] = (now, now + durations[i])
+            heapq.heappush(running, (now + durations[i], i))
+            for table in jobs[i]["tables"]:
+                busy[table] = busy.get(table, 0) + 1
+            last_start = now
+        if not pending:
+            break
+        events = [running[0][0]] if running else []
+        if last_start is not None and stagger_seconds:
+            events.append(last_start + stagger_seconds)
+        if release_times is not None:
+            events.extend(release_times[i] for i in pending if release_times[i] > now)
+        now = min(t for t in events if t > now) if any(t > now for t in events) else now
+    return times
+
+
+def plan_refresh_schedule(jobs: list, max_concurrent: int = 4, stagger_seconds: float = 0,
+                          avoid_table_overlap: bool = True) -> list[dict]:
+    """
+    Start/end offsets (seconds from the window start) for each job, planned
+    longest-first so the biggest refreshes don't end up trailing the window.
+    Returns the jobs with "start" and "end" added, in start order.
+    """
+    ordered = sorted(jobs, key=lambda j: (-j["seconds"], j["space_id"]))
+    times = dispatch(ordered, [j["seconds"] for j in ordered], max_concurrent, stagger_seconds, avoid_table_overlap)
+    schedule = [{**job, "start": start, "end": end} for job, (start, end) in zip(ordered, times)]
+    return sorted(schedule, key=lambda j: (j["start"], j["space_id"]))
+
+
+def peak_concurrency(intervals: list) -> int:
+    events = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    peak = current = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def simulate_refresh_schedule(schedule: list, max_concurrent: int = 4, stagger_seconds: float = 0,
+                              avoid_table_overlap: bool = True, duration_error: float = 0.5,
+                              runs: int = 200, seed: int = None) -> dict:
+    """
+    Replay a schedule `runs` times with each actual duration drawn uniformly
+    within ±duration_error of its estimate. A refresh starts at its planned
+    time or, if its slot or tables are still busy, as soon as they free up.
+
+    Returns {"planned_makespan", "makespan_p50", "makespan_p95", "delay_p95",
+    "delayed_fraction", "peak_concurrency", "unscheduled_peak"}; the last is
+    how many refreshes would overlap if every space started at once.
+    """
+    rng = random.Random(seed)
+    planned = [job["start"] for job in schedule]
+    makespans = []
+    delays = []
+    peak = 0
+    for _ in range(runs):
+        durations = [job["seconds"] * rng.uniform(1 - duration_error, 1 + duration_error) for job in schedule]
+        times = dispatch(schedule, durations, max_concurrent, stagger_seconds, avoid_table_overlap, planned)
+        makespans.append(max((end for _, end in times), default=0.0))
+        delays.extend(start - plan for (start, _), plan in zip(times, planned))
+        peak = max(peak, peak_concurrency(times))
+    makespans.sort()
+    delays.sort()
+    return {
+        "planned_makespan": max((job["end"] for job in schedule), default=0.0),
+        "makespan_p50": percentile(makespans, 50),
+        "makespan_p95": percentile(makespans, 95),
+        "delay_p95": percentile(delays, 95),
+        "delayed_fraction": sum(1 for d in delays if d > 1e-9) / len(delays) if delays else 0.0,
+        "peak_concurrency": peak,
+        "unscheduled_peak": len(schedule),
+    }
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 if empty)."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))]
+
+
+def wall_clock(offset_seconds: float, start: str) -> str:
+    """HH:MM (UTC) of an offset from a window start like "02:00", with +Nd past midnight."""
+    base = datetime.datetime.strptime(start, "%H:%M")
+    moment = base + datetime.timedelta(seconds=offset_seconds)
+    days = (moment.date() - base.date()).days
+    return moment.strftime("%H:%M") + (f" +{days}d" if days else "")
+
+
+def write_schedule_csv(schedule: list, path: str, start: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["space_id", "start_utc", "end_utc", "estimated_seconds", "columns", "tables"])
+        for job in schedule:
+            writer.writerow([job["space_id"], wall_clock(job["start"], start), wall_clock(job["end"], start),
+                             round(job["seconds"], 1), job["columns"], ";".join(job["tables"])])
+
+
+def format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{secs:02d}s"
+
+
+# =====================================================================
+# RUN
+# =====================================================================
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("PROMPT MATCHING REFRESH PLAN")
+    print(f"Concurrency cap: {max_concurrent_refreshes}, stagger: {stagger_seconds}s, "
+          f"shared tables {'serialized' if avoid_shared_table_overlap else 'may overlap'}")
+    print("=" * 70)
+
+    run_start = time.perf_counter()
+    if space_configs is None:
+        space_configs = load_snapshot_configs(snapshot_dir) if snapshot_dir else fetch_space_configs()
+    columns_by_space = {space_id: entity_matched_columns(cfg) for space_id, cfg in space_configs.items()}
+
+    counts = dict(distinct_counts) if distinct_counts is not None else {}
+    if distinct_counts is None:
+        counts.update(distinct_counts_from_results(globals().get("all_profiles")))
+        to_measure = missing_counts(columns_by_space, counts)
+        if to_measure:
+            print(f"  Measuring distinct counts for {sum(len(c) for c in to_measure.values())} column(s) "
+                  f"in {len(to_measure)} table(s)...")
+            for table, measured in measure_distinct_counts(to_measure).items():
+                counts.setdefault(table, {}).update(measured)
+
+    jobs = estimate_refresh_jobs(columns_by_space, counts)
+    schedule = plan_refresh_schedule(jobs, max_concurrent_refreshes, stagger_seconds, avoid_shared_table_overlap)
+
+    print(f"\n{'Start':<10} {'End':<10} {'Est.':<8} {'Cols':<5} Space")
+    print(f"{'─' * 10} {'─' * 10} {'─' * 8} {'─' * 5} {'─' * 34}")
+    for job in schedule:
+        print(f"{wall_clock(job['start'], window_start):<10} {wall_clock(job['end'], window_start):<10} "
+              f"{format_duration(job['seconds']):<8} {job['columns']:<5} {job['space_id']}")
+
+    table_users = {}
+    for job in jobs:
+        for table in job["tables"]:
+            table_users[table] = table_users.get(table, 0) + 1
+    shared = sorted(((n, t) for t, n in table_users.items() if n > 1), reverse=True)
+    unknown = [c for job in jobs for c in job["unknown"]]
+    over_limit = sorted({c for job in jobs for c in job["over_limit"]})
+
+    print(f"\n{'=' * 70}")
+    print("SUMMARY")
+    print(f"{'=' * 70}")
+    print(f"  {len(jobs)} space(s) with entity matching ({len(space_configs) - len(jobs)} without), "
+          f"{sum(j['columns'] for j in jobs)} column refresh(es), {len(table_users)} table(s)")
+    print(f"  Total estimated refresh time: {format_duration(sum(j['seconds'] for j in jobs))}")
+    if shared:
+        print(f"  Tables shared by several spaces: "
+              + ", ".join(f"{t} ({n})" for n, t in shared[:5]) + (" ..." if len(shared) > 5 else ""))
+    if unknown:
+        print(f"  ○ {len(unknown)} column(s) without a distinct count — estimated at the fixed per-column cost")
+    if over_limit:
+        print(f"  ✗ {len(over_limit)} entity-matched column(s) exceed {ENTITY_MATCHING_MAX_DISTINCT} distinct values: "
+              + ", ".join(over_limit[:5]) + (" ..." if len(over_limit) > 5 else ""))
+
+    if schedule:
+        sim = simulate_refresh_schedule(schedule, max_concurrent_refreshes, stagger_seconds,
+                                        avoid_shared_table_overlap, simulation_duration_error,
+                                        simulation_runs, simulation_seed)
+        print(f"\n  Planned window: {format_duration(sim['planned_makespan'])} "
+              f"({window_start} → {wall_clock(sim['planned_makespan'], window_start)} UTC)")
+        print(f"  Simulated ({simulation_runs} runs, ±{simulation_duration_error:.0%} durations): "
+              f"p50 {format_duration(sim['makespan_p50'])}, p95 {format_duration(sim['makespan_p95'])}; "
+              f"{sim['delayed_fraction']:.0%} of refreshes start late (p95 delay {format_duration(sim['delay_p95'])})")
+        print(f"  Peak concurrent refreshes: {sim['peak_concurrency']} (vs {sim['unscheduled_peak']} if all start at once)")
+    if schedule_csv_path:
+        write_schedule_csv(schedule, schedule_csv_path, window_start)
+        print(f"\n  Wrote {schedule_csv_path}")
+    print(f"  ({time.perf_counter() - run_start:.1f}s)")
@@ -0,0 +1,669 @@
+"""
+Run a Genie space's benchmark questions through the Genie conversation API
+and measure answer accuracy and latency.
+
+For each benchmarks.questions entry:
+  - asks the question in a new conversation and polls the message with backoff
+    until Genie finishes, recording end-to-end latency
+  - runs the SQL Genie generated and the benchmark's ground-truth SQL answer
+  - compares the two result sets (row order insensitive; integers and
+    decimals exact, floats within a relative tolerance) by streaming hashed
+    Arrow batches, never collecting either result, and samples the differing
+    rows when they don't match
+Questions run concurrently (bounded), optionally several times each, and the
+report gives accuracy and p50/p95 latency per question and overall.
+
+The Genie API is reached through a `transport(method, path, body=None)`
+callable (w.api_client.do by default) and results through a ResultScanner
+(SparkResultScanner by default), so both can be swapped for fakes or a local server.
+
+Usage: Run this in a Databricks notebook cell.
+       Set `space_id` to the Genie space to benchmark. Set `candidate_sqls`
+       to score SQL you already have against the ground truth without asking Genie.
+"""
+
+import hashlib
+import json
+import math
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+# --- CONFIGURE ---
+
+space_id = "your_space_id"
+
+# Benchmark question IDs to run; None runs all of them
+benchmark_question_ids = None
+
+# Times to ask each question (more runs → steadier latency percentiles)
+runs_per_question = 1
+
+# Questions in flight at once (Genie throttles heavy concurrent use)
+max_concurrency = 3
+
+# Give up on a question after this many seconds
+question_timeout_seconds = 300
+
+# Polling interval: starts at the first value, grows 1.5x per poll up to the second
+poll_initial_seconds = 1.0
+poll_max_seconds = 10.0
+
+# Relative tolerance when comparing floating-point values
+float_tolerance = 1e-6
+
+# Compare your own SQL instead of asking Genie: {benchmark_id: sql}, or None
+candidate_sqls = None
+
+# =====================================================================
+# GENIE CONVERSATION API
+# =====================================================================
+
+TERMINAL_STATUSES = {"COMPLETED", "FAILED", "CANCELLED", "QUERY_RESULT_EXPIRED"}
+
+
+def ask_genie(transport, space_id: str, question: str, timeout: float = 300, poll_initial: float = 1.0,
+              poll_max: float = 10.0, sleep=time.sleep, clock=time.monotonic) -> dict:
+    """
+    Ask one question in a new conversation and wait for Genie's answer.
+
+    Returns {"status", "latency", "sql", "text", "error"}; status is the final
+    message status, or "TIMEOUT" if it didn't finish within `timeout` seconds.
+    """
+    start = clock()
+    answer = {"status": None, "latency": None, "sql": None, "text": None, "error": None}
+    try:
+        started = transport(
+            "POST", f"/api/2.0/genie/spaces/{space_id}/start-conversation", body={"content": question}
+        )
+        message_path = (
+            f"/api/2.0/genie/spaces/{space_id}/conversations/{started['conversation_id']}"
+            f"/messages/{started['message_id']}"
+        )
+        delay = poll_initial
+        while True:
+            message = transport("GET", message_path)
+            answer["status"] = message.get("status")
+            if answer["status"] in TERMINAL_STATUSES:
+                break
+            if clock() - start + delay > timeout:
+                answer["status"] = "TIMEOUT"
+                answer["error"] = f"No answer after {timeout}s"
+                return answer
+            sleep(delay)
+            delay = min(delay * 1.5, poll_max)
+    except Exception as e:
+        answer["status"] = "ERROR"
+        answer["error"] = str(e)
+        return answer
+
+    answer["latency"] = clock() - start
+    for attachment in message.get("attachments") or []:
+        if attachment.get("query") and answer["sql"] is None:
+            answer["sql"] = attachment["query"].get("query")
+        if attachment.get("text") and answer["text"] is None:
+            answer["text"] = attachment["text"].get("content")
+    if message.get("error"):
+        error = message["error"]
+        answer["error"] = error.get("error") if isinstance(error, dict) else str(error)
+    return answer
+
+
+# =====================================================================
+# RESULT COMPARISON
+# =====================================================================
+# Result sets are never collected whole. Each row is normalized, hashed to
+# 64 bits, and folded into one of FINGERPRINT_BUCKETS buckets as
+# (row count, sum of row hashes mod 2^64) — an order-insensitive multiset
+# fingerprint. On Spark the hashing runs on the executors over Arrow batches
+# (mapInArrow), so the driver only receives bucket totals. Equal fingerprints
+# mean equal result sets; for unequal ones, only the rows of mismatched
+# buckets are fetched.
+#
+# Integers and decimals are hashed exactly; floats are rounded to one
+# significant digit more than the tolerance (7 for 1e-6), so floats that
+# round alike are always within it. Two floats within tolerance can still
+# round apart (e.g. 0.123456749 and 0.123456751), so when fingerprints
+# differ but the row counts agree and the mismatched buckets hold at most
+# DIFF_MAX_ROWS rows per side, those rows are fetched and paired up within
+# tolerance before declaring a mismatch. Larger results whose floats round
+# apart are reported as mismatches.
+
+FINGERPRINT_BUCKETS = 64
+HASH_MASK = (1 << 64) - 1
+
+# Mismatched buckets scanned, and rows fetched per side, to build a diff sample
+DIFF_BUCKETS = 4
+DIFF_MAX_ROWS = 10_000
+
+
+def normalize_value(value, float_tolerance: float = 1e-6):
+    """
+    Comparable form of a result value. Integers and decimals stay exact (3 and
+    Decimal("3.00") are both 3); floats are rounded to one significant digit
+    more than the relative tolerance, so two floats that round alike are
+    always within it, or kept as they are with float_tolerance None; anything
+    else becomes text.
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, Decimal):
+        if not value.is_finite():
+            return str(value)
+        return int(value) if value == value.to_integral_value() else value.normalize()
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return str(value)
+        if value == 0 or float_tolerance is None:
+            return value + 0.0  # -0.0 → 0.0
+        # Each value is within half a step of the rounded one, and a step is at
+        # most 10**(1 - digits) of the value, so equal roundings differ by at
+        # most float_tolerance relative to the larger value
+        digits = max(1, math.ceil(1 - math.log10(float_tolerance)))
+        return float(f"{value:.{digits}g}")
+    return str(value)
+
+
+def normalize_row(row, float_tolerance: float = 1e-6) -> tuple:
+    return tuple(normalize_value(v, float_tolerance) for v in row)
+
+
+def encode_row(normalized_row: tuple) -> str:
+    """JSON text of a normalized row; decimals are tagged so they can't collide with strings."""
+    return json.dumps(normalized_row, separators=(",", ":"), default=lambda v: {"decimal": str(v)})
+
+
+def decode_row(text: str) -> tuple:
+    return tuple(json.loads(text, object_hook=lambda d: Decimal(d["decimal"]) if d.keys() == {"decimal"} else d))
+
+
+def row_hash(normalized_row: tuple) -> int:
+    """Stable 64-bit hash of a normalized row (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(encode_row(normalized_row).encode(), digest_size=8).digest(), "big")
+
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def values_close(a, b, float_tolerance: float) -> bool:
+    """Equal, or numbers within the relative tolerance when either of them is a float."""
+    if is_number(a) and is_number(b) and (isinstance(a, float) or isinstance(b, float)):
+        return math.isclose(float(a), float(b), rel_tol=float_tolerance)
+    return a == b and isinstance(a, bool) == isinstance(b, bool)
+
+
+def unmatched_rows(expected_rows: list, actual_rows: list, float_tolerance: float) -> tuple:
+    """
+    (missing, unexpected): exact rows (normalize_row with float_tolerance None)
+    of each side left over after pairing equal rows, then rows equal within
+    the float tolerance.
+
+    Rows agreeing on every non-numeric value are paired in order of their
+    numbers, so a pair is only found when it is adjacent in that order — a
+    conservative matching that can miss a pairing but never invents one.
+    """
+    missing = Counter(expected_rows)
+    unexpected = Counter(actual_rows)
+    common = missing & unexpected
+    missing -= common
+    unexpected -= common
+
+    groups = {}
+    for side, rows in enumerate((missing, unexpected)):
+        for row in rows.elements():
+            key = tuple("#" if is_number(v) else (type(v).__name__, v) for v in row)
+            groups.setdefault(key, ([], []))[side].append(row)
+
+    def numbers(row):
+        return tuple(float(v) for v in row if is_number(v))
+
+    left = ([], [])
+    for expected_group, actual_group in groups.values():
+        expected_group.sort(key=numbers)
+        actual_group.sort(key=numbers)
+        i = j = 0
+        while i < len(expected_group) and j < len(actual_group):
+            e, a = expected_group[i], actual_group[j]
+            if all(values_close(x, y, float_tolerance) for x, y in zip(e, a)):
+                i += 1
+                j += 1
+            elif numbers(e) < numbers(a):
+                left[0].append(e)
+                i += 1
+            else:
+                left[1].append(a)
+                j += 1
+        left[0].extend(expected_group[i:])
+        left[1].extend(actual_group[j:])
+    return left
+
+
+def empty_fingerprint(buckets: int = FINGERPRINT_BUCKETS) -> dict:
+    return {"rows": 0, "columns": None, "counts": [0] * buckets, "sums": [0] * buckets}
+
+
+def add_rows(fingerprint: dict, rows, float_tolerance: float = 1e-6) -> dict:
+    """Fold an iterable of rows into a fingerprint in place."""
+    buckets = len(fingerprint["counts"])
+    for row in rows:
+        row = tuple(row)
+        if fingerprint["columns"] is None:
+            fingerprint["columns"] = len(row)
+        digest = row_hash(normalize_row(row, float_tolerance))
+        bucket = digest % buckets
+        fingerprint["counts"][bucket] += 1
+        fingerprint["sums"][bucket] = (fingerprint["sums"][bucket] + digest) & HASH_MASK
+        fingerprint["rows"] += 1
+    return fingerprint
+
+
+def fingerprint_batches(batches, float_tolerance: float = 1e-6, buckets: int = FINGERPRINT_BUCKETS) -> dict:
+    """Fingerprint a result set streamed as an iterable of row batches."""
+    fingerprint = empty_fingerprint(buckets)
+    for batch in batches:
+        add_rows(fingerprint, batch, float_tolerance)
+    return fingerprint
+
+
+def mismatched_buckets(expected: dict, actual: dict) -> list:
+    """Buckets whose row count or hash sum differ; empty when the result sets are equal."""
+    return [
+        b for b in range(len(expected["counts"]))
+        if expected["counts"][b] != actual["counts"][b] or expected["sums"][b] != actual["sums"][b]
+    ]
+
+
+class ResultScanner:
+    """
+    Streams query results for comparison.
+
+    `batches_for(sql)` must return an iterable of row batches (lists of
+    tuples) and may be called more than once per query: once to fingerprint,
+    again to sample the rows of mismatched buckets.
+    """
+
+    def __init__(self, batches_for, float_tolerance: float = 1e-6, buckets: int = FINGERPRINT_BUCKETS):
+        self.batches_for = batches_for
+        self.float_tolerance = float_tolerance
+        self.buckets = buckets
+
+    def fingerprint(self, sql: str) -> dict:
+        return fingerprint_batches(self.batches_for(sql), self.float_tolerance, self.buckets)
+
+    def bucket_rows(self, sql: str, bucket_ids, limit: int = DIFF_MAX_ROWS) -> list:
+        """
+        Rows of `sql` that fall in the given buckets, at most `limit` of them,
+        normalized without float rounding (see unmatched_rows).
+        """
+        wanted = set(bucket_ids)
+        rows = []
+        for batch in self.batches_for(sql):
+            for row in batch:
+                if row_hash(normalize_row(row, self.float_tolerance)) % self.buckets in wanted:
+                    rows.append(normalize_row(row, None))
+                    if len(rows) >= limit:
+                        return rows
+        return rows
+
+
+class SparkResultScanner(ResultScanner):
+    """
+    ResultScanner over a SparkSession. Rows are hashed on the executors over
+    Arrow batches with DataFrame.mapInArrow; where that isn't available
+    (older runtimes, no pyarrow) rows are streamed to the driver one
+    partition at a time with toLocalIterator instead.
+    """
+
+    def __init__(self, session, float_tolerance: float = 1e-6, buckets: int = FINGERPRINT_BUCKETS,
+                 batch_rows: int = 10_000):
+        super().__init__(self.local_batches, float_tolerance, buckets)
+        self.session = session
+        self.batch_rows = batch_rows
+
+    def local_batches(self, sql: str):
+        batch = []
+        for row in self.session.sql(sql).toLocalIterator():
+            batch.append(tuple(row))
+            if len(batch) >= self.batch_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def fingerprint(self, sql: str) -> dict:
+        try:
+            return self.arrow_fingerprint(sql)
+        except Exception:
+            return super().fingerprint(sql)
+
+    def bucket_rows(self, sql: str, bucket_ids, limit: int = DIFF_MAX_ROWS) -> list:
+        try:
+            return self.arrow_bucket_rows(sql, bucket_ids, limit)
+        except Exception:
+            return super().bucket_rows(sql, bucket_ids, limit)
+
+    def arrow_fingerprint(self, sql: str) -> dict:
+        df = self.session.sql(sql)
+        columns = len(df.columns)
+        buckets, float_tolerance = self.buckets, self.float_tolerance
+
+        def partial_fingerprints(arrow_batches):
+            import pyarrow as pa
+
+            partial = empty_fingerprint(buckets)
+            for arrow_batch in arrow_batches:
+                add_rows(partial, zip(*(column.to_pylist() for column in arrow_batch.columns)), float_tolerance)
+            used = [b for b in range(buckets) if partial["counts"][b]]
+            yield pa.RecordBatch.from_pydict({
+                "bucket": used,
+                "row_count": [partial["counts"][b] for b in used],
+                # Spark longs are signed; store the unsigned sum's two's-complement
+                "hash_sum": [partial["sums"][b] - (1 << 64) if partial["sums"][b] >> 63 else partial["sums"][b]
+                             for b in used],
+            }, schema=pa.schema([("bucket", pa.int32()), ("row_count", pa.int64()), ("hash_sum", pa.int64())]))
+
+        fingerprint = empty_fingerprint(buckets)
+        fingerprint["columns"] = columns
+        partials = df.mapInArrow(partial_fingerprints, "bucket int, row_count long, hash_sum long").collect()
+        for bucket, count, hash_sum in partials:
+            fingerprint["counts"][bucket] += count
+            fingerprint["sums"][bucket] = (fingerprint["sums"][bucket] + hash_sum) & HASH_MASK
+            fingerprint["rows"] += count
+        return fingerprint
+
+    def arrow_bucket_rows(self, sql: str, bucket_ids, limit: int = DIFF_MAX_ROWS) -> list:
+        wanted = set(bucket_ids)
+        buckets, float_tolerance = self.buckets, self.float_tolerance
+
+        def rows_in_buckets(arrow_batches):
+            import pyarrow as pa
+
+            for arrow_batch in arrow_batches:
+                matched = []
+                for row in zip(*(column.to_pylist() for column in arrow_batch.columns)):
+                    if row_hash(normalize_row(row, float_tolerance)) % buckets in wanted:
+                        matched.append(encode_row(normalize_row(row, None)))
+                yield pa.RecordBatch.from_pydict({"row": matched}, schema=pa.schema([("row", pa.string())]))
+
+        df = self.session.sql(sql).mapInArrow(rows_in_buckets, "row string").limit(limit)
+        return [decode_row(r[0]) for r in df.collect()]
+
+
+def compare_results(scanner, expected_sql: str, actual_sql: str, expected_fingerprint: dict = None,
+                    sample_rows: int = 5) -> dict:
+    """
+    Compare two queries' result sets, ignoring row order, with integers and
+    decimals compared exactly and floats within the scanner's tolerance.
+
+    Returns {"match", "expected_rows", "actual_rows", "columns": (expected, actual),
+    "missing": [...], "unexpected": [...]}, where missing/unexpected are a
+    sample of rows only in the expected/actual result. Pass a precomputed
+    `expected_fingerprint` to avoid re-scanning the ground truth.
+    """
+    expected = expected_fingerprint or scanner.fingerprint(expected_sql)
+    actual = scanner.fingerprint(actual_sql)
+    comparison = {
+        "match": False,
+        "expected_rows": expected["rows"],
+        "actual_rows": actual["rows"],
+        "columns": (expected["columns"], actual["columns"]),
+        "missing": [],
+        "unexpected": [],
+    }
+    if expected["rows"] and actual["rows"] and expected["columns"] != actual["columns"]:
+        return comparison
+    differing = mismatched_buckets(expected, actual)
+    if not differing:
+        comparison["match"] = True
+        return comparison
+
+    # Floats within tolerance can round apart and land in different buckets:
+    # when every differing row can be fetched, pair them up within tolerance.
+    # Otherwise identical rows still share a bucket, so the diff within a
+    # handful of buckets is a sample of the overall diff.
+    tolerant = expected["rows"] == actual["rows"] and all(
+        sum(side["counts"][b] for b in differing) <= DIFF_MAX_ROWS for side in (expected, actual)
+    )
+    sampled = differing if tolerant else differing[:DIFF_BUCKETS]
+    missing, unexpected = unmatched_rows(
+        scanner.bucket_rows(expected_sql, sampled), scanner.bucket_rows(actual_sql, sampled), scanner.float_tolerance
+    )
+    comparison["match"] = tolerant and not missing and not unexpected
+    comparison["missing"] = missing[:sample_rows]
+    comparison["unexpected"] = unexpected[:sample_rows]
+    return comparison
+
+
+# =====================================================================
+# BENCHMARK RUNNER
+# =====================================================================
+
+def benchmark_sql(benchmark: dict):
+    """Ground-truth SQL of a benchmark question (its first SQL-format answer), or None."""
+    for answer in benchmark.get("answer") or []:
+        if answer.get("format") == "SQL" and answer.get("content"):
+            content = answer["content"]
+            return "".join(content) if isinstance(content, list) else str(content)
+    return None
+
+
+def percentile(values: list, pct: float):
+    """Linear-interpolated percentile (pct in 0-100) of a list of numbers, or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def ground_truth_fingerprint(scanner, benchmark: dict) -> tuple:
+    """(sql, fingerprint, error) for a benchmark's ground-truth SQL answer."""
+    sql = benchmark_sql(benchmark)
+    if sql is None:
+        return None, None, "Benchmark has no SQL answer"
+    try:
+        return sql, scanner.fingerprint(sql), None
+    except Exception as e:
+        return sql, None, f"Ground-truth SQL failed: {e}"
+
+
+def score_sql(scanner, truth_sql: str, truth_fingerprint: dict, sql: str, run: dict) -> dict:
+    """Compare `sql` with the ground truth, recording match/diff (or the error) on `run`."""
+    try:
+        run["diff"] = compare_results(scanner, truth_sql, sql, truth_fingerprint)
+        run["match"] = run["diff"]["match"]
+    except Exception as e:
+        run["error"] = f"Generated SQL failed: {e}"
+    return run
+
+
+def run_benchmarks(transport, scanner, space_id: str, benchmarks: list, runs_per_question: int = 1,
+                   max_concurrency: int = 3, timeout: float = 300, poll_initial: float = 1.0,
+                   poll_max: float = 10.0, sleep=time.sleep) -> list[dict]:
+    """
+    Run benchmark questions and score each Genie answer against its ground truth.
+
+    `scanner` is a ResultScanner (SparkResultScanner in a notebook). Returns
+    one result per benchmark, in input order:
+    {"id", "question", "runs": [{"status", "latency", "sql", "match", "diff", "error"}],
+     "accuracy", "p50_latency", "p95_latency", "error"}, where "diff" is the
+    compare_results() report for runs whose SQL executed.
+    """
+    expected = {}
+
+    def run_one(job):
+        index, _ = job
+        truth_sql, truth_fingerprint, truth_error = expected[index]
+        run = {"status": "SKIPPED", "latency": None, "sql": None, "match": False, "diff": None, "error": None}
+        if truth_error:
+            # Nothing to score against — don't spend Genie quota on it
+            return index, run
+        question = (benchmarks[index].get("question") or [""])[0]
+        answer = ask_genie(transport, space_id, question, timeout, poll_initial, poll_max, sleep=sleep)
+        run.update({k: answer[k] for k in ("status", "latency", "sql", "error")})
+        if answer["status"] != "COMPLETED":
+            return index, run
+        if not answer["sql"]:
+            run["error"] = run["error"] or "Genie answered without SQL"
+            return index, run
+        return index, score_sql(scanner, truth_sql, truth_fingerprint, answer["sql"], run)
+
+    workers = max(1, min(max_concurrency, len(benchmarks) * runs_per_question or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        truths = pool.map(lambda benchmark: ground_truth_fingerprint(scanner, benchmark), benchmarks)
+        for index, truth in enumerate(truths):
+            expected[index] = truth
+        jobs = [(index, run) for run in range(runs_per_question) for index in range(len(benchmarks))]
+        runs = {index: [] for index in range(len(benchmarks))}
+        for index, run in pool.map(run_one, jobs):
+            runs[index].append(run)
+
+    results = []
+    for index, benchmark in enumerate(benchmarks):
+        latencies = [r["latency"] for r in runs[index] if r["latency"] is not None]
+        truth_error = expected[index][2]
+        results.append({
+            "id": benchmark.get("id"),
+            "question": (benchmark.get("question") or [""])[0],
+            "runs": runs[index],
+            "accuracy": None if truth_error else sum(r["match"] for r in runs[index]) / len(runs[index]),
+            "p50_latency": percentile(latencies, 50),
+            "p95_latency": percentile(latencies, 95),
+            "error": truth_error,
+        })
+    return results
+
+
+def summarize_benchmarks(results: list) -> dict:
+    """Overall accuracy and latency percentiles across every run of every scored benchmark."""
+    runs = [run for r in results if r["error"] is None for run in r["runs"]]
+    latencies = [run["latency"] for run in runs if run["latency"] is not None]
+    return {
+        "benchmarks": len(results),
+        "scored": sum(1 for r in results if r["error"] is None),
+        "runs": len(runs),
+        "accuracy": sum(run["match"] for run in runs) / len(runs) if runs else None,
+        "p50_latency": percentile(latencies, 50),
+        "p95_latency": percentile(latencies, 95),
+    }
+
+
+def compare_benchmark_sqls(scanner, benchmarks: list, candidate_sqls: dict, max_concurrency: int = 3) -> list[dict]:
+    """
+    Score candidate SQL (e.g. copied from a Genie conversation) against benchmark ground truth.
+
+    `candidate_sqls` maps benchmark id → SQL. Returns one result per listed
+    benchmark in the same shape as run_benchmarks(), with a single run each.
+    """
+    listed = [b for b in benchmarks if b.get("id") in candidate_sqls]
+
+    def score(benchmark):
+        truth_sql, truth_fingerprint, truth_error = ground_truth_fingerprint(scanner, benchmark)
+        run = {"status": "SKIPPED" if truth_error else "COMPLETED", "latency": None,
+               "sql": candidate_sqls[benchmark["id"]], "match": False, "diff": None, "error": None}
+        if not truth_error:
+            score_sql(scanner, truth_sql, truth_fingerprint, run["sql"], run)
+        return {
+            "id": benchmark.get("id"),
+            "question": (benchmark.get("question") or [""])[0],
+            "runs": [run],
+            "accuracy": None if truth_error else float(run["match"]),
+            "p50_latency": None,
+            "p95_latency": None,
+            "error": truth_error,
+        }
+
+    if not listed:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(listed)))) as pool:
+        return list(pool.map(score, listed))
+
+
+# =====================================================================
+# RUN BENCHMARKS
+# =====================================================================
+
+if __name__ == "__main__":
+    from databricks.sdk import WorkspaceClient
+    from pyspark.sql import SparkSession
+
+    w = WorkspaceClient()
+    spark = SparkSession.builder.getOrCreate()
+
+    space_data = w.api_client.do(
+        "GET",
+        f"/api/2.0/genie/spaces/{space_id}",
+        query={"include_serialized_space": "true"},
+    )
+    space_config = json.loads(space_data.get("serialized_space", "{}"))
+    benchmarks = space_config.get("benchmarks", {}).get("questions", [])
+    if benchmark_question_ids is not None:
+        benchmarks = [b for b in benchmarks if b.get("id") in set(benchmark_question_ids)]
+
+    print("=" * 70)
+    print(f"GENIE BENCHMARKS: {space_data.get('title', space_id)}")
+    print(f"{len(benchmarks)} question(s) × {runs_per_question} run(s), concurrency {max_concurrency}")
+    print("=" * 70)
+
+    if not benchmarks:
+        print("No benchmark questions found. Add benchmarks.questions with SQL answers to the space first.")
+    else:
+        scanner = SparkResultScanner(spark, float_tolerance)
+        if candidate_sqls:
+            benchmark_results = compare_benchmark_sqls(scanner, benchmarks, candidate_sqls, max_concurrency)
+        else:
+            benchmark_results = run_benchmarks(
+                lambda method, path, body=None: w.api_client.do(method, path, body=body),
+                scanner, space_id, benchmarks, runs_per_question, max_concurrency, question_timeout_seconds,
+                poll_initial_seconds, poll_max_seconds,
+            )
+
+        print(f"\n  {'Question':<50} {'Accuracy':<10} {'p50':<8} {'p95':<8}")
+        print(f"  {'─' * 50} {'─' * 10} {'─' * 8} {'─' * 8}")
+        for r in benchmark_results:
+            question = r["question"] if len(r["question"]) <= 50 else r["question"][:47] + "..."
+            accuracy = "n/a" if r["accuracy"] is None else f"{r['accuracy']:.0%}"
+            p50 = f"{r['p50_latency']:.1f}s" if r["p50_latency"] is not None else "—"
+            p95 = f"{r['p95_latency']:.1f}s" if r["p95_latency"] is not None else "—"
+            print(f"  {question:<50} {accuracy:<10} {p50:<8} {p95:<8}")
+
+        failures = [(r, run) for r in benchmark_results for run in r["runs"] if not run["match"]]
+        if failures or any(r["error"] for r in benchmark_results):
+            print(f"\n{'─' * 70}")
+            print("MISSES")
+            print(f"{'─' * 70}")
+            for r in benchmark_results:
+                if r["error"]:
+                    print(f"  ✗ {r['question'][:60]}: {r['error']}")
+            for r, run in failures:
+                if r["error"]:
+                    continue
+                reason = run["error"] or ("result differs from ground truth" if run["status"] == "COMPLETED" else run["status"])
+                print(f"  ✗ {r['question'][:60]}: {reason}")
+                if run["sql"]:
+                    print(f"    SQL: {' '.join(run['sql'].split())[:200]}")
+                diff = run["diff"]
+                if diff and not diff["match"]:
+                    print(f"    Rows: expected {diff['expected_rows']}, got {diff['actual_rows']}")
+                    if diff["columns"][0] != diff["columns"][1]:
+                        print(f"    Columns: expected {diff['columns'][0]}, got {diff['columns'][1]}")
+                    for row in diff["missing"]:
+                        print(f"    - {row}")
+                    for row in diff["unexpected"]:
+                        print(f"    + {row}")
+
+        summary = summarize_benchmarks(benchmark_results)
+        print(f"\n{'=' * 70}")
+        print("SUMMARY")
+        print(f"{'=' * 70}")
+        if summary["accuracy"] is not None:
+            print(f"  Accuracy: {summary['accuracy']:.0%} over {summary['runs']} run(s) of {summary['scored']} benchmark(s)")
+        if summary["p50_latency"] is not None:
+            print(f"  Latency: p50 {summary['p50_latency']:.1f}s, p95 {summary['p95_latency']:.1f}s")
+        unscored = summary["benchmarks"] - summary["scored"]
+        if unscored:
+            print(f"  ○ {unscored} benchmark(s) not scored (missing or failing ground-truth SQL)")
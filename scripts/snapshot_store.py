@@ -0,0 +1,282 @@
+"""
+Local, content-addressed history of Genie space configs.
+
+Genie keeps no history of serialized_space, and a PATCH replaces it whole.
+SnapshotStore.save() records a fetched config as one compressed object per
+item of each ID-keyed section (tables, snippets, example SQL, ...) plus one
+for everything else, and a small manifest listing the objects in order.
+Objects are named by the hash of their content, so an item shared by many
+spaces or many daily snapshots is stored once, and a snapshot identical to
+the space's latest one is not written again.
+
+Listing reads file names only; diffing two snapshots compares the manifests'
+item hashes without loading any item; restore() reassembles a config (or a
+PATCH body) from the objects.
+
+Layout under the store root:
+    objects/ab/cdef...          zlib-compressed canonical JSON, named by its blake2b hash
+    snapshots/<space_id>/<taken_at>-<digest>.json
+                                manifest: space metadata, the remainder object,
+                                and [[item key, object hash], ...] per section
+
+Usage:
+    from snapshot_store import SnapshotStore
+
+    store = SnapshotStore("/Volumes/main/genie/snapshots")
+    store.save(space_id, config, {"title": space_data.get("title")})
+    store.list_snapshots(space_id)           # [{"snapshot_id", "taken_at", ...}] oldest first
+    store.diff(space_id, older_id, newer_id) # same shape as manage_space.diff_config
+    body = store.patch_body(space_id, older_id)
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+
+# space_model.py lives next to this script; in a notebook outside scripts/,
+# add that folder to sys.path first
+from space_model import KEYED_SECTIONS, changed_fields, diff_keyed, get_section, keyed_items
+
+MANIFEST_FORMAT = 1
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S%fZ"
+
+
+def canonical_json(value) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def without_sections(config: dict) -> dict:
+    """The config with every ID-keyed section emptied — what the remainder object stores."""
+    remainder = json.loads(json.dumps(config))
+    for path in KEYED_SECTIONS:
+        *parents, leaf = path.split(".")
+        node = remainder
+        for key in parents:
+            node = node.get(key) if isinstance(node, dict) else None
+        if isinstance(node, dict) and isinstance(node.get(leaf), list):
+            node[leaf] = []
+    return remainder
+
+
+def set_section(config: dict, path: str, items: list):
+    *parents, leaf = path.split(".")
+    node = config
+    for key in parents:
+        node = node.setdefault(key, {})
+    node[leaf] = items
+
+
+class SnapshotStore:
+    """Content-addressed snapshots of serialized_space configs in a local directory (thread-safe)."""
+
+    def __init__(self, root: str, cache_objects: int = 100_000):
+        self.root = root
+        self.cache_objects = cache_objects
+        self.cache = {}
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "snapshots"), exist_ok=True)
+
+    # --- Objects ---
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def put_object(self, value) -> tuple:
+        """(hash, newly written) for a JSON value; an object already in the store isn't rewritten."""
+        data = canonical_json(value)
+        digest = content_hash(data)
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            return digest, False
+        write_atomic(path, zlib.compress(data))
+        return digest, True
+
+    def get_object(self, digest: str):
+        """
+        A stored JSON value, decoded afresh on every call so callers may edit it;
+        only the decompressed bytes are cached.
+        """
+        with self.lock:
+            data = self.cache.get(digest)
+        if data is None:
+            with open(self.object_path(digest), "rb") as f:
+                data = zlib.decompress(f.read())
+            with self.lock:
+                if len(self.cache) >= self.cache_objects:
+                    self.cache.clear()
+                self.cache[digest] = data
+        return json.loads(data)
+
+    # --- Snapshots ---
+
+    def space_dir(self, space_id: str) -> str:
+        return os.path.join(self.root, "snapshots", space_id)
+
+    def save(self, space_id: str, config: dict, metadata: dict = None, taken_at: datetime.datetime = None,
+             force: bool = False) -> dict:
+        """
+        Snapshot a config. Returns {"snapshot_id", "space_id", "taken_at",
+        "new_objects", "objects", "unchanged"}; when the config (and metadata)
+        match the space's latest snapshot, that snapshot is returned with
+        unchanged=True and nothing is written, unless force=True.
+        """
+        remainder, new = self.put_object(without_sections(config))
+        new_objects = int(new)
+        sections = {}
+        for path, key in KEYED_SECTIONS.items():
+            entries = []
+            for item_key, item in keyed_items(get_section(config, path), key).items():
+                digest, new = self.put_object(item)
+                new_objects += new
+                entries.append([item_key, digest])
+            if entries:
+                sections[path] = entries
+        core = {"metadata": metadata or {}, "remainder": remainder, "sections": sections}
+        digest = content_hash(canonical_json(core))
+        objects = 1 + sum(len(entries) for entries in sections.values())
+
+        latest = self.latest(space_id)
+        if latest and not force and latest["snapshot_id"].endswith(f"-{digest[:16]}"):
+            return {**latest, "new_objects": 0, "objects": objects, "unchanged": True}
+
+        taken_at = (taken_at or datetime.datetime.now(datetime.timezone.utc)).astimezone(datetime.timezone.utc)
+        snapshot_id = f"{taken_at.strftime(TIMESTAMP_FORMAT)}-{digest[:16]}"
+        manifest = {"format": MANIFEST_FORMAT, "space_id": space_id, "snapshot_id": snapshot_id,
+                    "taken_at": taken_at.isoformat(), **core}
+        write_atomic(os.path.join(self.space_dir(space_id), f"{snapshot_id}.json"), canonical_json(manifest))
+        return {"snapshot_id": snapshot_id, "space_id": space_id, "taken_at": taken_at.isoformat(),
+                "new_objects": new_objects, "objects": objects, "unchanged": False}
+
+    def list_snapshots(self, space_id: str = None) -> list[dict]:
+        """Snapshots of one space (or every space), oldest first, from file names alone."""
+        space_ids = [space_id] if space_id else sorted(os.listdir(os.path.join(self.root, "snapshots")))
+        snapshots = []
+        for sid in space_ids:
+            try:
+                names = sorted(n for n in os.listdir(self.space_dir(sid)) if n.endswith(".json"))
+            except FileNotFoundError:
+                continue
+            for name in names:
+                snapshot_id = name[:-len(".json")]
+                stamp, _, digest = snapshot_id.partition("-")
+                taken_at = datetime.datetime.strptime(stamp, TIMESTAMP_FORMAT).replace(tzinfo=datetime.timezone.utc)
+                snapshots.append({"snapshot_id": snapshot_id, "space_id": sid,
+                                  "taken_at": taken_at.isoformat(), "digest": digest})
+        return snapshots
+
+    def latest(self, space_id: str):
+        snapshots = self.list_snapshots(space_id)
+        return snapshots[-1] if snapshots else None
+
+    def manifest(self, space_id: str, snapshot_id: str = None) -> dict:
+        """A snapshot's manifest (the latest if snapshot_id is None)."""
+        if snapshot_id is None:
+            latest = self.latest(space_id)
+            if latest is None:
+                raise KeyError(f"No snapshots of space {space_id}")
+            snapshot_id = latest["snapshot_id"]
+        try:
+            with open(os.path.join(self.space_dir(space_id), f"{snapshot_id}.json"), "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            raise KeyError(f"No snapshot {snapshot_id} of space {space_id}") from None
+
+    def restore(self, space_id: str, snapshot_id: str = None) -> dict:
+        """The serialized_space config recorded by a snapshot (the latest if snapshot_id is None)."""
+        manifest = self.manifest(space_id, snapshot_id)
+        config = self.get_object(manifest["remainder"])
+        for path, entries in manifest["sections"].items():
+            set_section(config, path, [self.get_object(digest) for _, digest in entries])
+        return config
+
+    def patch_body(self, space_id: str, snapshot_id: str = None) -> dict:
+        """Body for PATCH /api/2.0/genie/spaces/{space_id} that puts a snapshot back."""
+        manifest = self.manifest(space_id, snapshot_id)
+        body = {"serialized_space": json.dumps(self.restore(space_id, manifest["snapshot_id"]))}
+        for field in ("title", "description"):
+            if manifest["metadata"].get(field):
+                body[field] = manifest["metadata"][field]
+        return body
+
+    def diff(self, space_id: str, before_id: str, after_id: str = None, after_space_id: str = None) -> dict:
+        """
+        Change set between two snapshots, in the shape of manage_space.diff_config.
+
+        Sections are compared by item hash from the manifests alone; only the
+        two remainder objects are loaded, and only if they differ. after_id
+        None means the latest snapshot; after_space_id compares across spaces.
+        """
+        before = self.manifest(space_id, before_id)
+        after = self.manifest(after_space_id or space_id, after_id)
+        changes = {}
+        for path in KEYED_SECTIONS:
+            change = diff_keyed(dict(before["sections"].get(path, [])), dict(after["sections"].get(path, [])))
+            if change:
+                changes[path] = change
+        if before["remainder"] != after["remainder"]:
+            changes.update(changed_fields(self.get_object(before["remainder"]), self.get_object(after["remainder"])))
+        return changes
+
+    def prune(self, keep_per_space: int) -> dict:
+        """Delete all but the newest `keep_per_space` snapshots of each space, then objects no snapshot uses."""
+        removed_snapshots = 0
+        by_space = {}
+        for snapshot in self.list_snapshots():
+            by_space.setdefault(snapshot["space_id"], []).append(snapshot)
+        for space_id, snapshots in by_space.items():
+            for snapshot in snapshots[:max(0, len(snapshots) - keep_per_space)]:
+                os.remove(os.path.join(self.space_dir(space_id), f"{snapshot['snapshot_id']}.json"))
+                removed_snapshots += 1
+
+        referenced = set()
+        for snapshot in self.list_snapshots():
+            manifest = self.manifest(snapshot["space_id"], snapshot["snapshot_id"])
+            referenced.add(manifest["remainder"])
+            referenced.update(digest for entries in manifest["sections"].values() for _, digest in entries)
+        removed_objects = 0
+        objects_dir = os.path.join(self.root, "objects")
+        for prefix in os.listdir(objects_dir):
+            for name in os.listdir(os.path.join(objects_dir, prefix)):
+                if prefix + name not in referenced:
+                    os.remove(os.path.join(objects_dir, prefix, name))
+                    removed_objects += 1
+        with self.lock:
+            self.cache.clear()
+        return {"snapshots": removed_snapshots, "objects": removed_objects}
+
+    def stats(self) -> dict:
+        """Snapshot and object counts and the bytes the objects take on disk."""
+        objects = 0
+        size = 0
+        objects_dir = os.path.join(self.root, "objects")
+        for prefix in os.listdir(objects_dir):
+            for name in os.listdir(os.path.join(objects_dir, prefix)):
+                objects += 1
+                size += os.path.getsize(os.path.join(objects_dir, prefix, name))
+        return {"snapshots": len(self.list_snapshots()), "objects": objects, "object_bytes": size}
+
+
+def write_atomic(path: str, data: bytes):
+    """Write via a temp file and rename, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,237 @@
+"""
+Parsed, indexed model of a serialized_space config.
+
+SpaceModel.from_config() walks the config once and builds typed, slotted
+records for each section (tables with their column configs, questions,
+instructions, snippets) and the section counts summary() reports, so the
+scripts that print or plan from a config (manage_space.py,
+plan_matching_refresh.py, validate_config.py's summary) read fields instead
+of re-walking it with chained .get() calls. Malformed entries (non-dict
+items, missing fields) are skipped rather than raising, so the model can be
+built before validation. Validation itself doesn't use the model: it also
+runs on a stream and on selected sections, where the whole config is never
+in hand, so validate_config.py collects the table names it checks snippet
+references against as it walks.
+KEYED_SECTIONS and the keyed_items/diff_keyed/changed_fields helpers compare
+two configs section by section (manage_space.py, snapshot_store.py).
+
+Usage:
+    from space_model import SpaceModel
+
+    space = SpaceModel.from_config(config)
+    space.summary()["instruction_count"]
+    [source.identifier for source in space.tables]
+"""
+
+from dataclasses import dataclass, field
+
+SNIPPET_TYPES = ("filters", "expressions", "measures")
+
+# ID-keyed arrays of serialized_space and the field identifying their items
+KEYED_SECTIONS = {
+    "config.sample_questions": "id",
+    "data_sources.tables": "identifier",
+    "data_sources.metric_views": "identifier",
+    "instructions.text_instructions": "id",
+    "instructions.example_question_sqls": "id",
+    "instructions.sql_functions": "id",
+    "instructions.join_specs": "id",
+    "instructions.sql_snippets.filters": "id",
+    "instructions.sql_snippets.expressions": "id",
+    "instructions.sql_snippets.measures": "id",
+    "benchmarks.questions": "id",
+}
+
+
+def table_names(identifier: str) -> tuple:
+    """Names a data source can be referenced by: its short name (for catalog.schema.table) and its identifier."""
+    parts = identifier.split(".")
+    return (parts[2], identifier) if len(parts) == 3 else (identifier,)
+
+
+def joined(value) -> str:
+    """A string-array field as one string."""
+    if isinstance(value, list):
+        return "".join(v for v in value if isinstance(v, str))
+    return value if isinstance(value, str) else ""
+
+
+def dict_items(value) -> list:
+    return [item for item in value if isinstance(item, dict)] if isinstance(value, list) else []
+
+
+def get_section(config: dict, path: str) -> list:
+    node = config
+    for key in path.split("."):
+        node = node.get(key, {}) if isinstance(node, dict) else {}
+    return node if isinstance(node, list) else []
+
+
+def keyed_items(items: list, key: str) -> dict:
+    """Map each item to its ID (or position, if it has none); repeated IDs get a #n suffix."""
+    keyed = {}
+    for i, item in enumerate(items):
+        item_id = item.get(key) if isinstance(item, dict) else None
+        item_id = item_id if isinstance(item_id, str) else f"[{i}]"
+        n = 1
+        unique_id = item_id
+        while unique_id in keyed:
+            n += 1
+            unique_id = f"{item_id}#{n}"
+        keyed[unique_id] = item
+    return keyed
+
+
+def diff_keyed(old_items: dict, new_items: dict):
+    """{"added", "removed", "modified": [ids], "reordered": bool} between two keyed sections, or None if equal."""
+    added = [i for i in new_items if i not in old_items]
+    removed = [i for i in old_items if i not in new_items]
+    modified = [i for i in new_items if i in old_items and new_items[i] != old_items[i]]
+    reordered = [i for i in new_items if i in old_items] != [i for i in old_items if i in new_items]
+    if added or removed or modified or reordered:
+        return {"added": added, "removed": removed, "modified": modified, "reordered": reordered}
+    return None
+
+
+def changed_fields(before, after, path="") -> dict:
+    """Dotted paths of non-section fields whose values differ, with their before/after values."""
+    if isinstance(before, dict) and isinstance(after, dict):
+        changes = {}
+        for key in list(before) + [k for k in after if k not in before]:
+            child = f"{path}.{key}" if path else key
+            if child in KEYED_SECTIONS:
+                continue
+            changes.update(changed_fields(before.get(key), after.get(key), child))
+        return changes
+    return {} if before == after else {path: {"before": before, "after": after}}
+
+
+@dataclass(slots=True)
+class ColumnConfig:
+    table: str
+    column_name: str
+    description: str
+    synonyms: list
+    enable_format_assistance: bool
+    enable_entity_matching: bool
+    exclude: bool
+    raw: dict
+
+
+@dataclass(slots=True)
+class DataSource:
+    kind: str  # "table" or "metric_view"
+    identifier: str
+    short_name: str
+    description: str
+    column_configs: list
+    raw: dict
+
+
+@dataclass(slots=True)
+class Question:
+    kind: str  # "sample_question" or "benchmark"
+    id: str
+    question: str
+    answer_sql: str  # benchmarks only
+    raw: dict
+
+
+@dataclass(slots=True)
+class Instruction:
+    kind: str  # "text_instruction", "example_sql", "sql_function", "join_spec", or a snippet type
+    id: str
+    name: str  # question, alias/display_name, or identifier
+    sql: str
+    raw: dict
+
+
+@dataclass(slots=True)
+class SpaceModel:
+    version: object = None
+    tables: list = field(default_factory=list)
+    metric_views: list = field(default_factory=list)
+    sample_questions: list = field(default_factory=list)
+    benchmarks: list = field(default_factory=list)
+    text_instructions: list = field(default_factory=list)
+    example_sqls: list = field(default_factory=list)
+    sql_functions: list = field(default_factory=list)
+    join_specs: list = field(default_factory=list)
+    snippets: dict = field(default_factory=lambda: {t: [] for t in SNIPPET_TYPES})
+    counts: dict = field(default_factory=dict)  # raw section lengths, malformed items included
+
+    @classmethod
+    def from_config(cls, config: dict) -> "SpaceModel":
+        space = cls(version=config.get("version"))
+        data_sources = config.get("data_sources", {})
+        instructions = config.get("instructions", {})
+        snippets = instructions.get("sql_snippets", {})
+        sections = {
+            "tables": data_sources.get("tables", []),
+            "metric_views": data_sources.get("metric_views", []),
+            "sample_questions": config.get("config", {}).get("sample_questions", []),
+            "example_sqls": instructions.get("example_question_sqls", []),
+            "sql_functions": instructions.get("sql_functions", []),
+            "join_specs": instructions.get("join_specs", []),
+            "text_instructions": instructions.get("text_instructions", []),
+            **{f"snippet_{t}": snippets.get(t, []) for t in ("measures", "filters", "expressions")},
+            "benchmarks": config.get("benchmarks", {}).get("questions", []),
+        }
+        space.counts = {name: len(items) for name, items in sections.items()}
+
+        for kind, target, items in (("table", space.tables, sections["tables"]),
+                                    ("metric_view", space.metric_views, sections["metric_views"])):
+            for raw in dict_items(items):
+                identifier = raw.get("identifier", "")
+                names = table_names(identifier) if isinstance(identifier, str) else ()
+                source = DataSource(kind, identifier, names[0] if len(names) == 2 else None,
+                                    joined(raw.get("description")), [], raw)
+                for cc in dict_items(raw.get("column_configs")):
+                    source.column_configs.append(ColumnConfig(
+                        identifier, cc.get("column_name", ""), joined(cc.get("description")),
+                        cc.get("synonyms") or [], bool(cc.get("enable_format_assistance")),
+                        bool(cc.get("enable_entity_matching")), bool(cc.get("exclude")), cc,
+                    ))
+                target.append(source)
+
+        for kind, target, items in (("sample_question", space.sample_questions, sections["sample_questions"]),
+                                    ("benchmark", space.benchmarks, sections["benchmarks"])):
+            for raw in dict_items(items):
+                answer_sql = next(
+                    (joined(a.get("content")) for a in dict_items(raw.get("answer")) if a.get("format") == "SQL"), ""
+                )
+                target.append(Question(kind, raw.get("id"), joined(raw.get("question")), answer_sql, raw))
+
+        for raw in dict_items(sections["text_instructions"]):
+            space.text_instructions.append(
+                Instruction("text_instruction", raw.get("id"), "", joined(raw.get("content")), raw))
+        for raw in dict_items(sections["example_sqls"]):
+            space.example_sqls.append(
+                Instruction("example_sql", raw.get("id"), joined(raw.get("question")), joined(raw.get("sql")), raw))
+        for raw in dict_items(sections["sql_functions"]):
+            space.sql_functions.append(
+                Instruction("sql_function", raw.get("id"), raw.get("identifier", ""), "", raw))
+        for raw in dict_items(sections["join_specs"]):
+            left = raw.get("left", {}).get("identifier", "") if isinstance(raw.get("left"), dict) else ""
+            right = raw.get("right", {}).get("identifier", "") if isinstance(raw.get("right"), dict) else ""
+            sql = " ".join(s for s in raw.get("sql", []) if isinstance(s, str)) if isinstance(raw.get("sql"), list) else ""
+            space.join_specs.append(Instruction("join_spec", raw.get("id"), f"{left} ↔ {right}", sql, raw))
+        for snippet_type in SNIPPET_TYPES:
+            for raw in dict_items(snippets.get(snippet_type, [])):
+                name = raw.get("alias") or raw.get("display_name") or ""
+                sql = " ".join(s for s in raw.get("sql", []) if isinstance(s, str)) if isinstance(raw.get("sql"), list) else ""
+                space.snippets[snippet_type].append(Instruction(snippet_type, raw.get("id"), name, sql, raw))
+        return space
+
+    def summary(self) -> dict:
+        """Section counts and instruction budget usage."""
+        summary = {
+            name: self.counts.get(name, 0)
+            for name in ("tables", "metric_views", "sample_questions", "example_sqls", "sql_functions",
+                         "join_specs", "text_instructions", "snippet_measures", "snippet_filters",
+                         "snippet_expressions", "benchmarks")
+        }
+        summary["instruction_count"] = (
+            summary["example_sqls"] + summary["sql_functions"] + (1 if summary["text_instructions"] else 0)
+        )
+        return summary
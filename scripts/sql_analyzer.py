@@ -0,0 +1,269 @@
+"""
+Tokenizer and column-reference analyzer for Databricks SQL expressions.
+
+parse_sql_expression() tokenizes a SQL expression (the body of a filter,
+dimension, or measure snippet) and finds every column reference in it,
+telling columns apart from function names, keywords, lambda parameters,
+AS aliases and cast types, INTERVAL/EXTRACT units, typed literals, named
+arguments, and query parameters. String literals, backtick-quoted names,
+and comments are tokenized, not pattern-matched, so a period inside a
+string or comment is never mistaken for table.column. Results are memoized
+by SQL text: a snippet repeated across snippets or spaces is parsed once
+per process.
+
+resolve_column_ref() resolves a table-qualified reference against the
+space's tables (by short name or full identifier); table_metadata.py holds
+the real columns to check the resolved names against.
+
+Usage:
+    from sql_analyzer import parse_sql_expression, resolve_column_ref
+
+    parsed = parse_sql_expression("SUM(orders.amount) FILTER (WHERE orders.status = 'paid')")
+    parsed.column_refs    # (('orders', 'amount'), ('orders', 'status'))
+    parsed.errors         # () — or e.g. ("unbalanced parentheses",)
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+TOKEN_PATTERN = re.compile(
+    r"""
+      (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>[rR]?'(?:[^'\\]|\\.|'')*'|[rR]?"(?:[^"\\]|\\.|"")*")
+    | (?P<quoted>`(?:[^`]|``)*`)
+    | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?(?:BD|bd|[LSYDFlsydf])?(?!\w))
+    | (?P<param>:[^\W\d]\w*|\$\{[^}]*\}|\{\{[^}]*\}\}|\?)
+    | (?P<ident>\d*[^\W\d]\w*)
+    | (?P<op>->|=>|::|<=>|<>|!=|>=|<=|==|\|\||&&|<<|>>|[-+*/%=<>!~&|^()\[\],.:;{}])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+UNTERMINATED = (("/*", "unterminated /* comment"), ("'", "unterminated string literal"),
+                ('"', "unterminated string literal"), ("`", "unterminated backtick identifier"))
+
+# Words that are never column references in an expression (clause and operator
+# keywords, and functions Databricks allows without parentheses)
+EXPRESSION_KEYWORDS = {
+    "ALL", "AND", "ANTI", "ANY", "AS", "ASC", "BETWEEN", "BOTH", "BY", "CASE", "CROSS",
+    "CURRENT", "CURRENT_DATE", "CURRENT_TIMESTAMP", "CURRENT_USER", "DESC", "DISTINCT", "DIV",
+    "ELSE", "END", "ESCAPE", "EXCEPT", "EXISTS", "FALSE", "FILTER", "FIRST", "FOLLOWING", "FOR",
+    "FROM", "FULL", "GROUP", "HAVING", "ILIKE", "IN", "INNER", "INTERSECT", "INTERVAL", "IS",
+    "JOIN", "LAST", "LATERAL", "LEADING", "LEFT", "LIKE", "LIMIT", "NOT", "NULL", "NULLS",
+    "OFFSET", "ON", "OR", "ORDER", "OUTER", "OVER", "PARTITION", "PRECEDING", "QUALIFY",
+    "RANGE", "REGEXP", "RIGHT", "RLIKE", "ROW", "ROWS", "SELECT", "SEMI", "SESSION_USER",
+    "SOME", "THEN", "TRAILING", "TRUE", "UNBOUNDED", "UNION", "UNKNOWN", "USING", "WHEN",
+    "WHERE", "WITH", "WITHIN",
+}
+# Keywords that turn a following string into a typed literal (DATE '2024-01-01')
+TYPED_LITERAL_PREFIXES = {"DATE", "TIMESTAMP", "TIMESTAMP_LTZ", "TIMESTAMP_NTZ", "INTERVAL", "X"}
+# Units in INTERVAL literals, EXTRACT(unit FROM ...), and DATEDIFF(unit, ...)-style calls
+DATETIME_UNITS = {
+    unit + suffix
+    for unit in ("YEAR", "QUARTER", "MONTH", "WEEK", "DAY", "DAYOFYEAR", "DAYOFWEEK", "HOUR",
+                 "MINUTE", "SECOND", "MILLISECOND", "MICROSECOND", "NANOSECOND")
+    for suffix in ("", "S")
+} | {"TO", "DOW", "DOY", "YEAROFWEEK"}
+UNIT_ARGUMENT_FUNCTIONS = {"DATEADD", "DATEDIFF", "DATE_ADD", "DATE_DIFF", "TIMESTAMPADD",
+                           "TIMESTAMPDIFF", "EXTRACT", "DATE_PART"}
+CLOSING = {"(": ")", "[": "]"}
+
+
+class Token(NamedTuple):
+    kind: str  # "string", "quoted", "number", "param", "ident", or "op"
+    text: str
+    start: int  # offset in the SQL string
+
+
+class ParsedExpression(NamedTuple):
+    column_refs: tuple  # name parts of each column reference, e.g. ("orders", "amount") or ("amount",)
+    aliases: tuple  # table aliases introduced by a subquery's FROM/JOIN
+    errors: tuple  # syntax problems, e.g. "unbalanced parentheses"
+
+
+def tokenize(sql: str) -> tuple:
+    """(tokens, errors) for a SQL string; whitespace and comments are dropped."""
+    tokens = []
+    errors = []
+    pos = 0
+    while pos < len(sql):
+        m = TOKEN_PATTERN.match(sql, pos)
+        # An unclosed /* would otherwise tokenize as the operators / and *
+        if m is None or (m.lastgroup == "op" and sql.startswith("/*", pos)):
+            opener = next((msg for prefix, msg in UNTERMINATED if sql.startswith(prefix, pos)), None)
+            if opener:
+                errors.append(opener)
+                break
+            errors.append(f"unexpected character {sql[pos]!r}")
+            pos += 1
+            continue
+        kind = m.lastgroup
+        if kind not in ("ws", "comment"):
+            tokens.append(Token(kind, m.group(), pos))
+        pos = m.end()
+    return tokens, errors
+
+
+def name_of(token: Token) -> str:
+    """Identifier text with backticks removed."""
+    return token.text[1:-1].replace("``", "`") if token.kind == "quoted" else token.text
+
+
+@lru_cache(maxsize=65_536)
+def parse_sql_expression(sql: str) -> ParsedExpression:
+    """Column references, subquery table aliases, and syntax errors in a SQL expression (memoized)."""
+    tokens, errors = tokenize(sql)
+    n = len(tokens)
+    refs = []
+    aliases = []
+    lambda_params = set()
+    stack = []  # (opening bracket, function name or None, index of the first token inside)
+    select_depths = []  # bracket depths with an open SELECT, where FROM/JOIN name tables
+    i = 0
+
+    def text_at(k):
+        return tokens[k].text if k < n else ""
+
+    while i < n:
+        token = tokens[i]
+        text = token.text
+        if token.kind == "op":
+            if text in CLOSING:
+                function = None
+                if i and tokens[i - 1].kind in ("ident", "quoted") and text == "(":
+                    function = tokens[i - 1].text.upper()
+                stack.append((text, function, i + 1))
+                # (x, y) -> ... binds lambda parameters
+                k = i + 1
+                names = []
+                while k + 1 < n and tokens[k].kind == "ident" and tokens[k + 1].text in (",", ")"):
+                    names.append(tokens[k].text.lower())
+                    if tokens[k + 1].text == ")":
+                        break
+                    k += 2
+                if names and text_at(k + 2) == "->":
+                    lambda_params.update(names)
+            elif text in (")", "]"):
+                if not stack or CLOSING[stack[-1][0]] != text:
+                    errors.append("unbalanced parentheses")
+                else:
+                    stack.pop()
+                    while select_depths and select_depths[-1] > len(stack):
+                        select_depths.pop()
+            i += 1
+            continue
+        if token.kind not in ("ident", "quoted"):
+            i += 1
+            continue
+
+        # A dotted name: ident(.ident)*(.*)?
+        start = i
+        parts = [name_of(token)]
+        i += 1
+        while i + 1 < n and tokens[i].text == "." and (tokens[i + 1].kind in ("ident", "quoted") or tokens[i + 1].text == "*"):
+            parts.append(name_of(tokens[i + 1]))
+            i += 2
+        previous = text_at(start - 1).upper() if start else ""
+        following = text_at(i)
+        upper = parts[0].upper() if token.kind == "ident" else None
+
+        if following == "(":
+            continue  # function call (possibly catalog.schema.function)
+        if previous in ("AS", "::"):
+            if following == "<":
+                i = skip_type_arguments(tokens, i)
+            continue  # alias or cast type
+        if len(parts) == 1 and upper is not None:
+            if upper == "INTERVAL":
+                i = skip_interval(tokens, i)
+                continue
+            if upper in TYPED_LITERAL_PREFIXES and i < n and tokens[i].kind == "string":
+                i += 1
+                continue
+            if upper == "SELECT":
+                select_depths.append(len(stack))
+                continue
+            if upper in ("FROM", "JOIN") and select_depths and select_depths[-1] == len(stack):
+                i = skip_table(tokens, i, aliases)
+                continue
+            if upper in EXPRESSION_KEYWORDS:
+                continue
+            if upper in DATETIME_UNITS and (
+                following.upper() == "FROM"
+                or (stack and stack[-1][1] in UNIT_ARGUMENT_FUNCTIONS and stack[-1][2] == start)
+            ):
+                continue
+        if following in ("->", "=>"):
+            if following == "->":
+                lambda_params.add(parts[0].lower())
+            continue  # lambda parameter or named argument
+        if parts[0].lower() in lambda_params:
+            continue
+        refs.append(tuple(parts))
+
+    if stack:
+        errors.append("unbalanced parentheses")
+    alias_set = {a.lower() for a in aliases}
+    refs = [r for r in refs if not (len(r) > 1 and r[0].lower() in alias_set)]
+    return ParsedExpression(tuple(refs), tuple(aliases), tuple(dict.fromkeys(errors)))
+
+
+def skip_type_arguments(tokens, i):
+    """Index after a <...> type argument list (ARRAY<STRING>, MAP<STRING, INT>) starting at i."""
+    depth = 0
+    while i < len(tokens):
+        text = tokens[i].text
+        depth += (text == "<") - (text == ">") - 2 * (text == ">>")
+        i += 1
+        if depth <= 0:
+            break
+    return i
+
+
+def skip_interval(tokens, i):
+    """Index after an INTERVAL literal's values and units (INTERVAL 1 YEAR 2 MONTHS, INTERVAL '3' DAY)."""
+    while i < len(tokens) and (
+        tokens[i].kind in ("number", "string")
+        or tokens[i].text in ("-", "+")
+        or (tokens[i].kind == "ident" and tokens[i].text.upper() in DATETIME_UNITS)
+    ):
+        i += 1
+    return i
+
+
+def skip_table(tokens, i, aliases):
+    """Index after a subquery's FROM/JOIN table name and alias, recording the alias."""
+    n = len(tokens)
+    if i < n and tokens[i].kind in ("ident", "quoted"):
+        i += 1
+        while i + 1 < n and tokens[i].text == "." and tokens[i + 1].kind in ("ident", "quoted"):
+            i += 2
+    if i < n and tokens[i].text.upper() == "AS":
+        i += 1
+    if i < n and (tokens[i].kind == "quoted" or (tokens[i].kind == "ident" and tokens[i].text.upper() not in EXPRESSION_KEYWORDS)):
+        aliases.append(name_of(tokens[i]))
+        i += 1
+    return i
+
+
+# =====================================================================
+# RESOLUTION
+# =====================================================================
+
+def resolve_column_ref(parts: tuple, tables: dict) -> tuple:
+    """
+    (table identifier, column name) for a qualified column reference.
+
+    tables: {lowercased short name or identifier: identifier}. Handles
+    table.column, catalog.schema.table.column, and `catalog.schema.table`.column;
+    trailing parts are struct fields. The identifier is None when the
+    reference's table isn't in `tables` — the column is then the unknown
+    table prefix, for reporting.
+    """
+    if len(parts) >= 4:
+        identifier = tables.get(".".join(parts[:3]).lower())
+        if identifier is not None:
+            return identifier, parts[3]
+    identifier = tables.get(parts[0].lower())
+    return (identifier, parts[1]) if identifier is not None else (None, parts[0])
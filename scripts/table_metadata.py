@@ -0,0 +1,121 @@
+"""
+Real table columns for validation, from live audits or offline snapshots.
+
+TableMetadata indexes column names by table so validate_config can check
+every `table.column` reference in snippets, join specs, and column_configs
+with one dictionary lookup. It can be built from:
+  - {identifier: [column names or {"name": ...} dicts]}
+  - discover_resources.py Part 2 review results (`all_results`)
+  - discover_resources.py's audit cache file (audit_cache_path), offline
+  - a JSON fixture written by save_fixture() (or any {identifier: [columns]} JSON)
+
+load_table_metadata() accepts any of these (a file path for the last two),
+so `table_columns` in validate_config.py and --table-metadata in
+validate_batch.py take whichever is at hand. Tables missing from the
+metadata are not checked, so a partial snapshot never causes false errors.
+
+Usage:
+    from table_metadata import TableMetadata, load_table_metadata
+
+    metadata = TableMetadata.from_audit_results(all_results)
+    metadata.save_fixture("catalog_snapshot.json")   # commit it, validate offline in CI
+    metadata = load_table_metadata("catalog_snapshot.json")
+    metadata.has_column("catalog.schema.orders", "amount")   # True, False, or None (table unknown)
+"""
+
+import difflib
+import json
+import os
+
+FIXTURE_FORMAT = 1
+REVIEW_KEY_PREFIX = "review:"
+
+
+class TableMetadata:
+    """Column names per table, keyed case-insensitively."""
+
+    def __init__(self, tables: dict = None):
+        self.tables = {}  # lowercased identifier -> {lowercased column name: column name}
+        self.identifiers = {}  # lowercased identifier -> identifier as given
+        for identifier, columns in (tables or {}).items():
+            self.add_table(identifier, columns)
+
+    def add_table(self, identifier: str, columns: list):
+        names = [c.get("name", "") if isinstance(c, dict) else c for c in columns]
+        self.tables[identifier.lower()] = {name.lower(): name for name in names if isinstance(name, str) and name}
+        self.identifiers[identifier.lower()] = identifier
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def __bool__(self) -> bool:
+        return bool(self.tables)
+
+    # --- Lookups ---
+
+    def columns(self, identifier: str):
+        """{lowercased column name: column name} for a table, or None if the table is unknown."""
+        return self.tables.get(identifier.lower())
+
+    def has_table(self, identifier: str) -> bool:
+        return identifier.lower() in self.tables
+
+    def has_column(self, identifier: str, column: str):
+        """True/False for a known table, None if the table's columns aren't known."""
+        columns = self.tables.get(identifier.lower())
+        return None if columns is None else column.lower() in columns
+
+    def suggest(self, identifier: str, column: str):
+        """Closest real column name to a misspelled one, or None."""
+        columns = self.tables.get(identifier.lower()) or {}
+        close = difflib.get_close_matches(column.lower(), columns, n=1)
+        return columns[close[0]] if close else None
+
+    # --- Sources ---
+
+    @classmethod
+    def from_audit_results(cls, results: list) -> "TableMetadata":
+        """From discover_resources.py review results; inaccessible tables are left out."""
+        return cls({r["table"]: r["columns"] for r in results if r.get("exists")})
+
+    @classmethod
+    def from_audit_cache(cls, data: dict) -> "TableMetadata":
+        """From the contents of discover_resources.py's audit cache file (review entries only)."""
+        return cls.from_audit_results([
+            entry["value"] for key, entry in data.get("entries", {}).items()
+            if key.startswith(REVIEW_KEY_PREFIX) and isinstance(entry.get("value"), dict)
+        ])
+
+    @classmethod
+    def from_fixture(cls, data: dict) -> "TableMetadata":
+        """From save_fixture() output, or a bare {identifier: [columns]} mapping."""
+        return cls(data["tables"] if data.get("format") == FIXTURE_FORMAT else data)
+
+    def save_fixture(self, path: str):
+        """Write the metadata as JSON for offline validation; load it with load_table_metadata(path)."""
+        tables = {self.identifiers[key]: sorted(columns.values()) for key, columns in sorted(self.tables.items())}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"format": FIXTURE_FORMAT, "tables": tables}, f, indent=1)
+        os.replace(tmp_path, path)
+
+
+def load_table_metadata(source):
+    """
+    TableMetadata from a TableMetadata, a {identifier: [columns]} dict, review
+    results, or the path of a fixture or audit cache file. None or an empty
+    source gives None (no column checks).
+    """
+    if not source:
+        return None
+    if isinstance(source, TableMetadata):
+        return source
+    if isinstance(source, list):
+        return TableMetadata.from_audit_results(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source) as f:
+            data = json.load(f)
+        if isinstance(data, dict) and "entries" in data:
+            return TableMetadata.from_audit_cache(data)
+        return TableMetadata.from_fixture(data)
+    return TableMetadata(source)
@@ -0,0 +1,305 @@
+"""
+Lightweight timing spans for the scripts.
+
+Tracing is off unless the GENIE_TRACE environment variable is set (to
+anything but "0"/"false") or enable_tracing() is called. While it is off,
+span() returns a shared no-op span and @traced functions run unwrapped apart
+from one flag check, so instrumented code costs next to nothing.
+
+While it is on, each span records its name, attributes, parent span, start
+time and duration (and the exception, if one escaped it). Spans nest per
+thread; spans started in a worker thread are roots unless given `parent=`.
+finish_tracing() prints a summary table (count, total, mean, p95, max per
+span name) and, if a path is given or GENIE_TRACE_FILE is set, exports the
+spans — as JSON lines for a .jsonl path, otherwise as OpenTelemetry (OTLP)
+JSON that collectors and trace viewers can import.
+
+Usage:
+    from tracing import enable_tracing, finish_tracing, span, traced
+
+    enable_tracing()
+    with span("discover.part2", tables=len(tables)):
+        ...
+
+    @traced("discover.review_table", attribute="table")
+    def review_table(table_identifier): ...
+
+    finish_tracing("/tmp/genie_trace.jsonl")
+"""
+
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+
+TRACE_ENV = "GENIE_TRACE"
+TRACE_FILE_ENV = "GENIE_TRACE_FILE"
+SERVICE_NAME = "prompt-to-genie"
+
+
+class Span:
+    """One timed operation. Use as a context manager, or call end() on a span from start_span()."""
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attributes", "error", "token")
+
+    def __init__(self, tracer, name: str, attributes: dict, parent=None):
+        self.tracer = tracer
+        self.name = name
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.attributes = attributes
+        self.error = None
+        self.token = None
+        self.end_ns = None
+        self.start_ns = time.time_ns()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer.finished(self)
+
+    def __enter__(self):
+        self.token = self.tracer.current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.current.reset(self.token)
+        self.end()
+        return False
+
+    @property
+    def seconds(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ns / 1e9,
+            "seconds": round(self.seconds, 6),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class NoopSpan:
+    """Stand-in returned while tracing is off."""
+
+    __slots__ = ()
+    span_id = None
+    trace_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Tracer:
+    """Collects finished spans in memory (thread-safe)."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.spans = []
+        self.lock = threading.Lock()
+        self.current = contextvars.ContextVar("genie_trace_span", default=None)
+
+    def span(self, name: str, parent=None, **attributes):
+        """Context-manager span, nested under the current span (or `parent`)."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes, parent or self.current.get())
+
+    def start_span(self, name: str, parent=None, **attributes):
+        """Span for code that can't be wrapped in a with block; call end() on it (not made current)."""
+        return self.span(name, parent, **attributes)
+
+    def record(self, name: str, seconds: float, start_ns: int = None, parent=None, **attributes):
+        """Add an already measured duration (e.g. a rule's total time across many calls) as a span."""
+        if not self.enabled:
+            return
+        record = Span(self, name, attributes, parent or self.current.get())
+        if start_ns is not None:
+            record.start_ns = start_ns
+        record.end_ns = record.start_ns + int(seconds * 1e9)
+        self.finished(record)
+
+    def finished(self, record: Span):
+        with self.lock:
+            self.spans.append(record)
+
+    def reset(self):
+        with self.lock:
+            self.spans = []
+
+    # --- Summary ---
+
+    def summary(self) -> list[dict]:
+        """{"name", "count", "errors", "total", "mean", "p95", "max"} per span name, by total time."""
+        by_name = {}
+        with self.lock:
+            for record in self.spans:
+                by_name.setdefault(record.name, []).append(record)
+        rows = []
+        for name, records in by_name.items():
+            durations = sorted(r.seconds for r in records)
+            total = sum(durations)
+            rows.append({
+                "name": name,
+                "count": len(durations),
+                "errors": sum(1 for r in records if r.error),
+                "total": total,
+                "mean": total / len(durations),
+                "p95": durations[max(0, round(0.95 * len(durations)) - 1)],
+                "max": durations[-1],
+            })
+        return sorted(rows, key=lambda r: -r["total"])
+
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        print(f"\n{'=' * 70}")
+        print("TIMING SUMMARY")
+        print(f"{'=' * 70}")
+        print(f"  {'Span':<44} {'Count':>6} {'Total s':>9} {'Mean ms':>9} {'p95 ms':>9} {'Max ms':>9}")
+        print(f"  {'─' * 44} {'─' * 6} {'─' * 9} {'─' * 9} {'─' * 9} {'─' * 9}")
+        for r in rows:
+            name = r["name"] if len(r["name"]) <= 44 else r["name"][:43] + "…"
+            errors = f"  ✗ {r['errors']} failed" if r["errors"] else ""
+            print(f"  {name:<44} {r['count']:>6} {r['total']:>9.2f} {r['mean'] * 1e3:>9.1f} "
+                  f"{r['p95'] * 1e3:>9.1f} {r['max'] * 1e3:>9.1f}{errors}")
+
+    # --- Export ---
+
+    def export_jsonl(self, path: str):
+        """One JSON object per span (see Span.to_dict)."""
+        with self.lock:
+            records = list(self.spans)
+        with open(path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record.to_dict(), default=str) + "\n")
+
+    def to_otlp(self) -> dict:
+        """Spans as an OTLP/JSON ExportTraceServiceRequest."""
+        with self.lock:
+            records = list(self.spans)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "genie.tracing"},
+                "spans": [
+                    {
+                        "traceId": r.trace_id,
+                        "spanId": r.span_id,
+                        **({"parentSpanId": r.parent_id} if r.parent_id else {}),
+                        "name": r.name,
+                        "kind": 1,
+                        "startTimeUnixNano": str(r.start_ns),
+                        "endTimeUnixNano": str(r.end_ns),
+                        "attributes": [otlp_attribute(k, v) for k, v in r.attributes.items()],
+                        "status": {"code": 2, "message": r.error} if r.error else {"code": 1},
+                    }
+                    for r in records
+                ],
+            }],
+        }]}
+
+    def export_otlp(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_otlp(), f)
+
+    def export(self, path: str):
+        """JSON lines for a .jsonl path, OTLP JSON otherwise."""
+        if path.endswith(".jsonl"):
+            self.export_jsonl(path)
+        else:
+            self.export_otlp(path)
+
+
+def otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": value if isinstance(value, str) else json.dumps(value, default=str)}
+    return {"key": key, "value": typed}
+
+
+TRACER = Tracer(enabled=os.environ.get(TRACE_ENV, "").lower() not in ("", "0", "false"))
+
+
+def span(name: str, parent=None, **attributes):
+    """TRACER.span — a context-manager span (a no-op while tracing is off)."""
+    if not TRACER.enabled:
+        return NOOP_SPAN
+    return TRACER.span(name, parent, **attributes)
+
+
+def start_span(name: str, parent=None, **attributes):
+    return TRACER.start_span(name, parent, **attributes)
+
+
+def traced(name: str, attribute: str = None):
+    """
+    Decorator wrapping each call in a span; with `attribute`, the first
+    argument is recorded under that attribute name (e.g. the table).
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return fn(*args, **kwargs)
+            attributes = {attribute: str(args[0])} if attribute and args else {}
+            with TRACER.span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def tracing_enabled() -> bool:
+    return TRACER.enabled
+
+
+def enable_tracing(enabled: bool = True):
+    TRACER.enabled = enabled
+
+
+def finish_tracing(path: str = None):
+    """
+    Print the summary table, export to `path` (or GENIE_TRACE_FILE) if set,
+    and clear the recorded spans. Does nothing while tracing is off.
+    """
+    if not TRACER.enabled:
+        return
+    TRACER.print_summary()
+    path = path or os.environ.get(TRACE_FILE_ENV)
+    if path:
+        TRACER.export(path)
+        print(f"\n  Trace written to {path}")
+    TRACER.reset()
@@ -0,0 +1,288 @@
+"""
+Validate many Genie space serialized_space JSON files from the command line.
+
+Runs validate_config from validate_config.py over files, directories, and
+glob patterns in a process pool, reports issues as text, JSON, or JUnit XML,
+and exits non-zero when any file has errors. Files whose content and
+validator version match a previous run with no errors are not re-validated;
+their warnings are replayed from the cache.
+
+Usage:
+    python scripts/validate_batch.py "spaces/**/*.json"
+    python scripts/validate_batch.py spaces/ --format junit --output validation.xml
+    python scripts/validate_batch.py big_export.json --stream --no-cache
+    python scripts/validate_batch.py spaces/ --token-budget 30000
+    python scripts/validate_batch.py spaces/ --table-metadata catalog_snapshot.json
+"""
+
+import argparse
+import functools
+import glob
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+from table_metadata import load_table_metadata
+from validate_config import estimate_token_budget, validate_config, validate_config_stream
+
+DEFAULT_CACHE_PATH = ".genie_validate_cache.json"
+
+# Modules whose source decides validate_config's output; editing any of them
+# expires cached results
+VALIDATOR_MODULES = ("validate_config", "sql_analyzer", "space_model", "table_metadata")
+
+
+def expand_paths(patterns: list) -> list:
+    """Files matched by paths, directories (their *.json files, recursively), and globs, deduplicated in order."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "**", "*.json"), recursive=True))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+        paths.extend(m for m in matches if not os.path.isdir(m))
+    return list(dict.fromkeys(os.path.normpath(p) for p in paths))
+
+
+def validator_fingerprint() -> str:
+    """Hash of the validator modules' source, so cached results expire when the rules change."""
+    digest = hashlib.sha256()
+    for name in VALIDATOR_MODULES:
+        with open(importlib.import_module(name).__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=4)
+def cached_table_metadata(path: str):
+    """A table metadata file, loaded once per worker process."""
+    return load_table_metadata(path)
+
+
+def validate_file(path: str, similarity_mode: str = "auto", stream: bool = False,
+                  token_budget: int = None, table_metadata_path: str = None) -> dict:
+    """
+    Validate one file; unreadable or malformed files are reported as a single error.
+    With token_budget, a config whose estimated model tokens exceed it gets an error too.
+    With table_metadata_path (a table_metadata.py fixture or audit cache file),
+    column names are checked against the real table columns.
+    """
+    start = time.perf_counter()
+    try:
+        table_columns = cached_table_metadata(table_metadata_path) if table_metadata_path else None
+        if stream:
+            with open(path, encoding="utf-8") as f:
+                issues = list(validate_config_stream(f, similarity_mode, table_columns=table_columns))
+        else:
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+            if not isinstance(config, dict):
+                raise ValueError(f"top-level JSON value must be an object, got {type(config).__name__}")
+            issues = validate_config(config, similarity_mode=similarity_mode, table_columns=table_columns)
+            if token_budget is not None:
+                issues.extend(estimate_token_budget(config, token_budget)["issues"])
+    except (OSError, ValueError) as e:
+        issues = [{"level": "error", "path": "", "message": f"Could not read config — {e}"}]
+    except Exception as e:
+        # Structurally malformed configs can trip a check; report instead of failing the batch
+        issues = [{"level": "error", "path": "", "message": f"Validation failed — {type(e).__name__}: {e}"}]
+    return {
+        "path": path,
+        "cached": False,
+        "seconds": round(time.perf_counter() - start, 3),
+        "errors": sum(1 for i in issues if i["level"] == "error"),
+        "warnings": sum(1 for i in issues if i["level"] == "warning"),
+        "issues": issues,
+    }
+
+
+def validate_file_args(args: tuple) -> dict:
+    return validate_file(*args)
+
+
+def load_cache(path: str, fingerprint: str) -> dict:
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get("files", {}) if data.get("validator") == fingerprint else {}
+
+
+def save_cache(path: str, fingerprint: str, entries: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"validator": fingerprint, "files": entries}, f)
+    os.replace(tmp_path, path)
+
+
+def validate_files(paths: list, similarity_mode: str = "auto", stream: bool = False,
+                   workers: int = None, cache_path: str = DEFAULT_CACHE_PATH, token_budget: int = None,
+                   table_metadata_path: str = None) -> list[dict]:
+    """
+    Validate files in a process pool, returning one result per path in input order.
+
+    With cache_path, files with no errors are recorded by content hash; a later
+    run reuses their result while the file, the VALIDATOR_MODULES, and the table
+    metadata file (if any) are unchanged.
+    """
+    fingerprint = validator_fingerprint() if cache_path else None
+    cache = load_cache(cache_path, fingerprint) if cache_path else {}
+    metadata_digest = file_digest(table_metadata_path) if table_metadata_path else None
+
+    results = {}
+    digests = {}
+    todo = []
+    for path in paths:
+        try:
+            digests[path] = file_digest(path)
+        except OSError:
+            digests[path] = None
+        if digests[path] and token_budget is not None:
+            # A clean result only holds for the budget it was checked against
+            digests[path] += f":tokens<={token_budget}"
+        if digests[path] and metadata_digest:
+            digests[path] += f":columns={metadata_digest}"
+        entry = cache.get(digests[path]) if digests[path] else None
+        if entry is not None:
+            results[path] = {**entry, "path": path, "cached": True, "seconds": 0.0}
+        else:
+            todo.append(path)
+
+    jobs = [(path, similarity_mode, stream, token_budget, table_metadata_path) for path in todo]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    if workers == 1:
+        fresh = map(validate_file_args, jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        fresh = pool.map(validate_file_args, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+    try:
+        for result in fresh:
+            results[result["path"]] = result
+    finally:
+        if workers > 1:
+            pool.shutdown()
+
+    if cache_path:
+        for path in todo:
+            result = results[path]
+            if digests[path] and not result["errors"]:
+                cache[digests[path]] = {k: result[k] for k in ("errors", "warnings", "issues")}
+        save_cache(cache_path, fingerprint, cache)
+    return [results[path] for path in paths]
+
+
+def format_text(results: list) -> str:
+    lines = []
+    for r in results:
+        mark = "✗" if r["errors"] else "✓"
+        note = " (cached)" if r["cached"] else ""
+        lines.append(f"{mark} {r['path']}: {r['errors']} error(s), {r['warnings']} warning(s){note}")
+        for issue in r["issues"]:
+            if issue["level"] == "error":
+                lines.append(f"    ✗ [{issue['path']}] {issue['message']}")
+    return "\n".join(lines)
+
+
+def format_json(results: list) -> str:
+    return json.dumps({"summary": summarize(results), "files": results}, indent=2)
+
+
+def format_junit(results: list) -> str:
+    """One testcase per file; errors become a failure, warnings go to system-out."""
+    summary = summarize(results)
+    suite = ET.Element("testsuite", {
+        "name": "validate_config",
+        "tests": str(summary["files"]),
+        "failures": str(summary["files_with_errors"]),
+        "errors": "0",
+        "skipped": "0",
+        "time": f"{sum(r['seconds'] for r in results):.3f}",
+    })
+    for r in results:
+        case = ET.SubElement(suite, "testcase", {"classname": "validate_config", "name": r["path"], "time": f"{r['seconds']:.3f}"})
+        errors = [i for i in r["issues"] if i["level"] == "error"]
+        warnings = [i for i in r["issues"] if i["level"] == "warning"]
+        if errors:
+            failure = ET.SubElement(case, "failure", {"message": f"{len(errors)} error(s)", "type": "ValidationError"})
+            failure.text = "\n".join(f"[{i['path']}] {i['message']}" for i in errors)
+        if warnings:
+            ET.SubElement(case, "system-out").text = "\n".join(f"[{i['path']}] {i['message']}" for i in warnings)
+    return ET.tostring(suite, encoding="unicode", xml_declaration=True)
+
+
+def summarize(results: list) -> dict:
+    return {
+        "files": len(results),
+        "files_with_errors": sum(1 for r in results if r["errors"]),
+        "errors": sum(r["errors"] for r in results),
+        "warnings": sum(r["warnings"] for r in results),
+        "cached": sum(1 for r in results if r["cached"]),
+    }
+
+
+FORMATTERS = {"text": format_text, "json": format_json, "junit": format_junit}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Validate Genie space serialized_space JSON files.")
+    parser.add_argument("paths", nargs="+", help="JSON files, directories, or glob patterns")
+    parser.add_argument("--format", choices=sorted(FORMATTERS), default="text", help="report format (default: text)")
+    parser.add_argument("--output", help="write the report to this file instead of stdout")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--similarity-mode", choices=("auto", "exact", "indexed"), default="auto")
+    parser.add_argument("--stream", action="store_true", help="stream each file instead of loading it whole")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help=f"cache of clean results (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--no-cache", action="store_true", help="re-validate every file")
+    parser.add_argument("--token-budget", type=int, default=None,
+                        help="fail files whose estimated model tokens exceed this budget")
+    parser.add_argument("--table-metadata", default=None,
+                        help="table_metadata.py fixture or discover_resources.py audit cache file to check column names against")
+    args = parser.parse_args(argv)
+    if args.stream and args.token_budget is not None:
+        parser.error("--token-budget needs the whole config and can't be combined with --stream")
+    if args.table_metadata and not os.path.isfile(args.table_metadata):
+        parser.error(f"table metadata file not found: {args.table_metadata}")
+
+    paths = expand_paths(args.paths)
+    if not paths:
+        parser.error("no files matched")
+
+    results = validate_files(
+        paths, similarity_mode=args.similarity_mode, stream=args.stream,
+        workers=args.workers, cache_path=None if args.no_cache else args.cache, token_budget=args.token_budget,
+        table_metadata_path=args.table_metadata,
+    )
+    report = FORMATTERS[args.format](results)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+    summary = summarize(results)
+    print(
+        f"{summary['files']} file(s): {summary['files_with_errors']} with errors, "
+        f"{summary['errors']} error(s), {summary['warnings']} warning(s), {summary['cached']} cached",
+        file=sys.stderr,
+    )
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,13 +12,44 @@ Checks all validation rules enforced by the API:
   - Array size limits (10,000 items)
   - Required fields and structure
 
+validate_config_single_pass is a rule engine that walks the config once and
+dispatches each node to the rules registered for its path. It can also
+re-check only selected sections of an edited config (see manage_space.py Part 2).
+validate_config_stream validates a large JSON file item by item as it is read,
+yielding issues as they are found (set `config_json_path`).
+estimate_token_budget approximates the tokens each table, column, SQL
+expression, example SQL, and text instruction adds, flagging the heaviest.
+Snippet SQL is parsed by sql_analyzer.py; with `table_columns` (or
+discover_resources.py's audit results in the same notebook) every column
+reference in snippets and join specs, and every column_configs column_name,
+is also checked against the table's real columns (see table_metadata.py —
+a saved fixture or audit cache file works offline).
+
 Usage: Run this in a Databricks notebook cell.
        Set `config` to your serialized_space dict (parsed JSON, not a string).
        Or set `config_json_string` to your raw JSON string.
+       Or set `config_json_path` to stream a large exported JSON file.
+       Set `token_budget` to fail configs whose estimated model tokens exceed it.
+       Set `table_columns` to check snippet, join spec and column_configs columns
+       against the real table columns.
+       Set `run_benchmark = True` to time the validator on a synthetic config.
+       Set GENIE_TRACE=1 (or call tracing.enable_tracing()) to time each rule.
 """
 
+import hashlib
 import json
+import math
+import os
 import re
+import time
+from collections import Counter
+
+# space_model.py, sql_analyzer.py, table_metadata.py, and tracing.py live next
+# to this script; in a notebook outside scripts/, add that folder to sys.path first
+from space_model import SNIPPET_TYPES, SpaceModel, table_names
+from sql_analyzer import parse_sql_expression, resolve_column_ref
+from table_metadata import load_table_metadata
+from tracing import TRACER, finish_tracing, span, tracing_enabled
 
 # --- CONFIGURE: paste your config here ---
 
@@ -39,6 +70,31 @@ config_json_string = None
 # )
 # config = json.loads(resp.get("serialized_space", "{}"))
 
+# Option D: Stream a large exported JSON file — items are validated as they are
+# read and issues printed as they are found, without loading the whole file
+config_json_path = None
+
+# Near-duplicate example SQL detection: "auto", "exact" (compare every pair),
+# or "indexed" (hash + inverted token index; same results, sub-quadratic)
+similarity_mode = "auto"
+
+# Approximate token budget for the text Genie sends to the model; exceeding it
+# is reported as an error. None only reports the estimate.
+token_budget = None
+
+# Cache per-item token counts by content hash across runs (None keeps them in memory)
+token_cache_path = None
+
+# Real columns per table, to check snippet, join spec and column_configs
+# column names against: {"catalog.schema.table": ["col_a", "col_b"]}, or the
+# path of a table_metadata.py fixture or discover_resources.py audit cache file
+# (no warehouse needed). When run in the same notebook as discover_resources.py,
+# its audit results (`all_results`) are used.
+table_columns = None
+
+# Set to True to benchmark the validator and similarity modes on synthetic configs
+run_benchmark = False
+
 
 # =====================================================================
 # VALIDATION LOGIC
@@ -50,752 +106,1821 @@ TABLE_ID_PATTERN = re.compile(r"^[^.]+\.[^.]+\.[^.]+$")
 MAX_STRING_LENGTH = 25_000
 MAX_ARRAY_SIZE = 10_000
 
+# Precompiled pattern table — no rule compiles or looks up a pattern string
+# inside a per-item loop.
+STRING_LITERAL_PATTERN = re.compile(r"'[^']*'")
+NUMERIC_LITERAL_PATTERN = re.compile(r'\b\d+\.?\d*\b')
+WHERE_PREFIX_PATTERN = re.compile(r'^\s*WHERE\s+', re.IGNORECASE)
+AND_OR_PATTERN = re.compile(r'\b(AND|OR)\b', re.IGNORECASE)
+JAMMED_SENTENCE_PATTERN = re.compile(r'[a-z?.!]([A-Z][a-z])')
+JAMMED_KEYWORD_PATTERN = re.compile(r'[a-z0-9_)][A-Z]{2,}')
+PARAMETER_PATTERN = re.compile(r':\w+')
+HARDCODED_FILTER_PATTERN = re.compile(r"=\s*'([^']+)'")
+
+VALID_RT_TYPES = {
+    "--rt=FROM_RELATIONSHIP_TYPE_MANY_TO_ONE--",
+    "--rt=FROM_RELATIONSHIP_TYPE_ONE_TO_MANY--",
+    "--rt=FROM_RELATIONSHIP_TYPE_ONE_TO_ONE--",
+    "--rt=FROM_RELATIONSHIP_TYPE_MANY_TO_MANY--",
+}
+
+# Placeholder/stale text patterns in text instructions
+STALE_PATTERNS = [
+    ("todo", "Contains TODO marker — may be a draft instruction"),
+    ("fixme", "Contains FIXME marker — may be incomplete"),
+    ("placeholder", "Contains 'placeholder' — may not be finalized"),
+    ("change this", "Contains 'change this' — may be a template reminder"),
+    ("update this", "Contains 'update this' — may be a template reminder"),
+    ("# comment", "Contains comment syntax — should be plain text instructions"),
+    ("//", "Contains comment syntax — should be plain text instructions"),
+]
+
+# Clause keywords that must not be jammed against the previous token in example SQL
+SQL_CLAUSE_KEYWORDS = {"SELECT", "FROM", "WHERE", "JOIN", "LEFT", "RIGHT", "INNER",
+                       "OUTER", "CROSS", "GROUP", "ORDER", "HAVING", "LIMIT", "UNION",
+                       "INSERT", "UPDATE", "DELETE", "CREATE", "WITH", "CASE", "WHEN"}
+JAMMED_CLAUSE_KEYWORD_PATTERN = re.compile("|".join(sorted(SQL_CLAUSE_KEYWORDS)))
+
+
+def normalize_sql(sql_parts):
+    """Normalize SQL by replacing literals with placeholders for comparison."""
+    full = " ".join("".join(sql_parts).split())  # collapse whitespace
+    full = full.upper()
+    # Replace string literals
+    full = STRING_LITERAL_PATTERN.sub("'?'", full)
+    # Replace numeric literals (but not in column names)
+    full = NUMERIC_LITERAL_PATTERN.sub('?', full)
+    return full
+
+
+def question_words(q_list):
+    """Lowercased word set across all phrasings of a question."""
+    words = set()
+    for q in q_list:
+        words.update(q.lower().split())
+    return words
+
+
+def word_set_similarity(words1, words2):
+    """Word-level Jaccard similarity between two word sets."""
+    if not words1 or not words2:
+        return 0.0
+    intersection = words1 & words2
+    union = words1 | words2
+    return len(intersection) / len(union)
+
+
+# --- Near-duplicate example SQL detection ---
+
+SIMILAR_QUESTION_THRESHOLD = 0.7
+# "auto" similarity mode compares every pair up to this many example SQLs
+EXACT_SIMILARITY_MAX_QUERIES = 200
+
+
+def find_similar_example_sqls(signatures, similarity_mode="auto"):
+    """
+    Find example SQL pairs that should be consolidated.
+
+    signatures: one (normalized_sql, question_words) tuple per example SQL.
+    similarity_mode: "exact" compares every pair, "indexed" uses hash and
+    inverted token indexes, "auto" picks exact for small configs. Both modes
+    return the same pairs.
+
+    Returns (param_candidates, similar_pairs): sorted (i, j) pairs with identical
+    SQL structure, and sorted (i, j, similarity) pairs whose questions are more
+    than SIMILAR_QUESTION_THRESHOLD similar but whose SQL differs.
+    """
+    if similarity_mode == "auto":
+        similarity_mode = "exact" if len(signatures) <= EXACT_SIMILARITY_MAX_QUERIES else "indexed"
+    if similarity_mode == "exact":
+        return find_similar_pairs_exact(signatures)
+    if similarity_mode == "indexed":
+        return find_similar_pairs_indexed(signatures)
+    raise ValueError(f"Unknown similarity mode '{similarity_mode}'. Use 'auto', 'exact' or 'indexed'.")
+
+
+def find_similar_pairs_exact(signatures):
+    """Compare every pair of signatures. O(n²) — fine for small configs."""
+    param_candidates = []
+    similar_pairs = []
+    for i in range(len(signatures)):
+        norm_i, words_i = signatures[i]
+        for j in range(i + 1, len(signatures)):
+            norm_j, words_j = signatures[j]
+            # Identical SQL structure (only literals differ)
+            if norm_i == norm_j:
+                param_candidates.append((i, j))
+            # High question similarity with different SQL
+            else:
+                q_sim = word_set_similarity(words_i, words_j)
+                if q_sim > SIMILAR_QUESTION_THRESHOLD:
+                    similar_pairs.append((i, j, q_sim))
+    return param_candidates, similar_pairs
+
+
+def find_similar_pairs_indexed(signatures):
+    """
+    Find the same pairs as find_similar_pairs_exact without comparing every pair.
+
+    Identical SQL structures are grouped through a hash index on the normalized
+    SQL. Similar questions are found through an inverted index over each word
+    set's prefix (rarest words first): two sets with Jaccard similarity >= t
+    must share a word within their first len - ceil(t * len) + 1 words, so only
+    pairs sharing a prefix word are scored. The result is exact, not approximate.
+    """
+    groups = {}
+    for i, (norm, _) in enumerate(signatures):
+        groups.setdefault(norm, []).append(i)
+    param_candidates = sorted(
+        (group[a], group[b])
+        for group in groups.values() if len(group) > 1
+        for a in range(len(group))
+        for b in range(a + 1, len(group))
+    )
+
+    doc_freq = Counter(word for _, words in signatures for word in words)
+    token_index = {}  # word -> indexes of earlier signatures with the word in their prefix
+    similar_pairs = []
+    for i, (norm_i, words_i) in enumerate(signatures):
+        if not words_i:
+            continue
+        size = len(words_i)
+        # Subtract a tiny epsilon so float error can only lengthen the prefix
+        prefix_len = size - math.ceil(SIMILAR_QUESTION_THRESHOLD * size - 1e-9) + 1
+        prefix = sorted(words_i, key=lambda w: (doc_freq[w], w))[:prefix_len]
+        candidates = set()
+        for word in prefix:
+            postings = token_index.setdefault(word, [])
+            candidates.update(postings)
+            postings.append(i)
+        for j in candidates:
+            norm_j, words_j = signatures[j]
+            if norm_j == norm_i:
+                continue
+            # Length filter: Jaccard can't exceed min/max of the set sizes
+            if min(size, len(words_j)) <= SIMILAR_QUESTION_THRESHOLD * max(size, len(words_j)):
+                continue
+            q_sim = word_set_similarity(words_j, words_i)
+            if q_sim > SIMILAR_QUESTION_THRESHOLD:
+                similar_pairs.append((j, i, q_sim))
+    similar_pairs.sort()
+    return param_candidates, similar_pairs
+
+
+def report_similar_example_sqls(example_sqls, param_candidates, similar_pairs, warning):
+    """Emit parameterization and near-duplicate warnings for example SQL pairs."""
+    for i, j in param_candidates:
+        q_i = example_sqls[i].get("question", [""])[0][:60]
+        q_j = example_sqls[j].get("question", [""])[0][:60]
+        warning(
+            f"instructions.example_question_sqls[{i}] & [{j}]",
+            f"These queries have identical SQL structure — consolidate into one parameterized query using :parameter syntax.\n"
+            f"      Query {i}: \"{q_i}\"\n"
+            f"      Query {j}: \"{q_j}\""
+        )
+
+    for i, j, sim in similar_pairs:
+        q_i = example_sqls[i].get("question", [""])[0][:60]
+        q_j = example_sqls[j].get("question", [""])[0][:60]
+        warning(
+            f"instructions.example_question_sqls[{i}] & [{j}]",
+            f"Questions are {int(sim*100)}% similar but SQL differs — review if these can be merged or if one is redundant.\n"
+            f"      Query {i}: \"{q_i}\"\n"
+            f"      Query {j}: \"{q_j}\""
+        )
+
+
+def snippet_bare_column_warning(parsed):
+    """Warning for a snippet whose SQL references a column without its table, or None."""
+    bare = [parts[0] for parts in parsed.column_refs if len(parts) == 1]
+    if not bare:
+        return None
+    return (
+        f"Column '{bare[0]}' is not table-qualified (e.g., 'table_name.column'). "
+        f"The Genie UI requires table-qualified references — bare column names "
+        f"will be rejected with 'Table name or alias is required'. "
+        f"Use table_name.column_name format."
+    )
+
+
+def snippet_parse_warning(parsed):
+    """Warning for snippet SQL the analyzer couldn't tokenize or balance, or None."""
+    if not parsed.errors:
+        return None
+    return (
+        f"SQL expression doesn't parse ({'; '.join(parsed.errors)}). "
+        f"Check quoting and parentheses — Genie rejects expressions that aren't valid SQL."
+    )
 
-def validate_config(config: dict) -> list[dict]:
+
+def unknown_column_message(identifier: str, name: str, metadata) -> str:
+    suggestion = metadata.suggest(identifier, name)
+    return (
+        f"Column '{name}' not found in {identifier}."
+        + (f" Did you mean '{suggestion}'?" if suggestion else "")
+        + " Check for typos in the column name."
+    )
+
+
+def snippet_reference_errors(parsed, tables, metadata, known_display) -> list[str]:
+    """
+    Errors for qualified column references in a snippet that don't resolve.
+
+    tables: {lowercased known table name: identifier}; metadata: the real
+    table columns (a TableMetadata, or None). A table prefix missing from
+    data_sources is always reported; an unknown column only for tables whose
+    columns are known. Each unknown table or column is reported once per snippet.
+    """
+    messages = []
+    reported = set()
+    for parts in parsed.column_refs:
+        if len(parts) == 1:
+            continue
+        identifier, name = resolve_column_ref(parts, tables)
+        if identifier is None:
+            if name.lower() not in reported:
+                reported.add(name.lower())
+                messages.append(
+                    f"Table reference '{name}' not found in data_sources. "
+                    f"Known tables: {known_display}. "
+                    f"Check for typos in the table name prefix."
+                )
+            continue
+        key = (identifier, name.lower())
+        if metadata is None or name == "*" or key in reported or metadata.has_column(identifier, name) is not False:
+            continue
+        reported.add(key)
+        messages.append(unknown_column_message(identifier, name, metadata))
+    return messages
+
+
+def join_spec_column_errors(js: dict, metadata) -> list[str]:
+    """
+    Errors for columns in a join spec's condition that its left/right tables
+    don't have. References resolve through the sides' aliases, short names and
+    identifiers; tables whose columns aren't known are skipped.
+    """
+    tables = {}
+    for side in ("left", "right"):
+        side_obj = js.get(side)
+        if not isinstance(side_obj, dict) or not isinstance(side_obj.get("identifier"), str):
+            continue
+        identifier = side_obj["identifier"]
+        for name in (side_obj.get("alias"), *table_names(identifier)):
+            if isinstance(name, str) and name:
+                tables.setdefault(name.lower(), identifier)
+    sql = js.get("sql")
+    if not tables or not isinstance(sql, list):
+        return []
+    parsed = parse_sql_expression(" ".join(s for s in sql if isinstance(s, str) and not s.startswith("--rt=")))
+    messages = []
+    reported = set()
+    for parts in parsed.column_refs:
+        if len(parts) == 1:
+            continue
+        identifier, name = resolve_column_ref(parts, tables)
+        key = (identifier, name.lower())
+        if identifier is None or name == "*" or key in reported or metadata.has_column(identifier, name) is not False:
+            continue
+        reported.add(key)
+        messages.append(unknown_column_message(identifier, name, metadata))
+    return messages
+
+
+def column_config_warning(identifier, cc: dict, metadata):
+    """Warning for a column_configs entry naming a column its table doesn't have, or None."""
+    name = cc.get("column_name")
+    if not isinstance(identifier, str) or not isinstance(name, str) or metadata.has_column(identifier, name) is not False:
+        return None
+    suggestion = metadata.suggest(identifier, name)
+    return (
+        f"Column '{name}' not found in {identifier}."
+        + (f" Did you mean '{suggestion}'?" if suggestion else "")
+        + " This column config has no effect — fix the column_name or remove the entry."
+    )
+
+
+def validate_config(config: dict, similarity_mode: str = "auto", sections=None, table_columns=None) -> list[dict]:
     """
     Validate a serialized_space config dict.
 
+    similarity_mode: near-duplicate example SQL detection, see find_similar_example_sqls.
+    sections: optional array paths to validate (e.g. {"instructions.example_question_sqls"}),
+      see validate_config_single_pass.
+    table_columns: optional real columns per table — {identifier: [column names]},
+      discover_resources.py's `all_results`, a TableMetadata, or the path of a fixture or
+      audit cache file (see table_metadata.py); snippet and join spec column references and
+      column_configs column names are checked against them.
     Returns a list of issue dicts: {"level": "error"|"warning", "path": str, "message": str}
     Errors will cause API rejection. Warnings are best-practice recommendations.
     """
-    issues = []
-
-    def error(path, msg):
-        issues.append({"level": "error", "path": path, "message": msg})
+    with span("validate.config", sections=sorted(sections) if sections is not None else "all"):
+        return validate_config_single_pass(config, similarity_mode, sections, table_columns)
 
-    def warning(path, msg):
-        issues.append({"level": "warning", "path": path, "message": msg})
 
-    # --- Version ---
-    version = config.get("version")
-    if version is None:
-        error("version", "Missing required 'version' field. Use 2 for new spaces.")
-    elif version not in (1, 2):
-        warning("version", f"Version is {version}. Recommended value is 2.")
-
-    # --- Helper: validate ID ---
-    def check_id(path, id_val):
+# =====================================================================
+# SINGLE-PASS RULE ENGINE
+# =====================================================================
+# The config is walked once, in schema order. Each array is sent to the rules
+# registered for its path (e.g. "data_sources.tables"), each array item to the
+# rules registered for "<path>[]", and each array again to its exit rules once
+# all items have been visited. "$" is the config root. Rules write into
+# per-phase buckets that are concatenated in PHASES order, so issues come out
+# grouped by check in a fixed order regardless of walk order.
+
+PHASES = (
+    "version",
+    "sample_questions",
+    "tables",
+    "metric_views",
+    "text_instructions",
+    "example_question_sqls",
+    "sql_functions",
+    "join_specs",
+    "sql_snippets",
+    "snippet_table_refs",
+    "column_refs",
+    "benchmarks",
+    "question_id_uniqueness",
+    "instruction_id_uniqueness",
+    "instruction_budget",
+    "column_config_uniqueness",
+    "question_formatting",
+    "sql_formatting",
+    "similarity",
+    "hardcoded_filters",
+)
+PHASE_INDEX = {name: i for i, name in enumerate(PHASES)}
+
+# Top-level arrays, in the order they are walked
+WALK_ORDER = (
+    "config.sample_questions",
+    "data_sources.tables",
+    "data_sources.metric_views",
+    "instructions.text_instructions",
+    "instructions.example_question_sqls",
+    "instructions.sql_functions",
+    "instructions.join_specs",
+    "instructions.sql_snippets.filters",
+    "instructions.sql_snippets.expressions",
+    "instructions.sql_snippets.measures",
+    "benchmarks.questions",
+)
+
+# Sections whose checks read another section's items, and so are re-validated
+# whenever it changes (snippet table references resolve against data_sources)
+SECTION_DEPENDENTS = {
+    "data_sources.tables": tuple(f"instructions.sql_snippets.{t}" for t in SNIPPET_TYPES),
+    "data_sources.metric_views": tuple(f"instructions.sql_snippets.{t}" for t in SNIPPET_TYPES),
+}
+
+# Sections sharing the question ID namespace; other instruction sections share
+# the instruction ID namespace
+QUESTION_ID_SECTIONS = ("config.sample_questions", "benchmarks.questions")
+
+# Nested arrays walked inside each item of a top-level array
+CHILD_ARRAYS = {
+    "data_sources.tables[]": ("column_configs",),
+    "data_sources.metric_views[]": ("column_configs",),
+}
+
+RULES = {}
+EXIT_RULES = {}
+
+
+def rule(path, phase, on_exit=False):
+    """Register fn(ctx, node, path) for a node path, reporting into `phase`."""
+    registry = EXIT_RULES if on_exit else RULES
+
+    def register(fn):
+        registry.setdefault(path, []).append((PHASE_INDEX[phase], fn))
+        return fn
+
+    return register
+
+
+class ValidationContext:
+    """Issue buckets and cross-node state for one single-pass validation run."""
+
+    def __init__(self, similarity_mode="auto", table_columns=None):
+        self.similarity_mode = similarity_mode
+        self.table_metadata = load_table_metadata(table_columns)
+        self.buckets = [[] for _ in PHASES]
+        self.phase = 0
+        self.index = 0  # index of the item being visited within its array
+        self.parent = None  # item that owns the nested array being visited
+        self.arrays = {}  # top-level path -> array, for exit rules
+        self.question_ids = {}
+        self.instruction_ids = {}
+        self.col_config_keys = set()
+        self.known_table_names = set()
+        self.known_tables = {}  # lowercased known table name -> identifier
+        self.known_table_names_display = None
+        self.sqls_with_guidance = 0
+        self.example_sql_signatures = []
+        # rule name -> [phase, calls, seconds], only while tracing is on
+        self.rule_timings = {} if tracing_enabled() else None
+
+    def issues(self) -> list[dict]:
+        return [issue for bucket in self.buckets for issue in bucket]
+
+    def drain(self):
+        """Yield and clear the issues recorded since the last drain."""
+        for bucket in self.buckets:
+            yield from bucket
+            bucket.clear()
+
+    def error(self, path, msg, phase=None):
+        bucket = self.buckets[self.phase if phase is None else PHASE_INDEX[phase]]
+        bucket.append({"level": "error", "path": path, "message": msg})
+
+    def warning(self, path, msg, phase=None):
+        bucket = self.buckets[self.phase if phase is None else PHASE_INDEX[phase]]
+        bucket.append({"level": "warning", "path": path, "message": msg})
+
+    def check_id(self, path, id_val):
         if not isinstance(id_val, str):
-            error(path, f"ID must be a string, got {type(id_val).__name__}")
+            self.error(path, f"ID must be a string, got {type(id_val).__name__}")
             return False
         if not ID_PATTERN.match(id_val):
-            error(path, f"ID '{id_val}' is not a valid 32-character lowercase hex string")
+            self.error(path, f"ID '{id_val}' is not a valid 32-character lowercase hex string")
             return False
         return True
 
-    # --- Helper: validate sorting ---
-    def check_sorted(path, items, key_fn, key_name):
-        keys = [key_fn(item) for item in items]
-        for i in range(1, len(keys)):
-            if keys[i] < keys[i - 1]:
-                error(path, f"Array must be sorted by '{key_name}'. '{keys[i]}' comes after '{keys[i-1]}' but should come before it.")
+    def register_id(self, seen, id_val, path, phase):
+        """Record an ID for a uniqueness group, reporting duplicates into `phase`."""
+        if id_val in seen:
+            self.error(path, f"Duplicate ID '{id_val}' — also used at {seen[id_val]}", phase=phase)
+        else:
+            seen[id_val] = path
+
+    def check_sorted(self, path, items, key_fn, key_name):
+        prev = None
+        for i, item in enumerate(items):
+            key = key_fn(item)
+            if i and key < prev:
+                self.error(path, f"Array must be sorted by '{key_name}'. '{key}' comes after '{prev}' but should come before it.")
                 return False
+            prev = key
         return True
 
-    # --- Helper: validate string length ---
-    def check_string_length(path, val):
+    def check_string_length(self, path, val):
         if isinstance(val, str) and len(val) > MAX_STRING_LENGTH:
-            error(path, f"String exceeds {MAX_STRING_LENGTH} character limit (length: {len(val)})")
+            self.error(path, f"String exceeds {MAX_STRING_LENGTH} character limit (length: {len(val)})")
 
-    # --- Helper: validate array size ---
-    def check_array_size(path, arr):
+    def check_array_size(self, path, arr):
         if len(arr) > MAX_ARRAY_SIZE:
-            error(path, f"Array exceeds {MAX_ARRAY_SIZE} item limit (size: {len(arr)})")
+            self.error(path, f"Array exceeds {MAX_ARRAY_SIZE} item limit (size: {len(arr)})")
 
-    # --- Helper: validate string arrays ---
-    def check_string_array(path, arr):
+    def check_string_array(self, path, arr):
         if not isinstance(arr, list):
-            error(path, f"Expected array, got {type(arr).__name__}")
+            self.error(path, f"Expected array, got {type(arr).__name__}")
             return
         for i, item in enumerate(arr):
             if not isinstance(item, str):
-                error(f"{path}[{i}]", f"Expected string, got {type(item).__name__}")
+                self.error(f"{path}[{i}]", f"Expected string, got {type(item).__name__}")
             else:
-                check_string_length(f"{path}[{i}]", item)
+                self.check_string_length(f"{path}[{i}]", item)
 
-    # Collect all IDs for uniqueness checks
-    question_and_benchmark_ids = []
-    instruction_ids = []
+    def check_question_formatting(self, q_str, path):
+        """Check a single question string for concatenation issues."""
+        q_marks = q_str.count("?")
+        if q_marks > 1:
+            self.error(path, f"String contains {q_marks} question marks — likely multiple questions concatenated into one string. Split into separate entries, each with one question.")
+            return
+        jammed_sentences = JAMMED_SENTENCE_PATTERN.findall(q_str)
+        if jammed_sentences:
+            self.error(path, f"String appears to have multiple sentences concatenated without spaces (e.g., '...{q_str[max(0,q_str.find(jammed_sentences[0])-5):q_str.find(jammed_sentences[0])+10]}...'). Split into separate entries, each with one question.")
+            return
+        if len(q_str) > 200 and "?" not in q_str:
+            self.warning(path, f"Very long question string ({len(q_str)} chars) without a question mark — check formatting")
+
+
+def run_rules(ctx, rules, node, path):
+    if ctx.rule_timings is not None:
+        run_rules_timed(ctx, rules, node, path)
+        return
+    for phase, fn in rules:
+        ctx.phase = phase
+        fn(ctx, node, path)
+
+
+def run_rules_timed(ctx, rules, node, path):
+    for phase, fn in rules:
+        ctx.phase = phase
+        start = time.perf_counter()
+        fn(ctx, node, path)
+        timing = ctx.rule_timings.setdefault(fn.__name__, [PHASES[phase], 0, 0.0])
+        timing[1] += 1
+        timing[2] += time.perf_counter() - start
+
+
+def record_rule_timings(ctx):
+    """One span per rule (its total time over all calls) and per rule group (phase)."""
+    if ctx.rule_timings is None:
+        return
+    by_phase = {}
+    for name, (phase, calls, seconds) in ctx.rule_timings.items():
+        TRACER.record(f"validate.rule.{name}", seconds, phase=phase, calls=calls)
+        by_phase[phase] = by_phase.get(phase, 0.0) + seconds
+    for phase, seconds in by_phase.items():
+        TRACER.record(f"validate.phase.{phase}", seconds)
+
+
+def walk_array(ctx, pattern, path, items):
+    """Dispatch an array, its items, and its items' nested arrays to their rules."""
+    run_rules(ctx, RULES.get(pattern, ()), items, path)
+    item_pattern = f"{pattern}[]"
+    item_rules = RULES.get(item_pattern, ())
+    children = CHILD_ARRAYS.get(item_pattern, ())
+    if items and (item_rules or children):
+        for i, item in enumerate(items):
+            walk_item(ctx, item_pattern, f"{path}[{i}]", i, item, item_rules, children)
+    run_rules(ctx, EXIT_RULES.get(pattern, ()), items, path)
+
+
+def walk_item(ctx, item_pattern, item_path, index, item, item_rules, children):
+    """Dispatch one array item and its nested arrays to their rules."""
+    ctx.index = index
+    run_rules(ctx, item_rules, item, item_path)
+    for child in children:
+        ctx.parent = item
+        walk_array(ctx, f"{item_pattern}.{child}", f"{item_path}.{child}", item.get(child, []))
+
+
+def register_unchanged_section(ctx, path, items):
+    """Record the IDs and table names of a section that isn't re-validated, for cross-section checks."""
+    if path.startswith("data_sources."):
+        for i, item in enumerate(items):
+            if isinstance(item, dict):
+                collect_known_table_name(ctx, item, f"{path}[{i}]")
+        return
+    seen = ctx.question_ids if path in QUESTION_ID_SECTIONS else ctx.instruction_ids
+    for i, item in enumerate(items):
+        if isinstance(item, dict) and isinstance(item.get("id"), str):
+            seen.setdefault(item["id"], f"{path}[{i}]")
+
+
+def validate_config_single_pass(config: dict, similarity_mode: str = "auto", sections=None,
+                                table_columns=None) -> list[dict]:
+    """
+    Rule-engine validator: walks the config once and sends each node to the
+    rules registered for its path.
 
-    # --- config.sample_questions ---
-    sample_questions = config.get("config", {}).get("sample_questions", [])
+    Returns issues grouped by check in PHASES order. With `sections` (paths
+    from WALK_ORDER), only those sections and their SECTION_DEPENDENTS are walked; the rest only contribute IDs and table names,
+    so duplicates and snippet table references across sections are still
+    caught, and whole-config checks (version, instruction budget) still run.
+    """
+    if sections is not None:
+        unknown = set(sections) - set(WALK_ORDER)
+        if unknown:
+            raise ValueError(f"Unknown section(s) {sorted(unknown)}. Valid sections: {list(WALK_ORDER)}")
+        sections = set(sections)
+        for path in list(sections):
+            sections.update(SECTION_DEPENDENTS.get(path, ()))
+
+    ctx = ValidationContext(similarity_mode, table_columns)
+    for path in WALK_ORDER:
+        *parents, leaf = path.split(".")
+        node = config
+        for key in parents:
+            node = node.get(key, {})
+        ctx.arrays[path] = node.get(leaf, [])
+        if sections is not None and path not in sections:
+            register_unchanged_section(ctx, path, ctx.arrays[path])
+
+    run_rules(ctx, RULES.get("$", ()), config, "")
+    for path in WALK_ORDER:
+        if sections is None or path in sections:
+            walk_array(ctx, path, path, ctx.arrays[path])
+    run_rules(ctx, EXIT_RULES.get("$", ()), config, "")
+    record_rule_timings(ctx)
+    return ctx.issues()
+
+
+# --- Rules: version ---
+
+@rule("$", "version")
+def check_version(ctx, config, path):
+    version = config.get("version")
+    if version is None:
+        ctx.error("version", "Missing required 'version' field. Use 2 for new spaces.")
+    elif version not in (1, 2):
+        ctx.warning("version", f"Version is {version}. Recommended value is 2.")
+
+
+# --- Rules: config.sample_questions ---
+
+@rule("config.sample_questions", "sample_questions")
+def check_sample_questions(ctx, sample_questions, path):
     if sample_questions:
-        check_array_size("config.sample_questions", sample_questions)
-        check_sorted("config.sample_questions", sample_questions, lambda x: x.get("id", ""), "id")
-        for i, sq in enumerate(sample_questions):
-            p = f"config.sample_questions[{i}]"
-            sid = sq.get("id")
-            if sid is None:
-                error(f"{p}.id", "Missing required 'id' field")
-            else:
-                check_id(f"{p}.id", sid)
-                question_and_benchmark_ids.append((sid, p))
-            q = sq.get("question")
-            if q is None:
-                error(f"{p}.question", "Missing required 'question' field")
-            elif not isinstance(q, list) or len(q) == 0:
-                error(f"{p}.question", "Must be a non-empty array of strings")
-            else:
-                check_string_array(f"{p}.question", q)
-    else:
-        warning("config.sample_questions", "No sample questions defined. Recommend adding 3-5 starter questions.")
-
-    # --- data_sources.tables ---
-    tables = config.get("data_sources", {}).get("tables", [])
-    if tables:
-        check_array_size("data_sources.tables", tables)
-        check_sorted("data_sources.tables", tables, lambda x: x.get("identifier", ""), "identifier")
-        for i, tbl in enumerate(tables):
-            p = f"data_sources.tables[{i}]"
-            ident = tbl.get("identifier")
-            if ident is None:
-                error(f"{p}.identifier", "Missing required 'identifier' field")
-            elif not TABLE_ID_PATTERN.match(ident):
-                error(f"{p}.identifier", f"'{ident}' must be three-level namespace: catalog.schema.table")
-            # Check column_configs sorting and prompt matching consistency
-            col_configs = tbl.get("column_configs", [])
-            if col_configs:
-                check_sorted(f"{p}.column_configs", col_configs, lambda x: x.get("column_name", ""), "column_name")
-                for j, cc in enumerate(col_configs):
-                    cp = f"{p}.column_configs[{j}]"
-                    col_name = cc.get("column_name", f"index {j}")
-                    # Entity matching requires format assistance
-                    if cc.get("enable_entity_matching") and not cc.get("enable_format_assistance"):
-                        error(cp, f"Column '{col_name}' has enable_entity_matching=true but enable_format_assistance is not true. Entity matching requires format assistance to be enabled.")
-                    # Warn if excluded column has prompt matching on
-                    if cc.get("exclude") and (cc.get("enable_entity_matching") or cc.get("enable_format_assistance")):
-                        warning(cp, f"Column '{col_name}' is excluded but has prompt matching enabled. Consider disabling enable_entity_matching and enable_format_assistance on excluded columns.")
-        if len(tables) > 25:
-            warning("data_sources.tables", f"Space has {len(tables)} tables (max 25). Recommend ≤5 for best accuracy.")
-        elif len(tables) > 5:
-            warning("data_sources.tables", f"Space has {len(tables)} tables. Recommend ≤5 for best accuracy.")
+        ctx.check_array_size(path, sample_questions)
+        ctx.check_sorted(path, sample_questions, lambda x: x.get("id", ""), "id")
     else:
-        error("data_sources.tables", "No tables defined. At least one table is required.")
-
-    # --- data_sources.metric_views ---
-    metric_views = config.get("data_sources", {}).get("metric_views", [])
-    if metric_views:
-        check_array_size("data_sources.metric_views", metric_views)
-        check_sorted("data_sources.metric_views", metric_views, lambda x: x.get("identifier", ""), "identifier")
-        for i, mv in enumerate(metric_views):
-            p = f"data_sources.metric_views[{i}]"
-            ident = mv.get("identifier")
-            if ident is None:
-                error(f"{p}.identifier", "Missing required 'identifier' field")
-            elif not TABLE_ID_PATTERN.match(ident):
-                error(f"{p}.identifier", f"'{ident}' must be three-level namespace: catalog.schema.metric_view")
-            col_configs = mv.get("column_configs", [])
-            if col_configs:
-                check_sorted(f"{p}.column_configs", col_configs, lambda x: x.get("column_name", ""), "column_name")
-
-    # --- instructions ---
-    instructions = config.get("instructions", {})
+        ctx.warning(path, "No sample questions defined. Recommend adding 3-5 starter questions.")
+
 
-    # text_instructions (max 1)
-    text_instr = instructions.get("text_instructions", [])
+@rule("config.sample_questions[]", "sample_questions")
+def check_sample_question(ctx, sq, p):
+    sid = sq.get("id")
+    if sid is None:
+        ctx.error(f"{p}.id", "Missing required 'id' field")
+    else:
+        ctx.check_id(f"{p}.id", sid)
+        ctx.register_id(ctx.question_ids, sid, p, "question_id_uniqueness")
+    q = sq.get("question")
+    if q is None:
+        ctx.error(f"{p}.question", "Missing required 'question' field")
+    elif not isinstance(q, list) or len(q) == 0:
+        ctx.error(f"{p}.question", "Must be a non-empty array of strings")
+    else:
+        ctx.check_string_array(f"{p}.question", q)
+
+
+@rule("config.sample_questions[]", "question_formatting")
+def check_sample_question_formatting(ctx, sq, p):
+    q_list = sq.get("question", [])
+    if len(q_list) > 1:
+        ctx.warning(f"{p}.question", f"Has {len(q_list)} phrasings — use one question per entry. Create separate entries for alternate phrasings.")
+    for j, q_str in enumerate(q_list):
+        ctx.check_question_formatting(q_str, f"{p}.question[{j}]")
+
+
+# --- Rules: data_sources ---
+
+@rule("data_sources.tables", "tables")
+@rule("data_sources.metric_views", "metric_views")
+def check_data_source_array(ctx, data_sources, path):
+    if data_sources:
+        ctx.check_array_size(path, data_sources)
+        ctx.check_sorted(path, data_sources, lambda x: x.get("identifier", ""), "identifier")
+
+
+@rule("data_sources.tables[]", "tables")
+def check_table_identifier(ctx, tbl, p):
+    ident = tbl.get("identifier")
+    if ident is None:
+        ctx.error(f"{p}.identifier", "Missing required 'identifier' field")
+    elif not TABLE_ID_PATTERN.match(ident):
+        ctx.error(f"{p}.identifier", f"'{ident}' must be three-level namespace: catalog.schema.table")
+
+
+@rule("data_sources.metric_views[]", "metric_views")
+def check_metric_view_identifier(ctx, mv, p):
+    ident = mv.get("identifier")
+    if ident is None:
+        ctx.error(f"{p}.identifier", "Missing required 'identifier' field")
+    elif not TABLE_ID_PATTERN.match(ident):
+        ctx.error(f"{p}.identifier", f"'{ident}' must be three-level namespace: catalog.schema.metric_view")
+
+
+@rule("data_sources.tables[]", "snippet_table_refs")
+@rule("data_sources.metric_views[]", "snippet_table_refs")
+def collect_known_table_name(ctx, tbl, p):
+    # Short name (e.g., "orders") and full name (e.g., "catalog.schema.orders")
+    identifier = tbl.get("identifier", "")
+    for name in table_names(identifier):
+        ctx.known_table_names.add(name)
+        ctx.known_tables.setdefault(name.lower(), identifier)
+
+
+@rule("data_sources.tables[].column_configs", "tables")
+@rule("data_sources.metric_views[].column_configs", "metric_views")
+def check_column_configs_sorted(ctx, col_configs, path):
+    if col_configs:
+        ctx.check_sorted(path, col_configs, lambda x: x.get("column_name", ""), "column_name")
+
+
+@rule("data_sources.tables[].column_configs[]", "tables")
+def check_column_config_prompt_matching(ctx, cc, cp):
+    col_name = cc.get("column_name", f"index {ctx.index}")
+    # Entity matching requires format assistance
+    if cc.get("enable_entity_matching") and not cc.get("enable_format_assistance"):
+        ctx.error(cp, f"Column '{col_name}' has enable_entity_matching=true but enable_format_assistance is not true. Entity matching requires format assistance to be enabled.")
+    # Warn if excluded column has prompt matching on
+    if cc.get("exclude") and (cc.get("enable_entity_matching") or cc.get("enable_format_assistance")):
+        ctx.warning(cp, f"Column '{col_name}' is excluded but has prompt matching enabled. Consider disabling enable_entity_matching and enable_format_assistance on excluded columns.")
+
+
+@rule("data_sources.tables[].column_configs[]", "column_config_uniqueness")
+@rule("data_sources.metric_views[].column_configs[]", "column_config_uniqueness")
+def check_column_config_unique(ctx, cc, cp):
+    ident = ctx.parent.get("identifier", "unknown")
+    key = (ident, cc.get("column_name", ""))
+    if key in ctx.col_config_keys:
+        ctx.error("data_sources", f"Duplicate column config: ({ident}, {cc.get('column_name')}) — must be unique")
+    ctx.col_config_keys.add(key)
+
+
+@rule("data_sources.tables[].column_configs[]", "column_refs")
+@rule("data_sources.metric_views[].column_configs[]", "column_refs")
+def check_column_config_exists(ctx, cc, cp):
+    if ctx.table_metadata is None:
+        return
+    message = column_config_warning(ctx.parent.get("identifier"), cc, ctx.table_metadata)
+    if message:
+        ctx.warning(f"{cp}.column_name", message)
+
+
+@rule("data_sources.tables", "tables", on_exit=True)
+def check_table_count(ctx, tables, path):
+    if not tables:
+        ctx.error(path, "No tables defined. At least one table is required.")
+    elif len(tables) > 25:
+        ctx.warning(path, f"Space has {len(tables)} tables (max 25). Recommend ≤5 for best accuracy.")
+    elif len(tables) > 5:
+        ctx.warning(path, f"Space has {len(tables)} tables. Recommend ≤5 for best accuracy.")
+
+
+# --- Rules: instructions.text_instructions ---
+
+@rule("instructions.text_instructions", "text_instructions")
+def check_text_instructions(ctx, text_instr, path):
     if text_instr:
         if len(text_instr) > 1:
-            error("instructions.text_instructions", f"At most 1 text instruction allowed, found {len(text_instr)}")
-        check_sorted("instructions.text_instructions", text_instr, lambda x: x.get("id", ""), "id")
-        for i, ti in enumerate(text_instr):
-            p = f"instructions.text_instructions[{i}]"
-            tid = ti.get("id")
-            if tid is None:
-                error(f"{p}.id", "Missing required 'id' field")
-            else:
-                check_id(f"{p}.id", tid)
-                instruction_ids.append((tid, p))
-            content = ti.get("content")
-            if content is None:
-                error(f"{p}.content", "Missing required 'content' field")
-            elif not isinstance(content, list) or len(content) == 0:
-                error(f"{p}.content", "Must be a non-empty array of strings")
-            else:
-                check_string_array(f"{p}.content", content)
-                # Check for content elements missing trailing whitespace/newline
-                for j, line in enumerate(content):
-                    if isinstance(line, str) and len(line) > 0 and not line.endswith(("\n", " ")):
-                        warning(
-                            f"{p}.content[{j}]",
-                            f"Content element does not end with '\\n' or a space. "
-                            f"The API concatenates elements without separators — add '\\n' at the end to prevent jammed text."
-                        )
-                # Check for placeholder/stale text patterns in instructions
-                full_text = " ".join(content).lower()
-                stale_patterns = [
-                    ("todo", "Contains TODO marker — may be a draft instruction"),
-                    ("fixme", "Contains FIXME marker — may be incomplete"),
-                    ("placeholder", "Contains 'placeholder' — may not be finalized"),
-                    ("change this", "Contains 'change this' — may be a template reminder"),
-                    ("update this", "Contains 'update this' — may be a template reminder"),
-                    ("# comment", "Contains comment syntax — should be plain text instructions"),
-                    ("//", "Contains comment syntax — should be plain text instructions"),
-                ]
-                for pattern, msg in stale_patterns:
-                    if pattern in full_text:
-                        warning(f"{p}.content", msg)
-
-    # example_question_sqls
-    example_sqls = instructions.get("example_question_sqls", [])
+            ctx.error(path, f"At most 1 text instruction allowed, found {len(text_instr)}")
+        ctx.check_sorted(path, text_instr, lambda x: x.get("id", ""), "id")
+
+
+@rule("instructions.text_instructions[]", "text_instructions")
+def check_text_instruction(ctx, ti, p):
+    tid = ti.get("id")
+    if tid is None:
+        ctx.error(f"{p}.id", "Missing required 'id' field")
+    else:
+        ctx.check_id(f"{p}.id", tid)
+        ctx.register_id(ctx.instruction_ids, tid, p, "instruction_id_uniqueness")
+    content = ti.get("content")
+    if content is None:
+        ctx.error(f"{p}.content", "Missing required 'content' field")
+    elif not isinstance(content, list) or len(content) == 0:
+        ctx.error(f"{p}.content", "Must be a non-empty array of strings")
+    else:
+        ctx.check_string_array(f"{p}.content", content)
+        # Check for content elements missing trailing whitespace/newline
+        for j, line in enumerate(content):
+            if isinstance(line, str) and len(line) > 0 and not line.endswith(("\n", " ")):
+                ctx.warning(
+                    f"{p}.content[{j}]",
+                    f"Content element does not end with '\\n' or a space. "
+                    f"The API concatenates elements without separators — add '\\n' at the end to prevent jammed text."
+                )
+        # Check for placeholder/stale text patterns in instructions
+        full_text = " ".join(content).lower()
+        for pattern, msg in STALE_PATTERNS:
+            if pattern in full_text:
+                ctx.warning(f"{p}.content", msg)
+
+
+# --- Rules: instructions.example_question_sqls ---
+
+@rule("instructions.example_question_sqls", "example_question_sqls")
+def check_example_sqls(ctx, example_sqls, path):
     if example_sqls:
-        check_array_size("instructions.example_question_sqls", example_sqls)
-        check_sorted("instructions.example_question_sqls", example_sqls, lambda x: x.get("id", ""), "id")
-        for i, eq in enumerate(example_sqls):
-            p = f"instructions.example_question_sqls[{i}]"
-            eid = eq.get("id")
-            if eid is None:
-                error(f"{p}.id", "Missing required 'id' field")
-            else:
-                check_id(f"{p}.id", eid)
-                instruction_ids.append((eid, p))
-            q = eq.get("question")
-            if q is None:
-                error(f"{p}.question", "Missing required 'question' field")
-            else:
-                check_string_array(f"{p}.question", q)
-            sql = eq.get("sql")
-            if sql is None:
-                error(f"{p}.sql", "Missing required 'sql' field")
-            else:
-                check_string_array(f"{p}.sql", sql)
-                if isinstance(sql, list) and len(sql) == 0:
-                    error(f"{p}.sql", "SQL array must not be empty")
-            # Check for usage_guidance (recommended on complex examples)
-            ug = eq.get("usage_guidance")
-            if ug is not None and not isinstance(ug, list):
-                error(f"{p}.usage_guidance", "Must be an array of strings")
-
-        # Warn if no example SQLs have usage_guidance
-        sqls_with_guidance = sum(1 for eq in example_sqls if eq.get("usage_guidance"))
-        if len(example_sqls) > 0 and sqls_with_guidance == 0:
-            warning(
-                "instructions.example_question_sqls",
-                "No example SQL queries have 'usage_guidance'. Adding usage_guidance helps Genie know when to apply each pattern."
+        ctx.check_array_size(path, example_sqls)
+        ctx.check_sorted(path, example_sqls, lambda x: x.get("id", ""), "id")
+
+
+@rule("instructions.example_question_sqls[]", "example_question_sqls")
+def check_example_sql(ctx, eq, p):
+    eid = eq.get("id")
+    if eid is None:
+        ctx.error(f"{p}.id", "Missing required 'id' field")
+    else:
+        ctx.check_id(f"{p}.id", eid)
+        ctx.register_id(ctx.instruction_ids, eid, p, "instruction_id_uniqueness")
+    q = eq.get("question")
+    if q is None:
+        ctx.error(f"{p}.question", "Missing required 'question' field")
+    else:
+        ctx.check_string_array(f"{p}.question", q)
+    sql = eq.get("sql")
+    if sql is None:
+        ctx.error(f"{p}.sql", "Missing required 'sql' field")
+    else:
+        ctx.check_string_array(f"{p}.sql", sql)
+        if isinstance(sql, list) and len(sql) == 0:
+            ctx.error(f"{p}.sql", "SQL array must not be empty")
+    ug = eq.get("usage_guidance")
+    if ug is not None and not isinstance(ug, list):
+        ctx.error(f"{p}.usage_guidance", "Must be an array of strings")
+    if ug:
+        ctx.sqls_with_guidance += 1
+
+
+@rule("instructions.example_question_sqls", "example_question_sqls", on_exit=True)
+def check_example_sqls_guidance(ctx, example_sqls, path):
+    if example_sqls and ctx.sqls_with_guidance == 0:
+        ctx.warning(
+            path,
+            "No example SQL queries have 'usage_guidance'. Adding usage_guidance helps Genie know when to apply each pattern."
+        )
+
+
+@rule("instructions.example_question_sqls[]", "question_formatting")
+def check_example_question_formatting(ctx, eq, p):
+    q_list = eq.get("question", [])
+    if len(q_list) > 1:
+        ctx.warning(f"{p}.question", f"Has {len(q_list)} phrasings — use one question per SQL entry. Create separate entries for alternate phrasings.")
+    for j, q_str in enumerate(q_list):
+        ctx.check_question_formatting(q_str, f"{p}.question[{j}]")
+
+
+@rule("instructions.example_question_sqls[]", "sql_formatting")
+def check_example_sql_formatting(ctx, eq, p):
+    sql_parts = eq.get("sql", [])
+    if not sql_parts:
+        return
+    full_sql = "".join(sql_parts)
+    p = f"{p}.sql"
+    jammed = JAMMED_KEYWORD_PATTERN.findall(full_sql)
+    jammed_keywords = [m for m in jammed if JAMMED_CLAUSE_KEYWORD_PATTERN.match(m, 1)]
+    if jammed_keywords:
+        ctx.error(p, f"SQL keywords concatenated without whitespace (e.g., '{jammed_keywords[0]}'). "
+                  f"Missing newlines between SQL clauses. Each clause should be a separate array element.")
+    elif len(sql_parts) == 1 and len(full_sql) > 100:
+        ctx.error(p, f"Entire SQL query is in a single array element ({len(full_sql)} chars). "
+                  f"Split each clause (SELECT, FROM, WHERE, etc.) into a separate array element.")
+    elif len(full_sql) > 100 and "\n" not in full_sql:
+        ctx.warning(p, f"SQL is {len(full_sql)} chars on a single line — consider adding '\\n' at the end of each array element for readability.")
+
+
+@rule("instructions.example_question_sqls[]", "similarity")
+def collect_example_sql_signature(ctx, eq, p):
+    # Normalize each query and build its question word set once, not per pair
+    ctx.example_sql_signatures.append(
+        (normalize_sql(eq.get("sql", [])), question_words(eq.get("question", [])))
+    )
+
+
+@rule("instructions.example_question_sqls[]", "hardcoded_filters")
+def check_hardcoded_filters(ctx, eq, p):
+    sql_text = "".join(eq.get("sql", []))
+    has_params = eq.get("parameters") or PARAMETER_PATTERN.search(sql_text)
+    if not has_params:
+        where_literals = HARDCODED_FILTER_PATTERN.findall(sql_text)
+        if where_literals:
+            ctx.warning(
+                p,
+                f"Query has hardcoded filter value(s): {where_literals[:3]}. "
+                f"Consider using :parameter syntax for trusted asset labeling."
             )
 
-    # sql_functions
-    sql_functions = instructions.get("sql_functions", [])
+
+# --- Rules: instructions.sql_functions ---
+
+@rule("instructions.sql_functions", "sql_functions")
+def check_sql_functions(ctx, sql_functions, path):
     if sql_functions:
-        check_array_size("instructions.sql_functions", sql_functions)
+        ctx.check_array_size(path, sql_functions)
         # Sorted by (id, identifier) tuple
-        check_sorted(
-            "instructions.sql_functions", sql_functions,
+        ctx.check_sorted(
+            path, sql_functions,
             lambda x: (x.get("id", ""), x.get("identifier", "")), "(id, identifier)"
         )
-        for i, sf in enumerate(sql_functions):
-            p = f"instructions.sql_functions[{i}]"
-            sfid = sf.get("id")
-            if sfid is None:
-                error(f"{p}.id", "Missing required 'id' field")
-            else:
-                check_id(f"{p}.id", sfid)
-                instruction_ids.append((sfid, p))
-            if not sf.get("identifier"):
-                error(f"{p}.identifier", "Missing required 'identifier' field")
-            if not sf.get("description"):
-                warning(f"{p}.description", "Missing 'description' — adding a description helps Genie understand when to use this function")
-
-    # join_specs
-    join_specs = instructions.get("join_specs", [])
+
+
+@rule("instructions.sql_functions[]", "sql_functions")
+def check_sql_function(ctx, sf, p):
+    sfid = sf.get("id")
+    if sfid is None:
+        ctx.error(f"{p}.id", "Missing required 'id' field")
+    else:
+        ctx.check_id(f"{p}.id", sfid)
+        ctx.register_id(ctx.instruction_ids, sfid, p, "instruction_id_uniqueness")
+    if not sf.get("identifier"):
+        ctx.error(f"{p}.identifier", "Missing required 'identifier' field")
+    if not sf.get("description"):
+        ctx.warning(f"{p}.description", "Missing 'description' — adding a description helps Genie understand when to use this function")
+
+
+# --- Rules: instructions.join_specs ---
+
+@rule("instructions.join_specs", "join_specs")
+def check_join_specs(ctx, join_specs, path):
     if join_specs:
-        check_array_size("instructions.join_specs", join_specs)
-        check_sorted("instructions.join_specs", join_specs, lambda x: x.get("id", ""), "id")
-        for i, js in enumerate(join_specs):
-            p = f"instructions.join_specs[{i}]"
-            jid = js.get("id")
-            if jid is None:
-                error(f"{p}.id", "Missing required 'id' field")
-            else:
-                check_id(f"{p}.id", jid)
-                instruction_ids.append((jid, p))
-            sql = js.get("sql")
-            if sql is None or (isinstance(sql, list) and len(sql) == 0):
-                error(f"{p}.sql", "Missing or empty 'sql' field")
-            elif isinstance(sql, list):
-                # Check for required --rt= relationship type annotation
-                has_rt = any(isinstance(s, str) and s.startswith("--rt=") for s in sql)
-                if not has_rt:
-                    error(
-                        f"{p}.sql",
-                        "Missing relationship type annotation. The sql array must include a "
-                        "'--rt=FROM_RELATIONSHIP_TYPE_...' element (e.g., '--rt=FROM_RELATIONSHIP_TYPE_MANY_TO_ONE--'). "
-                        "Without this, the API rejects the request with a proto parsing error."
-                    )
-                else:
-                    # Validate the --rt= value
-                    valid_rt_types = {
-                        "--rt=FROM_RELATIONSHIP_TYPE_MANY_TO_ONE--",
-                        "--rt=FROM_RELATIONSHIP_TYPE_ONE_TO_MANY--",
-                        "--rt=FROM_RELATIONSHIP_TYPE_ONE_TO_ONE--",
-                        "--rt=FROM_RELATIONSHIP_TYPE_MANY_TO_MANY--",
-                    }
-                    for j, s in enumerate(sql):
-                        if isinstance(s, str) and s.startswith("--rt=") and s not in valid_rt_types:
-                            warning(
-                                f"{p}.sql[{j}]",
-                                f"Unrecognized relationship type: '{s}'. Expected one of: {', '.join(sorted(valid_rt_types))}"
-                            )
-                # Check join condition elements for AND/OR
-                for j, s in enumerate(sql):
-                    if isinstance(s, str) and not s.startswith("--rt=") and re.search(r'\b(AND|OR)\b', s, re.IGNORECASE):
-                        warning(
-                            f"{p}.sql[{j}]",
-                            "Join spec SQL contains AND/OR — each element must be a single equality. "
-                            "For multi-column joins, use separate join specs."
-                        )
-            # Check left/right have identifier
-            for side in ("left", "right"):
-                side_obj = js.get(side, {})
-                if not side_obj.get("identifier"):
-                    error(f"{p}.{side}.identifier", f"Missing required '{side}.identifier' field")
-            # Warn if missing instruction (recommended)
-            if not js.get("instruction"):
-                warning(f"{p}.instruction", "Missing 'instruction' — adding usage guidance helps Genie know when to apply this join")
-
-    # sql_snippets
-    snippets = instructions.get("sql_snippets", {})
-    for snippet_type in ("filters", "expressions", "measures"):
-        snippet_list = snippets.get(snippet_type, [])
-        if snippet_list:
-            sp = f"instructions.sql_snippets.{snippet_type}"
-            check_array_size(sp, snippet_list)
-            check_sorted(sp, snippet_list, lambda x: x.get("id", ""), "id")
-            for i, sn in enumerate(snippet_list):
-                p = f"{sp}[{i}]"
-                snid = sn.get("id")
-                if snid is None:
-                    error(f"{p}.id", "Missing required 'id' field")
-                else:
-                    check_id(f"{p}.id", snid)
-                    instruction_ids.append((snid, p))
-                sql = sn.get("sql")
-                if sql is None:
-                    error(f"{p}.sql", "Missing required 'sql' field")
-                elif isinstance(sql, str):
-                    error(f"{p}.sql", "sql_snippets sql must be a string array, not a plain string. "
-                          "Example: [\"SUM(amount)\"] not \"SUM(amount)\"")
-                elif not isinstance(sql, list):
-                    error(f"{p}.sql", f"sql must be a string array, got {type(sql).__name__}")
-                elif len(sql) == 0:
-                    error(f"{p}.sql", "SQL array must not be empty")
-                else:
-                    check_string_array(f"{p}.sql", sql)
-                # Check filter-specific issues
-                if snippet_type == "filters" and isinstance(sql, list) and len(sql) > 0:
-                    first_elem = sql[0] if isinstance(sql[0], str) else ""
-                    # Check for WHERE keyword in filter SQL
-                    if re.match(r'^\s*WHERE\s+', first_elem, re.IGNORECASE):
-                        error(f"{p}.sql", "Filter SQL must NOT include the WHERE keyword — provide only the boolean condition. "
-                              "Genie adds the WHERE clause itself. The UI rejects filters containing WHERE. "
-                              "Example: [\"orders.amount > 1000\"] not [\"WHERE orders.amount > 1000\"]")
-                # Check for bare (non-table-qualified) column references in all snippet types.
-                # Heuristic: if the SQL contains no dot-separated identifiers (table.column),
-                # it likely has bare column references that the Genie UI will reject.
-                if isinstance(sql, list) and len(sql) > 0:
-                    full_sql = " ".join(s for s in sql if isinstance(s, str))
-                    # Strip string literals to avoid false positives
-                    stripped = re.sub(r"'[^']*'", "''", full_sql)
-                    # Strip leading WHERE for analysis
-                    stripped = re.sub(r'^\s*WHERE\s+', '', stripped, flags=re.IGNORECASE)
-                    # Check if there are any table-qualified references (word.word or `word`.`word`)
-                    has_qualified = bool(re.search(r'[a-zA-Z_]\w*\.[a-zA-Z_]\w*|`[^`]+`\.`[^`]+`', stripped))
-                    if not has_qualified and stripped.strip():
-                        # Find likely column names (identifiers that aren't SQL keywords/functions)
-                        all_idents = re.findall(r'[a-zA-Z_]\w*', stripped)
-                        sql_keywords = {'AND', 'OR', 'NOT', 'IN', 'IS', 'NULL', 'LIKE', 'ILIKE',
-                                      'BETWEEN', 'TRUE', 'FALSE', 'CASE', 'WHEN', 'THEN', 'ELSE',
-                                      'END', 'AS', 'SUM', 'AVG', 'COUNT', 'MIN', 'MAX', 'YEAR',
-                                      'MONTH', 'DAY', 'DATE', 'TIMESTAMP', 'CAST', 'COALESCE',
-                                      'NULLIF', 'IF', 'IIF', 'ROUND', 'ABS', 'UPPER', 'LOWER',
-                                      'TRIM', 'LENGTH', 'CONCAT', 'SUBSTR', 'SUBSTRING', 'REPLACE',
-                                      'DATEDIFF', 'DATEADD', 'DATE_ADD', 'DATE_SUB', 'CURRENT_DATE',
-                                      'CURRENT_TIMESTAMP', 'WHERE', 'FROM', 'SELECT', 'GROUP', 'BY',
-                                      'ORDER', 'HAVING', 'LIMIT', 'DISTINCT', 'EXISTS', 'ANY', 'ALL'}
-                        col_candidates = [c for c in all_idents if c.upper() not in sql_keywords]
-                        if col_candidates:
-                            warning(
-                                f"{p}.sql",
-                                f"No table-qualified column references found (e.g., 'table_name.column'). "
-                                f"The Genie UI requires table-qualified references — bare column names like "
-                                f"'{col_candidates[0]}' will be rejected with 'Table name or alias is required'. "
-                                f"Use table_name.column_name format."
-                            )
-                # Check for required name/alias fields
-                if snippet_type == "filters":
-                    if not sn.get("display_name"):
-                        warning(f"{p}.display_name", "Missing 'display_name' field — filters should have a display name")
-                elif snippet_type in ("expressions", "measures"):
-                    if not sn.get("alias"):
-                        warning(f"{p}.alias", "Missing 'alias' field — expressions and measures should have an alias")
-                # Check for recommended optional fields
-                if not sn.get("synonyms"):
-                    warning(f"{p}.synonyms", "Missing 'synonyms' — adding alternate terms helps Genie match user questions to this snippet")
-                if not sn.get("instruction"):
-                    warning(f"{p}.instruction", "Missing 'instruction' — adding usage guidance helps Genie know when to apply this snippet")
-
-    # --- Cross-reference: snippet table prefixes vs data_sources ---
-    # Verify that table names used in sql_snippets match tables in data_sources.
-    # Extract short table names from data_sources for matching.
-    known_table_names = set()
-    for tbl in tables:
-        ident = tbl.get("identifier", "")
-        parts = ident.split(".")
-        if len(parts) == 3:
-            known_table_names.add(parts[2])  # short name (e.g., "orders")
-        known_table_names.add(ident)  # full name (e.g., "catalog.schema.orders")
-    for mv in metric_views:
-        ident = mv.get("identifier", "")
-        parts = ident.split(".")
-        if len(parts) == 3:
-            known_table_names.add(parts[2])
-        known_table_names.add(ident)
-
-    if known_table_names:
-        for snippet_type in ("filters", "expressions", "measures"):
-            snippet_list = snippets.get(snippet_type, [])
-            for i, sn in enumerate(snippet_list):
-                p = f"instructions.sql_snippets.{snippet_type}[{i}]"
-                sql = sn.get("sql")
-                if isinstance(sql, list):
-                    full_sql = " ".join(s for s in sql if isinstance(s, str))
-                    # Strip string literals
-                    stripped = re.sub(r"'[^']*'", "''", full_sql)
-                    # Find table.column references (word.word or `word`.`word`)
-                    refs = re.findall(r'([a-zA-Z_]\w*)\.([a-zA-Z_]\w*)', stripped)
-                    refs += [(m[0], m[1]) for m in re.findall(r'`([^`]+)`\.`([^`]+)`', stripped)]
-                    for tbl_name, col_name in refs:
-                        if tbl_name.lower() not in {t.lower() for t in known_table_names}:
-                            error(
-                                f"{p}.sql",
-                                f"Table reference '{tbl_name}' not found in data_sources. "
-                                f"Known tables: {sorted(t for t in known_table_names if '.' not in t) or sorted(known_table_names)}. "
-                                f"Check for typos in the table name prefix."
-                            )
-
-    # --- benchmarks ---
-    benchmarks = config.get("benchmarks", {})
-    bench_questions = benchmarks.get("questions", [])
-    if bench_questions:
-        check_array_size("benchmarks.questions", bench_questions)
-        check_sorted("benchmarks.questions", bench_questions, lambda x: x.get("id", ""), "id")
-        for i, bq in enumerate(bench_questions):
-            p = f"benchmarks.questions[{i}]"
-            bid = bq.get("id")
-            if bid is None:
-                error(f"{p}.id", "Missing required 'id' field")
-            else:
-                check_id(f"{p}.id", bid)
-                question_and_benchmark_ids.append((bid, p))
-            answers = bq.get("answer", [])
-            if len(answers) != 1:
-                error(f"{p}.answer", f"Each benchmark must have exactly 1 answer, found {len(answers)}")
-            for j, ans in enumerate(answers):
-                if ans.get("format") != "SQL":
-                    error(f"{p}.answer[{j}].format", f"Answer format must be 'SQL', got '{ans.get('format')}'")
-
-    # --- Uniqueness checks ---
-    # Question + benchmark IDs must be unique across both collections
-    seen_qb = {}
-    for id_val, path in question_and_benchmark_ids:
-        if id_val in seen_qb:
-            error(path, f"Duplicate ID '{id_val}' — also used at {seen_qb[id_val]}")
+        ctx.check_array_size(path, join_specs)
+        ctx.check_sorted(path, join_specs, lambda x: x.get("id", ""), "id")
+
+
+@rule("instructions.join_specs[]", "join_specs")
+def check_join_spec(ctx, js, p):
+    jid = js.get("id")
+    if jid is None:
+        ctx.error(f"{p}.id", "Missing required 'id' field")
+    else:
+        ctx.check_id(f"{p}.id", jid)
+        ctx.register_id(ctx.instruction_ids, jid, p, "instruction_id_uniqueness")
+    sql = js.get("sql")
+    if sql is None or (isinstance(sql, list) and len(sql) == 0):
+        ctx.error(f"{p}.sql", "Missing or empty 'sql' field")
+    elif isinstance(sql, list):
+        has_rt = any(isinstance(s, str) and s.startswith("--rt=") for s in sql)
+        if not has_rt:
+            ctx.error(
+                f"{p}.sql",
+                "Missing relationship type annotation. The sql array must include a "
+                "'--rt=FROM_RELATIONSHIP_TYPE_...' element (e.g., '--rt=FROM_RELATIONSHIP_TYPE_MANY_TO_ONE--'). "
+                "Without this, the API rejects the request with a proto parsing error."
+            )
         else:
-            seen_qb[id_val] = path
+            for j, s in enumerate(sql):
+                if isinstance(s, str) and s.startswith("--rt=") and s not in VALID_RT_TYPES:
+                    ctx.warning(
+                        f"{p}.sql[{j}]",
+                        f"Unrecognized relationship type: '{s}'. Expected one of: {', '.join(sorted(VALID_RT_TYPES))}"
+                    )
+        for j, s in enumerate(sql):
+            if isinstance(s, str) and not s.startswith("--rt=") and AND_OR_PATTERN.search(s):
+                ctx.warning(
+                    f"{p}.sql[{j}]",
+                    "Join spec SQL contains AND/OR — each element must be a single equality. "
+                    "For multi-column joins, use separate join specs."
+                )
+    for side in ("left", "right"):
+        side_obj = js.get(side, {})
+        if not side_obj.get("identifier"):
+            ctx.error(f"{p}.{side}.identifier", f"Missing required '{side}.identifier' field")
+    if not js.get("instruction"):
+        ctx.warning(f"{p}.instruction", "Missing 'instruction' — adding usage guidance helps Genie know when to apply this join")
+
+
+@rule("instructions.join_specs[]", "column_refs")
+def check_join_spec_columns(ctx, js, p):
+    if ctx.table_metadata is None:
+        return
+    for message in join_spec_column_errors(js, ctx.table_metadata):
+        ctx.error(f"{p}.sql", message)
+
+
+# --- Rules: instructions.sql_snippets ---
+
+def check_snippets(ctx, snippet_list, path):
+    if snippet_list:
+        ctx.check_array_size(path, snippet_list)
+        ctx.check_sorted(path, snippet_list, lambda x: x.get("id", ""), "id")
 
-    # Instruction IDs must be unique across all instruction types
-    seen_instr = {}
-    for id_val, path in instruction_ids:
-        if id_val in seen_instr:
-            error(path, f"Duplicate ID '{id_val}' — also used at {seen_instr[id_val]}")
+
+def snippet_rule(snippet_type):
+    """Build the per-item rule for one sql_snippets type."""
+
+    def check_snippet(ctx, sn, p):
+        snid = sn.get("id")
+        if snid is None:
+            ctx.error(f"{p}.id", "Missing required 'id' field")
+        else:
+            ctx.check_id(f"{p}.id", snid)
+            ctx.register_id(ctx.instruction_ids, snid, p, "instruction_id_uniqueness")
+        sql = sn.get("sql")
+        if sql is None:
+            ctx.error(f"{p}.sql", "Missing required 'sql' field")
+        elif isinstance(sql, str):
+            ctx.error(f"{p}.sql", "sql_snippets sql must be a string array, not a plain string. "
+                      "Example: [\"SUM(amount)\"] not \"SUM(amount)\"")
+        elif not isinstance(sql, list):
+            ctx.error(f"{p}.sql", f"sql must be a string array, got {type(sql).__name__}")
+        elif len(sql) == 0:
+            ctx.error(f"{p}.sql", "SQL array must not be empty")
         else:
-            seen_instr[id_val] = path
+            ctx.check_string_array(f"{p}.sql", sql)
+        if snippet_type == "filters" and isinstance(sql, list) and len(sql) > 0:
+            first_elem = sql[0] if isinstance(sql[0], str) else ""
+            if WHERE_PREFIX_PATTERN.match(first_elem):
+                ctx.error(f"{p}.sql", "Filter SQL must NOT include the WHERE keyword — provide only the boolean condition. "
+                          "Genie adds the WHERE clause itself. The UI rejects filters containing WHERE. "
+                          "Example: [\"orders.amount > 1000\"] not [\"WHERE orders.amount > 1000\"]")
+        if isinstance(sql, list) and len(sql) > 0:
+            parsed = parse_sql_expression(" ".join(s for s in sql if isinstance(s, str)))
+            for message in (snippet_bare_column_warning(parsed), snippet_parse_warning(parsed)):
+                if message:
+                    ctx.warning(f"{p}.sql", message)
+        if snippet_type == "filters":
+            if not sn.get("display_name"):
+                ctx.warning(f"{p}.display_name", "Missing 'display_name' field — filters should have a display name")
+        elif not sn.get("alias"):
+            ctx.warning(f"{p}.alias", "Missing 'alias' field — expressions and measures should have an alias")
+        if not sn.get("synonyms"):
+            ctx.warning(f"{p}.synonyms", "Missing 'synonyms' — adding alternate terms helps Genie match user questions to this snippet")
+        if not sn.get("instruction"):
+            ctx.warning(f"{p}.instruction", "Missing 'instruction' — adding usage guidance helps Genie know when to apply this snippet")
+
+    return check_snippet
+
+
+def check_snippet_table_refs(ctx, sn, p):
+    """Verify that column references in a snippet resolve to tables in data_sources (and their columns, if known)."""
+    if not ctx.known_table_names:
+        return
+    sql = sn.get("sql")
+    if not isinstance(sql, list):
+        return
+    if ctx.known_table_names_display is None:
+        # Built once per run instead of once per reference
+        ctx.known_table_names_display = (
+            sorted(t for t in ctx.known_table_names if '.' not in t) or sorted(ctx.known_table_names)
+        )
+    parsed = parse_sql_expression(" ".join(s for s in sql if isinstance(s, str)))
+    for message in snippet_reference_errors(parsed, ctx.known_tables, ctx.table_metadata, ctx.known_table_names_display):
+        ctx.error(f"{p}.sql", message)
+
+
+for snippet_type in SNIPPET_TYPES:
+    snippet_path = f"instructions.sql_snippets.{snippet_type}"
+    rule(snippet_path, "sql_snippets")(check_snippets)
+    rule(f"{snippet_path}[]", "sql_snippets")(snippet_rule(snippet_type))
+    rule(f"{snippet_path}[]", "snippet_table_refs")(check_snippet_table_refs)
 
-    # --- Instruction count budget ---
-    total_instructions = len(example_sqls) + len(sql_functions) + (1 if text_instr else 0)
+
+# --- Rules: benchmarks.questions ---
+
+@rule("benchmarks.questions", "benchmarks")
+def check_benchmark_questions(ctx, bench_questions, path):
+    if bench_questions:
+        ctx.check_array_size(path, bench_questions)
+        ctx.check_sorted(path, bench_questions, lambda x: x.get("id", ""), "id")
+
+
+@rule("benchmarks.questions[]", "benchmarks")
+def check_benchmark_question(ctx, bq, p):
+    bid = bq.get("id")
+    if bid is None:
+        ctx.error(f"{p}.id", "Missing required 'id' field")
+    else:
+        ctx.check_id(f"{p}.id", bid)
+        ctx.register_id(ctx.question_ids, bid, p, "question_id_uniqueness")
+    answers = bq.get("answer", [])
+    if len(answers) != 1:
+        ctx.error(f"{p}.answer", f"Each benchmark must have exactly 1 answer, found {len(answers)}")
+    for j, ans in enumerate(answers):
+        if ans.get("format") != "SQL":
+            ctx.error(f"{p}.answer[{j}].format", f"Answer format must be 'SQL', got '{ans.get('format')}'")
+
+
+# --- Rules: whole-config checks, run after the walk ---
+
+@rule("$", "instruction_budget", on_exit=True)
+def check_instruction_budget(ctx, config, path):
+    total_instructions = (
+        len(ctx.arrays["instructions.example_question_sqls"])
+        + len(ctx.arrays["instructions.sql_functions"])
+        + (1 if ctx.arrays["instructions.text_instructions"] else 0)
+    )
     if total_instructions > 100:
-        error("instructions", f"Total instruction count is {total_instructions} — exceeds the 100 limit")
+        ctx.error("instructions", f"Total instruction count is {total_instructions} — exceeds the 100 limit")
     elif total_instructions > 80:
-        warning("instructions", f"Total instruction count is {total_instructions}/100 — approaching the limit")
-
-    # --- Column config uniqueness ---
-    col_config_keys = set()
-    all_tables = tables + metric_views
-    for tbl in all_tables:
-        ident = tbl.get("identifier", "unknown")
-        for cc in tbl.get("column_configs", []):
-            key = (ident, cc.get("column_name", ""))
-            if key in col_config_keys:
-                error(
-                    f"data_sources",
-                    f"Duplicate column config: ({ident}, {cc.get('column_name')}) — must be unique"
-                )
-            col_config_keys.add(key)
+        ctx.warning("instructions", f"Total instruction count is {total_instructions}/100 — approaching the limit")
 
-    # --- Question formatting checks ---
-    # Detect concatenated question phrasings (multiple sentences jammed into one string)
-    def check_question_formatting(q_str, path):
-        """Check a single question string for concatenation issues."""
-        # Multiple ? in a single string = likely concatenated phrasings
-        q_marks = q_str.count("?")
-        if q_marks > 1:
-            error(path, f"String contains {q_marks} question marks — likely multiple questions concatenated into one string. Split into separate entries, each with one question.")
-            return
-        # Detect sentences jammed together: "...level?Show" or "...groupsCompare"
-        # Pattern: lowercase/punctuation immediately followed by uppercase (no space)
-        jammed_sentences = re.findall(r'[a-z?.!]([A-Z][a-z])', q_str)
-        if jammed_sentences:
-            error(path, f"String appears to have multiple sentences concatenated without spaces (e.g., '...{q_str[max(0,q_str.find(jammed_sentences[0])-5):q_str.find(jammed_sentences[0])+10]}...'). Split into separate entries, each with one question.")
+
+@rule("$", "similarity", on_exit=True)
+def check_similar_example_sqls(ctx, config, path):
+    if len(ctx.example_sql_signatures) < 2:
+        return
+    param_candidates, similar_pairs = find_similar_example_sqls(ctx.example_sql_signatures, ctx.similarity_mode)
+    report_similar_example_sqls(
+        ctx.arrays["instructions.example_question_sqls"], param_candidates, similar_pairs, ctx.warning
+    )
+
+
+# =====================================================================
+# STREAMING VALIDATION
+# =====================================================================
+# For exported configs too large to load at once. The document is read in
+# chunks; objects on the way to the WALK_ORDER arrays are descended into, and
+# each array element is decoded on its own and sent through the same rules as
+# validate_config_single_pass. Array-level rules (sorting, sizes) run when the
+# array closes, on a stub of each item's key fields. Peak memory is the largest
+# single item plus those stubs and the per-item state cross-item checks need
+# (IDs, example SQL signatures).
+
+# Objects descended into while streaming; every other value is decoded whole
+STREAM_OBJECTS = {
+    path.rsplit(".", 1)[0] for path in WALK_ORDER
+} | {"instructions"}
+
+# Fields kept from each streamed item for array-level rules and reports
+STREAM_STUB_FIELDS = {
+    "instructions.example_question_sqls": ("id", "question"),
+}
+DEFAULT_STUB_FIELDS = ("id", "identifier")
+
+
+class JsonStreamReader:
+    """Incremental reader over a text file object, decoding one JSON value at a time."""
+
+    def __init__(self, fp, chunk_size: int = 1 << 16):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, min_chars: int = 0):
+        """Read at least one more chunk (or min_chars), dropping already consumed text."""
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.fp.read(max(self.chunk_size, min_chars))
+        if chunk:
+            self.buffer += chunk
+        else:
+            self.eof = True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it, or "" at end of input."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos] if self.pos < len(self.buffer) else ""
+            self.fill()
+
+    def expect(self, chars: str) -> str:
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise ValueError(f"Invalid JSON: expected one of {list(chars)}, got {ch or 'end of input'!r}")
+        self.pos += 1
+        return ch
+
+    def read_value(self):
+        """Decode the next complete JSON value, reading more input until it's whole."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow geometrically so a large item is re-scanned O(log n) times
+            self.fill(len(self.buffer) - self.pos)
+
+
+def iter_config_events(reader, path=""):
+    """
+    Yield streaming events for the object at the reader's position:
+      ("item", array_path, index, item) for each WALK_ORDER array element
+      ("end", array_path)               when a WALK_ORDER array closes
+      ("field", path, value)            for any other value
+      ("close", object_path)            when a STREAM_OBJECTS object closes
+    """
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        key = reader.read_value()
+        if not isinstance(key, str):
+            raise ValueError(f"Invalid JSON: object key must be a string at '{path}'")
+        reader.expect(":")
+        child = f"{path}.{key}" if path else key
+        if child in WALK_ORDER and reader.peek() == "[":
+            reader.pos += 1
+            index = 0
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield ("item", child, index, reader.read_value())
+                    index += 1
+                    if reader.expect(",]") == "]":
+                        break
+            yield ("end", child)
+        elif child in STREAM_OBJECTS and reader.peek() == "{":
+            yield from iter_config_events(reader, child)
+            yield ("close", child)
+        else:
+            yield ("field", child, reader.read_value())
+        if reader.expect(",}") == "}":
             return
-        # Very long single question without punctuation
-        if len(q_str) > 200 and "?" not in q_str:
-            warning(path, f"Very long question string ({len(q_str)} chars) without a question mark — check formatting")
-
-    for i, sq in enumerate(sample_questions):
-        q_list = sq.get("question", [])
-        if len(q_list) > 1:
-            warning(f"config.sample_questions[{i}].question", f"Has {len(q_list)} phrasings — use one question per entry. Create separate entries for alternate phrasings.")
-        for j, q_str in enumerate(q_list):
-            check_question_formatting(q_str, f"config.sample_questions[{i}].question[{j}]")
-
-    for i, eq in enumerate(example_sqls):
-        q_list = eq.get("question", [])
-        if len(q_list) > 1:
-            warning(f"instructions.example_question_sqls[{i}].question", f"Has {len(q_list)} phrasings — use one question per SQL entry. Create separate entries for alternate phrasings.")
-        for j, q_str in enumerate(q_list):
-            check_question_formatting(q_str, f"instructions.example_question_sqls[{i}].question[{j}]")
-
-    # --- SQL formatting checks ---
-    # Detect SQL that's all on one line or has keywords jammed together
-    SQL_KEYWORDS = {"SELECT", "FROM", "WHERE", "JOIN", "LEFT", "RIGHT", "INNER",
-                    "OUTER", "CROSS", "GROUP", "ORDER", "HAVING", "LIMIT", "UNION",
-                    "INSERT", "UPDATE", "DELETE", "CREATE", "WITH", "CASE", "WHEN"}
-
-    for i, eq in enumerate(example_sqls):
-        sql_parts = eq.get("sql", [])
-        if sql_parts:
-            full_sql = "".join(sql_parts)
-            p = f"instructions.example_question_sqls[{i}].sql"
-
-            # Check 1: SQL keywords jammed together without whitespace
-            # e.g., "country_countFROM" or "antigenORDER" or "stockoutsFROM"
-            jammed = re.findall(r'[a-z0-9_)][A-Z]{2,}', full_sql)
-            jammed_keywords = [m for m in jammed if any(m[1:].startswith(kw) for kw in SQL_KEYWORDS)]
-            if jammed_keywords:
-                error(p, f"SQL keywords concatenated without whitespace (e.g., '{jammed_keywords[0]}'). "
-                      f"Missing newlines between SQL clauses. Each clause should be a separate array element.")
-            # Check 2: Entire SQL in a single array element and long
-            elif len(sql_parts) == 1 and len(full_sql) > 100:
-                error(p, f"Entire SQL query is in a single array element ({len(full_sql)} chars). "
-                      f"Split each clause (SELECT, FROM, WHERE, etc.) into a separate array element.")
-            # Check 3: SQL is long with no newlines across all elements
-            elif len(full_sql) > 100 and "\n" not in full_sql:
-                warning(p, f"SQL is {len(full_sql)} chars on a single line — consider adding '\\n' at the end of each array element for readability.")
-
-    # --- Similar query detection and parameterization suggestions ---
-    def normalize_sql(sql_parts):
-        """Normalize SQL by replacing literals with placeholders for comparison."""
-        full = " ".join("".join(sql_parts).split())  # collapse whitespace
-        full = full.upper()
-        # Replace string literals
-        full = re.sub(r"'[^']*'", "'?'", full)
-        # Replace numeric literals (but not in column names)
-        full = re.sub(r'\b\d+\.?\d*\b', '?', full)
-        return full
-
-    def question_similarity(q1_list, q2_list):
-        """Calculate word-level Jaccard similarity between two question lists."""
-        words1 = set()
-        for q in q1_list:
-            words1.update(q.lower().split())
-        words2 = set()
-        for q in q2_list:
-            words2.update(q.lower().split())
-        if not words1 or not words2:
-            return 0.0
-        intersection = words1 & words2
-        union = words1 | words2
-        return len(intersection) / len(union)
-
-    if len(example_sqls) >= 2:
-        similar_pairs = []
-        param_candidates = []
-        for i in range(len(example_sqls)):
-            for j in range(i + 1, len(example_sqls)):
-                eq_i = example_sqls[i]
-                eq_j = example_sqls[j]
-
-                norm_i = normalize_sql(eq_i.get("sql", []))
-                norm_j = normalize_sql(eq_j.get("sql", []))
-
-                q_sim = question_similarity(
-                    eq_i.get("question", []),
-                    eq_j.get("question", [])
-                )
 
-                # Check if SQL structure is identical (only literals differ)
-                if norm_i == norm_j:
-                    q_i_text = eq_i.get("question", [""])[0][:60]
-                    q_j_text = eq_j.get("question", [""])[0][:60]
-                    param_candidates.append((i, j, q_i_text, q_j_text))
-                # Check for high question similarity with different SQL
-                elif q_sim > 0.7:
-                    q_i_text = eq_i.get("question", [""])[0][:60]
-                    q_j_text = eq_j.get("question", [""])[0][:60]
-                    similar_pairs.append((i, j, q_i_text, q_j_text, q_sim))
-
-        for i, j, q_i, q_j, in param_candidates:
-            warning(
-                f"instructions.example_question_sqls[{i}] & [{j}]",
-                f"These queries have identical SQL structure — consolidate into one parameterized query using :parameter syntax.\n"
-                f"      Query {i}: \"{q_i}\"\n"
-                f"      Query {j}: \"{q_j}\""
-            )
 
-        for i, j, q_i, q_j, sim in similar_pairs:
-            warning(
-                f"instructions.example_question_sqls[{i}] & [{j}]",
-                f"Questions are {int(sim*100)}% similar but SQL differs — review if these can be merged or if one is redundant.\n"
-                f"      Query {i}: \"{q_i}\"\n"
-                f"      Query {j}: \"{q_j}\""
-            )
+def validate_config_stream(fp, similarity_mode: str = "auto", chunk_size: int = 1 << 16, table_columns=None):
+    """
+    Validate a serialized_space JSON document read incrementally from a text
+    file object, yielding issue dicts as they are found.
 
-    # Check for example queries that already have parameters (good!) vs those that could
-    for i, eq in enumerate(example_sqls):
-        sql_text = "".join(eq.get("sql", []))
-        has_params = eq.get("parameters") or re.search(r':\w+', sql_text)
-        if not has_params:
-            # Look for hardcoded filter values that could be parameters
-            where_literals = re.findall(r"=\s*'([^']+)'", sql_text)
-            if where_literals:
-                warning(
-                    f"instructions.example_question_sqls[{i}]",
-                    f"Query has hardcoded filter value(s): {where_literals[:3]}. "
-                    f"Consider using :parameter syntax for trusted asset labeling."
-                )
+    Yields the same issues as validate_config_single_pass, in discovery order
+    rather than grouped by check. Snippets that appear before data_sources in
+    the document are held until the tables have been read, since their table
+    references are checked against them.
+    """
+    ctx = ValidationContext(similarity_mode, table_columns)
+    root = {}
+    stubs = {path: [] for path in WALK_ORDER}
+    ctx.arrays = stubs
+    pending = set(WALK_ORDER)
+    held_snippets = []
+    closed_early = set()
+    data_sources_read = False
+    snippet_paths = set(SECTION_DEPENDENTS["data_sources.tables"])
+
+    def visit(path, index, item):
+        item_pattern = f"{path}[]"
+        walk_item(
+            ctx, item_pattern, f"{path}[{index}]", index, item,
+            RULES.get(item_pattern, ()), CHILD_ARRAYS.get(item_pattern, ()),
+        )
 
-    return issues
+    def close_array(path, items):
+        run_rules(ctx, RULES.get(path, ()), items, path)
+        run_rules(ctx, EXIT_RULES.get(path, ()), items, path)
+        pending.discard(path)
+
+    def release_snippets():
+        for path, index, item in held_snippets:
+            visit(path, index, item)
+        for path in WALK_ORDER:
+            if path in closed_early:
+                close_array(path, stubs[path])
+        held_snippets.clear()
+        closed_early.clear()
+
+    for event in iter_config_events(JsonStreamReader(fp, chunk_size)):
+        kind, path = event[0], event[1]
+        if kind == "item":
+            index, item = event[2], event[3]
+            fields = STREAM_STUB_FIELDS.get(path, DEFAULT_STUB_FIELDS)
+            stubs[path].append({k: item[k] for k in fields if k in item} if isinstance(item, dict) else item)
+            if path in snippet_paths and not data_sources_read:
+                held_snippets.append((path, index, item))
+            else:
+                visit(path, index, item)
+        elif kind == "end":
+            if path in snippet_paths and not data_sources_read:
+                closed_early.add(path)
+            else:
+                close_array(path, stubs[path])
+        elif kind == "close" and path == "data_sources":
+            data_sources_read = True
+            release_snippets()
+        elif kind == "field":
+            if path in WALK_ORDER:
+                # Not an array — hand it to the rules as-is, like the single-pass walker
+                ctx.arrays[path] = event[2]
+                walk_array(ctx, path, path, event[2])
+                pending.discard(path)
+            elif "." not in path and not isinstance(event[2], (dict, list)):
+                root[path] = event[2]
+        yield from ctx.drain()
+
+    data_sources_read = True
+    release_snippets()
+    for path in WALK_ORDER:
+        if path in pending:
+            close_array(path, stubs[path])
+    run_rules(ctx, RULES.get("$", ()), root, "")
+    run_rules(ctx, EXIT_RULES.get("$", ()), root, "")
+    record_rule_timings(ctx)
+    yield from ctx.drain()
 
 
 # =====================================================================
-# RUN VALIDATION
+# TOKEN BUDGET
 # =====================================================================
+# Genie sends table and column metadata, SQL expressions, example SQL, join
+# specs, and text instructions to the model with every question; a space
+# that grows too large shows a "token limit" warning. These estimates follow
+# how BPE tokenizers split text (short words are one token, long words and
+# identifiers several, digits in groups of three, punctuation one each). They
+# are approximate, but good enough to see which sections and items to trim.
+
+TOKEN_PIECE_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+# Sections counted, in report order. Excluded columns are hidden from Genie
+# and not counted.
+TOKEN_CATEGORIES = (
+    "tables", "column_configs", "metric_views", "sql_snippets",
+    "example_question_sqls", "join_specs", "sql_functions", "text_instructions",
+)
+
+# How to shrink each section (from the "Token Limit Warning" fix list)
+TOKEN_TRIM_HINTS = {
+    "tables": "shorten table descriptions",
+    "column_configs": "hide unused columns and shorten column descriptions and synonyms",
+    "metric_views": "shorten metric view descriptions",
+    "sql_snippets": "remove unused SQL expressions and shorten their instructions",
+    "example_question_sqls": "prune overlapping example SQL and parameterize near-duplicates",
+    "join_specs": "remove join specs that duplicate Unity Catalog foreign keys",
+    "sql_functions": "remove unused SQL functions",
+    "text_instructions": "simplify the text instructions",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate model token count of a string."""
+    tokens = 0
+    for piece in TOKEN_PIECE_PATTERN.findall(text):
+        if piece[0].isalpha():
+            tokens += (len(piece) + 3) // 4
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
 
-if config is None and config_json_string is not None:
-    try:
-        config = json.loads(config_json_string)
-    except json.JSONDecodeError as e:
-        print(f"FATAL: Invalid JSON string — {e}")
-        config = None
-
-if config is None:
-    print("No config provided. Set 'config' (dict) or 'config_json_string' (str) at the top of this script.")
-    print("Or uncomment Option C to read from an existing Genie space.")
-else:
-    issues = validate_config(config)
 
-    errors = [i for i in issues if i["level"] == "error"]
-    warnings = [i for i in issues if i["level"] == "warning"]
+class TokenCounter:
+    """
+    estimate_tokens() with counts cached by content hash, optionally persisted
+    to a JSON file so repeated runs over large configs only tokenize new text.
+    """
 
-    print("=" * 70)
-    print("GENIE SPACE CONFIGURATION VALIDATION")
-    print("=" * 70)
+    def __init__(self, path: str = None):
+        self.path = path
+        self.counts = {}
+        self.hits = 0
+        self.misses = 0
+        if path:
+            try:
+                with open(path) as f:
+                    self.counts = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        key = hashlib.blake2b(text.encode(), digest_size=12).hexdigest()
+        cached = self.counts.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        self.counts[key] = estimate_tokens(text)
+        return self.counts[key]
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.counts, f)
+        os.replace(tmp_path, self.path)
+
+
+def item_text(item, fields) -> str:
+    """Text of the given fields of a config item; string arrays are joined, objects flattened."""
+    parts = []
+    for field in fields:
+        value = item.get(field)
+        if isinstance(value, list):
+            parts.extend(item_text(v, v.keys()) if isinstance(v, dict) else str(v) for v in value)
+        elif isinstance(value, dict):
+            parts.append(item_text(value, value.keys()))
+        elif value is not None and not isinstance(value, bool):
+            parts.append(str(value))
+    return "\n".join(p for p in parts if p)
+
+
+def iter_token_items(config: dict):
+    """Yield (category, path, label, text) for every config item Genie sends to the model."""
+    data_sources = config.get("data_sources", {})
+    for i, tbl in enumerate(data_sources.get("tables", [])):
+        identifier = tbl.get("identifier", "")
+        yield "tables", f"data_sources.tables[{i}]", identifier, item_text(tbl, ("identifier", "description"))
+        for j, cc in enumerate(tbl.get("column_configs", [])):
+            if cc.get("exclude"):
+                continue
+            yield (
+                "column_configs", f"data_sources.tables[{i}].column_configs[{j}]",
+                f"{identifier}.{cc.get('column_name', '')}",
+                item_text(cc, ("column_name", "description", "synonyms")),
+            )
+    for i, mv in enumerate(data_sources.get("metric_views", [])):
+        yield ("metric_views", f"data_sources.metric_views[{i}]", mv.get("identifier", ""),
+               item_text(mv, ("identifier", "description")))
 
-    # Summary counts
-    tables = config.get("data_sources", {}).get("tables", [])
-    metric_views = config.get("data_sources", {}).get("metric_views", [])
     instructions = config.get("instructions", {})
-    example_sqls = instructions.get("example_question_sqls", [])
-    text_instr = instructions.get("text_instructions", [])
-    sql_functions = instructions.get("sql_functions", [])
-    join_specs = instructions.get("join_specs", [])
-    snippets = instructions.get("sql_snippets", {})
-    snippet_measures = snippets.get("measures", [])
-    snippet_filters = snippets.get("filters", [])
-    snippet_expressions = snippets.get("expressions", [])
-    sample_qs = config.get("config", {}).get("sample_questions", [])
-    bench_qs = config.get("benchmarks", {}).get("questions", [])
-
-    # Count column configs and usage guidance
-    total_col_configs = sum(len(t.get("column_configs", [])) for t in tables)
-    sqls_with_guidance = sum(1 for eq in example_sqls if eq.get("usage_guidance"))
-
-    print(f"\n  Version: {config.get('version', 'MISSING')}")
-    print(f"  Tables: {len(tables)}")
-    if total_col_configs:
-        print(f"  Column configs: {total_col_configs} (across all tables)")
-    if metric_views:
-        print(f"  Metric views: {len(metric_views)}")
-    print(f"  Sample questions: {len(sample_qs)}")
-    print(f"  Text instructions: {len(text_instr)}")
-    print(f"  Example SQL queries: {len(example_sqls)}" + (f" ({sqls_with_guidance} with usage_guidance)" if example_sqls else ""))
-    print(f"  SQL functions: {len(sql_functions)}")
-    print(f"  Join specs: {len(join_specs)}")
-    total_snippets = len(snippet_measures) + len(snippet_filters) + len(snippet_expressions)
-    if total_snippets:
-        print(f"  SQL expressions: {total_snippets} (measures: {len(snippet_measures)}, filters: {len(snippet_filters)}, dimensions: {len(snippet_expressions)})")
-    else:
-        print(f"  SQL expressions: 0")
-    print(f"  Benchmarks: {len(bench_qs)}")
-    total_instr = len(example_sqls) + len(sql_functions) + (1 if text_instr else 0)
-    print(f"  Instruction budget: {total_instr}/100")
-
-    # Categorize warnings for cleaner output
-    formatting_keywords = ["concatenated", "single line", "single array element", "without whitespace", "question mark"]
-    similarity_keywords = ["identical SQL structure", "similar but SQL differs", "hardcoded filter"]
-
-    formatting_issues = [
-        w for w in warnings
-        if any(kw in w["message"] for kw in formatting_keywords)
+    for snippet_type in SNIPPET_TYPES:
+        for i, sn in enumerate(instructions.get("sql_snippets", {}).get(snippet_type, [])):
+            yield (
+                "sql_snippets", f"instructions.sql_snippets.{snippet_type}[{i}]",
+                sn.get("display_name") or sn.get("alias") or "",
+                item_text(sn, ("alias", "display_name", "sql", "synonyms", "instruction", "comment")),
+            )
+    for i, eq in enumerate(instructions.get("example_question_sqls", [])):
+        yield (
+            "example_question_sqls", f"instructions.example_question_sqls[{i}]",
+            "".join(eq.get("question", [])),
+            item_text(eq, ("question", "sql", "parameters", "usage_guidance")),
+        )
+    for i, js in enumerate(instructions.get("join_specs", [])):
+        label = f"{js.get('left', {}).get('identifier', '')} ↔ {js.get('right', {}).get('identifier', '')}"
+        yield ("join_specs", f"instructions.join_specs[{i}]", label,
+               item_text(js, ("left", "right", "sql", "instruction", "comment")))
+    for i, sf in enumerate(instructions.get("sql_functions", [])):
+        yield ("sql_functions", f"instructions.sql_functions[{i}]", sf.get("identifier", ""),
+               item_text(sf, ("identifier", "description")))
+    for i, ti in enumerate(instructions.get("text_instructions", [])):
+        yield ("text_instructions", f"instructions.text_instructions[{i}]", "text instruction",
+               item_text(ti, ("content",)))
+
+
+def estimate_token_budget(config: dict, budget: int = None, counter: TokenCounter = None, top_n: int = 10) -> dict:
+    """
+    Approximate tokens per config item and section.
+
+    Returns {"total", "budget", "over_budget", "by_category": {category: tokens},
+    "heaviest": [{"category", "path", "label", "tokens"}, ...top_n], "issues": [...]},
+    where issues holds an error when `budget` is exceeded, in validate_config's issue format.
+    """
+    counter = counter or TokenCounter()
+    by_category = dict.fromkeys(TOKEN_CATEGORIES, 0)
+    items = []
+    for category, path, label, text in iter_token_items(config):
+        tokens = counter.count(text)
+        by_category[category] += tokens
+        items.append({"category": category, "path": path, "label": label, "tokens": tokens})
+
+    total = sum(by_category.values())
+    over_budget = budget is not None and total > budget
+    issues = []
+    if over_budget:
+        largest = max(by_category, key=by_category.get)
+        issues.append({
+            "level": "error",
+            "path": "",
+            "message": (
+                f"Estimated {total:,} tokens exceeds the {budget:,} token budget — "
+                f"{largest} is the largest section ({by_category[largest]:,} tokens); "
+                f"{TOKEN_TRIM_HINTS[largest]}."
+            ),
+        })
+    return {
+        "total": total,
+        "budget": budget,
+        "over_budget": over_budget,
+        "by_category": by_category,
+        "heaviest": sorted(items, key=lambda item: -item["tokens"])[:top_n],
+        "issues": issues,
+    }
+
+
+# =====================================================================
+# BENCHMARK
+# =====================================================================
+
+def build_synthetic_config(num_items: int = MAX_ARRAY_SIZE, num_example_sqls: int = 1_000) -> dict:
+    """
+    Build a synthetic serialized_space with `num_items` entries in each large
+    collection (sample questions, column configs, snippets, benchmarks).
+
+    example_question_sqls is sized separately: the "exact" similarity mode
+    compares every pair, so it is quadratic, while "indexed" only scores pairs
+    that share a prefix word.
+    """
+    def make_id(kind, i):
+        return f"{kind:02x}{i:030x}"
+
+    num_tables = 25
+    cols_per_table = max(1, num_items // num_tables)
+    tables = [
+        {
+            "identifier": f"main.sales.table_{t:02d}",
+            "column_configs": [
+                {
+                    "column_name": f"col_{c:05d}",
+                    "enable_format_assistance": c % 3 == 0,
+                    "enable_entity_matching": c % 6 == 0,
+                    **({"exclude": True} if c % 50 == 0 else {}),
+                }
+                for c in range(cols_per_table)
+            ],
+        }
+        for t in range(num_tables)
     ]
-    similarity_issues = [
-        w for w in warnings
-        if any(kw in w["message"] for kw in similarity_keywords)
+    regions = ["AMER", "EMEA", "APJ", "LATAM"]
+    vocabulary = [f"term{k}" for k in range(5_000)]
+    example_sqls = []
+    for i in range(num_example_sqls):
+        # Pairs (2k, 2k+1) share most question words; every third pair also
+        # shares its SQL structure, the rest query different tables.
+        pair = i // 2
+        t = (pair if pair % 3 == 0 else i) % num_tables
+        example_sqls.append({
+            "id": make_id(2, i),
+            "question": [
+                "What is " + " ".join(vocabulary[(pair * 7919 + k * 104_729) % 5_000] for k in range(6))
+                + f" in {regions[i % 4]}?"
+            ],
+            "sql": [
+                "SELECT\n",
+                f"  table_{t:02d}.col_{pair:05d},\n",
+                "  SUM(table_00.col_00002) AS total\n",
+                f"FROM main.sales.table_{t:02d}\n",
+                f"WHERE table_{t:02d}.col_00003 = '{regions[i % 4]}' AND table_00.col_00004 > {i}\n",
+                "GROUP BY 1",
+            ],
+            **({"usage_guidance": ["Use for regional product line breakdowns"]} if i % 4 == 0 else {}),
+        })
+
+    def snippet(kind, i, sql):
+        return {
+            "id": make_id(kind, i),
+            "sql": [sql],
+            "synonyms": [f"synonym {i}"],
+            "instruction": ["Use when asked about this metric"],
+            "alias": f"snippet_{i}",
+            "display_name": f"Snippet {i}",
+        }
+
+    return {
+        "version": 2,
+        "config": {
+            "sample_questions": [
+                {"id": make_id(1, i), "question": [f"What is the revenue trend for segment {i}?"]}
+                for i in range(num_items)
+            ],
+        },
+        "data_sources": {
+            "tables": tables,
+            "metric_views": [{"identifier": "main.sales.revenue_metrics"}],
+        },
+        "instructions": {
+            "text_instructions": [
+                {"id": make_id(3, 0), "content": [f"Rule {i}: revenue excludes cancelled orders.\n" for i in range(100)]},
+            ],
+            "example_question_sqls": example_sqls,
+            "sql_functions": [
+                {"id": make_id(4, i), "identifier": f"main.sales.fn_{i}", "description": "Fiscal helper"}
+                for i in range(10)
+            ],
+            "join_specs": [
+                {
+                    "id": make_id(5, i),
+                    "left": {"identifier": f"main.sales.table_{i % num_tables:02d}"},
+                    "right": {"identifier": "main.sales.table_00"},
+                    "sql": [f"`table_{i % num_tables:02d}`.`col_00000` = `table_00`.`col_00000`", "--rt=FROM_RELATIONSHIP_TYPE_MANY_TO_ONE--"],
+                    "instruction": ["Join to the dimension table"],
+                }
+                for i in range(num_items // 10)
+            ],
+            "sql_snippets": {
+                "filters": [snippet(6, i, f"table_{i % num_tables:02d}.col_00001 > {i}") for i in range(num_items)],
+                "expressions": [snippet(7, i, f"YEAR(table_{i % num_tables:02d}.col_00002)") for i in range(num_items)],
+                "measures": [snippet(8, i, f"SUM(table_{i % num_tables:02d}.col_00003 * tabel_00.col_00004)") for i in range(num_items)],
+            },
+        },
+        "benchmarks": {
+            "questions": [
+                {"id": make_id(9, i), "question": [f"Benchmark {i}?"], "answer": [{"format": "SQL", "content": ["SELECT 1"]}]}
+                for i in range(num_items)
+            ],
+        },
+    }
+
+
+def benchmark_validation(num_items: int = MAX_ARRAY_SIZE, num_example_sqls: int = 1_000) -> dict:
+    """Time the validator on a synthetic config."""
+    synthetic_config = build_synthetic_config(num_items, num_example_sqls)
+    start = time.perf_counter()
+    issues = validate_config(synthetic_config)
+    seconds = time.perf_counter() - start
+
+    print("=" * 70)
+    print("VALIDATOR BENCHMARK")
+    print("=" * 70)
+    print(f"  Synthetic config: {num_items} items per collection, {num_example_sqls} example SQL queries")
+    print(f"  validate {seconds:8.3f}s  ({len(issues)} issues)")
+    return {"validate": seconds}
+
+
+def benchmark_similarity(num_example_sqls: int = 2_000) -> dict:
+    """Time exact vs indexed near-duplicate detection and confirm identical pairs."""
+    example_sqls = build_synthetic_config(0, num_example_sqls)["instructions"]["example_question_sqls"]
+    start = time.perf_counter()
+    signatures = [
+        (normalize_sql(eq.get("sql", [])), question_words(eq.get("question", [])))
+        for eq in example_sqls
     ]
-    other_warnings = [
-        w for w in warnings
-        if w not in formatting_issues and w not in similarity_issues
+    signature_seconds = time.perf_counter() - start
+    timings = {}
+    results = {}
+    for mode in ("exact", "indexed"):
+        start = time.perf_counter()
+        results[mode] = find_similar_example_sqls(signatures, mode)
+        timings[mode] = time.perf_counter() - start
+
+    print("=" * 70)
+    print("SIMILARITY BENCHMARK")
+    print("=" * 70)
+    print(f"  {num_example_sqls} example SQL queries, normalized once in {signature_seconds:.3f}s")
+    for mode, seconds in timings.items():
+        param_candidates, similar_pairs = results[mode]
+        print(f"  {mode:<8} {seconds:8.3f}s  ({len(param_candidates)} identical, {len(similar_pairs)} similar)")
+    print(f"  Speedup: {timings['exact'] / max(timings['indexed'], 1e-9):.1f}x")
+    print(f"  Identical pairs: {'yes' if results['exact'] == results['indexed'] else 'NO'}")
+    return timings
+
+
+def benchmark_snippet_analysis(num_snippets: int = MAX_ARRAY_SIZE) -> dict:
+    """Time snippet SQL parsing (cold and memoized) and column-checked validation on a synthetic config."""
+    synthetic_config = build_synthetic_config(num_snippets, 0)
+    table_columns = {
+        t["identifier"]: [cc["column_name"] for cc in t["column_configs"]]
+        for t in synthetic_config["data_sources"]["tables"]
+    }
+    snippet_sqls = [
+        " ".join(sn["sql"])
+        for snippet_type in SNIPPET_TYPES
+        for sn in synthetic_config["instructions"]["sql_snippets"][snippet_type]
     ]
+    timings = {}
+    parse_sql_expression.cache_clear()
+    for label in ("cold", "memoized"):
+        start = time.perf_counter()
+        for sql in snippet_sqls:
+            parse_sql_expression(sql)
+        timings[label] = time.perf_counter() - start
+    start = time.perf_counter()
+    issues = validate_config(synthetic_config, table_columns=table_columns)
+    timings["validate"] = time.perf_counter() - start
 
-    if errors:
-        print(f"\n{'─' * 70}")
-        print(f"ERRORS ({len(errors)}) — these will cause API rejection:")
-        print(f"{'─' * 70}")
-        for issue in errors:
-            print(f"  ✗ [{issue['path']}]")
-            print(f"    {issue['message']}")
+    print("=" * 70)
+    print("SNIPPET ANALYSIS BENCHMARK")
+    print("=" * 70)
+    print(f"  {len(snippet_sqls)} snippets ({len(set(snippet_sqls))} distinct SQL texts), "
+          f"{sum(len(c) for c in table_columns.values())} known columns")
+    for label in ("cold", "memoized"):
+        print(f"  parse {label:<9} {timings[label]:8.3f}s  ({len(snippet_sqls) / max(timings[label], 1e-9):,.0f} snippets/s)")
+    print(f"  validate {timings['validate']:8.3f}s  ({len(issues)} issues)")
+    return timings
 
-    if other_warnings:
-        print(f"\n{'─' * 70}")
-        print(f"WARNINGS ({len(other_warnings)}) — best-practice recommendations:")
-        print(f"{'─' * 70}")
-        for issue in other_warnings:
-            print(f"  ○ [{issue['path']}]")
-            print(f"    {issue['message']}")
 
-    if formatting_issues:
-        print(f"\n{'─' * 70}")
-        print(f"FORMATTING ISSUES ({len(formatting_issues)}):")
-        print(f"{'─' * 70}")
-        for issue in formatting_issues:
-            print(f"  ✗ [{issue['path']}]")
-            print(f"    {issue['message']}")
+# =====================================================================
+# RUN VALIDATION
+# =====================================================================
+# Runs in a notebook cell or as a script; skipped when imported
+# (e.g. by validate_batch.py).
+
+if __name__ == "__main__":
+    if config is None and config_json_string is not None:
+        try:
+            config = json.loads(config_json_string)
+        except json.JSONDecodeError as e:
+            print(f"FATAL: Invalid JSON string — {e}")
+            config = None
+
+    if table_columns is None:
+        # discover_resources.py's audit results, when run in the same notebook
+        table_columns = globals().get("all_results")
+
+    if run_benchmark:
+        benchmark_validation()
+        benchmark_similarity()
+        benchmark_snippet_analysis()
+
+    if config is None and config_json_path is not None:
+        print("=" * 70)
+        print("GENIE SPACE CONFIGURATION VALIDATION (streaming)")
+        print("=" * 70)
+        print(f"  File: {config_json_path}\n")
+
+        level_counts = Counter()
+        try:
+            with open(config_json_path) as f:
+                for issue in validate_config_stream(f, similarity_mode, table_columns=table_columns):
+                    level_counts[issue["level"]] += 1
+                    print(f"  {'✗' if issue['level'] == 'error' else '○'} [{issue['path']}]")
+                    print(f"    {issue['message']}")
+        except (OSError, ValueError) as e:
+            print(f"\nFATAL: Could not read {config_json_path} — {e}")
+        else:
+            if not level_counts:
+                print(f"  ✓ Configuration is valid. No issues found.")
+            elif not level_counts["error"]:
+                print(f"\n  ✓ Configuration is valid (will be accepted by API).")
+                print(f"    {level_counts['warning']} suggestion(s) to consider.")
+            else:
+                print(f"\n  ✗ Configuration has {level_counts['error']} error(s) that will cause API rejection.")
+                if level_counts["warning"]:
+                    print(f"    Also {level_counts['warning']} suggestion(s) to consider.")
+    elif config is None:
+        if not run_benchmark:
+            print("No config provided. Set 'config' (dict) or 'config_json_string' (str) at the top of this script.")
+            print("Or uncomment Option C to read from an existing Genie space, or set 'config_json_path' (Option D).")
+    else:
+        issues = validate_config(config, similarity_mode=similarity_mode, table_columns=table_columns)
+
+        errors = [i for i in issues if i["level"] == "error"]
+        warnings = [i for i in issues if i["level"] == "warning"]
+
+        print("=" * 70)
+        print("GENIE SPACE CONFIGURATION VALIDATION")
+        print("=" * 70)
+
+        # Summary counts
+        space = SpaceModel.from_config(config)
+        counts = space.summary()
+        total_col_configs = sum(len(t.column_configs) for t in space.tables)
+        sqls_with_guidance = sum(1 for eq in space.example_sqls if eq.raw.get("usage_guidance"))
+
+        print(f"\n  Version: {config.get('version', 'MISSING')}")
+        print(f"  Tables: {counts['tables']}")
+        if total_col_configs:
+            print(f"  Column configs: {total_col_configs} (across all tables)")
+        if counts["metric_views"]:
+            print(f"  Metric views: {counts['metric_views']}")
+        print(f"  Sample questions: {counts['sample_questions']}")
+        print(f"  Text instructions: {counts['text_instructions']}")
+        print(f"  Example SQL queries: {counts['example_sqls']}" + (f" ({sqls_with_guidance} with usage_guidance)" if counts["example_sqls"] else ""))
+        print(f"  SQL functions: {counts['sql_functions']}")
+        print(f"  Join specs: {counts['join_specs']}")
+        total_snippets = counts["snippet_measures"] + counts["snippet_filters"] + counts["snippet_expressions"]
+        if total_snippets:
+            print(f"  SQL expressions: {total_snippets} (measures: {counts['snippet_measures']}, filters: {counts['snippet_filters']}, dimensions: {counts['snippet_expressions']})")
+        else:
+            print(f"  SQL expressions: 0")
+        print(f"  Benchmarks: {counts['benchmarks']}")
+        print(f"  Instruction budget: {counts['instruction_count']}/100")
+
+        token_counter = TokenCounter(token_cache_path)
+        token_report = estimate_token_budget(config, token_budget, token_counter)
+        token_counter.save()
+        budget_note = f"/{token_budget:,}" if token_budget else ""
+        print(f"  Estimated tokens: ~{token_report['total']:,}{budget_note}")
+
+        # Categorize warnings for cleaner output
+        formatting_keywords = ["concatenated", "single line", "single array element", "without whitespace", "question mark"]
+        similarity_keywords = ["identical SQL structure", "similar but SQL differs", "hardcoded filter"]
+
+        formatting_issues = [
+            w for w in warnings
+            if any(kw in w["message"] for kw in formatting_keywords)
+        ]
+        similarity_issues = [
+            w for w in warnings
+            if any(kw in w["message"] for kw in similarity_keywords)
+        ]
+        other_warnings = [
+            w for w in warnings
+            if w not in formatting_issues and w not in similarity_issues
+        ]
 
-    if similarity_issues:
         print(f"\n{'─' * 70}")
-        print(f"PARAMETERIZATION SUGGESTIONS ({len(similarity_issues)}):")
+        print(f"TOKEN ESTIMATE (~{token_report['total']:,} tokens)")
         print(f"{'─' * 70}")
-        for issue in similarity_issues:
-            print(f"  → [{issue['path']}]")
-            print(f"    {issue['message']}")
-
-    if not errors and not other_warnings and not formatting_issues and not similarity_issues:
-        print(f"\n  ✓ Configuration is valid. No issues found.")
-    elif not errors:
-        total_notes = len(other_warnings) + len(formatting_issues) + len(similarity_issues)
-        print(f"\n  ✓ Configuration is valid (will be accepted by API).")
-        print(f"    {total_notes} suggestion(s) to consider.")
-    else:
-        print(f"\n  ✗ Configuration has {len(errors)} error(s) that will cause API rejection.")
-        total_notes = len(other_warnings) + len(formatting_issues) + len(similarity_issues)
-        if total_notes:
-            print(f"    Also {total_notes} suggestion(s) to consider.")
+        for category, tokens in token_report["by_category"].items():
+            if tokens:
+                share = tokens / token_report["total"]
+                print(f"  {category:<24} ~{tokens:>10,}  {share:>4.0%}")
+        if token_report["heaviest"]:
+            print(f"\n  Heaviest items:")
+            for item in token_report["heaviest"]:
+                label = item["label"] if len(item["label"]) <= 50 else item["label"][:47] + "..."
+                print(f"  → ~{item['tokens']:>6,}  {label}  [{item['path']}]")
+        for issue in token_report["issues"]:
+            print(f"\n  ✗ {issue['message']}")
+
+        if errors:
+            print(f"\n{'─' * 70}")
+            print(f"ERRORS ({len(errors)}) — these will cause API rejection:")
+            print(f"{'─' * 70}")
+            for issue in errors:
+                print(f"  ✗ [{issue['path']}]")
+                print(f"    {issue['message']}")
+
+        if other_warnings:
+            print(f"\n{'─' * 70}")
+            print(f"WARNINGS ({len(other_warnings)}) — best-practice recommendations:")
+            print(f"{'─' * 70}")
+            for issue in other_warnings:
+                print(f"  ○ [{issue['path']}]")
+                print(f"    {issue['message']}")
+
+        if formatting_issues:
+            print(f"\n{'─' * 70}")
+            print(f"FORMATTING ISSUES ({len(formatting_issues)}):")
+            print(f"{'─' * 70}")
+            for issue in formatting_issues:
+                print(f"  ✗ [{issue['path']}]")
+                print(f"    {issue['message']}")
+
+        if similarity_issues:
+            print(f"\n{'─' * 70}")
+            print(f"PARAMETERIZATION SUGGESTIONS ({len(similarity_issues)}):")
+            print(f"{'─' * 70}")
+            for issue in similarity_issues:
+                print(f"  → [{issue['path']}]")
+                print(f"    {issue['message']}")
+
+        if not errors and not other_warnings and not formatting_issues and not similarity_issues:
+            print(f"\n  ✓ Configuration is valid. No issues found.")
+        elif not errors:
+            total_notes = len(other_warnings) + len(formatting_issues) + len(similarity_issues)
+            print(f"\n  ✓ Configuration is valid (will be accepted by API).")
+            print(f"    {total_notes} suggestion(s) to consider.")
+        else:
+            print(f"\n  ✗ Configuration has {len(errors)} error(s) that will cause API rejection.")
+            total_notes = len(other_warnings) + len(formatting_issues) + len(similarity_issues)
+            if total_notes:
+                print(f"    Also {total_notes} suggestion(s) to consider.")
+        if token_report["over_budget"]:
+            print(f"  ✗ Estimated tokens exceed the {token_budget:,} token budget.")
+
+    finish_tracing()
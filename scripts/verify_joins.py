@@ -0,0 +1,347 @@
+"""
+Verify each join spec's declared relationship type against the actual key
+cardinality of its tables.
+
+A join declared MANY_TO_ONE whose right-side key isn't unique makes Genie
+write joins that fan out rows, inflating both results and query cost. For
+each instructions.join_specs entry this script:
+  - parses the join condition into key pairs (`orders`.`customer_id` =
+    `customers`.`customer_id`, ANDed for composite keys)
+  - runs one aggregated query that counts, on each side, rows, distinct
+    keys, duplicated keys, NULL keys, and keys with no match on the other side
+  - compares the measured relationship with the declared --rt=...-- type
+and reports mismatches (with the fan-out they cause) and orphan-key rates.
+Join specs are verified concurrently.
+
+With `sample_percent`, both sides keep the same fraction of the key space
+(by key hash), so per-key uniqueness and orphan rates stay exact for the
+sampled keys while the aggregation shrinks accordingly.
+
+Usage: Run this in a Databricks notebook cell.
+       Set `config` to your serialized_space dict (e.g. the `config` built by create_space.py).
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# sql_analyzer.py lives next to this script; in a notebook outside scripts/,
+# add that folder to sys.path first
+from sql_analyzer import parse_sql_expression, resolve_column_ref, tokenize
+
+# --- CONFIGURE ---
+
+# serialized_space dict to check (defaults to `config` from create_space.py when run in the same notebook)
+config = globals().get("config")
+
+# Percent of the key space to sample on both sides (None reads every key)
+sample_percent = None
+
+# Flag joins where more than this fraction of non-NULL key rows on a side has no match
+max_orphan_rate = 0.05
+
+# Join specs verified at once
+max_concurrency = 4
+
+# =====================================================================
+# JOIN CONDITION PARSING
+# =====================================================================
+
+RELATIONSHIP_TYPES = ("MANY_TO_ONE", "ONE_TO_MANY", "ONE_TO_ONE", "MANY_TO_MANY")
+
+# (left key unique, right key unique) -> relationship type
+RELATIONSHIP_BY_UNIQUENESS = {
+    (True, True): "ONE_TO_ONE",
+    (False, True): "MANY_TO_ONE",
+    (True, False): "ONE_TO_MANY",
+    (False, False): "MANY_TO_MANY",
+}
+
+
+def quote(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def declared_relationship(sql_parts: list):
+    """Relationship type from a join spec's --rt=FROM_RELATIONSHIP_TYPE_...-- element, or None."""
+    for part in sql_parts:
+        if isinstance(part, str) and part.strip().startswith("--rt=FROM_RELATIONSHIP_TYPE_"):
+            relationship = part.strip()[len("--rt=FROM_RELATIONSHIP_TYPE_"):].rstrip("-")
+            if relationship in RELATIONSHIP_TYPES:
+                return relationship
+    return None
+
+
+def join_condition(sql_parts: list) -> str:
+    return " ".join(p for p in sql_parts if isinstance(p, str) and not p.strip().startswith("--rt="))
+
+
+def side_names(side: dict) -> list:
+    """Names a join side can be referenced by in its condition: alias, table name, identifier."""
+    identifier = side.get("identifier", "")
+    names = [side.get("alias"), identifier.split(".")[-1], identifier]
+    return [n for n in dict.fromkeys(names) if n]
+
+
+def join_keys(condition: str, left: dict, right: dict) -> list[tuple]:
+    """
+    [(left key expression, right key expression)] for an equi-join condition.
+
+    The condition must be a conjunction of `expr = expr` terms, each side
+    referencing columns of only one of the two tables. Raises ValueError
+    for anything else (OR, non-equality predicates, ambiguous self-joins).
+    """
+    tokens, errors = tokenize(condition)
+    if errors:
+        raise ValueError(f"join condition doesn't parse ({'; '.join(errors)})")
+    left_names = {n.lower() for n in side_names(left)}
+    right_names = {n.lower() for n in side_names(right)}
+    if left_names & right_names and not (left.get("alias") and right.get("alias")):
+        raise ValueError("self-join without distinct aliases — can't tell the sides apart")
+    tables = {**{n: "left" for n in left_names}, **{n: "right" for n in right_names}}
+    if left.get("alias"):
+        tables[left["alias"].lower()] = "left"
+    if right.get("alias"):
+        tables[right["alias"].lower()] = "right"
+
+    # Split into top-level AND terms, then each term at its top-level '='
+    terms = [[]]
+    depth = 0
+    for token in tokens:
+        depth += (token.text == "(") - (token.text == ")")
+        if depth == 0 and token.kind == "ident" and token.text.upper() == "AND":
+            terms.append([])
+        elif depth == 0 and token.kind == "ident" and token.text.upper() == "OR":
+            raise ValueError("OR in join condition — only ANDed equality terms can be verified")
+        else:
+            terms[-1].append(token)
+
+    keys = []
+    for term in terms:
+        equals = [i for i, t in enumerate(term) if t.text in ("=", "==", "<=>")]
+        if not term or len(equals) != 1:
+            raise ValueError("join condition terms must each be a single equality (a.key = b.key)")
+        sides = {}
+        for part in (term[:equals[0]], term[equals[0] + 1:]):
+            if not part:
+                raise ValueError("empty side in join condition")
+            text = condition[part[0].start:part[-1].start + len(part[-1].text)]
+            owners = {
+                resolve_column_ref(ref, tables)[0]
+                for ref in parse_sql_expression(text).column_refs if len(ref) > 1
+            }
+            if len(owners) != 1 or None in owners:
+                raise ValueError(f"'{text}' must reference columns of exactly one of the joined tables")
+            sides[owners.pop()] = text
+        if set(sides) != {"left", "right"}:
+            raise ValueError("each join condition term must compare a left-table key with a right-table key")
+        keys.append((sides["left"], sides["right"]))
+    return keys
+
+
+def qualifier_used(key_expressions: list, names: list):
+    """The table name or alias the condition uses for a side (so the query can alias the table by it)."""
+    lowered = {n.lower(): n for n in names}
+    for expression in key_expressions:
+        for ref in parse_sql_expression(expression).column_refs:
+            if len(ref) > 1 and ref[0].lower() in lowered:
+                return ref[0]
+    return None
+
+
+# =====================================================================
+# CARDINALITY QUERY
+# =====================================================================
+
+def cardinality_query(left: dict, right: dict, keys: list, sample_percent: float = None) -> str:
+    """One aggregated query measuring key uniqueness, NULL keys, and orphan keys on both sides of a join."""
+    key_columns = [f"k{i}" for i in range(len(keys))]
+    null_key = " OR ".join(f"{k} IS NULL" for k in key_columns)
+
+    def side_cte(name, side, expressions):
+        alias = qualifier_used(expressions, side_names(side))
+        source = side["identifier"] + (f" AS {quote(alias)}" if alias and "." not in alias else "")
+        select = ", ".join(f"{e} AS {k}" for e, k in zip(expressions, key_columns))
+        sample = ""
+        if sample_percent:
+            hashed = ", ".join(f"CAST({k} AS STRING)" for k in key_columns)
+            # Same key hash on both sides, so a sampled key keeps all its rows on each side
+            sample = (f" WHERE CASE WHEN {null_key} THEN rand(17) * 100 < {sample_percent}"
+                      f" ELSE pmod(xxhash64({hashed}), 10000) < {int(sample_percent * 100)} END")
+        return (
+            f"{name}_rows AS (SELECT {select} FROM {source}),\n"
+            f"{name} AS (SELECT {', '.join(key_columns)}, COUNT(*) AS n, ({null_key}) AS null_key "
+            f"FROM {name}_rows{sample} GROUP BY {', '.join(key_columns)})"
+        )
+
+    def side_metrics(name, other):
+        return [
+            f"COALESCE(SUM({name}.n), 0) AS {name}_rows",
+            f"COALESCE(SUM(CASE WHEN {name}.null_key THEN {name}.n END), 0) AS {name}_null_rows",
+            f"COUNT(CASE WHEN NOT {name}.null_key THEN 1 END) AS {name}_keys",
+            f"COUNT(CASE WHEN NOT {name}.null_key AND {name}.n > 1 THEN 1 END) AS {name}_duplicate_keys",
+            f"COALESCE(MAX(CASE WHEN NOT {name}.null_key THEN {name}.n END), 0) AS {name}_max_rows_per_key",
+            f"COUNT(CASE WHEN NOT {name}.null_key AND {other}.n IS NULL THEN 1 END) AS {name}_orphan_keys",
+            f"COALESCE(SUM(CASE WHEN NOT {name}.null_key AND {other}.n IS NULL THEN {name}.n END), 0) AS {name}_orphan_rows",
+        ]
+
+    on = " AND ".join(f"l.{k} = r.{k}" for k in key_columns)
+    metrics = side_metrics("l", "r") + side_metrics("r", "l") + ["COALESCE(SUM(l.n * r.n), 0) AS joined_rows"]
+    return (
+        "WITH " + side_cte("l", left, [k[0] for k in keys]) + ",\n"
+        + side_cte("r", right, [k[1] for k in keys]) + "\n"
+        + "SELECT\n  " + ",\n  ".join(metrics) + f"\nFROM l FULL OUTER JOIN r ON {on}"
+    )
+
+
+# =====================================================================
+# VERIFY
+# =====================================================================
+
+def rate(part: int, whole: int) -> float:
+    return part / whole if whole else 0.0
+
+
+def verify_join(session, join_spec: dict, index: int, sample_percent: float = None,
+                max_orphan_rate: float = 0.05) -> dict:
+    """Measure one join spec's key cardinality and compare it with its declared relationship type."""
+    left = join_spec.get("left") or {}
+    right = join_spec.get("right") or {}
+    sql = join_spec.get("sql") or []
+    result = {
+        "index": index,
+        "id": join_spec.get("id"),
+        "left": left.get("identifier"),
+        "right": right.get("identifier"),
+        "declared": declared_relationship(sql),
+        "actual": None,
+        "keys": [],
+        "stats": None,
+        "fan_out": None,
+        "sql": None,
+        "seconds": None,
+        "error": None,
+        "mismatch": False,
+        "flags": [],
+    }
+    try:
+        if not result["left"] or not result["right"]:
+            raise ValueError("join spec needs left and right identifiers")
+        result["keys"] = join_keys(join_condition(sql), left, right)
+        result["sql"] = cardinality_query(left, right, result["keys"], sample_percent)
+        start = time.perf_counter()
+        stats = session.sql(result["sql"]).collect()[0].asDict()
+        result["seconds"] = round(time.perf_counter() - start, 3)
+    except Exception as e:
+        result["error"] = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+        return result
+
+    result["stats"] = stats = {k: int(v or 0) for k, v in stats.items()}
+    if not stats["l_keys"] or not stats["r_keys"]:
+        result["flags"].append("no non-NULL keys sampled on " + ("both sides" if not stats["l_keys"] and not stats["r_keys"]
+                                                                 else result["left"] if not stats["l_keys"] else result["right"]))
+        return result
+
+    left_unique = stats["l_duplicate_keys"] == 0
+    right_unique = stats["r_duplicate_keys"] == 0
+    result["actual"] = RELATIONSHIP_BY_UNIQUENESS[(left_unique, right_unique)]
+    matched_left_rows = stats["l_rows"] - stats["l_null_rows"] - stats["l_orphan_rows"]
+    result["fan_out"] = round(rate(stats["joined_rows"], matched_left_rows), 3)
+
+    declared = result["declared"]
+    if declared is None:
+        result["flags"].append(f"no --rt=...-- relationship type; measured {result['actual']}")
+    elif declared != result["actual"]:
+        expects_left_unique = declared in ("ONE_TO_MANY", "ONE_TO_ONE")
+        expects_right_unique = declared in ("MANY_TO_ONE", "ONE_TO_ONE")
+        for expected, unique, side, prefix in ((expects_left_unique, left_unique, result["left"], "l"),
+                                               (expects_right_unique, right_unique, result["right"], "r")):
+            if expected and not unique:
+                result["mismatch"] = True
+                result["flags"].append(
+                    f"declared {declared}, but {side} has {stats[f'{prefix}_duplicate_keys']:,} duplicated key(s) "
+                    f"(up to {stats[f'{prefix}_max_rows_per_key']:,} rows per key) — measured {result['actual']}"
+                )
+        if not result["mismatch"]:
+            result["flags"].append(f"declared {declared}, but the data supports the tighter {result['actual']}")
+    if result["mismatch"] and result["fan_out"] > 1:
+        result["flags"].append(f"joins fan out: {result['fan_out']:.2f} output rows per matched {result['left']} row")
+
+    for prefix, side, other in (("l", result["left"], result["right"]), ("r", result["right"], result["left"])):
+        non_null_rows = stats[f"{prefix}_rows"] - stats[f"{prefix}_null_rows"]
+        orphan_rate = rate(stats[f"{prefix}_orphan_rows"], non_null_rows)
+        if orphan_rate > max_orphan_rate:
+            result["flags"].append(
+                f"{orphan_rate:.1%} of {side} rows ({stats[f'{prefix}_orphan_keys']:,} key(s)) have no match in {other}"
+            )
+        null_rate = rate(stats[f"{prefix}_null_rows"], stats[f"{prefix}_rows"])
+        if null_rate > max_orphan_rate:
+            result["flags"].append(f"{null_rate:.1%} of {side} rows have a NULL join key")
+    return result
+
+
+def verify_join_specs(session, config: dict, sample_percent: float = None, max_workers: int = 4,
+                      max_orphan_rate: float = 0.05) -> list[dict]:
+    """Verify every join spec in a serialized_space config concurrently, in config order."""
+    join_specs = config.get("instructions", {}).get("join_specs", [])
+    if not join_specs:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(join_specs)))) as pool:
+        return list(pool.map(
+            lambda args: verify_join(session, args[1], args[0], sample_percent, max_orphan_rate),
+            enumerate(join_specs),
+        ))
+
+
+# =====================================================================
+# RUN VERIFICATION
+# =====================================================================
+
+if __name__ == "__main__":
+    from pyspark.sql import SparkSession
+
+    spark = SparkSession.builder.getOrCreate()
+
+    if not config:
+        print("No config provided. Set 'config' to your serialized_space dict at the top of this script.")
+    else:
+        print("=" * 70)
+        print("JOIN CARDINALITY VERIFICATION")
+        print(f"Sample: {f'{sample_percent}% of keys' if sample_percent else 'all keys'}, concurrency: {max_concurrency}")
+        print("=" * 70)
+
+        run_start = time.perf_counter()
+        join_results = verify_join_specs(spark, config, sample_percent, max_concurrency, max_orphan_rate)
+        run_seconds = time.perf_counter() - run_start
+
+        for r in join_results:
+            print(f"\n{'─' * 70}")
+            print(f"[{r['index']}] {r['left']} ↔ {r['right']}")
+            if r["error"]:
+                print(f"  ✗ Could not verify: {r['error']}")
+                continue
+            print(f"  Keys: {', '.join(f'{lk} = {rk}' for lk, rk in r['keys'])}")
+            if r["actual"]:
+                mark = "✗" if r["mismatch"] else "✓"
+                print(f"  {mark} Declared {r['declared'] or 'none'}, measured {r['actual']} ({r['seconds']:.2f}s)")
+                s = r["stats"]
+                print(f"    {r['left']}: {s['l_rows']:,} rows, {s['l_keys']:,} keys, {s['l_duplicate_keys']:,} duplicated")
+                print(f"    {r['right']}: {s['r_rows']:,} rows, {s['r_keys']:,} keys, {s['r_duplicate_keys']:,} duplicated")
+            for flag in r["flags"]:
+                print(f"  {'✗' if flag.startswith(('declared', 'joins fan out')) and r['mismatch'] else '○'} {flag}")
+
+        mismatched = [r for r in join_results if r["mismatch"]]
+        failed = [r for r in join_results if r["error"]]
+        print(f"\n{'=' * 70}")
+        print("SUMMARY")
+        print(f"{'=' * 70}")
+        verified = len(join_results) - len(failed)
+        print(f"  {verified}/{len(join_results)} join specs verified ({run_seconds:.1f}s total)")
+        if failed:
+            print(f"  ✗ {len(failed)} could not be verified: {', '.join(str(r['index']) for r in failed)}")
+        if mismatched:
+            print(f"  ✗ {len(mismatched)} declared relationship(s) contradicted by the data: "
+                  f"{', '.join(str(r['index']) for r in mismatched)}")
+            print(f"    Fix the --rt=...-- type (or deduplicate the key) — Genie trusts it when writing joins,")
+            print(f"    and a wrong MANY_TO_ONE/ONE_TO_ONE makes joins fan out rows.")
+        elif verified:
+            print(f"\n  ✓ Every verified join spec matches its data.")
@@ -0,0 +1,122 @@
+import json
+import sys
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# The scripts import their helpers as top-level modules (they run as notebook
+# cells next to each other), so tests import them the same way
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+SPACES_PATH = "/api/2.0/genie/spaces"
+
+
+class GenieStub:
+    """
+    In-memory stand-in for the Genie spaces REST API.
+
+    `spaces` maps space_id to the stored space. `fail(method, path, status,
+    times, headers)` makes the next `times` matching requests fail with that
+    status first. Every request is recorded in `requests` as
+    (method, path, query, body).
+    """
+
+    def __init__(self, page_size: int = 2, list_parent_path: bool = False):
+        self.spaces = {}
+        self.failures = {}
+        self.requests = []
+        self.page_size = page_size
+        self.list_parent_path = list_parent_path
+        self.lock = threading.Lock()
+
+    def add_space(self, **space) -> str:
+        space_id = space.setdefault("space_id", f"s{len(self.spaces) + 1}")
+        self.spaces[space_id] = space
+        return space_id
+
+    def fail(self, method: str, path: str, status: int, times: int = 1, headers: dict = None):
+        self.failures.setdefault((method, path), []).extend([(status, headers or {})] * times)
+
+    def handle(self, method: str, path: str, query: dict, body):
+        with self.lock:
+            self.requests.append((method, path, query, body))
+            failures = self.failures.get((method, path))
+            if failures:
+                return failures.pop(0) + ({"message": "injected failure"},)
+
+            if path == SPACES_PATH and method == "GET":
+                ids = sorted(self.spaces)
+                start = int(query.get("page_token", 0))
+                end = start + min(int(query.get("page_size", self.page_size)), self.page_size)
+                keys = ("space_id", "title", "description") + (("parent_path",) if self.list_parent_path else ())
+                page = {"spaces": [{k: self.spaces[i][k] for k in keys if k in self.spaces[i]} for i in ids[start:end]]}
+                if end < len(ids):
+                    page["next_page_token"] = str(end)
+                return 200, {}, page
+            if path == SPACES_PATH and method == "POST":
+                space_id = self.add_space(space_id=f"s{len(self.spaces) + 1}", **body)
+                return 200, {}, {"space_id": space_id, **body}
+
+            space_id = path[len(SPACES_PATH) + 1:]
+            if space_id not in self.spaces:
+                return 404, {}, {"error_code": "RESOURCE_DOES_NOT_EXIST"}
+            if method == "PATCH":
+                self.spaces[space_id].update(body)
+            space = dict(self.spaces[space_id])
+            if query.get("include_serialized_space") != "true":
+                space.pop("serialized_space", None)
+            return 200, {}, space
+
+
+@pytest.fixture
+def genie_server():
+    """(GenieStub, base URL) of a stub Genie API served on localhost."""
+    stub = GenieStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def respond(self):
+            url = urllib.parse.urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            status, headers, payload = stub.handle(self.command, url.path, dict(urllib.parse.parse_qsl(url.query)), body)
+            encoded = json.dumps(payload).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        do_GET = do_POST = do_PATCH = respond
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield stub, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="session")
+def local_spark(tmp_path_factory):
+    """Local SparkSession with a temporary warehouse; skipped without pyspark or a Java runtime."""
+    pytest.importorskip("pyspark")
+    from pyspark.sql import SparkSession
+
+    try:
+        session = (SparkSession.builder.master("local[2]").appName("prompt-to-genie-tests")
+                   .config("spark.sql.warehouse.dir", str(tmp_path_factory.mktemp("warehouse")))
+                   .config("spark.ui.enabled", "false").getOrCreate())
+    except Exception as e:
+        pytest.skip(f"local Spark unavailable: {e}")
+    yield session
+    session.stop()
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from bulk_create_spaces import apply_entry, bulk_create_spaces, existing_spaces
+from genie_api_client import GenieApiClient
+
+SPACES_PATH = "/api/2.0/genie/spaces"
+FOLDER = "/Workspace/Shared/genie"
+CONFIG = {"version": 2, "data_sources": {"tables": [{"identifier": "main.sales.orders"}]}}
+
+
+def entry(index: int = 0, **fields) -> dict:
+    return {"index": index, "error": None, "title": "Sales", "warehouse_id": "wh1", "parent_path": FOLDER,
+            "serialized_space": CONFIG, **fields}
+
+
+@pytest.fixture
+def api(genie_server):
+    _, url = genie_server
+    client = GenieApiClient(url, lambda: {}, backoff_seconds=0.01)
+    yield client
+    client.close()
+
+
+def add_space(stub, **fields) -> str:
+    return stub.add_space(**{"title": "Sales", "parent_path": FOLDER, "warehouse_id": "wh1",
+                             "serialized_space": json.dumps(CONFIG), **fields})
+
+
+def writes(stub) -> list:
+    return [(method, path, body) for method, path, _, body in stub.requests if method != "GET"]
+
+
+def test_creates_missing_space(genie_server, api):
+    stub, url = genie_server
+    row = apply_entry(api, entry(description="EMEA orders"), {}, url)
+
+    assert row["action"] == "created"
+    assert row["url"] == f"{url}/genie/rooms/{row['space_id']}"
+    created = stub.spaces[row["space_id"]]
+    assert created["parent_path"] == FOLDER
+    assert created["description"] == "EMEA orders"
+    assert json.loads(created["serialized_space"]) == CONFIG
+
+
+def test_unchanged_space_is_left_alone(genie_server, api):
+    stub, url = genie_server
+    space_id = add_space(stub)
+    existing = existing_spaces(api, {"Sales"})
+
+    # A missing description matches an empty or null one
+    for description in (None, ""):
+        stub.spaces[space_id]["description"] = description
+        assert apply_entry(api, entry(), existing, url)["action"] == "unchanged"
+    assert writes(stub) == []
+
+
+@pytest.mark.parametrize("change", [
+    {"serialized_space": {**CONFIG, "version": 3}},
+    {"description": "Now with a description"},
+    {"warehouse_id": "wh2"},
+])
+def test_changed_space_is_patched(genie_server, api, change):
+    stub, url = genie_server
+    space_id = add_space(stub, description="")
+    existing = existing_spaces(api, {"Sales"})
+
+    row = apply_entry(api, entry(**change), existing, url)
+
+    assert row["action"] == "updated"
+    assert row["space_id"] == space_id
+    [(method, path, body)] = writes(stub)
+    assert (method, path) == ("PATCH", f"{SPACES_PATH}/{space_id}")
+    assert body["warehouse_id"] == change.get("warehouse_id", "wh1")
+    assert body["description"] == change.get("description", "")
+    assert json.loads(body["serialized_space"]) == change.get("serialized_space", CONFIG)
+
+
+def test_dry_run_writes_nothing(genie_server, api):
+    stub, url = genie_server
+    add_space(stub)
+    entries = [entry(0, warehouse_id="wh2"), entry(1, title="Marketing"), entry(2, title="Sales", parent_path=f"{FOLDER}/")]
+    entries[2]["error"] = "Duplicate of manifest entry 0 (same title and parent_path)"
+
+    rows = bulk_create_spaces(api, entries, url, dry_run=True)
+
+    assert [r["action"] for r in rows] == ["would update", "would create", "invalid"]
+    assert writes(stub) == []
+
+
+def test_matches_only_spaces_in_the_same_folder(genie_server, api):
+    stub, url = genie_server
+    other_folder = add_space(stub, parent_path="/Workspace/Users/someone")
+    # The list response omits parent_path, so it is read from the space itself
+    same_folder = add_space(stub, parent_path=f"{FOLDER}/")
+
+    existing = existing_spaces(api, {"Sales"})
+
+    assert existing == {("Sales", FOLDER): same_folder, ("Sales", "/Workspace/Users/someone"): other_folder}
+    assert apply_entry(api, entry(), existing, url)["space_id"] == same_folder
+    assert apply_entry(api, entry(parent_path="/Workspace/Shared/other"), existing, url, dry_run=True)["action"] == "would create"
+
+
+def test_failed_create_is_reported_not_retried(genie_server, api):
+    stub, url = genie_server
+    stub.fail("POST", SPACES_PATH, 500)
+
+    [row] = bulk_create_spaces(api, [entry()], url)
+
+    assert row["action"] == "failed"
+    assert "HTTP 500" in row["error"]
+    assert len(writes(stub)) == 1
@@ -0,0 +1,395 @@
+import enum
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+import discover_resources
+from discover_resources import (
+    apply_entity_matching_limit,
+    profile_column_configs,
+    profile_table,
+    rank_warehouses,
+    recommend_warehouse,
+    review_tables,
+)
+
+
+class State(enum.Enum):
+    RUNNING = "RUNNING"
+    STOPPED = "STOPPED"
+    DELETED = "DELETED"
+
+
+class WarehouseType(enum.Enum):
+    PRO = "PRO"
+    CLASSIC = "CLASSIC"
+
+
+def warehouse(id, state="RUNNING", serverless=False, type="PRO", size="Small", max_clusters=1, num_clusters=None):
+    """Shaped like databricks.sdk.service.sql.EndpointInfo as returned by w.warehouses.list()."""
+    return SimpleNamespace(id=id, name=f"wh-{id}", state=State(state), enable_serverless_compute=serverless,
+                           warehouse_type=WarehouseType(type), cluster_size=size, max_num_clusters=max_clusters,
+                           num_clusters=num_clusters)
+
+
+def workspace_client(warehouses, queued=None):
+    """Mocked WorkspaceClient: warehouses.list() and query_history.list() (queued query counts by warehouse)."""
+    client = mock.Mock()
+    client.warehouses.list.return_value = warehouses
+
+    def list_queries(filter_by, max_results):
+        [warehouse_id] = filter_by.warehouse_ids
+        if warehouse_id not in (queued or {}):
+            raise PermissionError("no access to query history")
+        return SimpleNamespace(res=[object()] * queued[warehouse_id])
+
+    client.query_history.list.side_effect = list_queries
+    return client
+
+
+def test_running_beats_stopped_and_ineligible_are_dropped():
+    client = workspace_client([
+        warehouse("stopped", state="STOPPED", serverless=True, size="Large", max_clusters=4),
+        warehouse("running", state="RUNNING", size="Small"),
+        warehouse("classic", type="CLASSIC"),
+        warehouse("deleted", state="DELETED", serverless=True),
+    ])
+
+    recommended, ranking = recommend_warehouse(client)
+
+    assert recommended == "running"
+    assert [r["warehouse_id"] for r in ranking] == ["running", "stopped"]
+    assert ranking[1]["type"] == "Serverless"
+    assert ranking[1]["state"] == "STOPPED"
+
+
+def test_size_and_scaling_break_ties():
+    ranking = rank_warehouses([
+        warehouse("small", size="Small"),
+        warehouse("large", size="Large"),
+        warehouse("scaling", size="Small", max_clusters=8),
+        warehouse("unknown_size", size=None),
+    ])
+
+    assert [r["warehouse_id"] for r in ranking] == ["scaling", "large", "small", "unknown_size"]
+    assert ranking[-1]["size"] == "N/A"
+
+
+def test_queue_depth_penalty_per_running_cluster():
+    warehouses = [warehouse("busy", num_clusters=1), warehouse("busy_scaled", num_clusters=4), warehouse("idle")]
+
+    ranking = {r["warehouse_id"]: r for r in rank_warehouses(warehouses, {"busy": 4, "busy_scaled": 4, "idle": 0})}
+
+    assert ranking["idle"]["score"] - ranking["busy"]["score"] == pytest.approx(20)
+    assert ranking["idle"]["score"] - ranking["busy_scaled"]["score"] == pytest.approx(5)
+    assert ranking["busy"]["reasons"][-1] == "4 queued queries (-20.0)"
+
+
+def test_queue_depths_from_query_history():
+    pytest.importorskip("databricks.sdk")
+    client = workspace_client([warehouse("busy"), warehouse("idle"), warehouse("private")], queued={"busy": 3, "idle": 0})
+
+    recommended, ranking = recommend_warehouse(client)
+
+    assert recommended == "idle"
+    assert {r["warehouse_id"]: r["queued"] for r in ranking} == {"idle": 0, "private": None, "busy": 3}
+
+
+def test_no_eligible_warehouse():
+    recommended, ranking = recommend_warehouse(workspace_client([warehouse("classic", type="CLASSIC")]))
+
+    assert recommended is None
+    assert ranking == []
+
+
+def test_imports_without_side_effects():
+    # Importing the functions must not create clients or run any part
+    assert discover_resources.spark is None
+    assert not hasattr(discover_resources, "w")
+
+
+# Tables as Unity Catalog describes them, for FakeSpark
+CATALOG = {
+    "main.sales.orders": {
+        "type": "MANAGED",
+        "comment": "One row per order line.",
+        "columns": [("order_id", "bigint", "Order key."), ("customer_id", "bigint", None),
+                    ("region", "string", None), ("amount", "decimal(10,2)", "Net amount in USD.")],
+        "primary_key": ("pk_orders", ["order_id"]),
+        "foreign_keys": [("fk_orders_customers", ["customer_id", "region"], "main.sales.customers", ["id", "region"])],
+    },
+    "main.sales.customers": {
+        "type": "MANAGED",
+        "comment": None,
+        "columns": [("id", "bigint", "Customer key."), ("region", "string", "Sales region.")],
+        "primary_key": ("pk_customers", ["id", "region"]),
+        "foreign_keys": [],
+    },
+}
+
+
+def quoted(names) -> str:
+    return ", ".join(f"`{n}`" for n in names)
+
+
+class FakeSpark:
+    """
+    Answers the audit's queries for CATALOG: DESCRIBE TABLE EXTENDED as
+    Databricks prints it, and the information_schema queries of
+    fetch_catalog_metadata. Rows are dicts, which support row["name"] like
+    pyspark Rows.
+    """
+
+    def __init__(self, tables=CATALOG):
+        self.tables = tables
+        self.queries = []
+
+    def sql(self, query):
+        self.queries.append(query)
+        return SimpleNamespace(collect=lambda: self.rows(" ".join(query.split())))
+
+    def rows(self, query):
+        if query.startswith("DESCRIBE TABLE EXTENDED "):
+            return self.describe(query.split()[-1])
+        tables = {tuple(name.split(".")[1:]): t for name, t in self.tables.items()}
+        if "information_schema.tables" in query:
+            return [{"table_schema": schema, "table_name": table, "table_type": t["type"], "comment": t["comment"],
+                     "last_altered": "2026-10-01 12:00:00"}
+                    for (schema, table), t in tables.items()]
+        if "information_schema.columns" in query:
+            return [{"table_schema": schema, "table_name": table, "column_name": name, "full_data_type": type,
+                     "comment": comment}
+                    for (schema, table), t in tables.items() for name, type, comment in t["columns"]]
+        if "information_schema.table_constraints" in query:
+            return [{"table_schema": schema, "table_name": table, "constraint_name": fk_name, "column_name": column,
+                     "referenced_catalog": referenced.split(".")[0], "referenced_schema": referenced.split(".")[1],
+                     "referenced_table": referenced.split(".")[2]}
+                    for (schema, table), t in tables.items()
+                    for fk_name, columns, referenced, _ in t["foreign_keys"] for column in columns]
+        raise AssertionError(f"unexpected query: {query}")
+
+    def describe(self, table_identifier):
+        if table_identifier not in self.tables:
+            raise RuntimeError(f"[TABLE_OR_VIEW_NOT_FOUND] The table {table_identifier} cannot be found.")
+        t = self.tables[table_identifier]
+        rows = [(name, type, comment) for name, type, comment in t["columns"]]
+        rows += [("", "", ""), ("# Detailed Table Information", "", ""),
+                 ("Catalog", table_identifier.split(".")[0], ""), ("Type", t["type"], "")]
+        if t["comment"]:
+            rows.append(("Comment", t["comment"], ""))
+        pk_name, pk_columns = t["primary_key"]
+        rows += [("", "", ""), ("# Constraints", "", ""), (pk_name, f"PRIMARY KEY ({quoted(pk_columns)})", "")]
+        for fk_name, columns, referenced, referenced_columns in t["foreign_keys"]:
+            references = ".".join(f"`{p}`" for p in referenced.split("."))
+            rows.append((fk_name, f"FOREIGN KEY ({quoted(columns)}) REFERENCES {references} ({quoted(referenced_columns)})", ""))
+        return [{"col_name": name, "data_type": type, "comment": comment} for name, type, comment in rows]
+
+
+TABLES = ["main.sales.orders", "main.sales.customers", "main.sales.missing"]
+
+
+@pytest.fixture
+def fake_spark(monkeypatch):
+    session = FakeSpark()
+    monkeypatch.setattr(discover_resources, "spark", session)
+    return session
+
+
+def test_audit_modes_return_the_same_results(fake_spark):
+    bulk = review_tables(TABLES, mode="bulk")
+    # Only the missing table falls back to DESCRIBE
+    assert [q for q in fake_spark.queries if q.startswith("DESCRIBE")] == ["DESCRIBE TABLE EXTENDED main.sales.missing"]
+
+    assert review_tables(TABLES, mode="parallel") == bulk
+    assert review_tables(TABLES, mode="sequential") == bulk
+
+    orders, customers, missing = bulk
+    assert orders["foreign_keys"] == [{
+        "constraint_name": "fk_orders_customers",
+        "constraint_type": "FOREIGN_KEY",
+        "columns": ["customer_id", "region"],
+        "referenced_table": "main.sales.customers",
+    }]
+    assert orders["columns_missing_description"] == ["customer_id", "region"]
+    assert orders["quality_score"] == 70.0
+    assert customers["foreign_keys"] == []
+    assert customers["quality_score"] == 70.0
+    assert not missing["exists"]
+    assert missing["recommendations"][0].startswith("ERROR: Cannot access table")
+
+
+def test_cached_review_matches_uncached(fake_spark, tmp_path):
+    uncached = review_tables(TABLES[:2], mode="parallel")
+    cache = discover_resources.AuditCache(str(tmp_path / "cache.json"))
+
+    assert review_tables(TABLES[:2], mode="parallel", cache=cache) == uncached
+    cache.save()
+    reloaded = discover_resources.AuditCache(str(tmp_path / "cache.json"))
+    assert review_tables(TABLES[:2], mode="bulk", cache=reloaded) == uncached
+    assert reloaded.hits == 2
+
+
+@pytest.fixture(scope="module")
+def shop_catalog(local_spark):
+    """Fixture tables in spark_catalog.shop, and what Unity Catalog's information_schema would say about them."""
+    local_spark.sql("CREATE DATABASE IF NOT EXISTS shop")
+    local_spark.sql("CREATE TABLE shop.orders (order_id BIGINT COMMENT 'Order key.', customer_id BIGINT, "
+                    "amount DECIMAL(10,2) COMMENT 'Net amount in USD.') USING parquet COMMENT 'One row per order line.'")
+    local_spark.sql("CREATE TABLE shop.customers (id BIGINT COMMENT 'Customer key.', name STRING) USING parquet")
+
+    # What Unity Catalog's information_schema would say about those tables.
+    # Local Spark has no constraints, so the constraint views are empty.
+    local_spark.sql("CREATE DATABASE IF NOT EXISTS information_schema")
+    local_spark.sql("CREATE TABLE information_schema.tables AS SELECT * FROM VALUES "
+                    "('shop', 'orders', 'MANAGED', 'One row per order line.'), ('shop', 'customers', 'MANAGED', NULL) "
+                    "AS t(table_schema, table_name, table_type, comment)")
+    local_spark.sql("CREATE TABLE information_schema.columns AS SELECT * FROM VALUES "
+                    "('shop', 'orders', 'order_id', 'bigint', 'Order key.', 1), "
+                    "('shop', 'orders', 'customer_id', 'bigint', NULL, 2), "
+                    "('shop', 'orders', 'amount', 'decimal(10,2)', 'Net amount in USD.', 3), "
+                    "('shop', 'customers', 'id', 'bigint', 'Customer key.', 1), "
+                    "('shop', 'customers', 'name', 'string', NULL, 2) "
+                    "AS t(table_schema, table_name, column_name, full_data_type, comment, ordinal_position)")
+    local_spark.sql("CREATE TABLE information_schema.table_constraints (constraint_catalog STRING, "
+                    "constraint_schema STRING, constraint_name STRING, table_catalog STRING, table_schema STRING, "
+                    "table_name STRING, constraint_type STRING) USING parquet")
+    local_spark.sql("CREATE TABLE information_schema.key_column_usage (constraint_schema STRING, "
+                    "constraint_name STRING, column_name STRING, ordinal_position INT) USING parquet")
+    local_spark.sql("CREATE TABLE information_schema.referential_constraints (constraint_schema STRING, "
+                    "constraint_name STRING, unique_constraint_catalog STRING, unique_constraint_schema STRING, "
+                    "unique_constraint_name STRING) USING parquet")
+    return local_spark
+
+
+def test_local_spark_bulk_matches_per_table(shop_catalog, monkeypatch):
+    monkeypatch.setattr(discover_resources, "spark", shop_catalog)
+    tables = ["spark_catalog.shop.orders", "spark_catalog.shop.customers", "spark_catalog.shop.missing"]
+
+    bulk = review_tables(tables, mode="bulk")
+
+    assert review_tables(tables, mode="parallel") == bulk
+    assert [r["exists"] for r in bulk] == [True, True, False]
+    assert bulk[0]["table_comment"] == "One row per order line."
+    assert bulk[0]["columns_missing_description"] == ["customer_id"]
+
+
+def test_discarded_reviews_are_reviewed_again(fake_spark, tmp_path):
+    cache = discover_resources.AuditCache(str(tmp_path / "cache.json"))
+    review_tables(TABLES[:2], mode="parallel", cache=cache)
+    # Comment DDL ran on orders; information_schema still reports the old last_altered
+    fake_spark.tables = {**CATALOG, "main.sales.orders": {**CATALOG["main.sales.orders"], "comment": None}}
+    fake_spark.queries.clear()
+
+    cache.discard("review:main.sales.orders")
+    orders, customers = review_tables(TABLES[:2], mode="parallel", cache=cache)
+
+    assert orders["table_comment"] is None
+    assert [q for q in fake_spark.queries if q.startswith("DESCRIBE")] == ["DESCRIBE TABLE EXTENDED main.sales.orders"]
+
+
+class NoTopKSpark:
+    """Session without approx_top_k, answering the profile queries from canned rows."""
+
+    def __init__(self, aggregate: dict, top_values: list):
+        self.aggregate = aggregate
+        self.top_values = top_values
+        self.queries = []
+
+    def sql(self, query):
+        self.queries.append(query)
+        if "approx_top_k" in query:
+            raise RuntimeError("[UNRESOLVED_ROUTINE] Cannot resolve function `approx_top_k`")
+        rows = self.top_values if "stack(" in query else [self.aggregate]
+        return SimpleNamespace(collect=lambda: rows)
+
+
+def test_profile_fallback_keeps_most_frequent_values(monkeypatch):
+    session = NoTopKSpark(
+        {"row_count": 10, "c0_nulls": 1, "c0_distinct": 4, "c0_max_length": 5, "c0_long_values": 0},
+        [{"col": 0, "value": "beta", "frequency": 2}, {"col": 0, "value": "alpha", "frequency": 1},
+         {"col": 0, "value": "gamma", "frequency": 6}],
+    )
+    monkeypatch.setattr(discover_resources, "spark", session)
+
+    profile = profile_table("main.sales.orders", [{"name": "status", "type": "string"}], max_values=2)
+
+    assert profile["error"] is None
+    assert profile["columns"]["status"]["values"] == ["gamma", "beta"]
+    assert profile["columns"]["status"]["more_values"]
+    # Strings keep enough values to measure top-k coverage for entity matching
+    assert "frequency_rank <= 1024" in session.queries[-1]
+    assert profile["columns"]["status"]["top_k_coverage"] == 1.0
+    assert profile["columns"]["status"]["decision"] == "enable"
+
+
+def test_local_spark_profile_top_values(shop_catalog, monkeypatch):
+    monkeypatch.setattr(discover_resources, "spark", shop_catalog)
+    shop_catalog.sql("CREATE TABLE shop.tickets (status STRING, opened DATE) USING parquet")
+    shop_catalog.sql("INSERT INTO shop.tickets VALUES ('open', DATE'2026-01-01'), ('open', DATE'2026-01-02'), "
+                    "('open', NULL), ('closed', DATE'2026-01-03'), ('closed', NULL), ('archived', NULL), (NULL, NULL)")
+
+    profile = profile_table("spark_catalog.shop.tickets", [{"name": "status", "type": "string"},
+                                                            {"name": "opened", "type": "date"}], max_values=2)
+
+    status = profile["columns"]["status"]
+    assert profile["rows_scanned"] == 7
+    assert status["values"] == ["open", "closed"]
+    assert status["more_values"]
+    assert status["null_count"] == 1
+    assert str(profile["columns"]["opened"]["max"]) == "2026-01-03"
+
+
+def string_profile(table: str, row_count: int, columns: dict) -> dict:
+    """
+    profile_table result over NoTopKSpark for string columns given as
+    {name: (frequencies of their values, longest value, values over the length limit)}.
+    """
+    aggregate = {"row_count": row_count}
+    top_values = []
+    for i, (frequencies, max_length, long_values) in enumerate(columns.values()):
+        aggregate.update({f"c{i}_nulls": row_count - sum(frequencies), f"c{i}_distinct": len(frequencies),
+                          f"c{i}_max_length": max_length, f"c{i}_long_values": long_values})
+        top_values += [{"col": i, "value": f"v{n}", "frequency": f} for n, f in enumerate(frequencies)]
+    discover_resources.spark = NoTopKSpark(aggregate, top_values)
+    return profile_table(table, [{"name": name, "type": "string"} for name in columns])
+
+
+def test_profile_classifies_string_columns_for_entity_matching(monkeypatch):
+    monkeypatch.setattr(discover_resources, "spark", None)
+    profile = string_profile("main.sales.orders", 10_000, {
+        "region": ([2_500] * 4, 8, 0),
+        # 2,000 values, but the top 1,024 cover 83% of rows
+        "product": ([8] * 1_124 + [1] * 876, 20, 0),
+        "order_id": ([1] * 10_000, 12, 0),
+        "notes": ([1] * 50, 900, 50),
+        "empty": ([], 0, 0),
+    })
+    columns = profile["columns"]
+
+    assert {name: stats["decision"] for name, stats in columns.items()} == {
+        "region": "enable", "product": "needs_view", "order_id": "exclude", "notes": "exclude", "empty": "exclude",
+    }
+    assert columns["product"]["top_k_coverage"] == pytest.approx(0.83, abs=0.01)
+    assert columns["order_id"]["reason"] == "~10,000 distinct values (IDs or free text)"
+    assert profile_column_configs(profile) == [
+        {"column_name": "empty", "enable_format_assistance": False, "enable_entity_matching": False},
+        {"column_name": "notes", "enable_format_assistance": False, "enable_entity_matching": False},
+        {"column_name": "order_id", "enable_format_assistance": False, "enable_entity_matching": False},
+        {"column_name": "product", "enable_format_assistance": True, "enable_entity_matching": False},
+        {"column_name": "region", "enable_format_assistance": True, "enable_entity_matching": True},
+    ]
+
+
+def test_entity_matching_limit_keeps_the_fullest_columns(monkeypatch):
+    monkeypatch.setattr(discover_resources, "spark", None)
+    profiles = [
+        string_profile("main.sales.orders", 100, {"region": ([50, 50], 5, 0), "status": ([10, 10], 5, 0)}),
+        string_profile("main.sales.customers", 100, {"segment": ([30, 30], 5, 0)}),
+    ]
+
+    assert apply_entity_matching_limit(profiles, max_columns=2) == 1
+    assert profiles[0]["columns"]["region"]["decision"] == "enable"
+    assert profiles[1]["columns"]["segment"]["decision"] == "enable"
+    assert profiles[0]["columns"]["status"]["decision"] == "exclude"
+    assert profiles[0]["columns"]["status"]["reason"].endswith("over the 2-column entity matching limit for the space")
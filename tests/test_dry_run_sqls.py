@@ -0,0 +1,100 @@
+import pytest
+
+from dry_run_sqls import bind_parameters, dry_run_example_sqls, estimated_scan_bytes, full_scans
+
+FORMATTED_PLAN = """== Physical Plan ==
+* Project (4)
++- * BroadcastHashJoin Inner BuildRight (3)
+   :- Scan parquet spark_catalog.sales.orders (1)
+   +- Scan parquet spark_catalog.sales.customers (2)
+
+
+(1) Scan parquet spark_catalog.sales.orders
+Output [2]: [customer_id#1L, amount#2]
+Batched: true
+Location: InMemoryFileIndex [file:/tmp/warehouse/sales.db/orders]
+ReadSchema: struct<customer_id:bigint,amount:decimal(10,2)>
+
+(2) Scan parquet spark_catalog.sales.customers
+Output [2]: [id#3L, region#4]
+Batched: true
+Location: InMemoryFileIndex [file:/tmp/warehouse/sales.db/customers]
+PushedFilters: [IsNotNull(region), EqualTo(region,EMEA)]
+ReadSchema: struct<id:bigint,region:string>
+
+(3) BroadcastHashJoin [codegen id : 1]
+"""
+
+
+def example(sql: str, parameters=None, id: str = "q") -> dict:
+    return {"id": id, "question": [f"Question {id}"], "sql": [sql], "parameters": parameters or []}
+
+
+def test_bind_parameters():
+    bound, bindings, undeclared = bind_parameters(
+        "SELECT ':skip', CAST(x AS STRING)::int FROM t WHERE region = :region AND n > :n AND d = :missing",
+        [{"name": "region", "type_hint": "STRING", "default_value": {"values": ["O'Hare"]}},
+         {"name": "n", "type_hint": "INT"}],
+    )
+
+    assert bound == ("SELECT ':skip', CAST(x AS STRING)::int FROM t "
+                     "WHERE region = 'O\\'Hare' AND n > 1 AND d = NULL")
+    assert bindings == {"region": "'O\\'Hare'", "n": "1", "missing": "NULL"}
+    assert undeclared == ["missing"]
+
+
+def test_full_scans_are_scans_without_filters():
+    assert full_scans(FORMATTED_PLAN) == ["spark_catalog.sales.orders"]
+
+
+def test_estimated_scan_bytes_sums_leaf_relations():
+    cost_plan = ("Join Inner, Statistics(sizeInBytes=3.0 MiB)\n"
+                 ":- Relation spark_catalog.sales.orders[...] parquet, Statistics(sizeInBytes=2.0 MiB)\n"
+                 "+- Relation spark_catalog.sales.customers[...] parquet, Statistics(sizeInBytes=512.0 B)")
+
+    assert estimated_scan_bytes(cost_plan) == 2 * 1024 * 1024 + 512
+    assert estimated_scan_bytes("Project\n+- LocalRelation") is None
+
+
+@pytest.fixture(scope="module")
+def sales_tables(local_spark):
+    local_spark.sql("CREATE DATABASE IF NOT EXISTS sales")
+    local_spark.sql("CREATE TABLE sales.orders USING parquet AS SELECT * FROM VALUES "
+                    "(1, 10, CAST(5.00 AS DECIMAL(10,2))), (2, 20, CAST(7.50 AS DECIMAL(10,2))) "
+                    "AS t(order_id, customer_id, amount)")
+    local_spark.sql("CREATE TABLE sales.customers USING parquet AS SELECT * FROM VALUES "
+                    "(10, 'EMEA'), (20, 'APJ') AS t(id, region)")
+    return local_spark
+
+
+def test_local_spark_dry_run(sales_tables):
+    config = {"instructions": {"example_question_sqls": [
+        example("SELECT c.region, SUM(o.amount) FROM spark_catalog.sales.orders o "
+                "JOIN spark_catalog.sales.customers c ON o.customer_id = c.id "
+                "WHERE c.region = :region GROUP BY c.region",
+                [{"name": "region", "type_hint": "STRING", "default_value": {"values": ["EMEA"]}}], id="by_region"),
+        example("SELECT * FROM spark_catalog.sales.customers WHERE region = :region",
+                [{"name": "region", "type_hint": "STRING"}], id="empty"),
+        example("SELECT * FROM spark_catalog.sales.missing", id="broken"),
+    ]}}
+
+    by_region, empty, broken = dry_run_example_sqls(sales_tables, config, latency_budget=60, max_workers=3)
+
+    assert by_region["error"] is None
+    assert by_region["rows"] == 1
+    assert by_region["full_scans"] == ["spark_catalog.sales.orders"]
+    assert by_region["estimated_scan_bytes"] > 0
+    assert empty["rows"] == 0
+    assert "returned 0 rows" in empty["flags"]
+    assert broken["flags"] == ["error"]
+    assert "missing" in broken["error"]
+
+
+def test_local_spark_explain_only(sales_tables):
+    config = {"instructions": {"example_question_sqls": [example("SELECT * FROM spark_catalog.sales.orders")]}}
+
+    [result] = dry_run_example_sqls(sales_tables, config, execute=False)
+
+    assert result["seconds"] is None
+    assert result["rows"] is None
+    assert "Scan parquet spark_catalog.sales.orders" in result["plan"]
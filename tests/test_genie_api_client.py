@@ -0,0 +1,99 @@
+import pytest
+
+import genie_api_client
+from genie_api_client import GenieApiClient, list_space_ids
+
+SPACES_PATH = "/api/2.0/genie/spaces"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff sleeps the client asked for, without actually sleeping."""
+    recorded = []
+    monkeypatch.setattr(genie_api_client.time, "sleep", recorded.append)
+    return recorded
+
+
+def client(url: str, **kwargs) -> GenieApiClient:
+    return GenieApiClient(url, lambda: {"Authorization": "Bearer test"}, **kwargs)
+
+
+def test_429_is_retried_after_retry_after(genie_server, sleeps):
+    stub, url = genie_server
+    stub.add_space(space_id="s1", title="Sales")
+    stub.fail("GET", f"{SPACES_PATH}/s1", 429, times=2, headers={"Retry-After": "7"})
+    api = client(url)
+
+    assert api.get(f"{SPACES_PATH}/s1")["title"] == "Sales"
+    assert sleeps == [7.0, 7.0]
+    assert api.retries == 2
+    api.close()
+
+
+def test_retry_after_is_capped(genie_server, sleeps):
+    stub, url = genie_server
+    stub.add_space(space_id="s1", title="Sales")
+    stub.fail("GET", f"{SPACES_PATH}/s1", 429, headers={"Retry-After": "600"})
+    api = client(url, max_backoff_seconds=30)
+
+    api.get(f"{SPACES_PATH}/s1")
+    assert sleeps == [30]
+    api.close()
+
+
+def test_post_is_not_retried_on_5xx(genie_server, sleeps):
+    stub, url = genie_server
+    stub.fail("POST", SPACES_PATH, 503)
+    api = client(url)
+
+    with pytest.raises(RuntimeError, match="HTTP 503"):
+        api.post(SPACES_PATH, {"title": "Sales"})
+    assert [r[0] for r in stub.requests] == ["POST"]
+    assert stub.spaces == {}
+    assert sleeps == []
+    api.close()
+
+
+def test_post_is_retried_on_429(genie_server, sleeps):
+    stub, url = genie_server
+    stub.fail("POST", SPACES_PATH, 429)
+    api = client(url)
+
+    assert api.post(SPACES_PATH, {"title": "Sales"})["space_id"]
+    assert len(stub.spaces) == 1
+    api.close()
+
+
+def test_idempotent_requests_are_retried_on_5xx_until_max_retries(genie_server, sleeps):
+    stub, url = genie_server
+    stub.add_space(space_id="s1", title="Sales")
+    stub.fail("PATCH", f"{SPACES_PATH}/s1", 502, times=2)
+    stub.fail("GET", f"{SPACES_PATH}/s1", 500, times=3)
+    api = client(url, max_retries=2)
+
+    assert api.patch(f"{SPACES_PATH}/s1", {"title": "Sales v2"})["title"] == "Sales v2"
+    with pytest.raises(RuntimeError, match="HTTP 500"):
+        api.get(f"{SPACES_PATH}/s1")
+    assert len(sleeps) == 4
+    api.close()
+
+
+def test_client_errors_are_not_retried(genie_server, sleeps):
+    _, url = genie_server
+    api = client(url)
+
+    with pytest.raises(RuntimeError, match="HTTP 404"):
+        api.get(f"{SPACES_PATH}/missing")
+    assert sleeps == []
+    api.close()
+
+
+def test_list_follows_page_tokens(genie_server):
+    stub, url = genie_server
+    for i in range(5):
+        stub.add_space(space_id=f"s{i}", title=f"Space {i}")
+    api = client(url)
+
+    assert list_space_ids(api, page_size=2) == ["s0", "s1", "s2", "s3", "s4"]
+    assert sum(1 for r in stub.requests if r[1] == SPACES_PATH) == 3
+    api.close()
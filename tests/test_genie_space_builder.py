@@ -0,0 +1,146 @@
+import random
+import re
+
+import pytest
+
+from genie_space_builder import GenieSpaceBuilder, SortedCollection
+from validate_config import MAX_ARRAY_SIZE, MAX_STRING_LENGTH, validate_config
+
+ORDERS = {"identifier": "main.sales.orders", "alias": "o"}
+CUSTOMERS = {"identifier": "main.sales.customers", "alias": "c"}
+
+
+def ids(items: list) -> list:
+    return [item["id"] for item in items]
+
+
+def full_builder() -> GenieSpaceBuilder:
+    builder = GenieSpaceBuilder()
+    builder.add_table("main.sales.orders", description="Daily sales transactions", column_configs=[
+        {"column_name": "region", "enable_format_assistance": True, "enable_entity_matching": True},
+        {"column_name": "amount", "description": "Net amount", "synonyms": ["revenue"]},
+    ])
+    builder.add_table("main.sales.customers", description="One row per customer")
+    for question in ("What were total sales last month?", "Which region sells most?", "Who are our top customers?"):
+        builder.add_sample_question(question)
+    builder.add_text_instruction(["Amounts are in USD", "Weeks start on Monday"])
+    builder.add_example_sql("What are total sales by region?",
+                            "SELECT\n  orders.region,\n  SUM(orders.amount) AS total_sales\n"
+                            "FROM main.sales.orders\nGROUP BY orders.region")
+    builder.add_join(ORDERS, CUSTOMERS, "o.customer_id = c.id", relationship_type="MANY_TO_ONE",
+                     instruction="Orders to their customer")
+    builder.add_measure("total_revenue", "SUM(orders.amount)", display_name="Total Revenue",
+                        synonyms=["revenue"], instruction="Sum of net amounts")
+    builder.add_filter("Large orders", "orders.amount > 1000", synonyms=["big orders"], instruction="Over 1,000 USD")
+    builder.add_benchmark("What were total sales?", "SELECT SUM(amount)\nFROM main.sales.orders")
+    return builder
+
+
+def test_sorted_regardless_of_insert_order():
+    identifiers = [f"main.sales.t{i:02d}" for i in range(30)]
+    question_ids = [f"{i:032x}" for i in range(30)]
+    columns = [f"col_{i:02d}" for i in range(30)]
+    for sequence in (identifiers, question_ids, columns):
+        random.Random(7).shuffle(sequence)
+    builder = GenieSpaceBuilder()
+    for identifier in identifiers:
+        builder.add_table(identifier)
+    for column in columns:
+        builder.add_column_config("main.sales.t00", column)
+    for sq_id in question_ids:
+        builder.add_sample_question(f"Question {sq_id}?", id=sq_id)
+
+    config = builder.build()
+
+    assert [t["identifier"] for t in config["data_sources"]["tables"]] == sorted(identifiers)
+    assert [c["column_name"] for c in config["data_sources"]["tables"][0]["column_configs"]] == sorted(columns)
+    assert ids(config["config"]["sample_questions"]) == sorted(question_ids)
+
+
+def test_generated_ids_stay_with_their_items():
+    builder = GenieSpaceBuilder()
+    added = {}
+    for week in range(20):
+        question, sql = f"How many orders in week {week}?", f"SELECT COUNT(*) FROM main.sales.orders WHERE week = {week}"
+        added[builder.add_example_sql(question, sql)] = ([question], [sql])
+
+    items = builder.build()["instructions"]["example_question_sqls"]
+
+    assert ids(items) == sorted(added)
+    for item in items:
+        assert (item["question"], item["sql"]) == added[item["id"]]
+
+
+def test_multi_line_sql_is_split_into_lines():
+    builder = GenieSpaceBuilder()
+    builder.add_example_sql("Sales?", "SELECT\n  SUM(amount)\nFROM main.sales.orders")
+
+    [item] = builder.build()["instructions"]["example_question_sqls"]
+
+    assert item["sql"] == ["SELECT\n", "  SUM(amount)\n", "FROM main.sales.orders"]
+
+
+def test_build_passes_validation():
+    builder = full_builder()
+    config = builder.build()
+
+    assert [i for i in validate_config(config) if i["level"] == "error"] == []
+    assert [i for i in builder.validate() if i["level"] == "error"] == []
+    assert list(config) == ["version", "config", "data_sources", "instructions", "benchmarks"]
+    assert "metric_views" not in config["data_sources"]
+    assert list(config["instructions"]["sql_snippets"]) == ["filters", "measures"]
+    assert config["instructions"]["text_instructions"][0]["content"] == ["Amounts are in USD\n", "Weeks start on Monday\n"]
+    assert config["instructions"]["join_specs"][0]["sql"] == ["o.customer_id = c.id",
+                                                             "--rt=FROM_RELATIONSHIP_TYPE_MANY_TO_ONE--"]
+
+
+@pytest.mark.parametrize("add, message", [
+    (lambda b: b.add_table("sales.orders"), "must be three-level namespace"),
+    (lambda b: b.add_table("main.sales.orders"), "Duplicate identifier 'main.sales.orders' in data_sources.tables"),
+    (lambda b: b.add_column_config("main.sales.returns", "id"), "Table 'main.sales.returns' has not been added"),
+    (lambda b: b.add_column_config("main.sales.orders", "region"), "Duplicate column_name 'region'"),
+    (lambda b: b.add_column_config("main.sales.orders", "status", enable_entity_matching=True),
+     "enable_entity_matching requires enable_format_assistance"),
+    (lambda b: b.add_sample_question(["One?", "Two?"]), "must be a single question string"),
+    (lambda b: b.add_sample_question("Why?", id="ABC"), "is not a valid 32-character lowercase hex string"),
+    (lambda b: b.add_sample_question("Again?", id=b.sample_questions.keys[0]), "Duplicate ID"),
+    # Sample questions and benchmarks share one ID scope
+    (lambda b: b.add_benchmark("Again?", "SELECT 1", id=b.sample_questions.keys[0]), "Duplicate ID"),
+    (lambda b: b.add_sample_question("x" * (MAX_STRING_LENGTH + 1)), "character limit"),
+    (lambda b: b.add_sample_question(42), "Expected a string or list of strings"),
+    (lambda b: b.add_text_instruction("More"), "Only one text instruction is allowed"),
+    (lambda b: GenieSpaceBuilder().add_text_instruction(["", ""]), "Text instruction content is empty"),
+    (lambda b: b.add_example_sql("Empty?", ""), "is empty"),
+    (lambda b: b.add_example_sql(["One?", "Two?"], "SELECT 1"), "must have a single question string"),
+    # Instructions of every type share one ID scope
+    (lambda b: b.add_measure("m", "SUM(x)", id=b.example_question_sqls.keys[0]), "Duplicate ID"),
+    (lambda b: b.add_sql_function("my_function"), "must be three-level namespace"),
+    (lambda b: b.add_join({"alias": "o"}, CUSTOMERS, "o.id = c.id", relationship_type="MANY_TO_ONE"),
+     "Join spec left must be"),
+    (lambda b: b.add_join(ORDERS, CUSTOMERS, "o.id = c.id", relationship_type="SOME"),
+     "relationship_type must be one of"),
+    (lambda b: b.add_join(ORDERS, CUSTOMERS, "o.id = c.id"), "exactly one valid --rt="),
+    (lambda b: b.add_join(ORDERS, CUSTOMERS, ["o.id = c.id", "o.x = c.x"], relationship_type="ONE_TO_ONE"),
+     "one equality condition plus the --rt= annotation"),
+    (lambda b: b.add_snippet("dimensions", "x"), "snippet_type must be one of"),
+    (lambda b: b.add_measure("empty", []), "has empty sql"),
+    (lambda b: b.add_filter("Paid", "WHERE orders.status = 'paid'"), "must not start with WHERE"),
+    (lambda b: b.add_benchmark(["One?", "Two?"], "SELECT 1"), "must have a single question string"),
+])
+def test_rejects_invalid_input(add, message):
+    builder = full_builder()
+    before = builder.build()
+
+    with pytest.raises(ValueError, match=re.escape(message)):
+        add(builder)
+
+    assert builder.build() == before
+
+
+def test_collection_size_limit():
+    collection = SortedCollection("config.sample_questions", "id")
+    for i in range(MAX_ARRAY_SIZE):
+        collection.insert(f"{i:032x}", {})
+
+    with pytest.raises(ValueError, match=f"config.sample_questions is full \\({MAX_ARRAY_SIZE} item limit\\)"):
+        collection.insert("f" * 32, {})
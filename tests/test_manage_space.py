@@ -0,0 +1,138 @@
+import csv
+import json
+
+import pytest
+
+import genie_api_client
+from genie_api_client import GenieApiClient
+from manage_space import changed_sections, diff_config, fleet_inventory, print_change_set, write_fleet_csv
+from snapshot_store import SnapshotStore
+
+SPACES_PATH = "/api/2.0/genie/spaces"
+CONFIG = {
+    "version": 2,
+    "config": {"sample_questions": [{"id": "a1", "question": ["Total sales?"]}]},
+    "data_sources": {"tables": [{"identifier": "main.sales.orders"}, {"identifier": "main.sales.customers"}]},
+    "instructions": {
+        "example_question_sqls": [{"id": "b1", "question": ["Total sales?"], "sql": ["SELECT SUM(amount) FROM orders"]}],
+        "text_instructions": [{"id": "c1", "content": ["Amounts are in USD."]}],
+    },
+}
+
+
+@pytest.fixture
+def api(genie_server, monkeypatch):
+    monkeypatch.setattr(genie_api_client.time, "sleep", lambda seconds: None)
+    _, url = genie_server
+    client = GenieApiClient(url, lambda: {"Authorization": "Bearer test"})
+    yield client
+    client.close()
+
+
+def add_spaces(stub, count: int) -> list:
+    return [stub.add_space(space_id=f"s{i:03}", title=f"Space {i}", serialized_space=json.dumps(CONFIG))
+            for i in range(count)]
+
+
+def test_inventories_every_listed_space(genie_server, api):
+    stub, _ = genie_server
+    space_ids = add_spaces(stub, 7)
+    stub.fail("GET", f"{SPACES_PATH}/s003", 429, times=2, headers={"Retry-After": "1"})
+
+    rows = fleet_inventory(api, max_concurrency=4)
+
+    assert [r["space_id"] for r in rows] == space_ids
+    assert all(r["error"] is None for r in rows)
+    assert rows[3]["title"] == "Space 3"
+    assert {(r["tables"], r["sample_questions"], r["example_sqls"], r["instruction_count"]) for r in rows} == {(2, 1, 1, 2)}
+    assert api.retries == 2
+
+
+def test_unreadable_space_is_reported_in_its_row(genie_server, api):
+    stub, _ = genie_server
+    add_spaces(stub, 2)
+
+    rows = fleet_inventory(api, ["s000", "missing", "s001"])
+
+    assert [r["space_id"] for r in rows] == ["s000", "missing", "s001"]
+    assert rows[1]["title"] is None
+    assert "HTTP 404" in rows[1]["error"]
+    assert rows[2]["error"] is None
+
+
+def test_snapshots_and_csv(genie_server, api, tmp_path):
+    stub, _ = genie_server
+    add_spaces(stub, 3)
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+
+    first = fleet_inventory(api, store=store)
+    again = fleet_inventory(api, store=store)
+    write_fleet_csv(again, str(tmp_path / "fleet.csv"))
+
+    assert not any(r["snapshot"]["unchanged"] for r in first)
+    assert all(r["snapshot"]["unchanged"] for r in again)
+    with open(tmp_path / "fleet.csv", newline="") as f:
+        written = list(csv.DictReader(f))
+    assert [r["space_id"] for r in written] == ["s000", "s001", "s002"]
+    assert written[0]["tables"] == "2"
+    assert written[0]["error"] == ""
+
+
+def edited(config: dict, **sections) -> dict:
+    """Deep copy of a config with top-level sections replaced."""
+    return {**json.loads(json.dumps(config)), **sections}
+
+
+def test_diff_config_identical():
+    assert diff_config(CONFIG, json.loads(json.dumps(CONFIG))) == {}
+
+
+def test_diff_config_items():
+    after = edited(CONFIG, instructions={
+        "example_question_sqls": [
+            {"id": "b3", "question": ["Orders?"], "sql": ["SELECT COUNT(*) FROM orders"]},
+            {"id": "b2", "question": ["Customers?"], "sql": ["SELECT COUNT(*) FROM customers"]},
+        ],
+        "text_instructions": [{"id": "c1", "content": ["Amounts are in EUR."]}],
+    }, data_sources={"tables": [{"identifier": "main.sales.customers"}, {"identifier": "main.sales.orders"}]})
+
+    changes = diff_config(CONFIG, after)
+
+    assert changes == {
+        "data_sources.tables": {"added": [], "removed": [], "modified": [], "reordered": True},
+        "instructions.text_instructions": {"added": [], "removed": [], "modified": ["c1"], "reordered": False},
+        "instructions.example_question_sqls": {"added": ["b3", "b2"], "removed": ["b1"], "modified": [],
+                                               "reordered": False},
+    }
+    assert changed_sections(changes) == set(changes)
+
+
+def test_diff_config_non_section_fields():
+    after = edited(CONFIG, version=1, benchmarks={"questions": []})
+    after["config"]["title"] = "Sales"
+
+    changes = diff_config(CONFIG, after)
+
+    # An empty benchmarks section has no items to diff, so it shows as a plain field
+    assert changes == {"version": {"before": 2, "after": 1},
+                       "config.title": {"before": None, "after": "Sales"},
+                       "benchmarks": {"before": None, "after": {"questions": []}}}
+    assert changed_sections(changes) == set()
+
+
+def test_print_change_set(capsys):
+    after = edited(CONFIG, version=1)
+    after["config"]["sample_questions"] = [{"id": "a2", "question": ["Top customers?"]},
+                                           {"id": "a1", "question": ["Total sales this year?"]}]
+
+    print_change_set(diff_config(CONFIG, after))
+    print_change_set({})
+
+    assert capsys.readouterr().out.splitlines() == [
+        "Change set: 2 section(s)",
+        "  config.sample_questions: 1 added, 1 modified",
+        "    + a2",
+        "    ~ a1",
+        "  version: 2 → 1",
+        "No changes.",
+    ]
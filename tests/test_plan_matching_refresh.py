@@ -0,0 +1,117 @@
+import pytest
+
+from plan_matching_refresh import (
+    ENTITY_MATCHING_MAX_DISTINCT, REFRESH_SECONDS_PER_COLUMN, ROW_COUNT_KEY, dispatch, distinct_counts_from_results,
+    entity_matched_columns, estimate_column_seconds, estimate_refresh_jobs, missing_counts, peak_concurrency,
+    plan_refresh_schedule, simulate_refresh_schedule, wall_clock,
+)
+
+
+def job(space_id: str, seconds: float, *tables) -> dict:
+    return {"space_id": space_id, "tables": list(tables), "columns": 1, "seconds": seconds}
+
+
+def space(*columns) -> dict:
+    """Config with entity matching on each (table, column)."""
+    tables = {}
+    for table, column in columns:
+        tables.setdefault(table, []).append({"column_name": column, "enable_format_assistance": True,
+                                             "enable_entity_matching": True})
+    return {"data_sources": {"tables": [
+        {"identifier": t, "column_configs": ccs + [{"column_name": "note"}]} for t, ccs in tables.items()]}}
+
+
+def test_dispatch_rejects_a_cap_below_one():
+    with pytest.raises(ValueError, match="at least 1"):
+        dispatch([job("a", 10, "t")], [10.0], 0)
+
+
+def test_dispatch_respects_the_concurrency_cap():
+    jobs = [job(name, 10, name) for name in "abcde"]
+
+    times = dispatch(jobs, [10.0] * 5, max_concurrent=2)
+
+    assert times == [(0.0, 10.0), (0.0, 10.0), (10.0, 20.0), (10.0, 20.0), (20.0, 30.0)]
+    assert peak_concurrency(times) == 2
+
+
+def test_dispatch_serializes_shared_tables():
+    jobs = [job("a", 10, "dim"), job("b", 5, "dim", "facts"), job("c", 5, "other")]
+
+    assert dispatch(jobs, [10.0, 5.0, 5.0], 4) == [(0.0, 10.0), (10.0, 15.0), (0.0, 5.0)]
+    assert dispatch(jobs, [10.0, 5.0, 5.0], 4, avoid_table_overlap=False) == [(0.0, 10.0), (0.0, 5.0), (0.0, 5.0)]
+
+
+def test_dispatch_staggers_starts():
+    jobs = [job(name, 100, name) for name in "abc"]
+
+    assert dispatch(jobs, [100.0] * 3, 4, stagger_seconds=30) == [(0.0, 100.0), (30.0, 130.0), (60.0, 160.0)]
+
+
+def test_dispatch_waits_for_release_times():
+    jobs = [job("a", 10, "a"), job("b", 10, "b")]
+
+    assert dispatch(jobs, [10.0, 10.0], 4, release_times=[5.0, 0.0]) == [(5.0, 15.0), (0.0, 10.0)]
+
+
+def test_plan_refresh_schedule_starts_longest_first():
+    jobs = [job("small", 10, "a"), job("large", 50, "b"), job("medium", 30, "a")]
+
+    schedule = plan_refresh_schedule(jobs, max_concurrent=2)
+
+    assert [(j["space_id"], j["start"], j["end"]) for j in schedule] == [
+        ("large", 0.0, 50.0), ("medium", 0.0, 30.0), ("small", 30.0, 40.0)]
+
+
+def test_simulation_is_deterministic_for_a_seed():
+    schedule = plan_refresh_schedule([job(f"s{i}", 60 + i * 10, f"t{i % 3}") for i in range(8)],
+                                     max_concurrent=3, stagger_seconds=5)
+
+    first = simulate_refresh_schedule(schedule, 3, 5, duration_error=0.5, runs=50, seed=7)
+    second = simulate_refresh_schedule(schedule, 3, 5, duration_error=0.5, runs=50, seed=7)
+    exact = simulate_refresh_schedule(schedule, 3, 5, duration_error=0.0, runs=5, seed=7)
+
+    assert first == second
+    assert first["peak_concurrency"] <= 3
+    assert first["unscheduled_peak"] == 8
+    assert first["makespan_p50"] <= first["makespan_p95"]
+    # Exact estimates replay the plan: nothing starts late
+    assert exact["makespan_p95"] == pytest.approx(exact["planned_makespan"])
+    assert exact["delayed_fraction"] == 0.0
+
+
+def test_estimate_refresh_jobs():
+    columns_by_space = {
+        "s1": entity_matched_columns(space(("main.dim.region", "name"), ("main.dim.product", "sku"))),
+        "s2": entity_matched_columns(space(("main.dim.region", "code"))),
+        "s3": entity_matched_columns({"data_sources": {"tables": [{"identifier": "main.dim.x"}]}}),
+    }
+    counts = {"main.dim.region": {ROW_COUNT_KEY: 2_000_000, "name": 40},
+              "main.dim.product": {ROW_COUNT_KEY: 0, "sku": 5_000}}
+
+    s1, s2 = estimate_refresh_jobs(columns_by_space, counts)
+
+    assert columns_by_space["s3"] == {}
+    assert s1["tables"] == ["main.dim.product", "main.dim.region"]
+    assert s1["columns"] == 2
+    assert s1["seconds"] == pytest.approx(estimate_column_seconds(40, 2_000_000) + estimate_column_seconds(5_000, 0))
+    assert s1["over_limit"] == ["main.dim.product.sku"]
+    assert s2["unknown"] == ["main.dim.region.code"]
+    assert s2["seconds"] == pytest.approx(REFRESH_SECONDS_PER_COLUMN + 4.0)
+    assert estimate_column_seconds(10 ** 9) == estimate_column_seconds(ENTITY_MATCHING_MAX_DISTINCT)
+    assert missing_counts(columns_by_space, counts) == {"main.dim.region": {"code"}}
+
+
+def test_distinct_counts_from_profiles_skip_sampled_and_failed():
+    profiles = [
+        {"table": "a", "rows_scanned": 10, "columns": {"x": {"approx_distinct": 3}, "y": {"approx_distinct": None}}},
+        {"table": "b", "sample_percent": 10, "columns": {"x": {"approx_distinct": 1}}},
+        {"table": "c", "error": "boom"},
+    ]
+
+    assert distinct_counts_from_results(profiles) == {"a": {ROW_COUNT_KEY: 10, "x": 3}}
+
+
+def test_wall_clock():
+    assert wall_clock(90 * 60, "02:00") == "03:30"
+    assert wall_clock(23 * 3600, "02:00") == "01:00 +1d"
@@ -0,0 +1,157 @@
+from decimal import Decimal
+
+import pytest
+
+from run_benchmarks import ResultScanner, compare_results, normalize_value, run_benchmarks, unmatched_rows
+
+SPACE_ID = "space-1"
+
+
+def scanner_for(results: dict, float_tolerance: float = 1e-6, batch_size: int = 2) -> ResultScanner:
+    """ResultScanner over canned rows keyed by SQL text, streamed in small batches."""
+
+    def batches_for(sql):
+        if sql not in results:
+            raise RuntimeError(f"TABLE_OR_VIEW_NOT_FOUND: {sql}")
+        rows = results[sql]
+        return [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+
+    return ResultScanner(batches_for, float_tolerance)
+
+
+def genie_transport(answers: dict, polls_before_done: int = 1):
+    """Stub of the Genie conversation API: each question is answered with the SQL in `answers`."""
+    messages = {}
+
+    def transport(method, path, body=None):
+        if method == "POST" and path.endswith("/start-conversation"):
+            message_id = f"m{len(messages)}"
+            messages[message_id] = {"question": body["content"], "polls": 0}
+            return {"conversation_id": f"c{len(messages)}", "message_id": message_id}
+        assert method == "GET", (method, path)
+        message = messages[path.rsplit("/", 1)[1]]
+        message["polls"] += 1
+        if message["polls"] <= polls_before_done:
+            return {"status": "EXECUTING_QUERY"}
+        sql = answers[message["question"]]
+        if sql is None:
+            return {"status": "FAILED", "error": {"error": "Genie could not answer"}}
+        return {"status": "COMPLETED", "attachments": [{"query": {"query": sql}}]}
+
+    return transport
+
+
+def benchmark(question: str, sql: str) -> dict:
+    return {"id": question, "question": [question], "answer": [{"format": "SQL", "content": [sql]}]}
+
+
+def run(results: dict, answers: dict, benchmarks: list, **kwargs) -> list:
+    return run_benchmarks(
+        genie_transport(answers), scanner_for(results, **kwargs), SPACE_ID, benchmarks,
+        max_concurrency=2, sleep=lambda seconds: None,
+    )
+
+
+def test_matching_and_mismatching_answers():
+    results = {
+        "truth_a": [(1, "x"), (2, "y"), (3, "z")],
+        "genie_a": [(3, "z"), (1, "x"), (2, "y")],
+        "truth_b": [(1, "x"), (2, "y")],
+        "genie_b": [(1, "x"), (2, "w")],
+    }
+    [a, b] = run(
+        results,
+        {"A?": "genie_a", "B?": "genie_b"},
+        [benchmark("A?", "truth_a"), benchmark("B?", "truth_b")],
+    )
+
+    assert a["accuracy"] == 1.0
+    assert a["runs"][0]["sql"] == "genie_a"
+    assert b["accuracy"] == 0.0
+    diff = b["runs"][0]["diff"]
+    assert diff["missing"] == [(2, "y")]
+    assert diff["unexpected"] == [(2, "w")]
+
+
+def test_failed_answers_and_broken_sql_are_misses():
+    results = {"truth": [(1,)]}
+    [failed, broken] = run(
+        results,
+        {"Failed?": None, "Broken?": "no_such_table"},
+        [benchmark("Failed?", "truth"), benchmark("Broken?", "truth")],
+    )
+
+    assert failed["runs"][0]["status"] == "FAILED"
+    assert failed["accuracy"] == 0.0
+    assert broken["runs"][0]["error"].startswith("Generated SQL failed")
+    assert broken["accuracy"] == 0.0
+
+
+def test_benchmark_without_working_ground_truth_is_not_scored():
+    [result] = run({}, {"Q?": "anything"}, [benchmark("Q?", "missing_truth")])
+
+    assert result["accuracy"] is None
+    assert result["error"].startswith("Ground-truth SQL failed")
+    assert result["runs"][0]["status"] == "SKIPPED"
+
+
+def test_row_order_and_duplicates():
+    rows = [(i % 7, f"v{i % 3}") for i in range(200)]
+    scanner = scanner_for({"a": rows, "b": rows[::-1], "c": rows[1:] + rows[:1] + rows[:1]})
+
+    assert compare_results(scanner, "a", "b")["match"]
+    # Same distinct rows, one extra duplicate
+    diff = compare_results(scanner, "a", "c")
+    assert not diff["match"]
+    assert diff["unexpected"] == [rows[0]]
+
+
+def test_integers_and_decimals_compare_exactly():
+    assert normalize_value(1234567) != normalize_value(1234568)
+    assert normalize_value(Decimal("3.00")) == normalize_value(3)
+    scanner = scanner_for({
+        "ints": [(1234567,)],
+        "ints_off_by_one": [(1234568,)],
+        "decimals": [(Decimal("1234567.89"),)],
+        "decimals_off_by_a_cent": [(Decimal("1234567.88"),)],
+        "decimals_rescaled": [(Decimal("1234567.8900"),)],
+    })
+
+    assert not compare_results(scanner, "ints", "ints_off_by_one")["match"]
+    assert not compare_results(scanner, "decimals", "decimals_off_by_a_cent")["match"]
+    assert compare_results(scanner, "decimals", "decimals_rescaled")["match"]
+
+
+@pytest.mark.parametrize("expected, actual, match", [
+    (0.1 + 0.2, 0.3, True),
+    (1234567.0, 1234567.0000001, True),
+    # Within tolerance, but rounded to different 7-digit values
+    (0.123456749, 0.123456751, True),
+    (1.0, 1.00001, False),
+    # Just outside tolerance, though equal at 6 significant digits
+    (1.000004, 1.0000001, False),
+    (1.0, 1.0000015, False),
+    (1.0, 1.0000009, True),
+    # A float answer to an exact column is compared within tolerance
+    (Decimal("0.1234567"), 0.12345670000001, True),
+    (3, 3.0, True),
+])
+def test_float_tolerance(expected, actual, match):
+    scanner = scanner_for({"expected": [("k", expected)], "actual": [("k", actual)]})
+
+    assert compare_results(scanner, "expected", "actual")["match"] is match
+
+
+def test_floats_rounding_apart_across_many_rows():
+    expected = [(i, 0.123456749 + i) for i in range(500)]
+    actual = [(i, 0.123456751 + i) for i in reversed(range(500))]
+    scanner = scanner_for({"expected": expected, "actual": actual}, batch_size=64)
+
+    assert compare_results(scanner, "expected", "actual")["match"]
+
+
+def test_unmatched_rows_keeps_strings_and_decimals_apart():
+    missing, unexpected = unmatched_rows([(Decimal("1.5"),)], [("1.5",)], 1e-6)
+
+    assert missing == [(Decimal("1.5"),)]
+    assert unexpected == [("1.5",)]
@@ -0,0 +1,61 @@
+import datetime
+import json
+
+from snapshot_store import SnapshotStore
+
+EXAMPLE_SQL = {"id": "d0000000000000000000000000000000", "question": ["Revenue?"], "sql": ["SELECT 1"]}
+
+
+def space_config(example_sqls: list) -> dict:
+    return {
+        "version": 2,
+        "data_sources": {"tables": [{"identifier": "main.sales.orders"}]},
+        "instructions": {"example_question_sqls": example_sqls},
+    }
+
+
+def taken_at(day: int) -> datetime.datetime:
+    return datetime.datetime(2026, 1, day, tzinfo=datetime.timezone.utc)
+
+
+def test_restore_round_trips(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    config = space_config([EXAMPLE_SQL])
+    saved = store.save("space-1", config, {"title": "Sales"}, taken_at=taken_at(1))
+
+    assert store.restore("space-1", saved["snapshot_id"]) == config
+    assert json.loads(store.patch_body("space-1")["serialized_space"]) == config
+    assert store.save("space-1", config, {"title": "Sales"})["unchanged"]
+
+
+def test_restores_sharing_a_remainder_do_not_leak_items(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    a = store.save("space-1", space_config([EXAMPLE_SQL]), taken_at=taken_at(1))
+    b = store.save("space-1", space_config([]), taken_at=taken_at(2))
+
+    assert store.restore("space-1", a["snapshot_id"]) == space_config([EXAMPLE_SQL])
+    assert store.restore("space-1", b["snapshot_id"]) == space_config([])
+    assert store.restore("space-1", b["snapshot_id"]) == SnapshotStore(str(tmp_path)).restore("space-1", b["snapshot_id"])
+
+
+def test_editing_a_restored_config_leaves_the_store_unchanged(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.save("space-1", space_config([EXAMPLE_SQL]))
+
+    restored = store.restore("space-1")
+    restored["instructions"]["example_question_sqls"][0]["sql"].append("LIMIT 1")
+    restored["version"] = 1
+
+    assert store.restore("space-1") == space_config([EXAMPLE_SQL])
+
+
+def test_diff_and_prune(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    a = store.save("space-1", space_config([EXAMPLE_SQL]), taken_at=taken_at(1))
+    store.save("space-1", space_config([]), taken_at=taken_at(2))
+
+    changes = store.diff("space-1", a["snapshot_id"])
+
+    assert changes["instructions.example_question_sqls"]["removed"] == [EXAMPLE_SQL["id"]]
+    assert store.prune(keep_per_space=1) == {"snapshots": 1, "objects": 1}
+    assert store.restore("space-1") == space_config([])
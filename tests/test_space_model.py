@@ -0,0 +1,87 @@
+from space_model import SpaceModel, changed_fields, diff_keyed, get_section, keyed_items, table_names
+
+CONFIG = {
+    "version": 2,
+    "config": {"sample_questions": [{"id": "a1", "question": ["What is revenue?"]}, "not a dict"]},
+    "data_sources": {
+        "tables": [
+            {"identifier": "main.sales.orders", "description": ["Orders", " table"],
+             "column_configs": [{"column_name": "region", "enable_entity_matching": True,
+                                 "enable_format_assistance": True, "synonyms": ["area"]},
+                                {"column_name": "amount", "exclude": True}]},
+            {"identifier": "orders_view"},
+        ],
+        "metric_views": [{"identifier": "main.sales.revenue_mv"}],
+    },
+    "instructions": {
+        "text_instructions": [{"id": "t1", "content": ["Use fiscal ", "quarters."]}],
+        "example_question_sqls": [{"id": "e1", "question": ["Revenue by region"], "sql": ["SELECT 1\n", "FROM t"],
+                                   "usage_guidance": ["For regions"]}],
+        "sql_functions": [{"id": "f1", "identifier": "main.sales.fiscal_quarter"}],
+        "join_specs": [{"id": "j1", "left": {"identifier": "main.sales.orders"},
+                        "right": {"identifier": "main.sales.customers"}, "sql": ["orders.id = customers.id"]}],
+        "sql_snippets": {"measures": [{"id": "m1", "alias": "revenue", "sql": ["SUM(orders.amount)"]}],
+                         "filters": [{"id": "x1", "display_name": "Large", "sql": ["orders.amount > 100"]}]},
+    },
+    "benchmarks": {"questions": [{"id": "b1", "question": ["Revenue?"],
+                                  "answer": [{"format": "SQL", "content": ["SELECT ", "1"]}]}]},
+}
+
+
+def test_from_config_builds_records():
+    space = SpaceModel.from_config(CONFIG)
+    orders, view = space.tables
+
+    assert (orders.kind, orders.short_name, orders.description) == ("table", "orders", "Orders table")
+    assert view.short_name is None
+    assert [(c.column_name, c.enable_entity_matching, c.exclude, c.synonyms) for c in orders.column_configs] == [
+        ("region", True, False, ["area"]), ("amount", False, True, [])]
+    assert space.metric_views[0].kind == "metric_view"
+    assert [q.question for q in space.sample_questions] == ["What is revenue?"]
+    assert space.benchmarks[0].answer_sql == "SELECT 1"
+    assert space.text_instructions[0].sql == "Use fiscal quarters."
+    assert (space.example_sqls[0].name, space.example_sqls[0].sql) == ("Revenue by region", "SELECT 1\nFROM t")
+    assert space.join_specs[0].name == "main.sales.orders ↔ main.sales.customers"
+    assert [(s.name, s.sql) for s in space.snippets["measures"]] == [("revenue", "SUM(orders.amount)")]
+    assert space.snippets["filters"][0].name == "Large"
+    assert space.snippets["expressions"] == []
+
+
+def test_summary_counts_raw_sections():
+    summary = SpaceModel.from_config(CONFIG).summary()
+
+    # The malformed sample question is counted even though it has no record
+    assert summary["sample_questions"] == 2
+    assert (summary["tables"], summary["metric_views"], summary["snippet_measures"]) == (2, 1, 1)
+    assert summary["instruction_count"] == 1 + 1 + 1
+
+
+def test_malformed_config_does_not_raise():
+    space = SpaceModel.from_config({"data_sources": {"tables": [{"identifier": 7, "column_configs": "x"}]},
+                                    "instructions": {"join_specs": [{"left": "orders", "sql": "a = b"}]}})
+
+    assert space.tables[0].short_name is None
+    assert space.join_specs[0].sql == ""
+
+
+def test_table_names():
+    assert table_names("main.sales.orders") == ("orders", "main.sales.orders")
+    assert table_names("orders") == ("orders",)
+
+
+def test_keyed_items_and_diff():
+    old = keyed_items([{"id": "a"}, {"id": "b", "v": 1}, {"id": "a"}, "x"], "id")
+    new = keyed_items([{"id": "b", "v": 2}, {"id": "a"}, {"id": "c"}], "id")
+
+    assert list(old) == ["a", "b", "a#2", "[3]"]
+    assert diff_keyed(old, new) == {"added": ["c"], "removed": ["a#2", "[3]"], "modified": ["b"], "reordered": True}
+    assert diff_keyed(new, dict(new)) is None
+    assert get_section(CONFIG, "instructions.sql_snippets.measures")[0]["id"] == "m1"
+    assert get_section(CONFIG, "instructions.sql_snippets.missing") == []
+
+
+def test_changed_fields_skip_keyed_sections():
+    after = {**CONFIG, "version": 1, "data_sources": {"tables": [], "metric_views": []}, "title": "New"}
+
+    assert changed_fields(CONFIG, after) == {"version": {"before": 2, "after": 1},
+                                             "title": {"before": None, "after": "New"}}
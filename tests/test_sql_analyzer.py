@@ -0,0 +1,74 @@
+import pytest
+
+from sql_analyzer import parse_sql_expression, resolve_column_ref, tokenize
+
+TABLES = {"orders": "main.sales.orders", "main.sales.orders": "main.sales.orders"}
+
+
+@pytest.mark.parametrize("sql, refs", [
+    # Cast types
+    ("CAST(orders.amount AS DECIMAL(10, 2))", [("orders", "amount")]),
+    ("orders.amount::DOUBLE", [("orders", "amount")]),
+    ("CAST(orders.tags AS MAP<STRING, ARRAY<INT>>)", [("orders", "tags")]),
+    # Lambda parameters
+    ("TRANSFORM(orders.items, x -> x.price * 2)", [("orders", "items")]),
+    ("AGGREGATE(orders.items, 0, (acc, x) -> acc + x.qty)", [("orders", "items")]),
+    # INTERVAL and EXTRACT units, typed literals
+    ("orders.created_at >= CURRENT_DATE - INTERVAL 7 DAYS", [("orders", "created_at")]),
+    ("orders.created_at > now() - INTERVAL '3' DAY", [("orders", "created_at")]),
+    ("EXTRACT(YEAR FROM orders.created_at)", [("orders", "created_at")]),
+    ("DATEDIFF(DAY, orders.created_at, orders.shipped_at)", [("orders", "created_at"), ("orders", "shipped_at")]),
+    ("DATE '2024-01-01' < orders.day", [("orders", "day")]),
+    # Strings and comments are not scanned for table.column
+    ("orders.status = 'customers.region' -- products.sku\n/* returns.reason */", [("orders", "status")]),
+    ("orders.note LIKE 'it''s x.y'", [("orders", "note")]),
+    # Fully qualified and backtick-quoted names
+    ("main.sales.orders.amount > 0", [("main", "sales", "orders", "amount")]),
+    ("`main`.`sales`.`orders`.`order amount`", [("main", "sales", "orders", "order amount")]),
+    # Subquery aliases are not the space's tables
+    ("orders.id IN (SELECT r.order_id FROM main.sales.returns AS r WHERE r.reason = 'x')", [("orders", "id")]),
+    # Keywords, functions, parameters
+    ("SUM(orders.amount) FILTER (WHERE orders.status = 'paid')", [("orders", "amount"), ("orders", "status")]),
+    ("CASE WHEN orders.is_gift THEN 1 ELSE 0 END > :min_count", [("orders", "is_gift")]),
+    # Bare columns are reported alongside qualified ones
+    ("orders.amount > 0 AND status = 'paid'", [("orders", "amount"), ("status",)]),
+])
+def test_column_refs(sql, refs):
+    parsed = parse_sql_expression(sql)
+
+    assert list(parsed.column_refs) == refs
+    assert parsed.errors == ()
+
+
+def test_subquery_alias_is_recorded():
+    assert parse_sql_expression("EXISTS (SELECT 1 FROM main.sales.returns r WHERE r.id = orders.id)").aliases == ("r",)
+
+
+@pytest.mark.parametrize("sql, error", [
+    ("(orders.amount", "unbalanced parentheses"),
+    ("orders.amount)", "unbalanced parentheses"),
+    ("orders.name = 'abc", "unterminated string literal"),
+    ("orders.amount /* total", "unterminated /* comment"),
+    ("`orders.amount", "unterminated backtick identifier"),
+])
+def test_syntax_errors(sql, error):
+    assert error in parse_sql_expression(sql).errors
+
+
+def test_tokenize_drops_whitespace_and_comments():
+    tokens, errors = tokenize("a.b -- c\n+ 1")
+
+    assert [(t.kind, t.text) for t in tokens] == [("ident", "a"), ("op", "."), ("ident", "b"), ("op", "+"), ("number", "1")]
+    assert errors == []
+
+
+@pytest.mark.parametrize("parts, resolved", [
+    (("orders", "amount"), ("main.sales.orders", "amount")),
+    (("ORDERS", "amount"), ("main.sales.orders", "amount")),
+    (("main", "sales", "orders", "amount"), ("main.sales.orders", "amount")),
+    # Trailing parts are struct fields
+    (("orders", "address", "city"), ("main.sales.orders", "address")),
+    (("ordrs", "amount"), (None, "ordrs")),
+])
+def test_resolve_column_ref(parts, resolved):
+    assert resolve_column_ref(parts, TABLES) == resolved
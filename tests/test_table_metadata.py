@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from discover_resources import AuditCache
+from table_metadata import TableMetadata, load_table_metadata
+
+COLUMNS = {"main.sales.Orders": ["amount", {"name": "Region", "type": "string"}, ""],
+           "main.sales.customers": ["id", "name"]}
+
+
+def review(table: str, columns: list, exists: bool = True) -> dict:
+    return {"table": table, "exists": exists, "columns": [{"name": c, "type": "string"} for c in columns]}
+
+
+def test_lookups_are_case_insensitive():
+    metadata = TableMetadata(COLUMNS)
+
+    assert len(metadata) == 2
+    assert metadata.has_table("MAIN.SALES.ORDERS")
+    assert metadata.has_column("main.sales.orders", "region") is True
+    assert metadata.has_column("main.sales.orders", "tax") is False
+    assert metadata.has_column("main.sales.returns", "id") is None
+    assert metadata.columns("main.sales.orders") == {"amount": "amount", "region": "Region"}
+    assert metadata.suggest("main.sales.orders", "regoin") == "Region"
+    assert metadata.suggest("main.sales.orders", "zzz") is None
+    assert not TableMetadata()
+
+
+def test_from_audit_results_skips_inaccessible_tables():
+    metadata = TableMetadata.from_audit_results([review("main.sales.orders", ["amount"]),
+                                                 review("main.sales.secret", [], exists=False)])
+
+    assert metadata.has_table("main.sales.orders")
+    assert not metadata.has_table("main.sales.secret")
+
+
+def test_save_fixture_round_trips(tmp_path):
+    path = tmp_path / "catalog_snapshot.json"
+    TableMetadata(COLUMNS).save_fixture(str(path))
+
+    loaded = load_table_metadata(str(path))
+
+    assert json.loads(path.read_text())["tables"] == {"main.sales.Orders": ["Region", "amount"],
+                                                       "main.sales.customers": ["id", "name"]}
+    assert loaded.tables == TableMetadata(COLUMNS).tables
+    assert loaded.identifiers == TableMetadata(COLUMNS).identifiers
+
+
+def test_load_from_audit_cache_file(tmp_path):
+    cache = AuditCache(str(tmp_path / "audit_cache.json"))
+    cache.put("review:main.sales.orders", "v1", review("main.sales.orders", ["amount", "region"]))
+    cache.put("profile:main.sales.orders", "v1", {"table": "main.sales.orders", "columns": {}})
+    cache.save()
+
+    metadata = load_table_metadata(str(tmp_path / "audit_cache.json"))
+
+    assert metadata.tables == {"main.sales.orders": {"amount": "amount", "region": "region"}}
+
+
+def test_load_from_bare_mapping_file(tmp_path):
+    path = tmp_path / "columns.json"
+    path.write_text(json.dumps({"main.sales.orders": ["amount"]}))
+
+    assert load_table_metadata(str(path)).has_column("main.sales.orders", "amount")
+
+
+@pytest.mark.parametrize("source", [
+    {"main.sales.orders": ["amount"]},
+    [review("main.sales.orders", ["amount"])],
+    TableMetadata({"main.sales.orders": ["amount"]}),
+])
+def test_load_from_objects(source):
+    metadata = load_table_metadata(source)
+
+    assert metadata.has_column("main.sales.orders", "amount")
+    if isinstance(source, TableMetadata):
+        assert metadata is source
+
+
+def test_load_nothing():
+    assert load_table_metadata(None) is None
+    assert load_table_metadata({}) is None
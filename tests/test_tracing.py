@@ -0,0 +1,152 @@
+import json
+import threading
+
+import pytest
+
+import tracing
+from tracing import NOOP_SPAN, TRACER, Tracer, finish_tracing, span, start_span, traced
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    monkeypatch.setattr(TRACER, "enabled", True)
+    TRACER.reset()
+    yield TRACER
+    TRACER.reset()
+
+
+def test_disabled_tracing_is_a_noop(monkeypatch, capsys):
+    monkeypatch.setattr(TRACER, "enabled", False)
+    TRACER.reset()
+
+    @traced("work", attribute="table")
+    def work(table):
+        return table.upper()
+
+    with span("outer", tables=3) as outer:
+        outer.set(rows=1)
+        assert work("orders") == "ORDERS"
+    TRACER.record("rule", 0.5)
+
+    assert outer is NOOP_SPAN
+    assert start_span("manual") is NOOP_SPAN and Tracer().span("x") is NOOP_SPAN
+    assert TRACER.spans == []
+    finish_tracing()
+    assert capsys.readouterr().out == ""
+
+
+def test_spans_nest_and_record_errors(tracer):
+    @traced("review", attribute="table")
+    def review(table):
+        if table == "bad":
+            raise ValueError("no access")
+
+    with span("discover", tables=2) as outer:
+        review("orders")
+        with pytest.raises(ValueError):
+            review("bad")
+        outer.set(done=True)
+    with span("later"):
+        pass
+
+    ok, failed, discover, later = tracer.spans
+    assert [s.name for s in tracer.spans] == ["review", "review", "discover", "later"]
+    assert ok.parent_id == failed.parent_id == discover.span_id
+    assert ok.trace_id == discover.trace_id
+    assert discover.parent_id is None and later.parent_id is None and later.trace_id != discover.trace_id
+    assert ok.attributes == {"table": "orders"} and ok.error is None
+    assert failed.error == "ValueError: no access"
+    assert discover.attributes == {"tables": 2, "done": True}
+    assert tracer.current.get() is None
+
+
+def test_worker_thread_spans_need_an_explicit_parent(tracer):
+    with span("batch") as batch:
+        threads = [threading.Thread(target=lambda: start_span("orphan").end()),
+                   threading.Thread(target=lambda: start_span("child", parent=batch).end())]
+        for thread in threads:
+            thread.start()
+            thread.join()
+
+    by_name = {s.name: s for s in tracer.spans}
+    assert by_name["orphan"].parent_id is None
+    assert by_name["child"].parent_id == batch.span_id
+
+
+def test_start_span_and_record(tracer):
+    manual = start_span("upload", rows=10)
+    assert tracer.spans == []
+    manual.end()
+    manual.end()  # ending twice records once
+    with span("validate") as outer:
+        tracer.record("rule.sorting", 0.25, start_ns=1_000, rule="sorting")
+
+    upload, rule, validate = tracer.spans
+    assert upload.name == "upload" and upload.end_ns is not None
+    assert (rule.start_ns, rule.end_ns, rule.seconds) == (1_000, 250_001_000, 0.25)
+    assert rule.parent_id == outer.span_id and rule.attributes == {"rule": "sorting"}
+    assert validate is outer
+
+
+def test_summary(tracer):
+    for i in range(1, 21):
+        tracer.record("rule", i / 100)
+    tracer.record("once", 0.5)
+    with pytest.raises(KeyError):
+        with span("fails"):
+            raise KeyError("x")
+
+    rule, once, fails = tracer.summary()
+
+    assert rule["name"] == "rule" and rule["count"] == 20 and rule["errors"] == 0
+    assert rule["total"] == pytest.approx(2.1)
+    assert rule["mean"] == pytest.approx(0.105)
+    assert rule["p95"] == pytest.approx(0.19)
+    assert rule["max"] == pytest.approx(0.20)
+    assert (once["count"], once["p95"], once["max"]) == (1, 0.5, 0.5)
+    assert (fails["name"], fails["errors"]) == ("fails", 1)
+
+
+def test_export_jsonl(tracer, tmp_path, capsys):
+    with span("outer", table="main.sales.orders"):
+        tracer.record("inner", 0.125, start_ns=2_000_000_000, columns=4)
+    path = tmp_path / "trace.jsonl"
+
+    finish_tracing(str(path))
+
+    inner, outer = [json.loads(line) for line in path.read_text().splitlines()]
+    assert set(inner) == {"name", "trace_id", "span_id", "parent_id", "start", "seconds", "attributes", "error"}
+    assert (inner["name"], inner["start"], inner["seconds"]) == ("inner", 2.0, 0.125)
+    assert inner["parent_id"] == outer["span_id"] and outer["parent_id"] is None
+    assert inner["attributes"] == {"columns": 4} and outer["attributes"] == {"table": "main.sales.orders"}
+    assert "TIMING SUMMARY" in capsys.readouterr().out
+    assert tracer.spans == []  # finish_tracing clears the spans
+
+
+def test_export_otlp(tracer, tmp_path, monkeypatch):
+    with span("outer", table="main.sales.orders", rows=3, ratio=0.5, ok=True, tags=["a"]):
+        with pytest.raises(RuntimeError):
+            with span("inner"):
+                raise RuntimeError("boom")
+    path = tmp_path / "trace.json"
+    monkeypatch.setenv(tracing.TRACE_FILE_ENV, str(path))
+
+    finish_tracing()
+
+    [resource] = json.loads(path.read_text())["resourceSpans"]
+    assert resource["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "prompt-to-genie"}}]
+    [scope] = resource["scopeSpans"]
+    assert scope["scope"] == {"name": "genie.tracing"}
+    inner, outer = scope["spans"]
+    assert inner["parentSpanId"] == outer["spanId"] and "parentSpanId" not in outer
+    assert inner["traceId"] == outer["traceId"] and len(outer["traceId"]) == 32 and len(outer["spanId"]) == 16
+    assert inner["status"] == {"code": 2, "message": "RuntimeError: boom"}
+    assert outer["status"] == {"code": 1} and outer["kind"] == 1
+    assert int(outer["startTimeUnixNano"]) <= int(inner["startTimeUnixNano"]) <= int(inner["endTimeUnixNano"])
+    assert outer["attributes"] == [
+        {"key": "table", "value": {"stringValue": "main.sales.orders"}},
+        {"key": "rows", "value": {"intValue": "3"}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "ok", "value": {"boolValue": True}},
+        {"key": "tags", "value": {"stringValue": '["a"]'}},
+    ]
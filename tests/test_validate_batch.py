@@ -0,0 +1,134 @@
+import importlib
+import json
+import shutil
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import sql_analyzer
+from validate_batch import VALIDATOR_MODULES, expand_paths, main, validate_file, validate_files, validator_fingerprint
+
+CLEAN_CONFIG = {"version": 2, "data_sources": {"tables": [{"identifier": "main.sales.orders"}]}}
+UNSORTED_CONFIG = {"version": 2, "data_sources": {"tables": [{"identifier": "main.sales.z"}, {"identifier": "main.sales.a"}]}}
+NO_QUESTIONS = "No sample questions defined. Recommend adding 3-5 starter questions."
+
+
+def write_config(path, config) -> str:
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+@pytest.mark.parametrize("module", VALIDATOR_MODULES)
+def test_fingerprint_covers_every_validator_module(module, tmp_path, monkeypatch):
+    imported = importlib.import_module(module)
+    copy = tmp_path / f"{module}.py"
+    shutil.copy(imported.__file__, copy)
+    monkeypatch.setattr(imported, "__file__", str(copy))
+    before = validator_fingerprint()
+
+    copy.write_text(copy.read_text() + "\n# edited\n")
+
+    assert validator_fingerprint() != before
+
+
+def test_cache_expires_when_sql_analyzer_changes(tmp_path, monkeypatch):
+    path = write_config(tmp_path / "space.json", CLEAN_CONFIG)
+    cache_path = str(tmp_path / "cache.json")
+    [first] = validate_files([path], workers=1, cache_path=cache_path)
+    [cached] = validate_files([path], workers=1, cache_path=cache_path)
+    analyzer_copy = tmp_path / "sql_analyzer.py"
+    analyzer_copy.write_text(open(sql_analyzer.__file__).read() + "\n# edited\n")
+    monkeypatch.setattr(sql_analyzer, "__file__", str(analyzer_copy))
+
+    [revalidated] = validate_files([path], workers=1, cache_path=cache_path)
+
+    assert not first["cached"] and not first["errors"]
+    assert cached["cached"]
+    assert not revalidated["cached"]
+
+
+def test_expand_paths(tmp_path):
+    (tmp_path / "spaces" / "nested").mkdir(parents=True)
+    a = write_config(tmp_path / "spaces" / "a.json", CLEAN_CONFIG)
+    b = write_config(tmp_path / "spaces" / "nested" / "b.json", CLEAN_CONFIG)
+    (tmp_path / "spaces" / "notes.txt").write_text("not a config")
+    (tmp_path / "spaces" / "dir.json").mkdir()
+
+    paths = expand_paths([str(tmp_path / "spaces"), str(tmp_path / "spaces" / "*.json"), a, str(tmp_path / "missing.json")])
+
+    assert paths == [a, b, str(tmp_path / "missing.json")]
+
+
+def test_exit_code_and_text_report(tmp_path, capsys):
+    clean = write_config(tmp_path / "clean.json", CLEAN_CONFIG)
+    broken = write_config(tmp_path / "broken.json", UNSORTED_CONFIG)
+
+    assert main([clean, "--no-cache"]) == 0
+    assert main([clean, broken, "--no-cache"]) == 1
+    out, err = capsys.readouterr()
+    assert f"✓ {clean}: 0 error(s), 1 warning(s)" in out
+    assert f"✗ {broken}: 1 error(s), 1 warning(s)" in out
+    assert "    ✗ [data_sources.tables] Array must be sorted by 'identifier'." in out
+    assert err.splitlines()[-1] == "2 file(s): 1 with errors, 1 error(s), 2 warning(s), 0 cached"
+
+
+def test_malformed_files_are_errors(tmp_path):
+    truncated = tmp_path / "truncated.json"
+    truncated.write_text('{"version": 2, "data_sources": ')
+    not_object = write_config(tmp_path / "list.json", [CLEAN_CONFIG])
+
+    results = validate_files([str(truncated), not_object, str(tmp_path / "missing.json")], workers=1, cache_path=None)
+
+    assert [r["errors"] for r in results] == [1, 1, 1]
+    assert all(r["issues"][0]["message"].startswith("Could not read config — ") for r in results)
+    assert "top-level JSON value must be an object, got list" in results[1]["issues"][0]["message"]
+
+
+def test_json_report(tmp_path):
+    clean = write_config(tmp_path / "clean.json", CLEAN_CONFIG)
+    broken = write_config(tmp_path / "broken.json", UNSORTED_CONFIG)
+    output = tmp_path / "report.json"
+
+    assert main([clean, broken, "--no-cache", "--format", "json", "--output", str(output)]) == 1
+
+    report = json.loads(output.read_text())
+    assert report["summary"] == {"files": 2, "files_with_errors": 1, "errors": 1, "warnings": 2, "cached": 0}
+    assert [(f["path"], f["errors"], f["warnings"]) for f in report["files"]] == [(clean, 0, 1), (broken, 1, 1)]
+    assert report["files"][1]["issues"][1]["path"] == "data_sources.tables"
+
+
+def test_junit_report(tmp_path):
+    clean = write_config(tmp_path / "clean.json", CLEAN_CONFIG)
+    broken = write_config(tmp_path / "broken.json", UNSORTED_CONFIG)
+    output = tmp_path / "report.xml"
+
+    assert main([clean, broken, "--no-cache", "--format", "junit", "--output", str(output)]) == 1
+
+    suite = ET.parse(output).getroot()
+    assert (suite.tag, suite.get("tests"), suite.get("failures")) == ("testsuite", "2", "1")
+    clean_case, broken_case = suite.findall("testcase")
+    assert clean_case.get("name") == clean and clean_case.find("failure") is None
+    assert clean_case.find("system-out").text == f"[config.sample_questions] {NO_QUESTIONS}"
+    failure = broken_case.find("failure")
+    assert (failure.get("message"), failure.get("type")) == ("1 error(s)", "ValidationError")
+    assert failure.text.startswith("[data_sources.tables] Array must be sorted by 'identifier'.")
+
+
+def test_cache_skips_clean_files_and_replays_warnings(tmp_path, monkeypatch):
+    clean = write_config(tmp_path / "clean.json", CLEAN_CONFIG)
+    broken = write_config(tmp_path / "broken.json", UNSORTED_CONFIG)
+    cache_path = str(tmp_path / "cache.json")
+    validate_files([clean, broken], workers=1, cache_path=cache_path)
+    validated = []
+    monkeypatch.setattr("validate_batch.validate_file_args", lambda args: validated.append(args[0]) or validate_file(*args))
+
+    second_clean, second_broken = validate_files([clean, broken], workers=1, cache_path=cache_path)
+
+    assert validated == [broken]  # files with errors are always re-validated
+    assert second_clean["cached"] and second_clean["seconds"] == 0.0
+    assert second_clean["issues"] == [{"level": "warning", "path": "config.sample_questions", "message": NO_QUESTIONS}]
+    assert not second_broken["cached"] and second_broken["errors"] == 1
+
+    write_config(tmp_path / "clean.json", {**CLEAN_CONFIG, "config": {}})
+    [edited] = validate_files([clean], workers=1, cache_path=cache_path)
+    assert not edited["cached"]
@@ -0,0 +1,261 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from discover_resources import AuditCache
+from table_metadata import TableMetadata
+from validate_config import (
+    WALK_ORDER, TokenCounter, build_synthetic_config, estimate_token_budget, estimate_tokens, validate_config,
+    validate_config_stream,
+)
+
+# Issues the original multi-pass validator (before the rule engine) reported for
+# a config with a defect of every kind and for a synthetic config
+BASELINE = json.loads((Path(__file__).parent / "fixtures" / "validate_config_baseline.json").read_text())
+
+
+def test_matches_baseline_on_defects():
+    defects = BASELINE["defects"]
+
+    assert validate_config(defects["config"]) == defects["issues"]
+
+
+def test_matches_baseline_on_synthetic_config():
+    synthetic = BASELINE["synthetic"]
+    config = build_synthetic_config(synthetic["num_items"], synthetic["num_example_sqls"])
+
+    assert validate_config(config) == synthetic["issues"]
+
+
+@pytest.mark.parametrize("similarity_mode", ["exact", "indexed"])
+def test_similarity_modes_match_baseline(similarity_mode):
+    defects = BASELINE["defects"]
+
+    assert validate_config(defects["config"], similarity_mode=similarity_mode) == defects["issues"]
+
+
+def test_all_sections_match_full_validation():
+    defects = BASELINE["defects"]
+
+    assert validate_config(defects["config"], sections=WALK_ORDER) == defects["issues"]
+
+
+def test_stream_reports_the_same_issues():
+    defects = BASELINE["defects"]
+    streamed = list(validate_config_stream(io.StringIO(json.dumps(defects["config"])), chunk_size=64))
+
+    def key(issue):
+        return issue["path"], issue["message"]
+
+    assert sorted(streamed, key=key) == sorted(defects["issues"], key=key)
+
+
+SECTIONS_CONFIG = {
+    "version": 2,
+    "config": {"sample_questions": [{"id": "a0000000000000000000000000000001", "question": ["Total sales?"]}]},
+    "data_sources": {"tables": [{"identifier": "main.sales.orders"}]},
+    "instructions": {
+        "example_question_sqls": [{"id": "b0000000000000000000000000000001", "question": ["Sales by region"],
+                                   "sql": ["SELECT region\n", "FROM main.sales.orders"],
+                                   "usage_guidance": ["Regional totals"]}],
+        "sql_snippets": {"measures": [{"id": "b0000000000000000000000000000001", "alias": "revenue",
+                                       "sql": ["SUM(ordrs.amount)"], "synonyms": ["sales"],
+                                       "instruction": ["Total revenue"]}]},
+    },
+    "benchmarks": {"questions": [{"id": "a0000000000000000000000000000001", "question": ["Total?"],
+                                  "answer": [{"format": "SQL", "content": ["SELECT 1"]}]}]},
+}
+BENCHMARK_DUPLICATE = {"level": "error", "path": "benchmarks.questions[0]",
+                       "message": "Duplicate ID 'a0000000000000000000000000000001' — also used at config.sample_questions[0]"}
+SNIPPET_TABLE = {"level": "error", "path": "instructions.sql_snippets.measures[0].sql",
+                 "message": "Table reference 'ordrs' not found in data_sources. Known tables: ['orders']. "
+                            "Check for typos in the table name prefix."}
+SNIPPET_DUPLICATE = {"level": "error", "path": "instructions.sql_snippets.measures[0]",
+                     "message": "Duplicate ID 'b0000000000000000000000000000001' — also used at "
+                                "instructions.example_question_sqls[0]"}
+
+
+def test_full_validation_of_sections_config():
+    assert validate_config(SECTIONS_CONFIG) == [SNIPPET_TABLE, BENCHMARK_DUPLICATE, SNIPPET_DUPLICATE]
+
+
+@pytest.mark.parametrize("sections, expected", [
+    # IDs of unchanged sections still count for duplicates
+    ({"benchmarks.questions"}, [BENCHMARK_DUPLICATE]),
+    ({"config.sample_questions"}, [{**BENCHMARK_DUPLICATE, "path": "config.sample_questions[0]",
+                                     "message": BENCHMARK_DUPLICATE["message"].replace(
+                                         "config.sample_questions[0]", "benchmarks.questions[0]")}]),
+    # Table names of unchanged sections still resolve snippet references
+    ({"instructions.sql_snippets.measures"}, [SNIPPET_TABLE, SNIPPET_DUPLICATE]),
+    # Changed tables re-check the snippets that reference them
+    ({"data_sources.tables"}, [SNIPPET_TABLE, SNIPPET_DUPLICATE]),
+    ({"instructions.example_question_sqls"}, [{**SNIPPET_DUPLICATE, "path": "instructions.example_question_sqls[0]",
+                                               "message": SNIPPET_DUPLICATE["message"].replace(
+                                                   "instructions.example_question_sqls[0]",
+                                                   "instructions.sql_snippets.measures[0]")}]),
+    ({"instructions.text_instructions"}, []),
+])
+def test_partial_section_validation(sections, expected):
+    assert validate_config(SECTIONS_CONFIG, sections=sections) == expected
+
+
+def test_partial_validation_rejects_unknown_sections():
+    with pytest.raises(ValueError, match="Unknown section"):
+        validate_config(SECTIONS_CONFIG, sections={"instructions.examples"})
+
+
+def snippet_filters_config(*sqls) -> dict:
+    return {"version": 2, "config": {"sample_questions": [{"id": "f" * 32, "question": ["Orders?"]}]},
+            "data_sources": {"tables": [{"identifier": "main.sales.orders"}]},
+            "instructions": {"sql_snippets": {"filters": [
+                {"id": f"a{i:031d}", "display_name": "Filter", "synonyms": ["filter"], "instruction": ["Use it"],
+                 "sql": [sql]} for i, sql in enumerate(sqls)]}}}
+
+
+def test_snippet_bare_column_and_parse_warnings():
+    issues = validate_config(snippet_filters_config(
+        "orders.amount > 0 AND status = 'paid'",  # bare next to a qualified reference
+        "status = 'paid'",
+        "orders.status = 'paid' -- status",  # only mentioned in a comment
+        "(orders.amount > 0",
+    ))
+
+    assert [(i["level"], i["path"], i["message"].split(" (")[0].split(" is not")[0]) for i in issues] == [
+        ("warning", "instructions.sql_snippets.filters[0].sql", "Column 'status'"),
+        ("warning", "instructions.sql_snippets.filters[1].sql", "Column 'status'"),
+        ("warning", "instructions.sql_snippets.filters[3].sql", "SQL expression doesn't parse"),
+    ]
+    assert "not table-qualified" in issues[0]["message"]
+    assert "unbalanced parentheses" in issues[2]["message"]
+
+
+COLUMN_REFS_CONFIG = {
+    "version": 2,
+    "config": {"sample_questions": [{"id": "f" * 32, "question": ["Orders?"]}]},
+    "data_sources": {"tables": [
+        {"identifier": "main.sales.customers"},
+        {"identifier": "main.sales.orders", "column_configs": [{"column_name": "amout"}, {"column_name": "region"}]},
+    ]},
+    "instructions": {
+        "join_specs": [{"id": "b" * 32, "left": {"identifier": "main.sales.orders", "alias": "o"},
+                        "right": {"identifier": "main.sales.customers", "alias": "c"},
+                        "sql": ["o.custmer_id = c.id", "--rt=FROM_RELATIONSHIP_TYPE_MANY_TO_ONE--"],
+                        "instruction": ["Orders to their customer"]}],
+        "sql_snippets": {"measures": [{"id": "c" * 32, "alias": "total", "synonyms": ["total"], "instruction": ["Sum"],
+                                       "sql": ["SUM(orders.amount + orders.taxx) + SUM(main.sales.customers.credit)"]}]},
+    },
+}
+REAL_COLUMNS = {"main.sales.orders": ["amount", "tax", "customer_id", "region"], "main.sales.customers": ["id", "name"]}
+
+
+@pytest.mark.parametrize("table_columns", ["mapping", "fixture", "audit cache"])
+def test_column_refs_checked_against_table_columns(table_columns, tmp_path):
+    if table_columns == "mapping":
+        source = REAL_COLUMNS
+    elif table_columns == "fixture":
+        source = str(tmp_path / "catalog_snapshot.json")
+        TableMetadata(REAL_COLUMNS).save_fixture(source)
+    else:
+        source = str(tmp_path / "audit_cache.json")
+        cache = AuditCache(source)
+        for table, columns in REAL_COLUMNS.items():
+            cache.put(f"review:{table}", "v1", {"table": table, "exists": True, "columns": [{"name": c} for c in columns]})
+        cache.save()
+
+    issues = validate_config(COLUMN_REFS_CONFIG, table_columns=source)
+
+    assert [(i["level"], i["path"], i["message"]) for i in issues] == [
+        ("error", "instructions.sql_snippets.measures[0].sql",
+         "Column 'taxx' not found in main.sales.orders. Did you mean 'tax'? Check for typos in the column name."),
+        ("error", "instructions.sql_snippets.measures[0].sql",
+         "Column 'credit' not found in main.sales.customers. Check for typos in the column name."),
+        ("warning", "data_sources.tables[1].column_configs[0].column_name",
+         "Column 'amout' not found in main.sales.orders. Did you mean 'amount'? "
+         "This column config has no effect — fix the column_name or remove the entry."),
+        ("error", "instructions.join_specs[0].sql",
+         "Column 'custmer_id' not found in main.sales.orders. Did you mean 'customer_id'? "
+         "Check for typos in the column name."),
+    ]
+
+
+def test_column_refs_unchecked_without_table_columns():
+    assert validate_config(COLUMN_REFS_CONFIG) == []
+    # Tables missing from the metadata are not checked
+    assert validate_config(COLUMN_REFS_CONFIG, table_columns={"main.sales.returns": ["id"]}) == []
+
+
+TOKEN_CONFIG = {
+    "version": 2,
+    "data_sources": {"tables": [{
+        "identifier": "main.sales.orders",  # 7 tokens
+        "description": ["Orders placed"],  # 4
+        "column_configs": [
+            {"column_name": "amount", "description": ["Net amount"], "synonyms": ["total"]},  # 2 + 3 + 2
+            {"column_name": "internal_notes", "description": ["Free text notes"], "exclude": True},
+        ],
+    }]},
+    "instructions": {
+        "sql_snippets": {"measures": [{"id": "c" * 32, "alias": "revenue", "sql": ["SUM(amount)"]}]},  # 2 + 5
+        "example_question_sqls": [{"id": "a" * 32, "question": ["Top orders"], "sql": ["SELECT 12345"]}],  # 3 + 4
+        "text_instructions": [{"id": "b" * 32, "content": ["Use net amounts"]}],  # 4
+    },
+}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", 0),
+    ("a, b", 3),
+    ("SELECT 12345", 4),  # one word token per four letters, one number token per three digits
+    ("main.sales.orders", 7),
+])
+def test_estimate_tokens(text, expected):
+    assert estimate_tokens(text) == expected
+
+
+def test_token_budget_by_section():
+    report = estimate_token_budget(TOKEN_CONFIG)
+
+    assert report["by_category"] == {
+        "tables": 11, "column_configs": 7, "metric_views": 0, "sql_snippets": 7,
+        "example_question_sqls": 7, "join_specs": 0, "sql_functions": 0, "text_instructions": 4,
+    }
+    assert report["total"] == 36
+    assert not report["over_budget"] and report["issues"] == []
+    # The excluded column isn't counted
+    assert [item["path"] for item in report["heaviest"] if item["category"] == "column_configs"] == [
+        "data_sources.tables[0].column_configs[0]"]
+    assert report["heaviest"][0] == {"category": "tables", "path": "data_sources.tables[0]",
+                                     "label": "main.sales.orders", "tokens": 11}
+
+
+def test_token_budget_exceeded():
+    assert estimate_token_budget(TOKEN_CONFIG, budget=36)["issues"] == []
+
+    report = estimate_token_budget(TOKEN_CONFIG, budget=35)
+
+    assert report["over_budget"]
+    assert report["issues"] == [{
+        "level": "error",
+        "path": "",
+        "message": "Estimated 36 tokens exceeds the 35 token budget — tables is the largest section (11 tokens); "
+                   "shorten table descriptions.",
+    }]
+
+
+def test_token_counter_caches_by_content(tmp_path):
+    path = str(tmp_path / "token_counts.json")
+    counter = TokenCounter(path)
+    estimate_token_budget(TOKEN_CONFIG, counter=counter)
+    assert (counter.hits, counter.misses) == (0, 5)
+
+    counter.save()
+    reloaded = TokenCounter(path)
+    report = estimate_token_budget(TOKEN_CONFIG, counter=reloaded)
+
+    assert (reloaded.hits, reloaded.misses) == (5, 0)
+    assert report["total"] == 36
+    assert reloaded.count("main.sales.orders") == 7 and reloaded.misses == 1
+    # New text is counted once, then served from the cache
+    assert reloaded.count("main.sales.orders") == 7 and reloaded.hits == 6
@@ -0,0 +1,164 @@
+import pytest
+
+from verify_joins import cardinality_query, join_keys, verify_join, verify_join_specs
+
+ORDERS = {"identifier": "joins.orders", "alias": "o"}
+CUSTOMERS = {"identifier": "joins.customers", "alias": "c"}
+
+
+def join_spec(condition: str, relationship: str = "MANY_TO_ONE", left=ORDERS, right=CUSTOMERS) -> dict:
+    return {"id": "j1", "left": left, "right": right,
+            "sql": [condition, f"--rt=FROM_RELATIONSHIP_TYPE_{relationship}--"]}
+
+
+def stats(**overrides) -> dict:
+    """Cardinality query row: 100 orders over 10 customers, all matched."""
+    row = {"l_rows": 100, "l_null_rows": 0, "l_keys": 10, "l_duplicate_keys": 10, "l_max_rows_per_key": 10,
+           "l_orphan_keys": 0, "l_orphan_rows": 0,
+           "r_rows": 10, "r_null_rows": 0, "r_keys": 10, "r_duplicate_keys": 0, "r_max_rows_per_key": 1,
+           "r_orphan_keys": 0, "r_orphan_rows": 0, "joined_rows": 100}
+    return {**row, **overrides}
+
+
+class Row(dict):
+    def asDict(self):
+        return dict(self)
+
+
+class FakeSession:
+    """Answers every query with one canned cardinality row, recording the SQL."""
+
+    def __init__(self, row: dict = None, error: Exception = None):
+        self.row = row
+        self.error = error
+        self.queries = []
+
+    def sql(self, query):
+        self.queries.append(query)
+        if self.error:
+            raise self.error
+        return self
+
+    def collect(self):
+        return [Row(self.row)]
+
+
+def test_join_keys():
+    assert join_keys("o.customer_id = c.id AND o.region = c.region", ORDERS, CUSTOMERS) == [
+        ("o.customer_id", "c.id"), ("o.region", "c.region")]
+    assert join_keys("c.id = o.customer_id", ORDERS, CUSTOMERS) == [("o.customer_id", "c.id")]
+    assert join_keys("orders.customer_id = customers.id", {"identifier": "joins.orders"},
+                     {"identifier": "joins.customers"}) == [("orders.customer_id", "customers.id")]
+    assert join_keys("LOWER(o.email) = LOWER(c.email)", ORDERS, CUSTOMERS) == [("LOWER(o.email)", "LOWER(c.email)")]
+
+
+@pytest.mark.parametrize("condition, message", [
+    ("o.customer_id = c.id OR o.email = c.email", "OR in join condition"),
+    ("o.amount > c.credit_limit", "single equality"),
+    ("o.customer_id = o.id", "left-table key with a right-table key"),
+    ("o.customer_id + c.id = 1", "exactly one of the joined tables"),
+])
+def test_join_keys_rejects(condition, message):
+    with pytest.raises(ValueError, match=message):
+        join_keys(condition, ORDERS, CUSTOMERS)
+
+
+def test_join_keys_rejects_self_join_without_aliases():
+    with pytest.raises(ValueError, match="self-join"):
+        join_keys("employees.manager_id = employees.id", {"identifier": "hr.employees"}, {"identifier": "hr.employees"})
+
+
+def test_cardinality_query():
+    keys = [("o.customer_id", "c.id"), ("o.region", "c.region")]
+
+    query = cardinality_query(ORDERS, CUSTOMERS, keys)
+    sampled = cardinality_query(ORDERS, CUSTOMERS, keys, sample_percent=5)
+
+    assert "SELECT o.customer_id AS k0, o.region AS k1 FROM joins.orders AS `o`" in query
+    assert "SELECT c.id AS k0, c.region AS k1 FROM joins.customers AS `c`" in query
+    assert "FROM l FULL OUTER JOIN r ON l.k0 = r.k0 AND l.k1 = r.k1" in query
+    assert "xxhash64" not in query
+    # Both sides keep the same keys
+    assert sampled.count("pmod(xxhash64(CAST(k0 AS STRING), CAST(k1 AS STRING)), 10000) < 500") == 2
+
+
+def test_verify_join_matching_relationship():
+    session = FakeSession(stats())
+
+    result = verify_join(session, join_spec("o.customer_id = c.id"), 0)
+
+    assert (result["declared"], result["actual"], result["mismatch"]) == ("MANY_TO_ONE", "MANY_TO_ONE", False)
+    assert result["fan_out"] == 1.0
+    assert result["flags"] == []
+    assert session.queries == [result["sql"]]
+
+
+def test_verify_join_flags_fan_out_and_orphans():
+    # customers has 2 duplicated keys: 100 matched orders join to 120 rows; 10 of 110 orders have no customer
+    session = FakeSession(stats(l_rows=110, l_orphan_keys=1, l_orphan_rows=10, r_rows=12, r_duplicate_keys=2,
+                                r_max_rows_per_key=2, joined_rows=120))
+
+    result = verify_join(session, join_spec("o.customer_id = c.id"), 0)
+
+    assert result["actual"] == "MANY_TO_MANY"
+    assert result["mismatch"]
+    assert result["fan_out"] == 1.2
+    assert result["flags"] == [
+        "declared MANY_TO_ONE, but joins.customers has 2 duplicated key(s) (up to 2 rows per key) — measured MANY_TO_MANY",
+        "joins fan out: 1.20 output rows per matched joins.orders row",
+        "9.1% of joins.orders rows (1 key(s)) have no match in joins.customers",
+    ]
+
+
+def test_verify_join_tighter_relationship_is_not_a_mismatch():
+    result = verify_join(FakeSession(stats(l_duplicate_keys=0, l_rows=10, joined_rows=10)),
+                         join_spec("o.customer_id = c.id", "MANY_TO_MANY"), 0)
+
+    assert result["actual"] == "ONE_TO_ONE"
+    assert not result["mismatch"]
+    assert result["flags"] == ["declared MANY_TO_MANY, but the data supports the tighter ONE_TO_ONE"]
+
+
+def test_verify_join_errors():
+    unparsable = verify_join(FakeSession(stats()), join_spec("o.customer_id > c.id"), 0)
+    failed = verify_join(FakeSession(error=RuntimeError("TABLE_OR_VIEW_NOT_FOUND: joins.orders\nstack")),
+                         join_spec("o.customer_id = c.id"), 1)
+    missing_side = verify_join(FakeSession(stats()), {"left": ORDERS, "sql": ["o.id = c.id"]}, 2)
+
+    assert "single equality" in unparsable["error"]
+    assert failed["error"] == "TABLE_OR_VIEW_NOT_FOUND: joins.orders"
+    assert missing_side["error"] == "join spec needs left and right identifiers"
+
+
+def test_verify_join_specs_keeps_config_order():
+    config = {"instructions": {"join_specs": [join_spec("o.customer_id = c.id"), join_spec("o.x > c.y")]}}
+
+    results = verify_join_specs(FakeSession(stats()), config, max_workers=2)
+
+    assert [r["index"] for r in results] == [0, 1]
+    assert results[1]["error"]
+    assert verify_join_specs(FakeSession(), {}) == []
+
+
+@pytest.fixture(scope="module")
+def joins_tables(local_spark):
+    local_spark.sql("CREATE DATABASE IF NOT EXISTS joins")
+    local_spark.sql("CREATE TABLE joins.orders USING parquet AS SELECT * FROM VALUES "
+                    "(1, 10), (2, 10), (3, 20), (4, 30), (5, NULL) AS t(order_id, customer_id)")
+    local_spark.sql("CREATE TABLE joins.customers USING parquet AS SELECT * FROM VALUES "
+                    "(10, 'a'), (20, 'b'), (20, 'b2'), (40, 'c') AS t(id, name)")
+    return local_spark
+
+
+def test_local_spark_verify_join(joins_tables):
+    result = verify_join(joins_tables, join_spec("o.customer_id = c.id"), 0)
+
+    assert result["error"] is None
+    assert result["stats"] == {
+        "l_rows": 5, "l_null_rows": 1, "l_keys": 3, "l_duplicate_keys": 1, "l_max_rows_per_key": 2,
+        "l_orphan_keys": 1, "l_orphan_rows": 1,
+        "r_rows": 4, "r_null_rows": 0, "r_keys": 3, "r_duplicate_keys": 1, "r_max_rows_per_key": 2,
+        "r_orphan_keys": 1, "r_orphan_rows": 1, "joined_rows": 4,
+    }
+    assert result["actual"] == "MANY_TO_MANY"
+    assert result["mismatch"]